@@ -20,6 +20,8 @@ def main():
     p.add_argument("--top_level_only", action="store_true")
     p.add_argument("--max_files", type=int, default=None)
     p.add_argument("--catalog", default="Data/doc_catalog.json")
+    p.add_argument("--workers", type=int, default=None, help="Procesos para parsear documentos (1 = secuencial)")
+    p.add_argument("--full_rebuild", action="store_true", help="Ignora índice y caché de archivos existentes")
     args = p.parse_args()
 
     res = build_docs_index(
@@ -32,6 +34,8 @@ def main():
         top_level_only=args.top_level_only,
         max_files=args.max_files,
         catalog_path=args.catalog,
+        full_rebuild=args.full_rebuild,
+        parse_workers=args.workers,
     )
 
     print(json.dumps(res, ensure_ascii=False, indent=2))
@@ -0,0 +1,307 @@
+# Tools/docs_indexer/batch_embeddings.py
+# Motor de embeddings por lotes para los indexadores (docs, guides, quotes, etiquetas)
+# - Empaqueta los textos en llamadas multi-input a embeddings.create (tope de items y de tokens)
+# - Varios lotes en vuelo a la vez (EMBED_BATCH_CONCURRENCY)
+# - Rate limits: backoff exponencial con jitter (respeta retry-after) y baja la concurrencia
+#   de forma adaptativa; la recupera poco a poco cuando vuelven los éxitos
+# - Resultados en el mismo orden de entrada (None para textos que no se pudieron embeber)
+# - EMBED_PROVIDER=fake: vectores deterministas locales, sin red ni costo (Tools/index_bench, CI)
+
+import os
+import time
+import random
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import openai
+
+from Tools.search_tickets import EMBEDDING_MODEL, OPENAI_API_KEY_SEMANTIC
+from utils.logs import log_ai_call
+from .utils import normalize_vec_1d, encode_texts
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------
+# Config
+# ----------------------------
+EMBED_BATCH_MAX_ITEMS = int(os.getenv("EMBED_BATCH_MAX_ITEMS", "256"))
+EMBED_BATCH_MAX_TOKENS = int(os.getenv("EMBED_BATCH_MAX_TOKENS", "100000"))
+EMBED_BATCH_CONCURRENCY = int(os.getenv("EMBED_BATCH_CONCURRENCY", "4"))
+EMBED_BATCH_MAX_RETRIES = int(os.getenv("EMBED_BATCH_MAX_RETRIES", "6"))
+EMBED_BATCH_BACKOFF_BASE = float(os.getenv("EMBED_BATCH_BACKOFF_BASE", "1.0"))
+EMBED_BATCH_BACKOFF_MAX = float(os.getenv("EMBED_BATCH_BACKOFF_MAX", "60"))
+
+# Límite de tokens por input de text-embedding-ada-002
+EMBED_MAX_INPUT_TOKENS = 8191
+ENCODING_NAME = "cl100k_base"
+
+# "openai" (default) | "fake"
+EMBED_PROVIDER = os.getenv("EMBED_PROVIDER", "openai")
+EMBED_FAKE_DIM = int(os.getenv("EMBED_FAKE_DIM", "1536"))
+_provider = {"name": EMBED_PROVIDER}
+
+_RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+
+class _AdaptiveGate:
+    """
+    Semáforo con límite dinámico (AIMD):
+    - rate limit → límite a la mitad + pausa global hasta `cooldown_until`
+    - cada `recover_after` éxitos seguidos → límite + 1 (hasta max_limit)
+    """
+
+    def __init__(self, max_limit: int, recover_after: int = 5):
+        self.max_limit = max(1, max_limit)
+        self.limit = self.max_limit
+        self.recover_after = recover_after
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while True:
+                wait = self.cooldown_until - time.monotonic()
+                if wait <= 0 and self.in_flight < self.limit:
+                    self.in_flight += 1
+                    return
+                self._cond.wait(timeout=wait if wait > 0 else None)
+
+    def release(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self) -> None:
+        with self._cond:
+            self._successes += 1
+            if self.limit < self.max_limit and self._successes >= self.recover_after:
+                self.limit += 1
+                self._successes = 0
+                self._cond.notify_all()
+
+    def on_rate_limit(self, delay: float) -> None:
+        with self._cond:
+            self._successes = 0
+            self.limit = max(1, self.limit // 2)
+            self.cooldown_until = max(self.cooldown_until, time.monotonic() + delay)
+
+
+def _retry_after_seconds(err: Exception) -> Optional[float]:
+    response = getattr(err, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") if hasattr(headers, "get") else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(attempt: int) -> float:
+    return random.uniform(0.5, 1.0) * min(EMBED_BATCH_BACKOFF_MAX, EMBED_BATCH_BACKOFF_BASE * (2 ** attempt))
+
+
+def set_embedding_provider(name: str) -> str:
+    """Cambia el proveedor de embeddings del proceso ("openai" | "fake"). Retorna el anterior."""
+    if name not in ("openai", "fake"):
+        raise ValueError(f"Proveedor de embeddings desconocido: {name}")
+    previous = _provider["name"]
+    _provider["name"] = name
+    return previous
+
+
+def provider_model() -> str:
+    """Modelo con el que se guardan los vectores en el store: los falsos nunca se mezclan con los reales."""
+    return EMBEDDING_MODEL if _provider["name"] == "openai" else f"fake-{EMBED_FAKE_DIM}"
+
+
+def fake_embedding(text: str, dim: int = EMBED_FAKE_DIM) -> np.ndarray:
+    """Vector normalizado determinista por texto (mismo texto → mismo vector), sin red."""
+    seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+    return normalize_vec_1d(np.random.default_rng(seed).standard_normal(dim, dtype=np.float32))
+
+
+def pack_batches(
+    token_counts: Sequence[int],
+    max_items: int = EMBED_BATCH_MAX_ITEMS,
+    max_tokens: int = EMBED_BATCH_MAX_TOKENS,
+) -> List[List[int]]:
+    """
+    Agrupa posiciones consecutivas en lotes que no exceden max_items ni max_tokens.
+    Las posiciones con token_count <= 0 se omiten (texto vacío / demasiado largo).
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for pos, n in enumerate(token_counts):
+        if n <= 0:
+            continue
+        if current and (len(current) >= max_items or current_tokens + n > max_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(pos)
+        current_tokens += n
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _create_embeddings(inputs: List[str], conversation_id: str) -> List[np.ndarray]:
+    """Una llamada multi-input a embeddings.create; retorna vectores normalizados en orden."""
+    resp = openai.embeddings.create(model=EMBEDDING_MODEL, input=inputs)
+    data = sorted(resp.data, key=lambda d: d.index)
+
+    usage = getattr(resp, "usage", None)
+    token_usage = {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "total_tokens": getattr(usage, "total_tokens", 0) or 0,
+    }
+    try:
+        log_ai_call(
+            call_type="Embedding Generation (batch)",
+            model=EMBEDDING_MODEL,
+            provider="openai",
+            messages=[{"role": "user", "content": f"{len(inputs)} inputs"}],
+            response={"status": "success", "inputs": len(inputs), "dimension": len(data[0].embedding) if data else 0},
+            token_usage=token_usage,
+            conversation_id=conversation_id,
+            interaction_id=None,
+            tool="embed_texts_batched",
+        )
+    except Exception as log_error:
+        logger.debug(f"[BatchEmbeddings] Error al registrar embedding en log: {log_error}")
+
+    return [normalize_vec_1d(np.asarray(d.embedding, dtype=np.float32)) for d in data]
+
+
+def _embed_batch(
+    texts: List[str],
+    positions: List[int],
+    conversation_id: str,
+    gate: _AdaptiveGate,
+) -> List[Tuple[int, Optional[np.ndarray]]]:
+    """Embebe un lote con reintentos; un input inválido se aísla partiendo el lote en dos."""
+    inputs = [texts[p] for p in positions]
+    attempt = 0
+    while True:
+        gate.acquire()
+        try:
+            vecs = _create_embeddings(inputs, conversation_id)
+        except _RETRYABLE_ERRORS as e:
+            gate.release()
+            if attempt >= EMBED_BATCH_MAX_RETRIES:
+                logger.error(f"[BatchEmbeddings] ❌ Lote de {len(inputs)} falló tras {attempt} reintentos: {e}")
+                return [(p, None) for p in positions]
+            delay = _retry_after_seconds(e) or _backoff(attempt)
+            attempt += 1
+            if isinstance(e, openai.RateLimitError):
+                gate.on_rate_limit(delay)
+                logger.warning(
+                    f"[BatchEmbeddings] ⏳ Rate limit; pausa {delay:.1f}s, concurrencia → {gate.limit}"
+                )
+            else:
+                logger.warning(f"[BatchEmbeddings] 🔁 Reintento {attempt} en {delay:.1f}s: {e}")
+                time.sleep(delay)
+            continue
+        except openai.BadRequestError as e:
+            gate.release()
+            if len(positions) == 1:
+                logger.error(f"[BatchEmbeddings] ❌ Input {positions[0]} rechazado: {e}")
+                return [(positions[0], None)]
+            mid = len(positions) // 2
+            return (
+                _embed_batch(texts, positions[:mid], conversation_id, gate)
+                + _embed_batch(texts, positions[mid:], conversation_id, gate)
+            )
+        except Exception as e:
+            gate.release()
+            logger.error(f"[BatchEmbeddings] ❌ Error embebiendo lote de {len(inputs)}: {e}")
+            return [(p, None) for p in positions]
+
+        gate.release()
+        gate.on_success()
+        return list(zip(positions, vecs))
+
+
+def embed_texts_batched(
+    texts: Sequence[str],
+    conversation_id: str,
+    on_batch: Optional[Callable[[List[Tuple[int, np.ndarray]]], None]] = None,
+    max_items: int = EMBED_BATCH_MAX_ITEMS,
+    max_tokens: int = EMBED_BATCH_MAX_TOKENS,
+    concurrency: int = EMBED_BATCH_CONCURRENCY,
+) -> List[Optional[np.ndarray]]:
+    """
+    Embebe muchos textos con llamadas multi-input concurrentes.
+
+    Args:
+        texts: Textos a embeber
+        conversation_id: ID para el log de costos (p. ej. "index_quotes:quotes")
+        on_batch: Callback opcional por lote terminado con [(posición, vector)] exitosos;
+                  se llama desde el hilo que invocó esta función (útil para persistir el cache
+                  de forma incremental sin locks)
+
+    Returns:
+        Lista alineada con texts: vector 1D float32 normalizado o None si falló / texto vacío /
+        texto mayor a EMBED_MAX_INPUT_TOKENS.
+    """
+    if openai.api_key is None and OPENAI_API_KEY_SEMANTIC:
+        openai.api_key = OPENAI_API_KEY_SEMANTIC
+
+    texts = list(texts)
+    results: List[Optional[np.ndarray]] = [None] * len(texts)
+    if not texts:
+        return results
+
+    # Conteo de tokens de todos los textos en un solo encode_batch
+    encoded = encode_texts([t if t and t.strip() else "" for t in texts], ENCODING_NAME)
+    token_counts = []
+    for pos, toks in enumerate(encoded):
+        n = len(toks)
+        if n > EMBED_MAX_INPUT_TOKENS:
+            logger.warning(f"[BatchEmbeddings] ⚠️ Texto {pos} excede {EMBED_MAX_INPUT_TOKENS} tokens ({n}); se omite")
+            n = 0
+        token_counts.append(n)
+
+    batches = pack_batches(token_counts, max_items=max_items, max_tokens=max_tokens)
+    total_tokens = sum(token_counts)
+    logger.info(
+        f"[BatchEmbeddings] 🚀 {sum(len(b) for b in batches)} textos ({total_tokens} tokens) "
+        f"en {len(batches)} lotes, concurrencia {concurrency}"
+    )
+
+    t0 = time.time()
+    if _provider["name"] == "fake":
+        for b in batches:
+            done = [(p, fake_embedding(texts[p])) for p in b]
+            for p, v in done:
+                results[p] = v
+            if on_batch and done:
+                on_batch(done)
+        logger.info(f"[BatchEmbeddings] 🧪 {len(texts)} embeddings falsos (EMBED_PROVIDER=fake) en {time.time() - t0:.1f}s")
+        return results
+
+    gate = _AdaptiveGate(concurrency)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="embed-batch") as pool:
+        futures = [pool.submit(_embed_batch, texts, b, conversation_id, gate) for b in batches]
+        for fut in as_completed(futures):
+            done = fut.result()
+            ok = [(p, v) for p, v in done if v is not None]
+            for p, v in done:
+                results[p] = v
+            if on_batch and ok:
+                on_batch(ok)
+
+    embedded = sum(1 for r in results if r is not None)
+    logger.info(f"[BatchEmbeddings] ✅ {embedded}/{len(texts)} embeddings en {time.time() - t0:.1f}s")
+    return results
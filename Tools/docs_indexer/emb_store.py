@@ -0,0 +1,434 @@
+# Tools/docs_indexer/emb_store.py
+# Store binario de embeddings (reemplaza los Data/*_emb_cache.jsonl)
+# - Vectores float32 en segmentos append-only (<dir>/seg_000001.f32), leídos con np.memmap
+# - Claves en un archivo paralelo por segmento (<dir>/seg_000001.keys, una por línea);
+#   la fila i del .f32 corresponde a la línea i del .keys
+# - manifest.json: lista de segmentos con modelo y dimensión; índice (modelo, clave) → (segmento, fila)
+# - Compactación: reescribe solo las claves vivas en un segmento nuevo y borra los viejos
+# - Toda escritura (appends, segmentos nuevos, manifest, compactación) va bajo flock (<dir>/.lock)
+#   y antes relee del disco el manifest y las filas: varios procesos (p. ej. dos indexadores)
+#   pueden escribir en el mismo store sin desalinear clave ↔ fila
+# - Al cargar se recorta la cola de un append interrumpido (vectores sin clave o una línea de
+#   clave incompleta)
+# - Migración: importa una sola vez el JSONL anterior (el archivo original no se toca)
+
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows (desarrollo local): sin lock entre procesos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+EMB_STORE_SEGMENT_ROWS = int(os.getenv("EMB_STORE_SEGMENT_ROWS", "20000"))
+MANIFEST_NAME = "manifest.json"
+LOCK_NAME = ".lock"
+STORE_VERSION = 1
+
+_ROW_DTYPE = np.dtype("<f4")
+
+
+def _clean_key(key: str) -> str:
+    # Una clave por línea en el .keys
+    return key.replace("\n", " ").replace("\r", " ")
+
+
+class EmbeddingStore:
+    """
+    Store de vectores float32 direccionado por clave (string) + modelo.
+    La dimensión va por segmento, así que un cambio de modelo/dimensión abre segmentos nuevos
+    en lugar de mezclar vectores incompatibles.
+    """
+
+    def __init__(self, root: str, segment_rows: int = EMB_STORE_SEGMENT_ROWS):
+        self.root = root
+        self.segment_rows = max(1, segment_rows)
+        self._lock = threading.RLock()
+        self._segments: List[Dict[str, Any]] = []
+        self._migrated_from: List[str] = []
+        self._index: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        self._rows: List[int] = []
+        self._mmaps: Dict[int, np.memmap] = {}
+        self._flock_depth = 0
+        os.makedirs(root, exist_ok=True)
+        with self._file_lock():
+            self._load()
+
+    # ----------------------------
+    # Persistencia
+    # ----------------------------
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.root, MANIFEST_NAME)
+
+    def _seg_paths(self, name: str) -> Tuple[str, str]:
+        return os.path.join(self.root, f"{name}.f32"), os.path.join(self.root, f"{name}.keys")
+
+    def _write_manifest(self) -> None:
+        tmp = self._manifest_path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": STORE_VERSION,
+                "segments": self._segments,
+                "migrated_from": self._migrated_from,
+            }, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self._manifest_path())
+
+    @contextmanager
+    def _file_lock(self):
+        """Lock exclusivo entre procesos sobre el store (reentrante dentro del proceso)."""
+        with self._lock:
+            if fcntl is None or self._flock_depth:
+                self._flock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._flock_depth -= 1
+                return
+            with open(os.path.join(self.root, LOCK_NAME), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._flock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._flock_depth -= 1
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self) -> None:
+        path = self._manifest_path()
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        self._segments = list(manifest.get("segments") or [])
+        self._migrated_from = list(manifest.get("migrated_from") or [])
+
+        for seg_no, seg in enumerate(self._segments):
+            keys = self._read_segment(seg)
+            for row, key in enumerate(keys):
+                self._index[(seg["model"], key)] = (seg_no, row)
+            self._rows.append(len(keys))
+
+    def _read_segment(self, seg: Dict[str, Any]) -> List[str]:
+        """
+        Claves completas del segmento (requiere el file lock). Si un proceso murió a medio append
+        quedan vectores sin clave o una última línea sin "\n": se recortan ambos archivos a las
+        filas completas para que el siguiente append quede alineado fila ↔ clave.
+        """
+        vec_path, keys_path = self._seg_paths(seg["name"])
+        row_bytes = int(seg["dim"]) * _ROW_DTYPE.itemsize
+        vec_size = os.path.getsize(vec_path) if os.path.exists(vec_path) else 0
+        raw = b""
+        if os.path.exists(keys_path):
+            with open(keys_path, "rb") as f:
+                raw = f.read()
+        complete = raw.split(b"\n")[:-1]  # lo que sigue al último "\n" está incompleto
+        n = min(vec_size // row_bytes, len(complete))
+        keys_size = sum(len(line) + 1 for line in complete[:n])
+
+        if vec_size != n * row_bytes or len(raw) != keys_size:
+            logger.warning(
+                f"[EmbStore] ⚠️ {seg['name']}: append incompleto, se recorta a {n} filas "
+                f"(.f32 {vec_size} → {n * row_bytes} bytes, .keys {len(raw)} → {keys_size} bytes)"
+            )
+            for p, size in ((vec_path, n * row_bytes), (keys_path, keys_size)):
+                with open(p, "ab") as f:
+                    f.truncate(size)
+        return [line.decode("utf-8").rstrip("\r") for line in complete[:n]]
+
+    def _refresh(self) -> None:
+        """
+        Pone el estado en memoria al día con el disco (requiere el file lock): segmentos y filas
+        que agregaron otros procesos, o recarga completa si otro proceso compactó.
+        """
+        path = self._manifest_path()
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        segments = list(manifest.get("segments") or [])
+        known = [seg["name"] for seg in self._segments]
+        if [seg["name"] for seg in segments[:len(known)]] != known:
+            self._segments, self._rows, self._index, self._mmaps = [], [], {}, {}
+            self._load()
+            return
+        self._migrated_from = list(manifest.get("migrated_from") or [])
+        for seg in segments[len(known):]:
+            self._segments.append(seg)
+            self._rows.append(0)
+        for seg_no, seg in enumerate(self._segments):
+            vec_path, _ = self._seg_paths(seg["name"])
+            row_bytes = int(seg["dim"]) * _ROW_DTYPE.itemsize
+            on_disk = os.path.getsize(vec_path) // row_bytes if os.path.exists(vec_path) else 0
+            if on_disk == self._rows[seg_no]:
+                continue
+            keys = self._read_segment(seg)
+            for row in range(min(self._rows[seg_no], len(keys)), len(keys)):
+                self._index[(seg["model"], keys[row])] = (seg_no, row)
+            self._rows[seg_no] = len(keys)
+
+    @contextmanager
+    def _synced(self):
+        """File lock + estado releído del disco: envoltura de toda escritura."""
+        with self._file_lock():
+            if self._flock_depth == 1:
+                self._refresh()
+            yield
+
+    def _mmap(self, seg_no: int) -> np.memmap:
+        mm = self._mmaps.get(seg_no)
+        rows = self._rows[seg_no]
+        if mm is None or mm.shape[0] < rows:
+            seg = self._segments[seg_no]
+            vec_path, _ = self._seg_paths(seg["name"])
+            mm = np.memmap(vec_path, dtype=_ROW_DTYPE, mode="r", shape=(rows, int(seg["dim"])))
+            self._mmaps[seg_no] = mm
+        return mm
+
+    def _active_segment(self, model: str, dim: int) -> int:
+        """Último segmento abierto para (modelo, dim) con espacio; si no hay, crea uno."""
+        for seg_no in range(len(self._segments) - 1, -1, -1):
+            seg = self._segments[seg_no]
+            if seg["model"] == model and int(seg["dim"]) == dim:
+                if self._rows[seg_no] < self.segment_rows:
+                    return seg_no
+                break
+        name = f"seg_{len(self._segments) + 1:06d}_{int(time.time())}_{os.urandom(3).hex()}"
+        self._segments.append({"name": name, "model": model, "dim": dim})
+        self._rows.append(0)
+        for p in self._seg_paths(name):
+            open(p, "ab").close()
+        self._write_manifest()
+        return len(self._segments) - 1
+
+    # ----------------------------
+    # API
+    # ----------------------------
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def contains(self, key: str, model: str) -> bool:
+        return (model, _clean_key(key)) in self._index
+
+    def get(self, key: str, model: str) -> Optional[np.ndarray]:
+        """Copia 1D float32 del vector o None."""
+        with self._lock:
+            loc = self._index.get((model, _clean_key(key)))
+            if loc is None:
+                return None
+            seg_no, row = loc
+            try:
+                return np.array(self._mmap(seg_no)[row], dtype=np.float32)
+            except FileNotFoundError:
+                # Otro proceso compactó y borró el segmento: releer y reintentar una vez
+                with self._synced():
+                    loc = self._index.get((model, _clean_key(key)))
+                    if loc is None:
+                        return None
+                    return np.array(self._mmap(loc[0])[loc[1]], dtype=np.float32)
+
+    def put_many(self, items: Iterable[Tuple[str, np.ndarray]], model: str) -> int:
+        """Agrega vectores (append-only). Una clave repetida apunta a la fila más nueva."""
+        written = 0
+        with self._synced():
+            # Filas asignadas con los conteos recién leídos del disco, bajo el mismo lock que el append
+            pending: Dict[int, Tuple[List[bytes], List[str]]] = {}
+            for key, vec in items:
+                arr = np.asarray(vec, dtype=_ROW_DTYPE).reshape(-1)
+                seg_no = self._active_segment(model, int(arr.shape[0]))
+                blobs, keys = pending.setdefault(seg_no, ([], []))
+                blobs.append(arr.tobytes())
+                keys.append(_clean_key(key))
+                row = self._rows[seg_no]
+                self._rows[seg_no] = row + 1
+                self._index[(model, _clean_key(key))] = (seg_no, row)
+                written += 1
+
+            for seg_no, (blobs, keys) in pending.items():
+                vec_path, keys_path = self._seg_paths(self._segments[seg_no]["name"])
+                # Primero los vectores y luego las claves: una clave en disco siempre tiene su vector
+                with open(vec_path, "ab") as f:
+                    f.write(b"".join(blobs))
+                with open(keys_path, "ab") as f:
+                    f.write("".join(k + "\n" for k in keys).encode("utf-8"))
+        return written
+
+    def put(self, key: str, vec: np.ndarray, model: str) -> None:
+        self.put_many([(key, vec)], model)
+
+    def keys(self, model: Optional[str] = None) -> Set[str]:
+        with self._lock:
+            return {k for (m, k) in self._index if model is None or m == model}
+
+    def entries(self) -> Set[Tuple[str, str]]:
+        """Todas las combinaciones (modelo, clave) vivas."""
+        with self._lock:
+            return set(self._index)
+
+    def compact(self, keep: Optional[Set[Tuple[str, str]]] = None) -> Dict[str, Any]:
+        """
+        Reescribe las filas vivas (última versión de cada clave, y solo las de `keep` si se da:
+        conjunto de (modelo, clave)) en segmentos nuevos y elimina los anteriores.
+        """
+        with self._synced():
+            before_rows = sum(self._rows)
+            before_bytes = self.disk_bytes()
+            live = sorted(
+                ((model, key), loc) for (model, key), loc in self._index.items()
+                if keep is None or (model, key) in keep
+            )
+
+            old_segments = list(self._segments)
+            old_mmaps = {no: self._mmap(no) for no in range(len(old_segments)) if self._rows[no]}
+            vectors = [(model, key, np.array(old_mmaps[seg_no][row])) for (model, key), (seg_no, row) in live]
+
+            self._segments, self._rows, self._index, self._mmaps = [], [], {}, {}
+            by_model: Dict[str, List[Tuple[str, np.ndarray]]] = {}
+            for model, key, vec in vectors:
+                by_model.setdefault(model, []).append((key, vec))
+            for model, items in by_model.items():
+                self.put_many(items, model)
+            self._write_manifest()
+
+            del old_mmaps
+            for seg in old_segments:
+                for p in self._seg_paths(seg["name"]):
+                    try:
+                        os.remove(p)
+                    except FileNotFoundError:
+                        pass
+
+            result = {
+                "rows_before": before_rows,
+                "rows_after": sum(self._rows),
+                "bytes_before": before_bytes,
+                "bytes_after": self.disk_bytes(),
+                "segments": len(self._segments),
+            }
+        logger.info(f"[EmbStore] 🧹 Compactado {self.root}: {result}")
+        return result
+
+    def import_jsonl(
+        self,
+        jsonl_path: str,
+        model: str,
+        key_fn: Optional[Callable[[str], str]] = None,
+    ) -> int:
+        """
+        Migra un cache JSONL anterior ({"cache_key", "embedding", "dim"} por línea).
+        key_fn permite re-mapear la clave (p. ej. quedarse solo con el text_fp).
+        Solo se importa una vez por archivo (queda registrado en el manifest).
+        """
+        name = os.path.abspath(jsonl_path)
+        if name in self._migrated_from or not os.path.exists(jsonl_path):
+            return 0
+        items: List[Tuple[str, np.ndarray]] = []
+        with open(jsonl_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except Exception:
+                    continue
+                ck, emb = row.get("cache_key"), row.get("embedding")
+                if ck and isinstance(emb, list) and emb:
+                    items.append((key_fn(ck) if key_fn else ck, np.asarray(emb, dtype=np.float32)))
+        return self._import_items(name, items, model, source=jsonl_path)
+
+    def import_store(
+        self,
+        other_root: str,
+        key_fn: Optional[Callable[[str], str]] = None,
+    ) -> int:
+        """Copia las claves vivas de otro store (todas sus combinaciones modelo/clave), una sola vez."""
+        name = os.path.abspath(other_root)
+        if name in self._migrated_from or not os.path.exists(os.path.join(other_root, MANIFEST_NAME)):
+            return 0
+        other = EmbeddingStore(other_root)
+        by_model: Dict[str, List[Tuple[str, np.ndarray]]] = {}
+        for model, key in other.entries():
+            vec = other.get(key, model)
+            if vec is not None:
+                by_model.setdefault(model, []).append((key_fn(key) if key_fn else key, vec))
+        count = 0
+        for model, items in by_model.items():
+            count += self._import_items(None, items, model, source=other_root)
+        with self._synced():
+            if name not in self._migrated_from:
+                self._migrated_from.append(name)
+                self._write_manifest()
+        return count
+
+    def _import_items(
+        self,
+        marker: Optional[str],
+        items: List[Tuple[str, np.ndarray]],
+        model: str,
+        source: str,
+    ) -> int:
+        with self._synced():
+            if marker is not None and marker in self._migrated_from:
+                # Otro proceso lo migró mientras se leía el archivo
+                return 0
+            # No duplicar claves que ya existen (p. ej. el mismo texto en varios universos)
+            fresh = {}
+            for key, vec in items:
+                if not self.contains(key, model):
+                    fresh[key] = vec
+            count = self.put_many(fresh.items(), model)
+            if marker is not None:
+                self._migrated_from.append(marker)
+                self._write_manifest()
+        logger.info(f"[EmbStore] 📦 Migrados {count} embeddings desde {source}")
+        return count
+
+    def disk_bytes(self) -> int:
+        total = 0
+        for seg in self._segments:
+            for p in self._seg_paths(seg["name"]):
+                if os.path.exists(p):
+                    total += os.path.getsize(p)
+        return total
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "root": self.root,
+                "keys": len(self._index),
+                "rows": sum(self._rows),
+                "dead_rows": sum(self._rows) - len(self._index),
+                "segments": len(self._segments),
+                "bytes": self.disk_bytes(),
+            }
+
+
+def main():
+    # Uso: python -m Tools.docs_indexer.emb_store Data/docs_org_emb_store [--compact]
+    import argparse
+
+    p = argparse.ArgumentParser(description="Estadísticas / compactación de un store de embeddings")
+    p.add_argument("store_dir")
+    p.add_argument("--compact", action="store_true", help="Reescribe solo las filas vivas")
+    args = p.parse_args()
+
+    store = EmbeddingStore(args.store_dir)
+    out = {"stats": store.stats()}
+    if args.compact:
+        out["compact"] = store.compact()
+    print(json.dumps(out, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
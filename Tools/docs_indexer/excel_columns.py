@@ -0,0 +1,68 @@
+# Tools/docs_indexer/excel_columns.py
+# Conversión por columnas de DataFrames de Excel a valores Python (quotes_indexer, etiquetas_indexer)
+# - Reemplaza los pd.notna / int(float(...)) / strftime celda por celda dentro de iterrows
+# - Mismas reglas que la versión por fila: str(v).strip(), int truncado, float, fecha ISO
+# - Los valores salen como tipos nativos (int/float/str/None) listos para json.dumps
+# - Una columna que no existe en el Excel se trata como vacía (None en todas las filas)
+
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def _none_series(df: pd.DataFrame) -> pd.Series:
+    return pd.Series([None] * len(df), index=df.index, dtype=object)
+
+
+def str_values(df: pd.DataFrame, col: str) -> pd.Series:
+    """str(v).strip() para celdas con valor, None para vacías (Series object alineada con df)."""
+    if col not in df.columns:
+        return _none_series(df)
+    s = df[col]
+    out = s.astype(str).str.strip().astype(object)
+    return out.where(s.notna().to_numpy(), None)
+
+
+def _numeric(df: pd.DataFrame, col: str) -> np.ndarray:
+    """Columna como float64; NaN donde la celda está vacía o no es numérica."""
+    if col not in df.columns:
+        return np.full(len(df), np.nan, dtype=np.float64)
+    num = pd.to_numeric(df[col], errors="coerce")
+    return num.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def int_values(df: pd.DataFrame, col: str) -> List[Optional[int]]:
+    """Equivalente a int(float(v)) por celda; None si está vacía o no es numérica."""
+    num = _numeric(df, col)
+    valid = np.isfinite(num)
+    ints = np.zeros(len(num), dtype=np.int64)
+    ints[valid] = np.trunc(num[valid])
+    return [v if ok else None for v, ok in zip(ints.tolist(), valid.tolist())]
+
+
+def float_values(df: pd.DataFrame, col: str) -> List[Optional[float]]:
+    """Equivalente a float(v) por celda; None si está vacía o no es numérica."""
+    num = _numeric(df, col)
+    valid = ~np.isnan(num)
+    return [v if ok else None for v, ok in zip(num.tolist(), valid.tolist())]
+
+
+def date_values(df: pd.DataFrame, col: str, fmt: str = "%Y-%m-%d") -> List[Optional[str]]:
+    """
+    Fechas como texto: Timestamps con `fmt`, strings tal cual, cualquier otro valor con str(v).
+    None para celdas vacías.
+    """
+    if col not in df.columns:
+        return [None] * len(df)
+    s = df[col]
+    present = s.notna().to_numpy()
+    if pd.api.types.is_datetime64_any_dtype(s):
+        out = s.dt.strftime(fmt).astype(object)
+    else:
+        # Columna mixta (fechas + texto): solo los Timestamps se formatean
+        out = s.astype(str).astype(object)
+        is_ts = s.map(lambda v: isinstance(v, pd.Timestamp)).to_numpy(dtype=bool) & present
+        if is_ts.any():
+            out[is_ts] = s[is_ts].map(lambda v: v.strftime(fmt)).astype(object)
+    return out.where(present, None).tolist()
@@ -50,7 +50,8 @@ def save_file_cache(out_dir: str, universe: str, cache: Dict[str, Dict[str, Any]
 def is_file_processed(
     file_path: str,
     cache: Dict[str, Dict[str, Any]],
-    use_relative_path: bool = True
+    use_relative_path: bool = True,
+    current_sha: Optional[str] = None
 ) -> bool:
     """
     Verifica si un archivo ya fue procesado y no ha cambiado.
@@ -59,6 +60,7 @@ def is_file_processed(
         file_path: Ruta absoluta o relativa del archivo
         cache: Diccionario de caché cargado
         use_relative_path: Si True, usa path relativo como clave; si False, usa absoluto
+        current_sha: SHA256 ya calculado del archivo (evita volver a leerlo)
     
     Returns:
         True si el archivo ya fue procesado y su SHA256 coincide
@@ -86,6 +88,8 @@ def is_file_processed(
         return False
     
     # Verificar que el SHA256 actual coincida
+    if current_sha is not None:
+        return current_sha == cached_sha
     try:
         current_sha = file_sha256(file_path)
         return current_sha == cached_sha
@@ -126,7 +130,8 @@ def mark_file_processed(
 def get_unprocessed_files(
     file_paths: List[str],
     cache: Dict[str, Dict[str, Any]],
-    use_relative_path: bool = True
+    use_relative_path: bool = True,
+    hashes: Optional[Dict[str, str]] = None
 ) -> List[str]:
     """
     Filtra una lista de archivos y retorna solo los que NO han sido procesados o han cambiado.
@@ -135,6 +140,7 @@ def get_unprocessed_files(
         file_paths: Lista de rutas de archivos a verificar
         cache: Diccionario de caché cargado
         use_relative_path: Si True, usa path relativo como clave
+        hashes: {path: sha256} ya calculados (p. ej. con parallel_parse.hash_files)
     
     Returns:
         Lista de archivos que necesitan ser procesados
@@ -145,7 +151,8 @@ def get_unprocessed_files(
         if not os.path.exists(path):
             continue
         
-        if not is_file_processed(path, cache, use_relative_path):
+        current_sha = hashes.get(path) if hashes is not None else None
+        if not is_file_processed(path, cache, use_relative_path, current_sha=current_sha):
             unprocessed.append(path)
     
     return unprocessed
@@ -0,0 +1,220 @@
+# Tools/docs_indexer/index_maintenance.py
+# Mantenimiento incremental de índice FAISS + metadata JSONL (docs_indexer, guides_indexer)
+# - IndexIDMap2(IndexFlatIP) con ids int64 estables por chunk (hash de archivo fuente + chunk_id)
+# - remove_ids de los chunks de archivos modificados o eliminados antes de agregar los nuevos
+# - La metadata se reescribe completa (atómica) en el mismo orden que el almacenamiento del índice,
+#   así la fila i del JSONL sigue siendo el vector i para las búsquedas (Tools/index_registry.py)
+# - Verificación de alineación índice/meta después de cada corrida
+# - Índices anteriores (IndexFlatIP sin ids) se migran reconstruyendo sus vectores
+
+import os
+import json
+import hashlib
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import faiss
+
+logger = logging.getLogger(__name__)
+
+VECTOR_ID_FIELD = "vector_id"
+_ID_MASK = (1 << 63) - 1
+
+
+def source_key(path: str) -> str:
+    """Clave del archivo fuente, igual que la del cache de archivos procesados (path relativo)."""
+    try:
+        return os.path.relpath(path)
+    except ValueError:
+        return os.path.abspath(path)
+
+
+def chunk_vector_id(source: str, chunk_id: str) -> int:
+    """
+    Id int64 estable del chunk. Incluye el archivo fuente porque chunk_id depende solo
+    del contenido (doc_id = sha[:12]) y dos archivos idénticos compartirían ids.
+    """
+    digest = hashlib.blake2b(f"{source}|{chunk_id}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") & _ID_MASK
+
+
+def row_vector_id(row: Dict[str, Any]) -> int:
+    vid = row.get(VECTOR_ID_FIELD)
+    if vid is not None:
+        return int(vid)
+    return chunk_vector_id(source_key(row.get("source_path") or ""), row.get("chunk_id") or "")
+
+
+def new_id_index(dim: int) -> faiss.IndexIDMap2:
+    """IndexIDMap2 sobre IndexFlatIP (IP sobre vectores normalizados ~= cosine)."""
+    return faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+
+
+def is_id_mapped(index: Any) -> bool:
+    return isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2))
+
+
+def index_ids(index: Any) -> np.ndarray:
+    """Ids del índice en orden de almacenamiento."""
+    return faiss.vector_to_array(index.id_map).astype(np.int64)
+
+
+def _read_meta(meta_path: str) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    with open(meta_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                rows.append(json.loads(line))
+    return rows
+
+
+def _migrate_flat_index(index: Any, rows: List[Dict[str, Any]]) -> Tuple[Optional[Any], List[Dict[str, Any]]]:
+    """IndexFlatIP alineado con su meta → IndexIDMap2 con los mismos vectores (sin re-embeber)."""
+    vecs = index.reconstruct_n(0, index.ntotal)
+    keep_pos: List[int] = []
+    kept_rows: List[Dict[str, Any]] = []
+    seen: Set[int] = set()
+    for pos, row in enumerate(rows):
+        vid = row_vector_id(row)
+        if vid in seen:
+            # Mismo archivo + chunk_id agregado dos veces por el modo append anterior
+            continue
+        seen.add(vid)
+        row[VECTOR_ID_FIELD] = vid
+        keep_pos.append(pos)
+        kept_rows.append(row)
+
+    migrated = new_id_index(index.d)
+    if keep_pos:
+        migrated.add_with_ids(
+            np.ascontiguousarray(vecs[keep_pos], dtype=np.float32),
+            np.array([r[VECTOR_ID_FIELD] for r in kept_rows], dtype=np.int64),
+        )
+    logger.info(
+        f"[IndexMaintenance] 🔁 Índice sin ids migrado a IndexIDMap2: "
+        f"{len(kept_rows)} vectores ({len(rows) - len(kept_rows)} duplicados descartados)"
+    )
+    return migrated, kept_rows
+
+
+def load_index_state(idx_path: str, meta_path: str) -> Tuple[Optional[Any], List[Dict[str, Any]], Optional[str]]:
+    """
+    Carga índice + metadata existentes para mantenimiento incremental.
+
+    Returns:
+        (index IndexIDMap2 | None, filas de meta alineadas, motivo)
+        index None con motivo != None significa que hay que reconstruir desde cero
+        (archivos ilegibles o índice/meta desalineados). Sin archivos previos → (None, [], None).
+    """
+    if not (os.path.exists(idx_path) and os.path.exists(meta_path)):
+        return None, [], None
+    try:
+        index = faiss.read_index(idx_path)
+        rows = _read_meta(meta_path)
+    except Exception as e:
+        return None, [], f"no se pudo leer índice/meta: {e}"
+
+    if index.ntotal != len(rows):
+        return None, [], f"índice/meta desalineados (index={index.ntotal}, meta={len(rows)})"
+
+    if not is_id_mapped(index):
+        try:
+            index, rows = _migrate_flat_index(index, rows)
+        except Exception as e:
+            return None, [], f"no se pudo migrar índice sin ids: {e}"
+        return index, rows, None
+
+    ids = index_ids(index)
+    if any(row.get(VECTOR_ID_FIELD) is None for row in rows) or not np.array_equal(
+        ids, np.array([int(r[VECTOR_ID_FIELD]) for r in rows], dtype=np.int64)
+    ):
+        return None, [], "ids del índice no coinciden con vector_id de la metadata"
+    return index, rows, None
+
+
+def stale_vector_ids(
+    rows: Iterable[Dict[str, Any]],
+    file_cache: Dict[str, Dict[str, Any]],
+    sources_to_replace: Set[str],
+) -> List[int]:
+    """
+    Ids a eliminar: chunks de archivos que se van a re-procesar, de archivos que ya no
+    están en el cache (eliminados) o cuyo sha256 no es el último procesado (restos de corridas anteriores).
+    """
+    stale: List[int] = []
+    for row in rows:
+        src = source_key(row.get("source_path") or "")
+        cached = file_cache.get(src)
+        if src in sources_to_replace or cached is None or cached.get("sha256") != row.get("sha256"):
+            stale.append(int(row[VECTOR_ID_FIELD]))
+    return stale
+
+
+def remove_vectors(index: Any, rows: List[Dict[str, Any]], ids: List[int]) -> Tuple[List[Dict[str, Any]], int]:
+    """remove_ids en el índice y las mismas filas fuera de la metadata. Retorna (filas restantes, removidos)."""
+    if not ids:
+        return rows, 0
+    drop = set(ids)
+    removed = int(index.remove_ids(np.array(sorted(drop), dtype=np.int64)))
+    return [r for r in rows if int(r[VECTOR_ID_FIELD]) not in drop], removed
+
+
+def add_vectors(index: Any, rows: List[Dict[str, Any]], mat: np.ndarray) -> None:
+    """add_with_ids de los vectores nuevos; rows debe traer vector_id (uno por fila de mat)."""
+    if not rows:
+        return
+    ids = np.array([int(r[VECTOR_ID_FIELD]) for r in rows], dtype=np.int64)
+    if len(set(ids.tolist())) != len(ids):
+        raise ValueError("vector_id duplicado en los chunks nuevos")
+    index.add_with_ids(np.ascontiguousarray(mat, dtype=np.float32), ids)
+
+
+def order_rows_like_index(index: Any, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Ordena la metadata según el almacenamiento del índice (fila i = vector i)."""
+    by_id = {int(r[VECTOR_ID_FIELD]): r for r in rows}
+    ordered = []
+    for vid in index_ids(index).tolist():
+        row = by_id.get(vid)
+        if row is None:
+            raise ValueError(f"vector_id {vid} del índice sin fila de metadata")
+        ordered.append(row)
+    return ordered
+
+
+def write_index_and_meta(index: Any, rows: List[Dict[str, Any]], idx_path: str, meta_path: str) -> None:
+    """
+    Persiste índice y metadata reemplazando los archivos de forma atómica
+    (primero el .index y luego el _meta.jsonl, el orden que espera el hot reload del registro).
+    """
+    tmp_idx = idx_path + ".tmp"
+    faiss.write_index(index, tmp_idx)
+    os.replace(tmp_idx, idx_path)
+
+    tmp_meta = meta_path + ".tmp"
+    with open(tmp_meta, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    os.replace(tmp_meta, meta_path)
+
+
+def verify_alignment(idx_path: str, meta_path: str) -> Dict[str, Any]:
+    """Relee índice y metadata del disco y verifica que la fila i del meta corresponda al vector i."""
+    try:
+        index = faiss.read_index(idx_path)
+        rows = _read_meta(meta_path)
+    except Exception as e:
+        return {"ok": False, "error": f"No se pudo releer índice/meta: {e}"}
+
+    out: Dict[str, Any] = {"ok": True, "vectors": int(index.ntotal), "meta_rows": len(rows)}
+    if index.ntotal != len(rows):
+        out.update(ok=False, error="index.ntotal != filas de metadata")
+        return out
+    if is_id_mapped(index):
+        meta_ids = np.array([int(r.get(VECTOR_ID_FIELD, -1)) for r in rows], dtype=np.int64)
+        mismatches = int(np.count_nonzero(index_ids(index) != meta_ids))
+        out["id_mismatches"] = mismatches
+        if mismatches:
+            out.update(ok=False, error=f"{mismatches} filas con vector_id distinto al del índice")
+    return out
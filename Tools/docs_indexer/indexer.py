@@ -5,19 +5,19 @@
 # - Adds boilerplate filtering + dedupe for meetings
 # - Optional catalog enrichment (Data/doc_catalog.json) via code in filename (e.g. M-SGCSI-01 ...)
 # - Optional embedding cache per universe to avoid re-embedding unchanged chunks
+# - Incremental maintenance: IndexIDMap2 with stable ids, removes chunks of changed/deleted files
+# - Streaming pipeline (parse → embed → add) with bounded queues and periodic checkpoints
 
 import os
-import json
-from typing import List, Dict, Any, Optional, Set
+import time
+from typing import List, Dict, Any, Optional, Tuple
 
 import numpy as np
-import faiss
-import tiktoken
 
 from .config import DEFAULT_CHUNK_TOKENS, DEFAULT_OVERLAP_TOKENS, SUPPORTED_EXTS
 from .utils import (
-    file_sha256,
-    chunk_text_tokens,
+    encode_texts,
+    chunk_encoded_text,
     compute_sections,
     section_for_charpos,
     fingerprint_text
@@ -28,16 +28,220 @@ from .meetings import is_meeting_boilerplate
 from .docx import read_document
 from .embeddings import (
     load_emb_cache,
-    embed_text_cached,
+    embed_texts_cached,
     get_emb_cache_path
 )
 from .file_cache import (
     load_file_cache,
     save_file_cache,
     get_unprocessed_files,
-    mark_file_processed,
     get_file_cache_path
 )
+from .parallel_parse import hash_files
+from .index_maintenance import source_key, load_index_state, verify_alignment
+from .pipeline import run_index_pipeline, DimensionChanged
+
+
+def _meta_row(c: DocChunk) -> Dict[str, Any]:
+    """Fila de metadata JSONL de un chunk."""
+    return {
+        "chunk_id": c.chunk_id,
+        "universe": c.universe,
+        "doc_id": c.doc_id,
+        "title": c.title,
+        "source_path": c.source_path,
+        "sha256": c.sha256,
+        "chunk_index": c.chunk_index,
+        "section": c.section,
+        "token_start": c.token_start,
+        "token_end": c.token_end,
+        "text": c.text,
+
+        # block metadata
+        "block_kind": c.block_kind,
+        "table_name": c.table_name,
+        "row_key": c.row_key,
+        "meeting_date": c.meeting_date,
+        "meeting_date_raw": c.meeting_date_raw,
+        "meeting_start": c.meeting_start,
+        "meeting_end": c.meeting_end,
+
+        # catalog metadata
+        "codigo": c.codigo,
+        "domain": c.domain,
+        "family": c.family,
+        "revision": c.revision,
+        "estatus": c.estatus,
+        "tipo_info": c.tipo_info,
+        "alcance_iso": c.alcance_iso,
+        "disposicion": c.disposicion,
+        "fecha_emision": c.fecha_emision,
+        "catalog_title": c.catalog_title,
+    }
+
+
+def _chunk_document(
+    path: str,
+    sha: str,
+    universe: str,
+    encoding_name: str,
+    chunk_tokens: int,
+    overlap_tokens: int,
+    codigo: Optional[str],
+    cat: Optional[Dict[str, Any]],
+    timings: Optional[Dict[str, float]] = None,
+) -> List[DocChunk]:
+    """Lee un documento y lo divide en chunks (se ejecuta en los workers de parallel_parse)."""
+    title = os.path.basename(path)
+    doc_id = sha[:12]  # estable por contenido
+    chunks: List[DocChunk] = []
+
+    # Leer documento -> blocks
+    t0 = time.perf_counter()
+    plain_text, blocks, doc_meta = read_document(path, universe=universe)
+    if timings is not None:
+        timings["parse"] = time.perf_counter() - t0
+    if not blocks:
+        return chunks
+
+    # Para .txt/.md podemos querer mapeo de headings (opcional)
+    sections = compute_sections(plain_text) if plain_text else []
+
+    # Deduplicación + filtrado de boilerplate específicamente para meetings
+    filtered_blocks: List[Dict[str, Any]] = []
+    seen_fp = set()
+    for b in blocks:
+        t = (b.get("text") or "").strip()
+        if not t:
+            continue
+
+        if universe == "meetings_weekly":
+            if is_meeting_boilerplate(t, b.get("block_kind"), b.get("table_name")):
+                continue
+
+        fp = fingerprint_text(t)
+        if fp in seen_fp:
+            continue
+        seen_fp.add(fp)
+
+        filtered_blocks.append(b)
+
+    if not filtered_blocks:
+        return chunks
+
+    # Ahora tokenizar por bloque (todos los bloques en un solo encode_batch);
+    # si el bloque es largo, dividir en sub-chunks sobre los mismos tokens
+    block_texts = [(b.get("text") or "").strip() for b in filtered_blocks]
+    block_tokens = encode_texts(block_texts, encoding_name)
+    token_cursor = 0
+    chunk_idx = 0
+    for b, b_text, b_toks in zip(filtered_blocks, block_texts, block_tokens):
+        if not b_text:
+            continue
+
+        # Mapeo de sección:
+        sec = b.get("section")
+        if not sec and sections:
+            # aproximado: coincidencia de ancla en plain_text
+            anchor = b_text[:120]
+            found_at = plain_text.find(anchor)
+            if found_at >= 0:
+                sec = section_for_charpos(sections, found_at)
+
+        # Dividir bloque largo en chunks de tokens
+        skip_chunking = False
+        
+        # Para meetings_weekly: NO fragmentar chunks especiales
+        if universe == "meetings_weekly":
+            block_kind = b.get("block_kind")
+            table_name = b.get("table_name")
+            
+            # NO fragmentar: meeting completo, headers pequeños
+            if block_kind == "meeting_full" or table_name == "meeting_summary":
+                skip_chunking = True
+            elif table_name == "meeting_data":
+                if len(b_toks) < 800:  # Headers pequeños no fragmentar
+                    skip_chunking = True
+        
+        if skip_chunking:
+            # Mantener el bloque como un solo chunk
+            sub_chunks = [(b_text, 0, len(b_toks))]
+        else:
+            sub_chunks = chunk_encoded_text(
+                b_toks,
+                encoding_name=encoding_name,
+                chunk_tokens=chunk_tokens,
+                overlap_tokens=overlap_tokens,
+            )
+
+        if not sub_chunks:
+            continue
+
+        for (chunk_txt, t0, t1) in sub_chunks:
+            # token_start/end son aproximados dentro del documento (block-local + cursor)
+            token_start = token_cursor + t0
+            token_end = token_cursor + t1
+
+            cid = f"{doc_id}_{chunk_idx}"
+            chunk_idx += 1
+
+            chunks.append(DocChunk(
+                chunk_id=cid,
+                universe=universe,
+                doc_id=doc_id,
+                title=title,
+                source_path=path,
+                sha256=sha,
+                chunk_index=(chunk_idx - 1),
+                section=sec,
+                token_start=token_start,
+                token_end=token_end,
+                text=chunk_txt,
+
+                block_kind=b.get("block_kind"),
+                table_name=b.get("table_name"),
+                row_key=str(b.get("row_key")) if b.get("row_key") is not None else None,
+                meeting_date=b.get("meeting_date") or doc_meta.get("meeting_date"),
+                meeting_date_raw=b.get("meeting_date_raw") or doc_meta.get("meeting_date_raw"),
+                meeting_start=b.get("meeting_start"),
+                meeting_end=b.get("meeting_end"),
+
+                codigo=codigo,
+                domain=cat.get("domain") if cat else None,
+                family=cat.get("family") if cat else None,
+                revision=cat.get("revision") if cat else None,
+                estatus=cat.get("estatus") if cat else None,
+                tipo_info=cat.get("tipo_info") if cat else None,
+                alcance_iso=cat.get("alcance_iso") if cat else None,
+                disposicion=cat.get("disposicion") if cat else None,
+                fecha_emision=cat.get("fecha_emision") if cat else None,
+                catalog_title=cat.get("titulo") if cat else None,
+            ))
+
+        # Avanzar cursor por longitud completa de tokens del bloque (aprox)
+        token_cursor += sub_chunks[-1][2]
+
+    return chunks
+
+
+def _parse_file_task(task: Tuple[Any, ...]) -> Dict[str, Any]:
+    """
+    Tarea del pool de parseo: nunca lanza, un archivo con error se reporta y no se marca procesado.
+    timings: segundos de lectura (parse) y de chunking/tokenización (chunk) en el worker.
+    """
+    path = task[0]
+    timings: Dict[str, float] = {}
+    t0 = time.perf_counter()
+    try:
+        chunks = _chunk_document(*task, timings=timings)
+    except Exception as e:
+        return {"path": path, "error": f"{type(e).__name__}: {e}"}
+    parse_s = timings.get("parse", 0.0)
+    return {
+        "path": path,
+        "chunks": chunks,
+        "timings": {"parse": parse_s, "chunk": time.perf_counter() - t0 - parse_s},
+    }
 
 
 def build_docs_index(
@@ -50,11 +254,18 @@ def build_docs_index(
     top_level_only: bool = False,
     max_files: Optional[int] = None,
     catalog_path: Optional[str] = "Data/doc_catalog.json",
+    full_rebuild: bool = False,
+    parse_workers: Optional[int] = None,
 ) -> Dict[str, Any]:
     """
-    Construye índice FAISS (IndexFlatIP) + metadatos JSONL para un universo.
+    Construye índice FAISS (IndexIDMap2 sobre IndexFlatIP) + metadatos JSONL para un universo.
     Soporta: .txt, .md, .docx
     Especial: meetings_weekly docx parsing con tablas.
+
+    Incremental: solo procesa archivos nuevos/modificados; los chunks de archivos modificados
+    o eliminados se quitan del índice (remove_ids) y la metadata se reescribe alineada.
+    full_rebuild=True ignora índice y caché de archivos existentes.
+    parse_workers: procesos para parsear/chunkear (default INDEXER_PARSE_WORKERS / núcleos).
     """
     os.makedirs(out_dir, exist_ok=True)
     catalog = load_catalog(catalog_path)
@@ -66,6 +277,7 @@ def build_docs_index(
     file_cache = load_file_cache(out_dir, universe)
 
     # 1) Descubrir archivos
+    t_discover = time.perf_counter()
     files: List[str] = []
     if top_level_only:
         for fn in os.listdir(input_dir):
@@ -79,17 +291,38 @@ def build_docs_index(
                     files.append(os.path.join(root, fn))
 
     files.sort()
+    discover_s = time.perf_counter() - t_discover
     if max_files is not None:
         files = files[:max_files]
 
     if not files:
         return {"ok": False, "error": f"No encontré archivos {SUPPORTED_EXTS} en {input_dir}"}
     
+    idx_path = os.path.join(out_dir, f"docs_{universe}.index")
+    meta_path = os.path.join(out_dir, f"docs_{universe}_meta.jsonl")
+
+    # Archivos que ya no están (eliminados / fuera de input_dir): se purgan del caché y del índice.
+    # Con max_files solo cuentan los que ya no existen en disco.
+    current_sources = {source_key(p) for p in files}
+    removed_sources = [
+        k for k in file_cache
+        if k not in current_sources and (max_files is None or not os.path.exists(k))
+    ]
+    for k in removed_sources:
+        file_cache.pop(k, None)
+
+    # Hash de cada archivo una sola vez (se reutiliza para el caché y para doc_id)
+    t_hash = time.perf_counter()
+    file_hashes = hash_files(files)
+    hash_s = time.perf_counter() - t_hash
+    files = [p for p in files if p in file_hashes]
+
     # Filtrar archivos ya procesados (solo procesar nuevos/modificados)
-    files_to_process = get_unprocessed_files(files, file_cache, use_relative_path=True)
+    files_to_process = get_unprocessed_files(files, file_cache, use_relative_path=True, hashes=file_hashes)
     skipped_files = len(files) - len(files_to_process)
-    
-    if not files_to_process:
+    index_exists = os.path.exists(idx_path) and os.path.exists(meta_path)
+
+    if not full_rebuild and not files_to_process and not removed_sources and index_exists:
         return {
             "ok": True,
             "universe": universe,
@@ -97,339 +330,132 @@ def build_docs_index(
             "files": len(files),
             "skipped": skipped_files,
             "message": "Todos los archivos ya están procesados. No hay cambios.",
-            "index_path": os.path.join(out_dir, f"docs_{universe}.index"),
-            "meta_path": os.path.join(out_dir, f"docs_{universe}_meta.jsonl"),
+            "stage_seconds": {"discover": round(discover_s, 3), "hash": round(hash_s, 3)},
+            "index_path": idx_path,
+            "meta_path": meta_path,
         }
 
-    # Cargar índice FAISS existente si existe (para actualización incremental)
-    idx_path = os.path.join(out_dir, f"docs_{universe}.index")
-    meta_path = os.path.join(out_dir, f"docs_{universe}_meta.jsonl")
-    existing_index = None
-    existing_meta: List[DocChunk] = []
-    existing_chunk_ids: Set[str] = set()
-    
-    if os.path.exists(idx_path) and os.path.exists(meta_path):
-        try:
-            existing_index = faiss.read_index(idx_path)
-            # Cargar metadatos existentes para evitar duplicados
-            with open(meta_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        data = json.loads(line)
-                        existing_chunk_ids.add(data.get("chunk_id", ""))
-                    except Exception:
-                        continue
-        except Exception as e:
-            # Si hay error cargando el índice existente, empezamos de cero
-            existing_index = None
-            existing_chunk_ids = set()
-
-    # 2) Crear chunks solo para archivos nuevos/modificados
-    chunks: List[DocChunk] = []
+    # Cargar índice existente (IndexIDMap2 + meta alineada) para mantenimiento incremental.
+    # Si no se puede usar (ilegible / desalineado) se reconstruye todo desde cero.
+    existing_index, existing_rows, rebuild_reason = (
+        (None, [], None) if full_rebuild else load_index_state(idx_path, meta_path)
+    )
+    if full_rebuild or rebuild_reason or (existing_index is None and file_cache):
+        file_cache = {}
+        files_to_process = list(files)
+        skipped_files = 0
+
+    # 2) Tareas de parseo solo para archivos nuevos/modificados (orden determinista)
+    tasks = []
     matched_catalog_docs = 0
-
     for path in files_to_process:
-        title = os.path.basename(path)
-        sha = file_sha256(path)
-        doc_id = sha[:12]  # estable por contenido
-
         # Coincidencia de catálogo por código en filename
-        codigo = infer_code_from_filename(title)
+        codigo = infer_code_from_filename(os.path.basename(path))
         cat = catalog.get(codigo) if codigo else None
         if cat:
             matched_catalog_docs += 1
+        tasks.append((path, file_hashes[path], universe, encoding_name, chunk_tokens, overlap_tokens, codigo, cat))
 
-        # Leer documento -> blocks
-        plain_text, blocks, doc_meta = read_document(path, universe=universe)
-        if not blocks:
-            continue
-
-        # Para .txt/.md podemos querer mapeo de headings (opcional)
-        sections = compute_sections(plain_text) if plain_text else []
-
-        # Deduplicación + filtrado de boilerplate específicamente para meetings
-        filtered_blocks: List[Dict[str, Any]] = []
-        seen_fp = set()
-        for b in blocks:
-            t = (b.get("text") or "").strip()
-            if not t:
-                continue
-
-            if universe == "meetings_weekly":
-                if is_meeting_boilerplate(t, b.get("block_kind"), b.get("table_name")):
-                    continue
-
-            fp = fingerprint_text(t)
-            if fp in seen_fp:
-                continue
-            seen_fp.add(fp)
-
-            filtered_blocks.append(b)
-
-        if not filtered_blocks:
-            continue
-
-        # Ahora tokenizar por bloque; si el bloque es largo, dividir en sub-chunks
-        token_cursor = 0
-        chunk_idx = 0
-        for b in filtered_blocks:
-            b_text = (b.get("text") or "").strip()
-            if not b_text:
-                continue
+    # 3) Pipeline en streaming: parse/chunk (procesos) → embeddings (lotes concurrentes, con cache)
+    #    → remove_ids de la versión anterior + add al índice, con checkpoints periódicos
+    def _embed(chunk_batch: List[DocChunk]) -> List[Optional[np.ndarray]]:
+        return embed_texts_cached(
+            [(c.chunk_id, c.text) for c in chunk_batch],
+            universe=universe,
+            out_dir=out_dir,
+            cache=emb_cache
+        )
 
-            # Mapeo de sección:
-            sec = b.get("section")
-            if not sec and sections:
-                # aproximado: coincidencia de ancla en plain_text
-                anchor = b_text[:120]
-                found_at = plain_text.find(anchor)
-                if found_at >= 0:
-                    sec = section_for_charpos(sections, found_at)
-
-            # Dividir bloque largo en chunks de tokens
-            skip_chunking = False
-            enc = tiktoken.get_encoding(encoding_name)
-            
-            # Para meetings_weekly: NO fragmentar chunks especiales
-            if universe == "meetings_weekly":
-                block_kind = b.get("block_kind")
-                table_name = b.get("table_name")
-                
-                # NO fragmentar: meeting completo, headers pequeños
-                if block_kind == "meeting_full" or table_name == "meeting_summary":
-                    skip_chunking = True
-                elif table_name == "meeting_data":
-                    token_count = len(enc.encode(b_text))
-                    if token_count < 800:  # Headers pequeños no fragmentar
-                        skip_chunking = True
-            
-            if skip_chunking:
-                # Mantener el bloque como un solo chunk
-                token_count = len(enc.encode(b_text))
-                sub_chunks = [(b_text, 0, token_count)]
-            else:
-                sub_chunks = chunk_text_tokens(
-                    b_text,
-                    encoding_name=encoding_name,
-                    chunk_tokens=chunk_tokens,
-                    overlap_tokens=overlap_tokens,
-                )
-
-            if not sub_chunks:
-                continue
+    try:
+        run = run_index_pipeline(
+            tasks,
+            parse_fn=_parse_file_task,
+            embed_fn=_embed,
+            row_fn=_meta_row,
+            index=existing_index,
+            rows=existing_rows,
+            file_cache=file_cache,
+            file_hashes=file_hashes,
+            idx_path=idx_path,
+            meta_path=meta_path,
+            save_file_cache_fn=lambda fc: save_file_cache(out_dir, universe, fc),
+            parse_workers=parse_workers,
+        )
+    except DimensionChanged:
+        # Cambió la dimensión de los embeddings: no se pueden mezclar vectores → reconstrucción completa
+        return build_docs_index(
+            universe=universe,
+            input_dir=input_dir,
+            out_dir=out_dir,
+            encoding_name=encoding_name,
+            chunk_tokens=chunk_tokens,
+            overlap_tokens=overlap_tokens,
+            top_level_only=top_level_only,
+            max_files=max_files,
+            catalog_path=catalog_path,
+            full_rebuild=True,
+            parse_workers=parse_workers,
+        )
 
-            for (chunk_txt, t0, t1) in sub_chunks:
-                # token_start/end son aproximados dentro del documento (block-local + cursor)
-                token_start = token_cursor + t0
-                token_end = token_cursor + t1
-
-                cid = f"{doc_id}_{chunk_idx}"
-                chunk_idx += 1
-
-                chunks.append(DocChunk(
-                    chunk_id=cid,
-                    universe=universe,
-                    doc_id=doc_id,
-                    title=title,
-                    source_path=path,
-                    sha256=sha,
-                    chunk_index=(chunk_idx - 1),
-                    section=sec,
-                    token_start=token_start,
-                    token_end=token_end,
-                    text=chunk_txt,
-
-                    block_kind=b.get("block_kind"),
-                    table_name=b.get("table_name"),
-                    row_key=str(b.get("row_key")) if b.get("row_key") is not None else None,
-                    meeting_date=b.get("meeting_date") or doc_meta.get("meeting_date"),
-                    meeting_date_raw=b.get("meeting_date_raw") or doc_meta.get("meeting_date_raw"),
-                    meeting_start=b.get("meeting_start"),
-                    meeting_end=b.get("meeting_end"),
-
-                    codigo=codigo,
-                    domain=cat.get("domain") if cat else None,
-                    family=cat.get("family") if cat else None,
-                    revision=cat.get("revision") if cat else None,
-                    estatus=cat.get("estatus") if cat else None,
-                    tipo_info=cat.get("tipo_info") if cat else None,
-                    alcance_iso=cat.get("alcance_iso") if cat else None,
-                    disposicion=cat.get("disposicion") if cat else None,
-                    fecha_emision=cat.get("fecha_emision") if cat else None,
-                    catalog_title=cat.get("titulo") if cat else None,
-                ))
-
-            # Avanzar cursor por longitud completa de tokens del bloque (aprox)
-            token_cursor += sub_chunks[-1][2]
-
-    if not chunks:
-        # Si no hay chunks nuevos pero hay archivos procesados, retornar info del índice existente
-        if existing_index is not None:
-            return {
-                "ok": True,
-                "universe": universe,
-                "input_dir": input_dir,
-                "files": len(files),
-                "skipped": skipped_files,
-                "new_files": 0,
-                "message": "No se generaron chunks nuevos de los archivos modificados (pueden estar vacíos o fallar extracción). Índice existente se mantiene.",
-                "index_path": idx_path,
-                "meta_path": meta_path,
-            }
+    index = run["index"]
+    all_rows = run["rows"]
+    parse_errors: Dict[str, str] = run["parse_errors"]
+    if index is None:
+        if parse_errors or run["embed_errors"]:
+            return {"ok": False, "error": "No se generaron embeddings (revisa OPENAI key/config)",
+                    "parse_errors": parse_errors, "embed_errors": run["embed_errors"]}
         return {"ok": False, "error": "No se generaron chunks (docs vacíos o extracción falló)"}
 
-    # 3) Embeddings por chunk (con cache)
-    vectors: List[np.ndarray] = []
-    meta_rows: List[DocChunk] = []
+    # Verificar alineación índice/meta en disco
+    alignment = verify_alignment(idx_path, meta_path)
 
-    for c in chunks:
-        v = embed_text_cached(
-            text=c.text,
-            chunk_id=c.chunk_id,
-            universe=universe,
-            out_dir=out_dir,
-            cache=emb_cache
-        )
-        if v is None:
-            continue
-        vectors.append(v.astype(np.float32))
-        meta_rows.append(c)
-
-    if not vectors:
-        return {"ok": False, "error": "No se generaron embeddings (revisa OPENAI key/config)"}
-
-    mat = np.vstack(vectors).astype(np.float32)
-    dim = mat.shape[1]
-
-    # 4) Índice FAISS (IP sobre vectores normalizados ~= cosine)
-    # Si hay índice existente, agregar a él; si no, crear uno nuevo
-    if existing_index is not None:
-        if existing_index.d != dim:
-            # Dimensiones no coinciden, crear nuevo índice
-            index = faiss.IndexFlatIP(dim)
-            # Cargar vectores existentes del índice anterior (no podemos recuperarlos fácilmente)
-            # Por ahora, si las dimensiones no coinciden, empezamos de cero
-            index.add(mat)
-        else:
-            # Agregar nuevos vectores al índice existente
-            index = existing_index
-            index.add(mat)
-    else:
-        # Crear nuevo índice
-        index = faiss.IndexFlatIP(dim)
-        index.add(mat)
-
-    # 5) Persistir
-    faiss.write_index(index, idx_path)
-
-    # Guardar metadatos: append si hay existentes, write si es nuevo
-    mode = "a" if existing_index is not None and os.path.exists(meta_path) else "w"
-    with open(meta_path, mode, encoding="utf-8") as f:
-        for c in meta_rows:
-            f.write(json.dumps({
-                "chunk_id": c.chunk_id,
-                "universe": c.universe,
-                "doc_id": c.doc_id,
-                "title": c.title,
-                "source_path": c.source_path,
-                "sha256": c.sha256,
-                "chunk_index": c.chunk_index,
-                "section": c.section,
-                "token_start": c.token_start,
-                "token_end": c.token_end,
-                "text": c.text,
-
-                # block metadata
-                "block_kind": c.block_kind,
-                "table_name": c.table_name,
-                "row_key": c.row_key,
-                "meeting_date": c.meeting_date,
-                "meeting_date_raw": c.meeting_date_raw,
-                "meeting_start": c.meeting_start,
-                "meeting_end": c.meeting_end,
-
-                # catalog metadata
-                "codigo": c.codigo,
-                "domain": c.domain,
-                "family": c.family,
-                "revision": c.revision,
-                "estatus": c.estatus,
-                "tipo_info": c.tipo_info,
-                "alcance_iso": c.alcance_iso,
-                "disposicion": c.disposicion,
-                "fecha_emision": c.fecha_emision,
-                "catalog_title": c.catalog_title,
-            }, ensure_ascii=False) + "\n")
-
-    # Marcar archivos como procesados en el caché
-    for path in files_to_process:
-        try:
-            sha = file_sha256(path)
-            mark_file_processed(path, sha, file_cache, use_relative_path=True)
-        except Exception:
-            pass
-    
-    # Guardar caché de archivos actualizado
-    save_file_cache(out_dir, universe, file_cache)
-    
     # Calcular estadísticas
-    # Para docs únicos, contar los nuevos + los existentes
-    new_doc_ids = set([c.doc_id for c in meta_rows])
-    if existing_index is not None:
-        # Leer todos los doc_ids del meta existente para contar total
-        all_doc_ids = new_doc_ids.copy()
-        try:
-            with open(meta_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        data = json.loads(line)
-                        doc_id = data.get("doc_id")
-                        if doc_id:
-                            all_doc_ids.add(doc_id)
-                    except Exception:
-                        continue
-        except Exception:
-            pass
-        unique_docs = len(all_doc_ids)
-    else:
-        unique_docs = len(new_doc_ids)
+    unique_docs = len({r.get("doc_id") for r in all_rows if r.get("doc_id")})
     
-    unique_codes = len(set([c.codigo for c in meta_rows if c.codigo]))
+    unique_codes = len(set([r.get("codigo") for r in all_rows if r.get("codigo")]))
 
     stats_meetings = {}
     if universe == "meetings_weekly":
         kinds = {}
         tables = {}
-        for c in meta_rows:
-            kinds[c.block_kind or "none"] = kinds.get(c.block_kind or "none", 0) + 1
-            tables[c.table_name or "none"] = tables.get(c.table_name or "none", 0) + 1
+        for r in all_rows:
+            kinds[r.get("block_kind") or "none"] = kinds.get(r.get("block_kind") or "none", 0) + 1
+            tables[r.get("table_name") or "none"] = tables.get(r.get("table_name") or "none", 0) + 1
         stats_meetings = {"block_kind_counts": kinds, "table_name_counts": tables}
 
+    # Referencias del universo en el store global de embeddings (para GC / reporte de dedup)
+    emb_refs = emb_cache.update_refs(meta_path)
+
     return {
-        "ok": True,
+        "ok": alignment["ok"],
+        **({} if alignment["ok"] else {"error": f"Índice/meta desalineados: {alignment.get('error')}"}),
         "universe": universe,
         "input_dir": input_dir,
         "files": len(files),
         "files_processed": len(files_to_process),
         "files_skipped": skipped_files,
+        "files_removed": len(removed_sources),
+        **({"parse_errors": parse_errors} if parse_errors else {}),
+        **({"embed_errors": run["embed_errors"]} if run["embed_errors"] else {}),
         "docs": unique_docs,
-        "chunks_new": len(meta_rows),
-        "chunks_total": index.ntotal if index else len(meta_rows),
-        "dim": dim,
+        "chunks_new": run["chunks_new"],
+        "chunks_removed": run["chunks_removed"],
+        "chunks_total": index.ntotal,
+        "dim": index.d,
+        "checkpoints": run["checkpoints"],
+        "stage_seconds": {"discover": round(discover_s, 3), "hash": round(hash_s, 3), **run["stage_seconds"]},
         "index_path": idx_path,
         "meta_path": meta_path,
         "catalog_path": catalog_path,
         "catalog_docs_matched_by_filename": matched_catalog_docs,
         "unique_codes_in_meta": unique_codes,
         "emb_cache_path": get_emb_cache_path(out_dir, universe),
+        "emb_cache": {**emb_cache.run_stats(), "unique_texts": len(emb_refs)},
         "file_cache_path": get_file_cache_path(out_dir, universe),
         "incremental_update": existing_index is not None,
+        "full_rebuild": existing_index is None,
+        **({"rebuild_reason": rebuild_reason} if rebuild_reason else {}),
+        "alignment": alignment,
         "note": "Para que el catálogo se aplique, el filename idealmente debe contener el código tipo P-SGSI-14 / M-SGCSI-01.",
         **({"meetings_stats": stats_meetings} if stats_meetings else {})
     }
@@ -0,0 +1,105 @@
+# Tools/docs_indexer/parallel_parse.py
+# Etapa de parseo en paralelo para los indexadores de docs y guías
+# - Hash SHA256 de todos los archivos una sola vez (hilos: hashlib libera el GIL)
+# - Parseo .docx + chunking + tokenización en un pool de procesos (python-docx es CPU puro)
+# - Resultados en el mismo orden de entrada (determinista sin importar cuántos workers haya),
+#   con una ventana acotada de archivos en vuelo
+# - INDEXER_PARSE_WORKERS=1 fuerza el modo secuencial en el mismo proceso
+
+import os
+import time
+import logging
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence
+
+from .utils import file_sha256
+
+logger = logging.getLogger(__name__)
+
+# 0 = automático (núcleos disponibles, máx. 8)
+INDEXER_PARSE_WORKERS = int(os.getenv("INDEXER_PARSE_WORKERS", "0"))
+INDEXER_HASH_THREADS = int(os.getenv("INDEXER_HASH_THREADS", "8"))
+
+
+def resolve_workers(workers: Optional[int] = None) -> int:
+    """Número de procesos para el parseo (argumento > env > núcleos disponibles)."""
+    n = workers if workers is not None else INDEXER_PARSE_WORKERS
+    if n and n > 0:
+        return n
+    return max(1, min(8, os.cpu_count() or 1))
+
+
+def hash_files(paths: Sequence[str], threads: int = INDEXER_HASH_THREADS) -> Dict[str, str]:
+    """SHA256 de cada archivo (una sola lectura por archivo). Archivos ilegibles se omiten."""
+    def _hash(path: str) -> Optional[str]:
+        try:
+            return file_sha256(path)
+        except OSError as e:
+            logger.warning(f"[ParallelParse] ⚠️ No se pudo leer {path}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="index-hash") as pool:
+        hashes = list(pool.map(_hash, paths))
+    return {p: h for p, h in zip(paths, hashes) if h is not None}
+
+
+def iter_parsed(
+    parse_fn: Callable[[Any], Dict[str, Any]],
+    tasks: Sequence[Any],
+    workers: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Aplica parse_fn (función de módulo, serializable) a cada tarea y entrega los resultados
+    en el orden de `tasks` conforme van estando listos.
+    parse_fn no debe lanzar: los errores por archivo se regresan como {"error": ...}.
+    """
+    n_workers = min(resolve_workers(workers), len(tasks))
+    t0 = time.time()
+    if n_workers <= 1:
+        for task in tasks:
+            yield parse_fn(task)
+    else:
+        try:
+            pool = ProcessPoolExecutor(max_workers=n_workers)
+        except (OSError, NotImplementedError) as e:
+            logger.warning(f"[ParallelParse] ⚠️ Sin pool de procesos ({e}); parseo secuencial")
+            for task in tasks:
+                yield parse_fn(task)
+            return
+        # Ventana acotada de tareas en vuelo (no se encolan todas de golpe): la memoria no crece
+        # con el tamaño del lote si el consumidor va más lento. Se entrega en orden de entrada.
+        window = n_workers * 2
+        pending: Deque[Future] = deque()
+        next_task = 0
+        try:
+            while pending or next_task < len(tasks):
+                while next_task < len(tasks) and len(pending) < window:
+                    pending.append(pool.submit(parse_fn, tasks[next_task]))
+                    next_task += 1
+                yield pending.popleft().result()
+        finally:
+            # Si el consumidor se detiene antes de tiempo, no seguir parseando
+            pool.shutdown(wait=True, cancel_futures=True)
+    logger.info(
+        f"[ParallelParse] ✅ {len(tasks)} archivos parseados con {max(1, n_workers)} worker(s) "
+        f"en {time.time() - t0:.1f}s"
+    )
+
+
+def collect_chunks(results: Iterator[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Junta los chunks de iter_parsed en orden.
+    Returns: {"chunks": [...], "errors": {path: error}, "parsed": [paths sin error]}
+    """
+    chunks: List[Any] = []
+    errors: Dict[str, str] = {}
+    parsed: List[str] = []
+    for res in results:
+        if res.get("error"):
+            errors[res["path"]] = res["error"]
+            logger.error(f"[ParallelParse] ❌ Error parseando {res['path']}: {res['error']}")
+            continue
+        parsed.append(res["path"])
+        chunks.extend(res.get("chunks") or [])
+    return {"chunks": chunks, "errors": errors, "parsed": parsed}
@@ -0,0 +1,126 @@
+# Tools/docs_indexer/parse_bench.py
+# Benchmark de la etapa de parseo (hash + lectura .docx + chunking + tokens), sin embeddings ni FAISS
+# Compara varios números de workers sobre el mismo lote y verifica que la salida sea idéntica
+# Uso:
+#   python -m Tools.docs_indexer.parse_bench --universe meetings_weekly \
+#       --input_dir knowledgebase/meetings_weekly --workers 1 2 4 8
+#   python -m Tools.docs_indexer.parse_bench --guides --input_dir knowledgebase/user_guides
+
+import os
+import json
+import time
+import hashlib
+import argparse
+from typing import Any, Dict, List
+
+from .config import DEFAULT_CHUNK_TOKENS, DEFAULT_OVERLAP_TOKENS, SUPPORTED_EXTS
+from .catalog import infer_code_from_filename
+from .parallel_parse import hash_files, iter_parsed, collect_chunks
+
+
+def _list_files(input_dir: str, exts: tuple, max_files: int = None) -> List[str]:
+    files = []
+    for root, _, filenames in os.walk(input_dir):
+        for fn in filenames:
+            if fn.lower().endswith(exts):
+                files.append(os.path.join(root, fn))
+    files.sort()
+    return files[:max_files] if max_files else files
+
+
+def _output_digest(chunks: List[Any]) -> str:
+    """Huella del resultado (orden + ids + texto) para comprobar que es determinista."""
+    h = hashlib.sha256()
+    for c in chunks:
+        h.update(f"{c.chunk_id}\x1f{c.token_start}\x1f{c.text}\x1e".encode("utf-8"))
+    return h.hexdigest()
+
+
+def run_bench(
+    input_dir: str,
+    universe: str,
+    workers: List[int],
+    guides: bool = False,
+    max_files: int = None,
+    encoding_name: str = "cl100k_base",
+) -> Dict[str, Any]:
+    if guides:
+        from Tools.guides_indexer.config import SUPPORTED_EXTS as GUIDE_EXTS
+        from Tools.guides_indexer.indexer import _parse_guide_task
+        files = _list_files(input_dir, GUIDE_EXTS, max_files)
+    else:
+        from .indexer import _parse_file_task
+        files = _list_files(input_dir, SUPPORTED_EXTS, max_files)
+
+    if not files:
+        return {"ok": False, "error": f"No encontré archivos en {input_dir}"}
+
+    t0 = time.time()
+    hashes = hash_files(files)
+    hash_seconds = time.time() - t0
+    files = [p for p in files if p in hashes]
+
+    if guides:
+        tasks = [(p, hashes[p], universe, encoding_name, DEFAULT_CHUNK_TOKENS, DEFAULT_OVERLAP_TOKENS, None) for p in files]
+        parse_fn = _parse_guide_task
+    else:
+        tasks = [
+            (p, hashes[p], universe, encoding_name, DEFAULT_CHUNK_TOKENS, DEFAULT_OVERLAP_TOKENS,
+             infer_code_from_filename(os.path.basename(p)), None)
+            for p in files
+        ]
+        parse_fn = _parse_file_task
+
+    runs = []
+    for n in workers:
+        t0 = time.time()
+        parsed = collect_chunks(iter_parsed(parse_fn, tasks, workers=n))
+        seconds = time.time() - t0
+        runs.append({
+            "workers": n,
+            "seconds": round(seconds, 3),
+            "files_per_second": round(len(files) / seconds, 2) if seconds else None,
+            "chunks": len(parsed["chunks"]),
+            "errors": len(parsed["errors"]),
+            "output_digest": _output_digest(parsed["chunks"]),
+        })
+
+    base = runs[0]["seconds"] if runs else 0
+    for r in runs:
+        r["speedup_vs_first"] = round(base / r["seconds"], 2) if r["seconds"] else None
+
+    return {
+        "ok": True,
+        "input_dir": input_dir,
+        "universe": universe,
+        "files": len(files),
+        "hash_seconds": round(hash_seconds, 3),
+        "cpu_count": os.cpu_count(),
+        "runs": runs,
+        "deterministic": len({r["output_digest"] for r in runs}) <= 1,
+    }
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark del parseo en paralelo de los indexadores")
+    p.add_argument("--input_dir", required=True)
+    p.add_argument("--universe", default="meetings_weekly")
+    p.add_argument("--guides", action="store_true", help="Usa el parser de guías (user_guides)")
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    p.add_argument("--max_files", type=int, default=None)
+    p.add_argument("--encoding", default="cl100k_base")
+    args = p.parse_args()
+
+    res = run_bench(
+        input_dir=args.input_dir,
+        universe="user_guides" if args.guides and args.universe == "meetings_weekly" else args.universe,
+        workers=args.workers,
+        guides=args.guides,
+        max_files=args.max_files,
+        encoding_name=args.encoding,
+    )
+    print(json.dumps(res, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+# Tools/docs_indexer/pipeline.py
+# Pipeline en streaming para los indexadores de docs y guías: parse/chunk → embed → add a FAISS
+# - Etapas en hilos separados unidas por colas acotadas (memoria de trabajo constante sin importar
+#   el tamaño del corpus): mientras se espera la red de embeddings, el pool de procesos sigue parseando
+# - Embeddings en grupos de archivos completos (embed_texts_cached: lotes multi-input concurrentes)
+# - Add con remove_ids de la versión anterior de cada archivo justo antes de agregar la nueva
+# - Checkpoint periódico de índice + meta + caché de archivos: una corrida interrumpida se reanuda
+#   desde el último checkpoint (los archivos no marcados se vuelven a procesar)
+
+import os
+import time
+import queue
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from .parallel_parse import iter_parsed
+from .index_maintenance import (
+    VECTOR_ID_FIELD,
+    source_key,
+    chunk_vector_id,
+    new_id_index,
+    stale_vector_ids,
+    add_vectors,
+    order_rows_like_index,
+    write_index_and_meta,
+)
+from .file_cache import mark_file_processed
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------
+# Config
+# ----------------------------
+INDEXER_PARSE_QUEUE_FILES = int(os.getenv("INDEXER_PARSE_QUEUE_FILES", "16"))
+INDEXER_EMBED_GROUP_CHUNKS = int(os.getenv("INDEXER_EMBED_GROUP_CHUNKS", "512"))
+INDEXER_EMBED_QUEUE_GROUPS = int(os.getenv("INDEXER_EMBED_QUEUE_GROUPS", "2"))
+INDEXER_CHECKPOINT_FILES = int(os.getenv("INDEXER_CHECKPOINT_FILES", "50"))
+INDEXER_CHECKPOINT_SECONDS = float(os.getenv("INDEXER_CHECKPOINT_SECONDS", "120"))
+
+_DONE = object()
+
+
+class DimensionChanged(Exception):
+    """La dimensión de los embeddings nuevos no coincide con la del índice existente."""
+
+
+class _StageError:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def _put(q: "queue.Queue", item: Any, stop: threading.Event) -> bool:
+    """put con espera acotada que respeta la señal de paro. Retorna False si se detuvo."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: "queue.Queue", stop: threading.Event) -> Any:
+    while True:
+        try:
+            return q.get(timeout=0.5)
+        except queue.Empty:
+            if stop.is_set():
+                return _DONE
+
+
+def run_index_pipeline(
+    tasks: Sequence[Any],
+    parse_fn: Callable[[Any], Dict[str, Any]],
+    embed_fn: Callable[[List[Any]], List[Optional[np.ndarray]]],
+    row_fn: Callable[[Any], Dict[str, Any]],
+    index: Any,
+    rows: List[Dict[str, Any]],
+    file_cache: Dict[str, Dict[str, Any]],
+    file_hashes: Dict[str, str],
+    idx_path: str,
+    meta_path: str,
+    save_file_cache_fn: Callable[[Dict[str, Dict[str, Any]]], None],
+    parse_workers: Optional[int] = None,
+    checkpoint_files: int = INDEXER_CHECKPOINT_FILES,
+    checkpoint_seconds: float = INDEXER_CHECKPOINT_SECONDS,
+) -> Dict[str, Any]:
+    """
+    Procesa `tasks` (una por archivo, ver parallel_parse) y mantiene índice + meta + caché de archivos.
+
+    Args:
+        parse_fn: Tarea de parseo (path, sha, ...) → {"path", "chunks", "timings"?} | {"path", "error"}
+        embed_fn: Lista de chunks → lista alineada de vectores normalizados (o None)
+        row_fn: Chunk → fila de metadata JSONL (sin vector_id)
+        index: IndexIDMap2 existente o None (se crea con la dimensión del primer embedding)
+        rows: Filas de metadata alineadas con index (vector_id en cada una)
+        file_cache / file_hashes: Caché de archivos procesados y sha256 ya calculados
+        save_file_cache_fn: Persiste el caché de archivos (se llama en cada checkpoint)
+
+    Returns:
+        dict con index, rows (orden del índice), contadores, errores y tiempos por etapa.
+        Lanza DimensionChanged si el primer embedding no coincide con la dimensión del índice.
+    """
+    rows_by_id: Dict[int, Dict[str, Any]] = {int(r[VECTOR_ID_FIELD]): r for r in rows}
+    ids_by_source: Dict[str, Set[int]] = {}
+    for vid, r in rows_by_id.items():
+        ids_by_source.setdefault(source_key(r.get("source_path") or ""), set()).add(vid)
+
+    stats: Dict[str, Any] = {
+        "files_done": 0,
+        "chunks_new": 0,
+        "chunks_removed": 0,
+        "checkpoints": 0,
+        "parse_errors": {},
+        "embed_errors": {},
+        # parse / chunk: segundos sumados de los workers (ver timings de parse_fn)
+        "stage_seconds": {"parse": 0.0, "chunk": 0.0, "parse_wait": 0.0, "embed": 0.0, "add": 0.0, "checkpoint": 0.0},
+    }
+    state = {"index": index}
+
+    def _remove(ids: List[int]) -> None:
+        if not ids or state["index"] is None:
+            return
+        stats["chunks_removed"] += int(state["index"].remove_ids(np.array(sorted(ids), dtype=np.int64)))
+        for vid in ids:
+            r = rows_by_id.pop(vid, None)
+            if r is not None:
+                ids_by_source.get(source_key(r.get("source_path") or ""), set()).discard(vid)
+
+    # Restos que ya no corresponden a la última versión procesada de ningún archivo
+    # (eliminados, corridas anteriores). La versión vigente de cada archivo a re-procesar
+    # se conserva hasta que su versión nueva esté embebida.
+    _remove(stale_vector_ids(rows, file_cache, set()))
+
+    stop = threading.Event()
+    parse_q: "queue.Queue" = queue.Queue(maxsize=max(1, INDEXER_PARSE_QUEUE_FILES))
+    embed_q: "queue.Queue" = queue.Queue(maxsize=max(1, INDEXER_EMBED_QUEUE_GROUPS))
+
+    def _parse_stage():
+        try:
+            for res in iter_parsed(parse_fn, tasks, workers=parse_workers):
+                if not _put(parse_q, res, stop):
+                    return
+        except BaseException as e:
+            _put(parse_q, _StageError(e), stop)
+            return
+        _put(parse_q, _DONE, stop)
+
+    def _embed_stage():
+        group: List[Dict[str, Any]] = []
+        group_chunks = 0
+
+        def _flush() -> bool:
+            nonlocal group, group_chunks
+            if not group:
+                return True
+            chunks = [c for res in group for c in res["chunks"]]
+            t0 = time.time()
+            vecs = embed_fn(chunks) if chunks else []
+            stats["stage_seconds"]["embed"] += time.time() - t0
+            ok = _put(embed_q, (group, vecs), stop)
+            group, group_chunks = [], 0
+            return ok
+
+        try:
+            while True:
+                t0 = time.time()
+                res = _get(parse_q, stop)
+                stats["stage_seconds"]["parse_wait"] += time.time() - t0
+                if res is _DONE or isinstance(res, _StageError):
+                    if isinstance(res, _StageError):
+                        _put(embed_q, res, stop)
+                        return
+                    break
+                for stage, seconds in (res.get("timings") or {}).items():
+                    if stage in ("parse", "chunk"):
+                        stats["stage_seconds"][stage] += seconds
+                if res.get("error"):
+                    stats["parse_errors"][res["path"]] = res["error"]
+                    logger.error(f"[IndexPipeline] ❌ Error parseando {res['path']}: {res['error']}")
+                    continue
+                group.append(res)
+                group_chunks += len(res.get("chunks") or [])
+                if group_chunks >= INDEXER_EMBED_GROUP_CHUNKS and not _flush():
+                    return
+            if _flush():
+                _put(embed_q, _DONE, stop)
+        except BaseException as e:
+            _put(embed_q, _StageError(e), stop)
+
+    def _checkpoint() -> None:
+        t0 = time.time()
+        if state["index"] is not None:
+            ordered = order_rows_like_index(state["index"], list(rows_by_id.values()))
+            write_index_and_meta(state["index"], ordered, idx_path, meta_path)
+        save_file_cache_fn(file_cache)
+        stats["checkpoints"] += 1
+        stats["stage_seconds"]["checkpoint"] += time.time() - t0
+
+    threads = [
+        threading.Thread(target=_parse_stage, name="index-parse", daemon=True),
+        threading.Thread(target=_embed_stage, name="index-embed", daemon=True),
+    ]
+    for t in threads:
+        t.start()
+
+    files_since_checkpoint = 0
+    last_checkpoint = time.time()
+    try:
+        while True:
+            item = _get(embed_q, stop)
+            if item is _DONE:
+                break
+            if isinstance(item, _StageError):
+                raise item.error
+
+            group, vecs = item
+            t0 = time.time()
+            pos = 0
+            done_paths: List[str] = []
+            replace_ids: List[int] = []
+            new_rows: List[Dict[str, Any]] = []
+            new_vecs: List[np.ndarray] = []
+            for res in group:
+                path = res["path"]
+                chunks = res.get("chunks") or []
+                file_vecs = vecs[pos:pos + len(chunks)]
+                pos += len(chunks)
+
+                ok = [(c, v) for c, v in zip(chunks, file_vecs) if v is not None]
+                if chunks and not ok:
+                    # Ningún embedding del archivo: conserva su versión anterior y se reintenta
+                    stats["embed_errors"][path] = "No se generaron embeddings"
+                    continue
+
+                src = source_key(path)
+                replace_ids.extend(ids_by_source.get(src, ()))
+                for c, v in ok:
+                    row = row_fn(c)
+                    row[VECTOR_ID_FIELD] = chunk_vector_id(src, c.chunk_id)
+                    new_rows.append(row)
+                    new_vecs.append(v.astype(np.float32))
+                done_paths.append(path)
+
+            if new_vecs:
+                mat = np.vstack(new_vecs)
+                if state["index"] is None:
+                    state["index"] = new_id_index(mat.shape[1])
+                elif state["index"].d != mat.shape[1]:
+                    raise DimensionChanged(f"index d={state['index'].d}, embeddings d={mat.shape[1]}")
+
+            # Quitar la versión anterior de los archivos del grupo y agregar la nueva
+            _remove(replace_ids)
+            if new_vecs:
+                add_vectors(state["index"], new_rows, mat)
+            for row in new_rows:
+                vid = int(row[VECTOR_ID_FIELD])
+                rows_by_id[vid] = row
+                ids_by_source.setdefault(source_key(row.get("source_path") or ""), set()).add(vid)
+            stats["chunks_new"] += len(new_rows)
+
+            for path in done_paths:
+                mark_file_processed(path, file_hashes[path], file_cache, use_relative_path=True)
+            stats["files_done"] += len(done_paths)
+            files_since_checkpoint += len(done_paths)
+            stats["stage_seconds"]["add"] += time.time() - t0
+
+            if files_since_checkpoint >= checkpoint_files or time.time() - last_checkpoint >= checkpoint_seconds:
+                _checkpoint()
+                logger.info(
+                    f"[IndexPipeline] 💾 Checkpoint: {stats['files_done']}/{len(tasks)} archivos, "
+                    f"{state['index'].ntotal if state['index'] is not None else 0} vectores"
+                )
+                files_since_checkpoint = 0
+                last_checkpoint = time.time()
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+
+    _checkpoint()
+    for k, v in stats["stage_seconds"].items():
+        stats["stage_seconds"][k] = round(v, 3)
+
+    index = state["index"]
+    return {
+        **stats,
+        "index": index,
+        "rows": order_rows_like_index(index, list(rows_by_id.values())) if index is not None else [],
+    }
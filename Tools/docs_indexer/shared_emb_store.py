@@ -0,0 +1,235 @@
+# Tools/docs_indexer/shared_emb_store.py
+# Store global de embeddings direccionado por contenido, compartido por todos los indexadores
+# - Clave: (modelo, text_fp): el mismo texto en docs_org, user_guides, meetings, quotes o etiquetas
+#   se embebe y se guarda una sola vez; renombrar un chunk_id ya no obliga a re-embeber
+# - Referencias por universo (Data/emb_store/refs/<universo>.json = {text_fp: nº de chunks}),
+#   recalculadas desde el *_meta.jsonl tras cada build
+# - GC: compacta el store dejando solo los text_fp con refcount > 0
+# - Reporte de deduplicación: referencias vs vectores únicos y bytes ahorrados
+# - Varios indexadores (procesos) pueden usarlo a la vez: EmbeddingStore hace cada escritura
+#   bajo flock y releyendo antes del disco el manifest y las filas de los demás
+# Uso: python -m Tools.docs_indexer.shared_emb_store [--out_dir Data] [--gc] [--dry_run]
+
+import os
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from Tools.search_tickets import EMBEDDING_MODEL
+from .emb_store import EmbeddingStore
+from .batch_embeddings import provider_model
+from .utils import fingerprint_text
+
+logger = logging.getLogger(__name__)
+
+SHARED_STORE_DIRNAME = "emb_store"
+REFS_DIRNAME = "refs"
+
+_stores: Dict[str, EmbeddingStore] = {}
+_stores_lock = threading.Lock()
+
+
+def shared_store_dir(out_dir: str) -> str:
+    return os.path.join(out_dir, SHARED_STORE_DIRNAME)
+
+
+def get_shared_store(out_dir: str = "Data") -> EmbeddingStore:
+    """Store global del directorio de datos (uno por proceso y out_dir)."""
+    root = os.path.abspath(shared_store_dir(out_dir))
+    with _stores_lock:
+        store = _stores.get(root)
+        if store is None:
+            store = EmbeddingStore(root)
+            _stores[root] = store
+        return store
+
+
+def _fp_from_cache_key(cache_key: str) -> str:
+    # Claves anteriores: chunk_id + "|" + text_fp
+    return cache_key.rsplit("|", 1)[-1]
+
+
+class SharedEmbeddingCache:
+    """
+    Vista de un universo sobre el store global: lo que usan embed_text_cached / embed_texts_cached.
+    Cuenta aciertos y faltantes de la corrida para el resultado del indexador.
+    """
+
+    def __init__(
+        self,
+        out_dir: str,
+        universe: str,
+        legacy_store_dir: Optional[str] = None,
+        legacy_jsonl: Optional[str] = None,
+        model: Optional[str] = None,
+    ):
+        self.out_dir = out_dir
+        self.universe = universe
+        # Con EMBED_PROVIDER=fake los vectores quedan bajo otro modelo ("fake-<dim>")
+        self.model = model or provider_model()
+        self.store = get_shared_store(out_dir)
+        self.hits = 0
+        self.misses = 0
+        # Migración única desde el store por universo (chunk_id|fp) y el JSONL original
+        if legacy_store_dir:
+            self.store.import_store(legacy_store_dir, key_fn=_fp_from_cache_key)
+        # El JSONL original tiene embeddings reales de OpenAI: van bajo EMBEDDING_MODEL, y no se
+        # migran en corridas con el proveedor falso (se importan en la siguiente corrida real)
+        if legacy_jsonl and not self.model.startswith("fake-"):
+            self.store.import_jsonl(legacy_jsonl, model=EMBEDDING_MODEL, key_fn=_fp_from_cache_key)
+
+    def get(self, text_fp: str) -> Optional[np.ndarray]:
+        vec = self.store.get(text_fp, self.model)
+        if vec is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return vec
+
+    def put_many(self, items: List[Tuple[str, np.ndarray]]) -> int:
+        return self.store.put_many(items, self.model)
+
+    def put(self, text_fp: str, vec: np.ndarray) -> None:
+        self.store.put(text_fp, vec, self.model)
+
+    def update_refs(self, meta_path: str) -> Dict[str, int]:
+        return update_universe_refs(self.out_dir, self.universe, meta_path, model=self.model)
+
+    def run_stats(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses, "store": self.store.root}
+
+
+# ----------------------------
+# Referencias / GC / reporte
+# ----------------------------
+
+def _refs_dir(out_dir: str) -> str:
+    return os.path.join(shared_store_dir(out_dir), REFS_DIRNAME)
+
+
+def update_universe_refs(out_dir: str, universe: str, meta_path: str, model: str = EMBEDDING_MODEL) -> Dict[str, int]:
+    """
+    Recalcula las referencias del universo desde su metadata (campo "text" de cada chunk).
+    Se hace sobre el meta completo, así que también cubre builds incrementales.
+    """
+    counts: Dict[str, int] = {}
+    if os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    text = json.loads(line).get("text")
+                except Exception:
+                    continue
+                if text:
+                    fp = fingerprint_text(text)
+                    counts[fp] = counts.get(fp, 0) + 1
+
+    os.makedirs(_refs_dir(out_dir), exist_ok=True)
+    path = os.path.join(_refs_dir(out_dir), f"{universe}.json")
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"model": model, "meta_path": meta_path, "refs": counts}, f, ensure_ascii=False)
+    os.replace(tmp, path)
+    return counts
+
+
+def load_all_refs(out_dir: str) -> Dict[str, Dict[str, Any]]:
+    """{universo: {"model", "meta_path", "refs": {text_fp: count}}}"""
+    out: Dict[str, Dict[str, Any]] = {}
+    d = _refs_dir(out_dir)
+    if not os.path.isdir(d):
+        return out
+    for fn in sorted(os.listdir(d)):
+        if not fn.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(d, fn), "r", encoding="utf-8") as f:
+                out[fn[:-len(".json")]] = json.load(f)
+        except Exception as e:
+            logger.warning(f"[SharedEmbStore] ⚠️ No se pudo leer refs {fn}: {e}")
+    return out
+
+
+def refcounts(out_dir: str) -> Dict[Tuple[str, str], int]:
+    """Refcount global por (modelo, text_fp) = chunks que lo usan en todos los universos."""
+    total: Dict[Tuple[str, str], int] = {}
+    for data in load_all_refs(out_dir).values():
+        model = data.get("model") or EMBEDDING_MODEL
+        for fp, n in (data.get("refs") or {}).items():
+            total[(model, fp)] = total.get((model, fp), 0) + int(n)
+    return total
+
+
+def dedup_report(out_dir: str = "Data") -> Dict[str, Any]:
+    """Cuánto ahorra el store compartido frente a un cache por universo."""
+    store = get_shared_store(out_dir)
+    all_refs = load_all_refs(out_dir)
+    counts = refcounts(out_dir)
+
+    universes_per_fp: Dict[str, int] = {}
+    per_universe = {}
+    for universe, data in all_refs.items():
+        refs = data.get("refs") or {}
+        per_universe[universe] = {"chunks": sum(refs.values()), "unique_texts": len(refs)}
+        for fp in refs:
+            universes_per_fp[fp] = universes_per_fp.get(fp, 0) + 1
+
+    total_refs = sum(counts.values())
+    unique_refs = len(counts)
+    referenced_in_store = sum(1 for (model, fp) in counts if store.contains(fp, model))
+    stats = store.stats()
+    bytes_per_vec = (stats["bytes"] / stats["rows"]) if stats["rows"] else 0
+
+    return {
+        "store": stats,
+        "universes": per_universe,
+        "chunk_references": total_refs,
+        "unique_texts": unique_refs,
+        "texts_shared_across_universes": sum(1 for n in universes_per_fp.values() if n > 1),
+        "referenced_in_store": referenced_in_store,
+        "unreferenced_in_store": max(0, len(store) - referenced_in_store),
+        "embeddings_saved": total_refs - unique_refs,
+        "bytes_saved_estimate": int((total_refs - unique_refs) * bytes_per_vec),
+    }
+
+
+def gc_shared_store(out_dir: str = "Data", dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Elimina del store los vectores sin referencias (refcount 0) compactando los segmentos.
+    Sin archivos de refs no se borra nada (evita vaciar el store por error).
+    """
+    store = get_shared_store(out_dir)
+    counts = refcounts(out_dir)
+    if not counts:
+        return {"ok": False, "error": "No hay referencias registradas; corre los indexadores primero."}
+    keep = {key for key, n in counts.items() if n > 0}
+    unreferenced = len(store.entries() - keep)
+    if dry_run:
+        return {"ok": True, "dry_run": True, "would_remove": unreferenced, "store": store.stats()}
+    result = store.compact(keep=keep)
+    return {"ok": True, "removed": unreferenced, **result}
+
+
+def main():
+    import argparse
+
+    p = argparse.ArgumentParser(description="Reporte de deduplicación / GC del store global de embeddings")
+    p.add_argument("--out_dir", default="Data")
+    p.add_argument("--gc", action="store_true", help="Elimina vectores sin referencias")
+    p.add_argument("--dry_run", action="store_true", help="Con --gc: solo reporta qué se borraría")
+    args = p.parse_args()
+
+    out: Dict[str, Any] = {"report": dedup_report(args.out_dir)}
+    if args.gc:
+        out["gc"] = gc_shared_store(args.out_dir, dry_run=args.dry_run)
+    print(json.dumps(out, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# Tools/docs_indexer/table_sync.py
+# Actualización incremental por diff de filas para índices tabulares (quotes_indexer, etiquetas_indexer)
+# - Cada fila del Excel tiene una llave estable (row_key) y un fingerprint de su texto (text_fp)
+# - Diff contra el _meta.jsonl anterior: agregadas, cambiadas, eliminadas y sin cambios
+# - Solo las agregadas y cambiadas se embeben (el store de embeddings evita la llamada si el texto
+#   no cambió) y se hace upsert en el IndexIDMap2; las eliminadas se quitan con remove_ids
+# - Misma persistencia que docs/guías: índice + meta atómicos en orden de almacenamiento
+#   (index_maintenance), así las búsquedas por posición siguen funcionando
+
+import os
+import json
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .utils import fingerprint_text
+from .index_maintenance import (
+    VECTOR_ID_FIELD,
+    chunk_vector_id,
+    new_id_index,
+    load_index_state,
+    remove_vectors,
+    add_vectors,
+    order_rows_like_index,
+    write_index_and_meta,
+    verify_alignment,
+)
+
+logger = logging.getLogger(__name__)
+
+ROW_KEY_FIELD = "row_key"
+TEXT_FP_FIELD = "text_fp"
+
+
+def unique_row_keys(keys: List[str]) -> List[str]:
+    """Llaves repetidas en el mismo Excel se desambiguan por orden de aparición (key, key#2, ...)."""
+    seen: Dict[str, int] = {}
+    out: List[str] = []
+    for key in keys:
+        n = seen.get(key, 0) + 1
+        seen[key] = n
+        out.append(key if n == 1 else f"{key}#{n}")
+    return out
+
+
+def keyed_meta_rows(universe: str, rows: List[Dict[str, Any]], keys: List[str]) -> List[Dict[str, Any]]:
+    """Agrega row_key, text_fp y vector_id (estable por universo + llave) a las filas de metadata."""
+    for row, key in zip(rows, unique_row_keys(keys)):
+        row[ROW_KEY_FIELD] = key
+        row[TEXT_FP_FIELD] = fingerprint_text(row.get("text") or "")
+        row[VECTOR_ID_FIELD] = chunk_vector_id(universe, key)
+    return rows
+
+
+def _same_row(old: Dict[str, Any], new: Dict[str, Any]) -> bool:
+    """Compara como quedaría en el JSONL (el meta anterior viene de json.loads)."""
+    return json.loads(json.dumps(new, ensure_ascii=False)) == old
+
+
+def diff_rows(old_rows: List[Dict[str, Any]], new_rows: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Diff por row_key entre la metadata anterior y las filas nuevas.
+    Returns: {"added", "changed", "unchanged", "removed"}; changed incluye cambios solo de metadata
+    (mismo text_fp): esas filas se re-escriben pero su embedding sale del store.
+    """
+    old_by_key = {r.get(ROW_KEY_FIELD): r for r in old_rows}
+    out: Dict[str, List[Dict[str, Any]]] = {"added": [], "changed": [], "unchanged": [], "removed": []}
+    new_keys = set()
+    for row in new_rows:
+        key = row[ROW_KEY_FIELD]
+        new_keys.add(key)
+        old = old_by_key.get(key)
+        if old is None:
+            out["added"].append(row)
+        elif _same_row(old, row):
+            out["unchanged"].append(old)
+        else:
+            out["changed"].append(row)
+    out["removed"] = [r for r in old_rows if r.get(ROW_KEY_FIELD) not in new_keys]
+    return out
+
+
+def _load_previous(
+    idx_path: str, meta_path: str, full_rebuild: bool, reason: Optional[str]
+) -> Tuple[Optional[Any], List[Dict[str, Any]], Optional[str]]:
+    if full_rebuild:
+        return None, [], reason or "full_rebuild solicitado"
+    index, rows, reason = load_index_state(idx_path, meta_path)
+    if index is not None and any(r.get(ROW_KEY_FIELD) is None for r in rows):
+        # Meta del modo append anterior (sin llaves ni ids por fila): se reconstruye una vez
+        return None, [], "metadata sin row_key (formato anterior)"
+    return index, rows, reason
+
+
+def sync_table_index(
+    universe: str,
+    out_dir: str,
+    new_rows: List[Dict[str, Any]],
+    embed_fn: Callable[[List[Tuple[str, str]]], List[Optional[np.ndarray]]],
+    full_rebuild: bool = False,
+    rebuild_reason: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Aplica al índice del universo solo el diff de filas respecto a la corrida anterior.
+
+    Args:
+        new_rows: Filas de metadata (con row_key / text_fp / vector_id, ver keyed_meta_rows)
+        embed_fn: Lista de (chunk_id, text) → lista alineada de vectores normalizados (o None)
+        full_rebuild: Ignora el índice anterior y embebe/agrega todas las filas
+
+    Returns:
+        dict con rows_added / rows_changed / rows_removed / rows_unchanged, errores, alineación
+        y rutas; {"ok": False, "error": ...} si no hay índice que escribir.
+    """
+    idx_path = os.path.join(out_dir, f"{universe}.index")
+    meta_path = os.path.join(out_dir, f"{universe}_meta.jsonl")
+
+    stage_seconds = {"diff": 0.0, "embed": 0.0, "add": 0.0, "persist": 0.0}
+    t0 = time.perf_counter()
+    index, old_rows, rebuild_reason = _load_previous(idx_path, meta_path, full_rebuild, rebuild_reason)
+    if rebuild_reason:
+        logger.info(f"[TableSync] 🔁 {universe}: reconstrucción completa ({rebuild_reason})")
+    diff = diff_rows(old_rows, new_rows)
+    stage_seconds["diff"] = time.perf_counter() - t0
+
+    stats: Dict[str, Any] = {
+        "rows_added": len(diff["added"]),
+        "rows_changed": len(diff["changed"]),
+        "rows_removed": len(diff["removed"]),
+        "rows_unchanged": len(diff["unchanged"]),
+        "embed_errors": 0,
+        "incremental_update": index is not None,
+        "full_rebuild": index is None,
+        "rebuild_reason": rebuild_reason,
+        "index_path": idx_path,
+        "meta_path": meta_path,
+        "stage_seconds": stage_seconds,
+    }
+
+    if index is not None and not (diff["added"] or diff["changed"] or diff["removed"]):
+        logger.info(f"[TableSync] ✅ {universe}: sin cambios ({len(old_rows)} filas)")
+        return {"ok": True, **stats, "index": index, "rows": old_rows, "alignment": None}
+
+    to_embed = diff["added"] + diff["changed"]
+    t0 = time.perf_counter()
+    vecs = embed_fn([(r["chunk_id"], r["text"]) for r in to_embed]) if to_embed else []
+    stage_seconds["embed"] = time.perf_counter() - t0
+
+    upsert_rows: List[Dict[str, Any]] = []
+    upsert_vecs: List[np.ndarray] = []
+    for row, vec in zip(to_embed, vecs):
+        if vec is None:
+            # Agregada: queda fuera hasta la próxima corrida; cambiada: conserva su versión anterior
+            stats["embed_errors"] += 1
+            continue
+        upsert_rows.append(row)
+        upsert_vecs.append(vec.astype(np.float32))
+
+    mat = np.vstack(upsert_vecs) if upsert_vecs else None
+    if index is not None and mat is not None and index.d != mat.shape[1]:
+        logger.warning(
+            f"[TableSync] ⚠️ {universe}: dimensión cambió (index d={index.d}, embeddings d={mat.shape[1]}); "
+            f"reconstruyendo"
+        )
+        return sync_table_index(
+            universe, out_dir, new_rows, embed_fn,
+            full_rebuild=True, rebuild_reason="cambió la dimensión de los embeddings",
+        )
+
+    if index is None:
+        if mat is None:
+            return {"ok": False, "error": "No se generaron embeddings (revisa OPENAI key/config)", **stats}
+        index = new_id_index(mat.shape[1])
+
+    # Quitar eliminadas y la versión anterior de las que se van a re-escribir; agregar las nuevas
+    t0 = time.perf_counter()
+    old_keys = {r.get(ROW_KEY_FIELD) for r in old_rows}
+    drop_ids = [int(r[VECTOR_ID_FIELD]) for r in diff["removed"]]
+    drop_ids += [int(r[VECTOR_ID_FIELD]) for r in upsert_rows if r[ROW_KEY_FIELD] in old_keys]
+    rows, _ = remove_vectors(index, old_rows, drop_ids)
+    if mat is not None:
+        add_vectors(index, upsert_rows, mat)
+        rows = rows + upsert_rows
+
+    rows = order_rows_like_index(index, rows)
+    stage_seconds["add"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    write_index_and_meta(index, rows, idx_path, meta_path)
+    alignment = verify_alignment(idx_path, meta_path)
+    stage_seconds["persist"] = time.perf_counter() - t0
+    for k, v in stage_seconds.items():
+        stage_seconds[k] = round(v, 3)
+    logger.info(
+        f"[TableSync] ✅ {universe}: +{stats['rows_added']} ~{stats['rows_changed']} "
+        f"-{stats['rows_removed']} ={stats['rows_unchanged']} → {index.ntotal} vectores"
+    )
+    return {"ok": alignment.get("ok", False), **stats, "index": index, "rows": rows, "alignment": alignment}
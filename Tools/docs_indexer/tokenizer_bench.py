@@ -0,0 +1,152 @@
+# Tools/docs_indexer/tokenizer_bench.py
+# Microbenchmark del chunking por tokens: implementación anterior vs. encoder cacheado + offsets
+# - legacy: get_encoding + encode por llamada y un decode por ventana (copia de la versión anterior)
+# - per_text: chunk_text_tokens actual (un encode y un decode por texto)
+# - batch: chunk_texts_tokens (encode_batch de todos los textos)
+# Uso:
+#   python -m Tools.docs_indexer.tokenizer_bench --texts 5000
+#   python -m Tools.docs_indexer.tokenizer_bench --meta Data/docs_meetings_weekly_meta.jsonl --repeat 3
+
+import json
+import time
+import random
+import argparse
+from typing import Any, Callable, Dict, List, Tuple
+
+import tiktoken
+
+from .config import DEFAULT_CHUNK_TOKENS, DEFAULT_OVERLAP_TOKENS
+from .utils import chunk_text_tokens, chunk_texts_tokens, get_encoder
+
+_WORDS = (
+    "reunión acuerdo cliente ticket sistema póliza revisión entrega versión módulo "
+    "facturación pendiente responsable fecha avance incidencia configuración usuario "
+    "implementación validación proceso reporte área dirección calidad seguimiento"
+).split()
+
+
+def _legacy_chunk_text_tokens(
+    text: str,
+    encoding_name: str = "cl100k_base",
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+) -> List[Tuple[str, int, int]]:
+    """Versión anterior de utils.chunk_text_tokens (referencia para el benchmark)."""
+    enc = tiktoken.get_encoding(encoding_name)
+    toks = enc.encode(text or "")
+    chunks: List[Tuple[str, int, int]] = []
+
+    i = 0
+    n = len(toks)
+    while i < n:
+        j = min(i + chunk_tokens, n)
+        chunk = enc.decode(toks[i:j]).strip()
+        if chunk:
+            chunks.append((chunk, i, j))
+        if j == n:
+            break
+        i = max(0, j - overlap_tokens)
+
+    return chunks
+
+
+def synthetic_texts(n: int, seed: int = 7) -> List[str]:
+    """Mezcla de textos cortos (filas de tabla) y largos (bloques que se fragmentan)."""
+    rnd = random.Random(seed)
+    texts = []
+    for k in range(n):
+        n_words = rnd.randint(20, 80) if k % 5 else rnd.randint(600, 2500)
+        texts.append(" ".join(rnd.choice(_WORDS) for _ in range(n_words)))
+    return texts
+
+
+def load_meta_texts(meta_path: str, limit: int = None) -> List[str]:
+    texts = []
+    with open(meta_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            text = json.loads(line).get("text") or ""
+            if text:
+                texts.append(text)
+            if limit and len(texts) >= limit:
+                break
+    return texts
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    best = None
+    out = None
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        out = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, out
+
+
+def run_bench(
+    texts: List[str],
+    encoding_name: str = "cl100k_base",
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+    repeat: int = 3,
+) -> Dict[str, Any]:
+    if not texts:
+        return {"ok": False, "error": "Sin textos para el benchmark"}
+
+    get_encoder(encoding_name)  # carga del BPE fuera de la medición
+    args = (encoding_name, chunk_tokens, overlap_tokens)
+
+    legacy_s, legacy = _time(lambda: [_legacy_chunk_text_tokens(t, *args) for t in texts], repeat)
+    per_text_s, per_text = _time(lambda: [chunk_text_tokens(t, *args) for t in texts], repeat)
+    batch_s, batch = _time(lambda: chunk_texts_tokens(texts, *args), repeat)
+
+    same = sum(1 for a, b in zip(legacy, per_text) if a == b)
+    return {
+        "ok": True,
+        "texts": len(texts),
+        "chunks": sum(len(c) for c in legacy),
+        "encoding": encoding_name,
+        "chunk_tokens": chunk_tokens,
+        "overlap_tokens": overlap_tokens,
+        "seconds": {
+            "legacy": round(legacy_s, 4),
+            "per_text": round(per_text_s, 4),
+            "batch": round(batch_s, 4),
+        },
+        "speedup_vs_legacy": {
+            "per_text": round(legacy_s / per_text_s, 2) if per_text_s else None,
+            "batch": round(legacy_s / batch_s, 2) if batch_s else None,
+        },
+        # Difieren solo ventanas que cortaban un carácter UTF-8 a la mitad (antes: U+FFFD)
+        "identical_texts": same,
+        "identical_rate": round(same / len(texts), 4),
+        "batch_matches_per_text": batch == per_text,
+    }
+
+
+def main():
+    p = argparse.ArgumentParser(description="Microbenchmark del chunking por tokens")
+    p.add_argument("--meta", default=None, help="JSONL de metadata del que se toman los textos")
+    p.add_argument("--texts", type=int, default=2000, help="Textos sintéticos (o límite con --meta)")
+    p.add_argument("--encoding", default="cl100k_base")
+    p.add_argument("--chunk_tokens", type=int, default=DEFAULT_CHUNK_TOKENS)
+    p.add_argument("--overlap_tokens", type=int, default=DEFAULT_OVERLAP_TOKENS)
+    p.add_argument("--repeat", type=int, default=3)
+    args = p.parse_args()
+
+    texts = load_meta_texts(args.meta, args.texts) if args.meta else synthetic_texts(args.texts)
+    res = run_bench(
+        texts,
+        encoding_name=args.encoding,
+        chunk_tokens=args.chunk_tokens,
+        overlap_tokens=args.overlap_tokens,
+        repeat=args.repeat,
+    )
+    print(json.dumps(res, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,8 @@
 import os
 import re
 import hashlib
-from typing import List, Tuple, Optional
+from functools import lru_cache
+from typing import List, Tuple, Optional, Sequence
 
 import numpy as np
 import tiktoken
@@ -15,6 +16,9 @@ from .config import (
     HEADING_RE
 )
 
+# Hilos para encode_batch (tiktoken tokeniza en Rust sin el GIL)
+TOKENIZER_BATCH_THREADS = int(os.getenv("TOKENIZER_BATCH_THREADS", "4"))
+
 
 def file_sha256(path: str) -> str:
     """Calcula el hash SHA256 de un archivo."""
@@ -63,25 +67,67 @@ def normalize_vec_1d(v: np.ndarray) -> np.ndarray:
     return (v / n).astype(np.float32)
 
 
-def chunk_text_tokens(
-    text: str,
+@lru_cache(maxsize=None)
+def get_encoder(encoding_name: str = "cl100k_base") -> "tiktoken.Encoding":
+    """Encoder de tiktoken cacheado a nivel de módulo (uno por encoding y por proceso)."""
+    return tiktoken.get_encoding(encoding_name)
+
+
+def encode_texts(
+    texts: Sequence[str],
+    encoding_name: str = "cl100k_base",
+    num_threads: int = TOKENIZER_BATCH_THREADS,
+) -> List[List[int]]:
+    """
+    Tokeniza muchos textos de una vez (encode_batch: tiktoken libera el GIL y reparte en hilos).
+    Returns: lista de tokens alineada con texts.
+    """
+    enc = get_encoder(encoding_name)
+    texts = [t or "" for t in texts]
+    if num_threads <= 1 or len(texts) < 2:
+        return [enc.encode(t) for t in texts]
+    return enc.encode_batch(texts, num_threads=num_threads)
+
+
+def _token_char_offsets(enc: "tiktoken.Encoding", toks: List[int]) -> Tuple[str, List[int]]:
+    """
+    Decodifica toks una sola vez y regresa (texto, offset de carácter donde empieza cada token).
+    Un token que empieza a mitad de un carácter UTF-8 apunta al inicio de ese carácter.
+    """
+    decode_with_offsets = getattr(enc, "decode_with_offsets", None)
+    if decode_with_offsets is not None:
+        return decode_with_offsets(toks)
+
+    offsets: List[int] = []
+    n_chars = 0
+    for b in enc.decode_tokens_bytes(toks):
+        offsets.append(max(0, n_chars - (1 if b and 0x80 <= b[0] < 0xC0 else 0)))
+        n_chars += sum(1 for c in b if not 0x80 <= c < 0xC0)
+    return enc.decode(toks), offsets
+
+
+def chunk_encoded_text(
+    toks: List[int],
     encoding_name: str = "cl100k_base",
     chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
     overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
 ) -> List[Tuple[str, int, int]]:
     """
-    Divide texto en chunks basados en tokens.
-    Returns: lista de (chunk_text, start_token_idx, end_token_idx) dentro del texto dado.
+    Igual que chunk_text_tokens pero sobre tokens ya calculados.
+    Decodifica una sola vez y corta cada ventana por offsets de carácter, en lugar de
+    decodificar cada ventana (los tokens del traslape se decodificaban dos veces).
     """
-    enc = tiktoken.get_encoding(encoding_name)
-    toks = enc.encode(text or "")
+    n = len(toks)
+    if not n:
+        return []
+    text, offsets = _token_char_offsets(get_encoder(encoding_name), toks)
     chunks: List[Tuple[str, int, int]] = []
 
     i = 0
-    n = len(toks)
     while i < n:
         j = min(i + chunk_tokens, n)
-        chunk = enc.decode(toks[i:j]).strip()
+        end = len(text) if j == n else offsets[j]
+        chunk = text[offsets[i]:end].strip()
         if chunk:
             chunks.append((chunk, i, j))
         if j == n:
@@ -91,6 +137,34 @@ def chunk_text_tokens(
     return chunks
 
 
+def chunk_text_tokens(
+    text: str,
+    encoding_name: str = "cl100k_base",
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+) -> List[Tuple[str, int, int]]:
+    """
+    Divide texto en chunks basados en tokens.
+    Returns: lista de (chunk_text, start_token_idx, end_token_idx) dentro del texto dado.
+    """
+    toks = get_encoder(encoding_name).encode(text or "")
+    return chunk_encoded_text(toks, encoding_name, chunk_tokens, overlap_tokens)
+
+
+def chunk_texts_tokens(
+    texts: Sequence[str],
+    encoding_name: str = "cl100k_base",
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+    num_threads: int = TOKENIZER_BATCH_THREADS,
+) -> List[List[Tuple[str, int, int]]]:
+    """Versión por lotes de chunk_text_tokens (una sola llamada a encode_batch para todos los textos)."""
+    return [
+        chunk_encoded_text(toks, encoding_name, chunk_tokens, overlap_tokens)
+        for toks in encode_texts(texts, encoding_name, num_threads=num_threads)
+    ]
+
+
 def compute_sections(text: str) -> List[Tuple[int, str]]:
     """
     Detecta secciones (títulos/encabezados) en el texto.
@@ -0,0 +1,180 @@
+"""
+Cache de embeddings de consultas - Evita pedir a OpenAI el mismo embedding varias veces.
+Usado por search_tickets.generate_openai_embedding (y por lo tanto por search_docs,
+search_etiquetas, search_quotes y la búsqueda semántica de tickets).
+
+- Tier en memoria: LRU acotado + TTL, clave (modelo, texto normalizado).
+- Tier en disco (opcional): SQLite en EMBEDDING_CACHE_DISK_PATH, sobrevive reinicios.
+"""
+import os
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# === Config ===
+EMBEDDING_CACHE_MAX_ITEMS = int(os.getenv("EMBEDDING_CACHE_MAX_ITEMS", "2048"))
+EMBEDDING_CACHE_TTL_SECONDS = float(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", "3600"))
+# Vacío = sin tier en disco
+EMBEDDING_CACHE_DISK_PATH = os.getenv("EMBEDDING_CACHE_DISK_PATH", "")
+EMBEDDING_CACHE_DISK_TTL_SECONDS = float(os.getenv("EMBEDDING_CACHE_DISK_TTL_SECONDS", str(30 * 24 * 3600)))
+
+
+def normalize_query_text(text: str) -> str:
+    """Normaliza el texto para la clave del cache (Unicode NFC + espacios colapsados)."""
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+def _cache_key(model: str, text: str) -> str:
+    return hashlib.sha1(f"{model}|{normalize_query_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Cache LRU + TTL de vectores (1, d) float32 ya normalizados L2.
+    Thread-safe; los vectores se entregan como copia para que el llamador pueda modificarlos.
+    """
+
+    def __init__(
+        self,
+        max_items: int = EMBEDDING_CACHE_MAX_ITEMS,
+        ttl_seconds: float = EMBEDDING_CACHE_TTL_SECONDS,
+        disk_path: str = EMBEDDING_CACHE_DISK_PATH,
+        disk_ttl_seconds: float = EMBEDDING_CACHE_DISK_TTL_SECONDS,
+    ):
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = disk_path
+        self.disk_ttl_seconds = disk_ttl_seconds
+        self._items: "OrderedDict[str, Tuple[float, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if disk_path:
+            self._open_disk(disk_path)
+
+    def _open_disk(self, path: str) -> None:
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings ("
+                "key TEXT PRIMARY KEY, model TEXT, created_at REAL, dim INTEGER, vec BLOB)"
+            )
+            conn.commit()
+            self._disk = conn
+            logger.info(f"[EmbeddingCache] 💾 Tier en disco activo: {path}")
+        except Exception as e:
+            logger.error(f"[EmbeddingCache] ❌ No se pudo abrir cache en disco {path}: {e}")
+            self._disk = None
+
+    def _disk_get(self, key: str) -> Optional[np.ndarray]:
+        if self._disk is None:
+            return None
+        try:
+            row = self._disk.execute(
+                "SELECT created_at, dim, vec FROM query_embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        except Exception as e:
+            logger.debug(f"[EmbeddingCache] Error leyendo cache en disco: {e}")
+            return None
+        if row is None:
+            return None
+        created_at, dim, blob = row
+        if self.disk_ttl_seconds > 0 and time.time() - created_at > self.disk_ttl_seconds:
+            return None
+        return np.frombuffer(blob, dtype=np.float32).reshape(1, dim).copy()
+
+    def _disk_put(self, key: str, model: str, vec: np.ndarray) -> None:
+        if self._disk is None:
+            return
+        try:
+            self._disk.execute(
+                "INSERT OR REPLACE INTO query_embeddings (key, model, created_at, dim, vec) VALUES (?, ?, ?, ?, ?)",
+                (key, model, time.time(), int(vec.shape[-1]), vec.astype(np.float32).tobytes()),
+            )
+            self._disk.commit()
+        except Exception as e:
+            logger.debug(f"[EmbeddingCache] Error escribiendo cache en disco: {e}")
+
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        """Retorna una copia del vector cacheado o None (miss / expirado)."""
+        key = _cache_key(model, text)
+        now = time.time()
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None:
+                stored_at, vec = entry
+                if self.ttl_seconds <= 0 or now - stored_at <= self.ttl_seconds:
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return vec.copy()
+                del self._items[key]
+
+            vec = self._disk_get(key)
+            if vec is not None:
+                self._put_memory(key, vec, now)
+                self.disk_hits += 1
+                return vec.copy()
+
+            self.misses += 1
+            return None
+
+    def put(self, model: str, text: str, vec: np.ndarray) -> None:
+        key = _cache_key(model, text)
+        vec = np.array(vec, dtype=np.float32).reshape(1, -1)
+        with self._lock:
+            self._put_memory(key, vec, time.time())
+            self._disk_put(key, model, vec)
+
+    def _put_memory(self, key: str, vec: np.ndarray, now: float) -> None:
+        self._items[key] = (now, vec)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "items": len(self._items),
+                "max_items": self.max_items,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "disk_path": self.disk_path if self._disk is not None else None,
+            }
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Cache de embeddings del proceso (singleton)."""
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _embedding_cache_lock:
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache()
+    return _embedding_cache
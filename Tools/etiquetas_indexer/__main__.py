@@ -23,6 +23,9 @@ Ejemplos:
   
   # Especificar directorio de salida
   python -m Tools.etiquetas_indexer --out-dir "Data"
+  
+  # Reconstruir desde cero (por defecto solo se aplica el diff de filas)
+  python -m Tools.etiquetas_indexer --full-rebuild
         """
     )
     
@@ -47,6 +50,12 @@ Ejemplos:
         help=f"Nombre del universo (default: {UNIVERSE_NAME})"
     )
     
+    parser.add_argument(
+        "--full-rebuild",
+        action="store_true",
+        help="Ignora el índice anterior y lo reconstruye con todas las filas (default: solo el diff)"
+    )
+    
     args = parser.parse_args()
     
     # Validar que el Excel existe
@@ -63,6 +72,7 @@ Ejemplos:
         excel_path=args.excel,
         out_dir=args.out_dir,
         universe=args.universe,
+        full_rebuild=args.full_rebuild,
     )
     
     if not result.get("ok"):
@@ -83,10 +93,19 @@ Ejemplos:
     print(f"  - Cache embeddings: {result.get('emb_cache_path')}")
     print()
     
+    print("🔁 Cambios respecto a la corrida anterior:")
+    print(f"  - Agregadas: {result.get('rows_added', 0)}")
+    print(f"  - Modificadas: {result.get('rows_changed', 0)}")
+    print(f"  - Eliminadas: {result.get('rows_removed', 0)}")
+    print(f"  - Sin cambios: {result.get('rows_unchanged', 0)}")
+    if result.get("embed_errors"):
+        print(f"  - Sin embedding (se reintentan en la próxima corrida): {result['embed_errors']}")
+    print()
+    
     if result.get("incremental_update"):
         print("ℹ️  Se actualizó el índice existente (actualización incremental)")
     else:
-        print("ℹ️  Se creó un nuevo índice")
+        print(f"ℹ️  Se creó un nuevo índice ({result.get('rebuild_reason') or 'sin índice anterior'})")
 
 
 if __name__ == "__main__":
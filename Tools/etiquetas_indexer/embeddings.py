@@ -2,51 +2,39 @@
 # Cache y generación de embeddings (reutiliza lógica de docs_indexer)
 
 import os
-import json
-from typing import Dict, Any, Optional, List
+from typing import Any, Dict, Optional, List, Tuple
 
 import numpy as np
 
 from Tools.search_tickets import generate_openai_embedding
 from Tools.docs_indexer.utils import fingerprint_text, normalize_vec_1d
+from Tools.docs_indexer.batch_embeddings import embed_texts_batched
+from Tools.docs_indexer.shared_emb_store import SharedEmbeddingCache, shared_store_dir
 
 
 def _emb_cache_path(out_dir: str, universe: str) -> str:
-    """Retorna la ruta del archivo de cache de embeddings para un universo."""
+    """Retorna la ruta del cache JSONL anterior (solo se lee para migrarlo al store binario)."""
     return os.path.join(out_dir, f"{universe}_emb_cache.jsonl")
 
 
-def load_emb_cache(out_dir: str, universe: str) -> Dict[str, Dict[str, Any]]:
-    """
-    Carga el cache de embeddings desde un archivo JSONL.
-    Returns: dict con clave cache_key = chunk_id + "|" + text_fp
-    Valor: {"embedding": [...], "dim": int}
-    """
-    p = _emb_cache_path(out_dir, universe)
-    if not os.path.exists(p):
-        return {}
-    cache: Dict[str, Dict[str, Any]] = {}
-    try:
-        with open(p, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                row = json.loads(line)
-                ck = row.get("cache_key")
-                if ck:
-                    cache[ck] = row
-    except Exception:
-        return {}
-    return cache
+def _emb_store_dir(out_dir: str, universe: str) -> str:
+    """Retorna el directorio del store binario por universo anterior (solo se lee para migrarlo)."""
+    return os.path.join(out_dir, f"{universe}_emb_store")
 
 
-def append_emb_cache(out_dir: str, universe: str, cache_key: str, embedding: List[float]) -> None:
-    """Añade una entrada al cache de embeddings."""
-    p = _emb_cache_path(out_dir, universe)
-    row = {"cache_key": cache_key, "embedding": embedding, "dim": len(embedding)}
-    with open(p, "a", encoding="utf-8") as f:
-        f.write(json.dumps(row, ensure_ascii=False) + "\n")
+def load_emb_cache(out_dir: str, universe: str) -> SharedEmbeddingCache:
+    """
+    Abre la vista del universo sobre el store global de embeddings
+    (Tools/docs_indexer/shared_emb_store.py), direccionado por (modelo, text_fp):
+    el mismo texto se embebe una sola vez aunque aparezca en varios universos o cambie su chunk_id.
+    Los caches anteriores del universo (store binario y JSONL) se migran una sola vez.
+    """
+    return SharedEmbeddingCache(
+        out_dir,
+        universe,
+        legacy_store_dir=_emb_store_dir(out_dir, universe),
+        legacy_jsonl=_emb_cache_path(out_dir, universe),
+    )
 
 
 def embedding_to_1d_list(x: Any) -> Optional[List[float]]:
@@ -70,19 +58,17 @@ def embed_text_cached(
     chunk_id: str,
     universe: str,
     out_dir: str,
-    cache: Dict[str, Dict[str, Any]]
+    cache: SharedEmbeddingCache
 ) -> Optional[np.ndarray]:
     """
     Genera embedding para un texto con cache.
     Returns: vector normalizado 1D float32.
     """
     text_fp = fingerprint_text(text)
-    cache_key = f"{chunk_id}|{text_fp}"
 
-    if cache_key in cache:
-        emb_list = cache[cache_key].get("embedding")
-        if isinstance(emb_list, list) and emb_list:
-            return normalize_vec_1d(np.array(emb_list, dtype=np.float32))
+    cached = cache.get(text_fp)
+    if cached is not None:
+        return normalize_vec_1d(cached)
 
     vec = generate_openai_embedding(
         text,
@@ -93,12 +79,59 @@ def embed_text_cached(
     if emb_list is None:
         return None
 
-    append_emb_cache(out_dir, universe, cache_key, emb_list)
-    cache[cache_key] = {"cache_key": cache_key, "embedding": emb_list, "dim": len(emb_list)}
+    cache.put(text_fp, np.array(emb_list, dtype=np.float32))
     return normalize_vec_1d(np.array(emb_list, dtype=np.float32))
 
 
-def get_emb_cache_path(out_dir: str, universe: str) -> str:
-    """Obtiene la ruta del archivo de cache de embeddings (función pública)."""
-    return _emb_cache_path(out_dir, universe)
+def embed_texts_cached(
+    items: List[Tuple[str, str]],
+    universe: str,
+    out_dir: str,
+    cache: SharedEmbeddingCache
+) -> List[Optional[np.ndarray]]:
+    """
+    Versión por lotes de embed_text_cached para una lista de (chunk_id, text).
+    Los aciertos salen del cache; los faltantes se embeben con llamadas multi-input
+    (embed_texts_batched) y se agregan al store conforme termina cada lote.
+    Textos repetidos dentro de la misma corrida se embeben una sola vez.
+    Returns: lista alineada con items (vector normalizado 1D float32 o None).
+    """
+    results: List[Optional[np.ndarray]] = [None] * len(items)
+    # text_fp faltante → posiciones de items que lo usan
+    misses: Dict[str, List[int]] = {}
+    miss_texts: List[str] = []
+
+    for pos, (chunk_id, text) in enumerate(items):
+        text_fp = fingerprint_text(text)
+        if text_fp in misses:
+            misses[text_fp].append(pos)
+            continue
+        cached = cache.get(text_fp)
+        if cached is not None:
+            results[pos] = normalize_vec_1d(cached)
+        else:
+            misses[text_fp] = [pos]
+            miss_texts.append(text)
+
+    if not misses:
+        return results
+
+    miss_fps = list(misses)
+
+    def _persist(done: List[Tuple[int, np.ndarray]]) -> None:
+        cache.put_many([(miss_fps[miss_idx], vec) for miss_idx, vec in done])
+
+    vecs = embed_texts_batched(
+        miss_texts,
+        conversation_id=f"index_etiquetas:{universe}",
+        on_batch=_persist,
+    )
+    for text_fp, vec in zip(miss_fps, vecs):
+        for pos in misses[text_fp]:
+            results[pos] = vec
+    return results
 
+
+def get_emb_cache_path(out_dir: str, universe: str) -> str:
+    """Obtiene la ruta del store global de embeddings (función pública)."""
+    return shared_store_dir(out_dir)
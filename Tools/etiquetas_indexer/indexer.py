@@ -2,12 +2,9 @@
 # Indexador de etiquetas: construye FAISS index + metadata JSONL desde Excel
 
 import os
-import json
+import time
 import pandas as pd
-from typing import List, Dict, Any, Optional
-
-import numpy as np
-import faiss
+from typing import List, Dict, Any
 
 from .config import (
     UNIVERSE_NAME,
@@ -23,57 +20,111 @@ from .config import (
     EXCEL_HEADER_ROW,
 )
 from .models import EtiquetaChunk
+from Tools.docs_indexer.excel_columns import str_values, int_values
+from Tools.docs_indexer.table_sync import keyed_meta_rows, sync_table_index
+from Tools.docs_indexer.utils import fingerprint_text
 from .embeddings import (
     load_emb_cache,
-    embed_text_cached,
+    embed_texts_cached,
     get_emb_cache_path
 )
 
 
-def _build_text_for_embedding(row: pd.Series) -> Optional[str]:
+def _build_chunks(df: pd.DataFrame, universe: str) -> List[EtiquetaChunk]:
     """
-    Construye el texto combinado para embedding.
-    Formato: "[Etiqueta] - Descripcion | Desc Tabla: [Desc Tabla]"
+    Convierte las filas del Excel en EtiquetaChunk con operaciones por columna (sin iterrows).
+    Texto para embedding: "[Etiqueta] - Descripcion | Desc Tabla: [Desc Tabla]";
+    las filas sin etiqueta ni descripción se omiten.
     """
-    etiqueta = str(row[COL_ETIQUETA]).strip() if pd.notna(row[COL_ETIQUETA]) else ""
-    descripcion = str(row[COL_DESCRIPCION]).strip() if pd.notna(row[COL_DESCRIPCION]) else ""
-    desc_tabla = str(row[COL_DESC_TABLA]).strip() if pd.notna(row[COL_DESC_TABLA]) else ""
-    
-    # Validar que al menos tengamos etiqueta o descripción
-    if not etiqueta and not descripcion:
-        return None
-    
-    # Construir texto combinado
-    parts = []
-    if etiqueta:
-        parts.append(etiqueta)
-    if descripcion:
-        parts.append(descripcion)
-    
-    text = " - ".join(parts) if len(parts) > 1 else parts[0]
-    
+    etiqueta = str_values(df, COL_ETIQUETA)
+    descripcion = str_values(df, COL_DESCRIPCION)
+    desc_tabla = str_values(df, COL_DESC_TABLA)
+
+    e = etiqueta.fillna("")
+    d = descripcion.fillna("")
+    dt = desc_tabla.fillna("")
+    has_e = e != ""
+    has_d = d != ""
+
+    # "Etiqueta - Descripcion" si están ambas; si falta una, la otra sola
+    text = (e + " - " + d).where(has_e & has_d, e + d)
     # Agregar Desc Tabla si existe
-    if desc_tabla:
-        text += f" | Desc Tabla: {desc_tabla}"
-    
-    return text
+    text = text + (" | Desc Tabla: " + dt).where(dt != "", "")
+    keep = (has_e | has_d).to_numpy(dtype=bool)
+
+    numero = int_values(df, COL_NUMERO)
+    longitud = int_values(df, COL_LONGITUD)
+    cliente = str_values(df, COL_CLIENTE)
+    tipo_dato = str_values(df, COL_TIPO_DATO)
+    query = str_values(df, COL_QUERY)
+
+    # Solo la construcción de los EtiquetaChunk recorre filas (sobre listas nativas, no Series)
+    chunks: List[EtiquetaChunk] = []
+    for keep_row, idx, num, etq, desc, dtab, cli, tipo, lon, q, txt in zip(
+        keep.tolist(), df.index.tolist(), numero, etiqueta.tolist(), descripcion.tolist(),
+        desc_tabla.tolist(), cliente.tolist(), tipo_dato.tolist(), longitud, query.tolist(),
+        text.tolist(),
+    ):
+        if not keep_row:
+            continue  # Saltar filas sin texto válido
+        chunks.append(EtiquetaChunk(
+            chunk_id=f"etiqueta_{num}" if num else f"etiqueta_row_{idx}",
+            universe=universe,
+            numero=num,
+            etiqueta=etq,
+            descripcion=desc,
+            desc_tabla=dtab,
+            cliente_que_la_tiene=cli,
+            tipo_dato=tipo,
+            longitud=lon,
+            query=q,
+            text=txt,
+        ))
+    return chunks
+
+
+def _row_key(c: EtiquetaChunk) -> str:
+    """Llave estable de la fila: número de etiqueta (o el texto si la fila no tiene número)."""
+    if c.numero is None:
+        return f"text:{fingerprint_text(c.text)}"
+    return str(c.numero)
+
+
+def _meta_row(c: EtiquetaChunk) -> Dict[str, Any]:
+    return {
+        "chunk_id": c.chunk_id,
+        "universe": c.universe,
+        "numero": c.numero,
+        "etiqueta": c.etiqueta,
+        "descripcion": c.descripcion,
+        "desc_tabla": c.desc_tabla,
+        "cliente_que_la_tiene": c.cliente_que_la_tiene,
+        "tipo_dato": c.tipo_dato,
+        "longitud": c.longitud,
+        "query": c.query,
+        "text": c.text,  # Texto usado para embedding (para referencia)
+    }
 
 
 def build_etiquetas_index(
     excel_path: str = DEFAULT_EXCEL_PATH,
     out_dir: str = "Data",
     universe: str = UNIVERSE_NAME,
+    full_rebuild: bool = False,
 ) -> Dict[str, Any]:
     """
-    Construye índice FAISS (IndexFlatIP) + metadatos JSONL para etiquetas desde Excel.
+    Construye o actualiza el índice FAISS (IndexIDMap2 sobre IndexFlatIP) + metadatos JSONL
+    para etiquetas desde Excel. Solo se embeben y re-escriben las filas agregadas o cambiadas
+    respecto a la corrida anterior; las que ya no están en el Excel se eliminan del índice.
     
     Args:
         excel_path: Ruta al archivo Excel con las etiquetas
         out_dir: Directorio donde guardar el índice y metadata
         universe: Nombre del universo (default: "etiquetas")
+        full_rebuild: Ignora el índice anterior y lo reconstruye con todas las filas
     
     Returns:
-        Dict con estadísticas del proceso
+        Dict con estadísticas del proceso (rows_added / rows_changed / rows_removed / rows_unchanged)
     """
     os.makedirs(out_dir, exist_ok=True)
     
@@ -84,6 +135,7 @@ def build_etiquetas_index(
     emb_cache = load_emb_cache(out_dir, universe)
     
     # 1) Leer Excel
+    t0 = time.perf_counter()
     try:
         # Leer saltando las primeras filas vacías y usando la fila 7 como header
         df = pd.read_excel(excel_path, header=EXCEL_HEADER_ROW)
@@ -101,124 +153,50 @@ def build_etiquetas_index(
     if missing_cols:
         return {"ok": False, "error": f"Faltan columnas en Excel: {missing_cols}"}
     
-    # 2) Crear chunks (una etiqueta = un chunk)
-    chunks: List[EtiquetaChunk] = []
+    parse_s = time.perf_counter() - t0
     
-    for idx, row in df.iterrows():
-        # Construir texto para embedding
-        text = _build_text_for_embedding(row)
-        if not text:
-            continue  # Saltar filas sin texto válido
-        
-        # Extraer valores
-        numero = None
-        if pd.notna(row[COL_NUMERO]):
-            try:
-                numero = int(float(row[COL_NUMERO]))
-            except (ValueError, TypeError):
-                pass
-        
-        chunk_id = f"etiqueta_{numero}" if numero else f"etiqueta_row_{idx}"
-        
-        chunks.append(EtiquetaChunk(
-            chunk_id=chunk_id,
-            universe=universe,
-            numero=numero,
-            etiqueta=str(row[COL_ETIQUETA]).strip() if pd.notna(row[COL_ETIQUETA]) else None,
-            descripcion=str(row[COL_DESCRIPCION]).strip() if pd.notna(row[COL_DESCRIPCION]) else None,
-            desc_tabla=str(row[COL_DESC_TABLA]).strip() if pd.notna(row[COL_DESC_TABLA]) else None,
-            cliente_que_la_tiene=str(row[COL_CLIENTE]).strip() if pd.notna(row[COL_CLIENTE]) else None,
-            tipo_dato=str(row[COL_TIPO_DATO]).strip() if pd.notna(row[COL_TIPO_DATO]) else None,
-            longitud=int(float(row[COL_LONGITUD])) if pd.notna(row[COL_LONGITUD]) else None,
-            query=str(row[COL_QUERY]).strip() if pd.notna(row[COL_QUERY]) else None,
-            text=text,
-        ))
+    # 2) Crear chunks (una etiqueta = un chunk)
+    chunks = _build_chunks(df, universe)
     
     if not chunks:
         return {"ok": False, "error": "No se generaron chunks válidos del Excel"}
     
-    # 3) Embeddings por chunk (con cache)
-    vectors: List[np.ndarray] = []
-    meta_rows: List[EtiquetaChunk] = []
-    
-    for c in chunks:
-        v = embed_text_cached(
-            text=c.text,
-            chunk_id=c.chunk_id,
-            universe=universe,
-            out_dir=out_dir,
-            cache=emb_cache
-        )
-        if v is None:
-            continue
-        vectors.append(v.astype(np.float32))
-        meta_rows.append(c)
-    
-    if not vectors:
-        return {"ok": False, "error": "No se generaron embeddings (revisa OPENAI key/config)"}
-    
-    mat = np.vstack(vectors).astype(np.float32)
-    dim = mat.shape[1]
-    
-    # 4) Índice FAISS (IP sobre vectores normalizados ~= cosine)
-    idx_path = os.path.join(out_dir, f"{universe}.index")
-    meta_path = os.path.join(out_dir, f"{universe}_meta.jsonl")
-    
-    # Cargar índice existente si existe (para actualización incremental)
-    existing_index = None
-    if os.path.exists(idx_path):
-        try:
-            existing_index = faiss.read_index(idx_path)
-            if existing_index.d != dim:
-                # Dimensiones no coinciden, crear nuevo índice
-                existing_index = None
-        except Exception:
-            existing_index = None
-    
-    if existing_index is not None:
-        # Agregar nuevos vectores al índice existente
-        index = existing_index
-        index.add(mat)
-    else:
-        # Crear nuevo índice
-        index = faiss.IndexFlatIP(dim)
-        index.add(mat)
-    
-    # 5) Persistir
-    faiss.write_index(index, idx_path)
-    
-    # Guardar metadatos: append si hay existentes, write si es nuevo
-    mode = "a" if existing_index is not None and os.path.exists(meta_path) else "w"
-    with open(meta_path, mode, encoding="utf-8") as f:
-        for c in meta_rows:
-            f.write(json.dumps({
-                "chunk_id": c.chunk_id,
-                "universe": c.universe,
-                "numero": c.numero,
-                "etiqueta": c.etiqueta,
-                "descripcion": c.descripcion,
-                "desc_tabla": c.desc_tabla,
-                "cliente_que_la_tiene": c.cliente_que_la_tiene,
-                "tipo_dato": c.tipo_dato,
-                "longitud": c.longitud,
-                "query": c.query,
-                "text": c.text,  # Texto usado para embedding (para referencia)
-            }, ensure_ascii=False) + "\n")
-    
+    # 3) Diff por fila contra la metadata anterior (llave Numero + fingerprint del texto)
+    #    Solo las agregadas/cambiadas se embeben (con cache; faltantes en lotes multi-input)
+    meta_rows = keyed_meta_rows(
+        universe,
+        [_meta_row(c) for c in chunks],
+        [_row_key(c) for c in chunks],
+    )
+    chunk_s = time.perf_counter() - t0 - parse_s
+    sync = sync_table_index(
+        universe,
+        out_dir,
+        meta_rows,
+        embed_fn=lambda items: embed_texts_cached(items, universe=universe, out_dir=out_dir, cache=emb_cache),
+        full_rebuild=full_rebuild,
+    )
+    if sync.get("index") is None:
+        return {**sync, "ok": False, "excel_path": excel_path}
+
+    index = sync.pop("index")
+    rows = sync.pop("rows")
+
     # Estadísticas
-    unique_numeros = len(set([c.numero for c in meta_rows if c.numero is not None]))
+    unique_numeros = len(set([r["numero"] for r in rows if r.get("numero") is not None]))
     
+    # Referencias del universo en el store global de embeddings (para GC / reporte de dedup)
+    emb_refs = emb_cache.update_refs(sync["meta_path"])
+
     return {
-        "ok": True,
+        **sync,
         "universe": universe,
         "excel_path": excel_path,
-        "chunks_total": len(meta_rows),
-        "chunks_indexed": index.ntotal if index else len(meta_rows),
-        "dim": dim,
-        "index_path": idx_path,
-        "meta_path": meta_path,
+        "chunks_total": len(rows),
+        "chunks_indexed": index.ntotal,
+        "dim": index.d,
+        "stage_seconds": {"parse": round(parse_s, 3), "chunk": round(chunk_s, 3), **sync["stage_seconds"]},
         "emb_cache_path": get_emb_cache_path(out_dir, universe),
+        "emb_cache": {**emb_cache.run_stats(), "unique_texts": len(emb_refs)},
         "unique_etiquetas": unique_numeros,
-        "incremental_update": existing_index is not None,
     }
-
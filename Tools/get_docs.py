@@ -4,11 +4,22 @@ Complementa a search_docs.py:
 - search_docs.py: Buscar documentos (búsqueda semántica con FAISS)
 - get_docs.py: Obtener contexto completo de documentos (chunks con texto completo)
 """
-import os
-import json
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
-from Tools.search_docs import _load_meta, _load_index_and_meta
+from Tools.index_registry import get_index_handle
+
+
+def _chunks_by_doc_and_index(meta: Tuple[Dict[str, Any], ...]) -> Dict[str, Dict[int, Dict[str, Any]]]:
+    """Construye {doc_id: {chunk_index: chunk}} para expandir chunks adyacentes."""
+    chunks_by_doc_and_index = {}
+    for m in meta:
+        doc_id_key = m.get("doc_id")
+        chunk_idx = m.get("chunk_index")
+        if doc_id_key and chunk_idx is not None:
+            if doc_id_key not in chunks_by_doc_and_index:
+                chunks_by_doc_and_index[doc_id_key] = {}
+            chunks_by_doc_and_index[doc_id_key][chunk_idx] = m
+    return chunks_by_doc_and_index
 
 
 def get_doc_context(
@@ -52,23 +63,15 @@ def get_doc_context(
             ]
         }
     """
-    _, meta = _load_index_and_meta(universe)
+    handle = get_index_handle(universe)
 
     selected = []
     selected_ids = set()
 
     if chunk_ids:
-        # Crear índice de chunks por doc_id y chunk_index para búsqueda rápida
-        chunks_by_id = {m.get("chunk_id"): m for m in meta}
-        chunks_by_doc_and_index = {}  # {doc_id: {chunk_index: chunk}}
-        
-        for m in meta:
-            doc_id_key = m.get("doc_id")
-            chunk_idx = m.get("chunk_index")
-            if doc_id_key and chunk_idx is not None:
-                if doc_id_key not in chunks_by_doc_and_index:
-                    chunks_by_doc_and_index[doc_id_key] = {}
-                chunks_by_doc_and_index[doc_id_key][chunk_idx] = m
+        # Índices de chunks por chunk_id y por doc_id/chunk_index (se construyen una sola vez por índice cargado)
+        chunks_by_id = handle.index_by("chunk_id")
+        chunks_by_doc_and_index = handle.memo("chunks_by_doc_and_index", _chunks_by_doc_and_index)
         
         # ESPECIAL: Para user_guides, devolver TODO el documento completo
         if universe == "user_guides":
@@ -138,12 +141,11 @@ def get_doc_context(
             selected.sort(key=lambda x: (x.get("doc_id", ""), x.get("chunk_index", 0)))
 
     elif doc_id:
-        for m in meta:
-            if m.get("doc_id") == doc_id:
-                selected.append(m)
-                # Si max_chunks es muy grande (>= 9999), obtener todos los chunks
-                if max_chunks < 9999 and len(selected) >= max_chunks:
-                    break
+        for m in handle.group_by("doc_id").get(doc_id, []):
+            selected.append(m)
+            # Si max_chunks es muy grande (>= 9999), obtener todos los chunks
+            if max_chunks < 9999 and len(selected) >= max_chunks:
+                break
     else:
         return {"ok": False, "error": "provide chunk_ids or doc_id"}
 
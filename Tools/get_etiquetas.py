@@ -4,11 +4,9 @@ Complementa a search_etiquetas.py:
 - search_etiquetas.py: Buscar etiquetas (búsqueda semántica con FAISS)
 - get_etiquetas.py: Obtener información completa de etiquetas específicas
 """
-import os
-import json
 from typing import List, Dict, Any, Optional
 
-from Tools.search_etiquetas import _load_meta, _load_index_and_meta
+from Tools.index_registry import get_index_handle
 
 
 def get_etiqueta_context(
@@ -48,20 +46,16 @@ def get_etiqueta_context(
         }
     """
     try:
-        _, meta = _load_index_and_meta(universe)
+        handle = get_index_handle(universe, base_name=universe)
     except FileNotFoundError as e:
         return {"ok": False, "error": str(e)}
 
     selected = []
     selected_ids = set()
 
-    # Crear índices para búsqueda rápida
-    chunks_by_id = {m.get("chunk_id"): m for m in meta}
-    chunks_by_numero = {}
-    for m in meta:
-        numero = m.get("numero")
-        if numero is not None:
-            chunks_by_numero[numero] = m
+    # Índices para búsqueda rápida (se construyen una sola vez por índice cargado)
+    chunks_by_id = handle.index_by("chunk_id")
+    chunks_by_numero = handle.index_by("numero")
 
     # Buscar por chunk_ids
     if chunk_ids:
@@ -4,11 +4,9 @@ Complementa a search_quotes.py:
 - search_quotes.py: Buscar cotizaciones (búsqueda semántica con FAISS)
 - get_quotes.py: Obtener información completa de cotizaciones específicas
 """
-import os
-import json
 from typing import List, Dict, Any, Optional
 
-from Tools.search_quotes import _load_meta, _load_index_and_meta
+from Tools.index_registry import get_index_handle
 
 
 def get_quotes_context(
@@ -48,26 +46,17 @@ def get_quotes_context(
         }
     """
     try:
-        _, meta = _load_index_and_meta(universe)
+        handle = get_index_handle(universe, base_name=universe)
     except FileNotFoundError as e:
         return {"ok": False, "error": str(e)}
 
     selected = []
     selected_ids = set()
 
-    # Crear índices para búsqueda rápida
-    chunks_by_id = {m.get("chunk_id"): m for m in meta}
-    chunks_by_issue_id = {}
-    chunks_by_quote_id = {}
-    for m in meta:
-        issue_id = m.get("i_issue_id")
-        quote_id = m.get("i_quote_id")
-        if issue_id is not None:
-            chunks_by_issue_id[issue_id] = m
-        if quote_id is not None:
-            if quote_id not in chunks_by_quote_id:
-                chunks_by_quote_id[quote_id] = []
-            chunks_by_quote_id[quote_id].append(m)
+    # Índices para búsqueda rápida (se construyen una sola vez por índice cargado)
+    chunks_by_id = handle.index_by("chunk_id")
+    chunks_by_issue_id = handle.index_by("i_issue_id")
+    chunks_by_quote_id = handle.group_by("i_quote_id")
 
     # Buscar por chunk_ids
     if chunk_ids:
@@ -3,18 +3,31 @@ Obtener tickets - Funciones para obtener datos completos de tickets y comentario
 Complementa a search_tickets.py:
 - search_tickets.py: Buscar tickets (keywords, semantic, hybrid)
 - get_tickets.py: Obtener detalles de tickets específicos (get_ticket_data + get_ticket_comments)
+
+Las llamadas a la API pasan por el cliente compartido (Tools/zell_client.py). get_ticket_full
+y get_tickets_full lanzan datos (5001) y comentarios (5002) a la vez en lugar de uno tras otro.
+Las respuestas válidas se guardan en el cache de tickets (Tools/ticket_cache.py).
 """
 import os
 import json
 import logging
 import httpx
-from typing import Dict, Any
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+from Tools.ticket_cache import get_ticket_cache, ACTION_TICKET_DATA, ACTION_TICKET_COMMENTS, STALE
+from Tools.zell_client import zell_get, zell_submit, zell_headers, zell_url, ZellCircuitOpenError
 from utils.contextManager.context_handler import get_interaction_id
 from utils.logs import log_zell_api_call
 
 logger = logging.getLogger(__name__)
 
+# Máximo de tickets en vuelo a la vez en get_tickets_full (cada ticket = 2 requests con comentarios)
+TICKET_BATCH_MAX_CONCURRENCY = int(os.getenv("TICKET_BATCH_MAX_CONCURRENCY", "5"))
+
+
+def _ticket_query_string(ticket_number: str) -> str:
+    return f"source=1&sourceid={ticket_number}"
+
 
 def get_ticket_data(ticket_number: str, conversation_id: str) -> Dict[str, Any]:
     """
@@ -27,19 +40,26 @@ def get_ticket_data(ticket_number: str, conversation_id: str) -> Dict[str, Any]:
     Returns:
         Dict con los datos del ticket o {"error": "mensaje"} si falla
     """
-    api_url = f"https://tickets.zell.mx/apilink/info?source=1&sourceid={ticket_number}"
-    api_headers = {
-        "x-api-key": os.getenv("ZELL_API_KEY", ""),
-        "user": os.getenv("ZELL_USER", ""),
-        "password": os.getenv("ZELL_PASSWORD", ""),
-        "action": "5001"
-    }
+    cached = _cached(ACTION_TICKET_DATA, ticket_number, conversation_id)
+    if cached is not None:
+        return cached
+    query_string = _ticket_query_string(ticket_number)
+    return _load_and_cache(ACTION_TICKET_DATA, ticket_number, conversation_id, lambda: zell_get(ACTION_TICKET_DATA, query_string))
+
+
+def _ticket_data_from_response(
+    ticket_number: str,
+    conversation_id: str,
+    fetch: Callable[[], httpx.Response],
+) -> Dict[str, Any]:
+    """Espera la respuesta de la acción 5001 (fetch) y la normaliza; errores → {"error": ...}."""
+    api_url = zell_url(_ticket_query_string(ticket_number))
+    api_headers = zell_headers("5001")
     interaction_id = get_interaction_id(conversation_id)
     sanitized_headers = {k: v for k, v in api_headers.items() if k.lower() != "password"}
 
     try:
-        with httpx.Client(timeout=30) as client:
-            response = client.get(api_url, headers=api_headers)
+        response = fetch()
 
         raw_response_text = response.text
         response.raise_for_status()
@@ -84,6 +104,9 @@ def get_ticket_data(ticket_number: str, conversation_id: str) -> Dict[str, Any]:
         error_msg = f"❌ HTTP Error al obtener datos del ticket: {str(e)}"
         logger.error(error_msg)
         return {"error": error_msg}
+    except ZellCircuitOpenError as e:
+        logger.error(f"🛑 {e}")
+        return {"error": str(e)}
     except Exception as e:
         error_msg = f"Error inesperado al obtener ticket: {str(e)}"
         logger.error(error_msg)
@@ -101,19 +124,26 @@ def get_ticket_comments(ticket_number: str, conversation_id: str) -> Dict[str, A
     Returns:
         Dict con los comentarios del ticket o {"error": "mensaje"} si falla
     """
-    api_url = f"https://tickets.zell.mx/apilink/info?source=1&sourceid={ticket_number}"
-    api_headers = {
-        "x-api-key": os.getenv("ZELL_API_KEY", ""),
-        "user": os.getenv("ZELL_USER", ""),
-        "password": os.getenv("ZELL_PASSWORD", ""),
-        "action": "5002"
-    }
+    cached = _cached(ACTION_TICKET_COMMENTS, ticket_number, conversation_id)
+    if cached is not None:
+        return cached
+    query_string = _ticket_query_string(ticket_number)
+    return _load_and_cache(ACTION_TICKET_COMMENTS, ticket_number, conversation_id, lambda: zell_get(ACTION_TICKET_COMMENTS, query_string))
+
+
+def _ticket_comments_from_response(
+    ticket_number: str,
+    conversation_id: str,
+    fetch: Callable[[], httpx.Response],
+) -> Dict[str, Any]:
+    """Espera la respuesta de la acción 5002 (fetch) y la valida; errores → {"error": ...}."""
+    api_url = zell_url(_ticket_query_string(ticket_number))
+    api_headers = zell_headers("5002")
     interaction_id = get_interaction_id(conversation_id)
     sanitized_headers = {k: v for k, v in api_headers.items() if k.lower() not in ["password"]}
 
     try:
-        with httpx.Client(timeout=30) as client:
-            response = client.get(api_url, headers=api_headers)
+        response = fetch()
 
         raw_response_text = response.text
         response.raise_for_status()
@@ -150,8 +180,108 @@ def get_ticket_comments(ticket_number: str, conversation_id: str) -> Dict[str, A
         error_msg = f"❌ HTTP Error al obtener comentarios del ticket: {str(e)}"
         logger.error(error_msg)
         return {"error": error_msg}
+    except ZellCircuitOpenError as e:
+        logger.error(f"🛑 {e}")
+        return {"error": str(e)}
     except Exception as e:
         error_msg = f"Error inesperado al obtener comentarios: {str(e)}"
         logger.error(error_msg)
         return {"error": error_msg}
 
+
+_RESPONSE_HANDLERS = {
+    ACTION_TICKET_DATA: _ticket_data_from_response,
+    ACTION_TICKET_COMMENTS: _ticket_comments_from_response,
+}
+
+
+def _load_and_cache(
+    action: str,
+    ticket_number: str,
+    conversation_id: str,
+    fetch: Callable[[], httpx.Response],
+) -> Any:
+    """Procesa la respuesta de la API y, si no es un error, la guarda en el cache de tickets."""
+    result = _RESPONSE_HANDLERS[action](ticket_number, conversation_id, fetch)
+    if not (isinstance(result, dict) and "error" in result):
+        get_ticket_cache().put(action, ticket_number, result)
+    return result
+
+
+def _cached(action: str, ticket_number: str, conversation_id: str) -> Optional[Any]:
+    """
+    Valor cacheado (fresco o stale) o None si hay que ir a la API.
+    Si está stale se entrega igual y se revalida en segundo plano.
+    """
+    cache = get_ticket_cache()
+    value, state = cache.get(action, ticket_number)
+    if state == STALE:
+        query_string = _ticket_query_string(ticket_number)
+        cache.refresh_in_background(
+            action,
+            ticket_number,
+            lambda: _load_and_cache(action, ticket_number, conversation_id, lambda: zell_get(action, query_string)),
+        )
+    if value is not None:
+        logger.debug(f"[TicketCache] Hit ({state}) ticket {ticket_number} acción {action}")
+    return value
+
+
+def get_ticket_full(
+    ticket_number: str,
+    conversation_id: str,
+    include_comments: bool = True,
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    Obtiene datos y comentarios de un ticket con ambas llamadas en vuelo a la vez.
+
+    Returns:
+        (ticket_data, comments) con el mismo formato que get_ticket_data / get_ticket_comments;
+        comments es None si include_comments=False.
+    """
+    return get_tickets_full([ticket_number], conversation_id, include_comments=include_comments)[str(ticket_number)]
+
+
+def get_tickets_full(
+    ticket_numbers: List[str],
+    conversation_id: str,
+    include_comments: bool = True,
+    max_concurrency: int = TICKET_BATCH_MAX_CONCURRENCY,
+) -> Dict[str, Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+    """
+    Obtiene varios tickets (datos + comentarios) en paralelo, con máximo max_concurrency
+    tickets en vuelo a la vez.
+
+    Returns:
+        Dict ticket_number → (ticket_data, comments), en el orden de ticket_numbers.
+        Un ticket que falla trae {"error": ...} en su posición sin afectar a los demás.
+    """
+    numbers = list(dict.fromkeys(str(t) for t in ticket_numbers))
+    results: Dict[str, Tuple[Dict[str, Any], Optional[Dict[str, Any]]]] = {}
+    window = max(1, max_concurrency)
+
+    actions = [ACTION_TICKET_DATA] + ([ACTION_TICKET_COMMENTS] if include_comments else [])
+
+    for start in range(0, len(numbers), window):
+        wave = numbers[start:start + window]
+        # Primero el cache; solo lo que falta va a la API (todo en vuelo a la vez)
+        values: Dict[Tuple[str, str], Any] = {}
+        futures = {}
+        for number in wave:
+            query_string = _ticket_query_string(number)
+            for action in actions:
+                cached = _cached(action, number, conversation_id)
+                if cached is not None:
+                    values[(number, action)] = cached
+                else:
+                    futures[(number, action)] = zell_submit(action, query_string)
+
+        for (number, action), future in futures.items():
+            values[(number, action)] = _load_and_cache(action, number, conversation_id, future.result)
+
+        for number in wave:
+            ticket_data = values[(number, ACTION_TICKET_DATA)]
+            comments = values.get((number, ACTION_TICKET_COMMENTS)) if include_comments else None
+            results[number] = (ticket_data, comments)
+
+    return results
@@ -37,6 +37,16 @@ def main():
         action="store_true",
         help="Solo procesar archivos en el nivel superior (no subdirectorios)"
     )
+    ap.add_argument(
+        "--workers",
+        type=int,
+        help="Procesos para parsear guías (1 = secuencial)"
+    )
+    ap.add_argument(
+        "--full-rebuild",
+        action="store_true",
+        help="Ignora índice y caché de archivos existentes"
+    )
     
     args = ap.parse_args()
 
@@ -52,6 +62,8 @@ def main():
         catalog_path=args.catalog,
         max_files=args.max_files,
         top_level_only=args.top_level_only,
+        full_rebuild=args.full_rebuild,
+        parse_workers=args.workers,
     )
 
     if not result.get("ok"):
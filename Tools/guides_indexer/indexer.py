@@ -2,30 +2,186 @@
 # Indexador de guías de usuario: construye FAISS index + metadata JSONL para user_guides
 
 import os
-import json
-from typing import List, Dict, Any, Optional, Set
+import time
+from typing import List, Dict, Any, Optional, Tuple
 
 import numpy as np
-import faiss
-import tiktoken
 
 from .config import DEFAULT_CHUNK_TOKENS, DEFAULT_OVERLAP_TOKENS, SUPPORTED_EXTS
-from .utils import file_sha256, chunk_text_tokens
+from .utils import encode_texts, chunk_encoded_text
 from .models import GuideChunk
 from .catalog import load_guides_catalog, match_guide_to_catalog
 from .guide_parser import read_guide_document
 from .embeddings import (
     load_emb_cache,
-    embed_text_cached,
+    embed_texts_cached,
     get_emb_cache_path
 )
 from .file_cache import (
     load_file_cache,
     save_file_cache,
     get_unprocessed_files,
-    mark_file_processed,
     get_file_cache_path
 )
+from Tools.docs_indexer.parallel_parse import hash_files
+from Tools.docs_indexer.index_maintenance import source_key, load_index_state, verify_alignment
+from Tools.docs_indexer.pipeline import run_index_pipeline, DimensionChanged
+
+
+def _meta_row(c: GuideChunk) -> Dict[str, Any]:
+    """Fila de metadata JSONL de un chunk."""
+    return {
+        "chunk_id": c.chunk_id,
+        "universe": c.universe,
+        "doc_id": c.doc_id,
+        "title": c.title,
+        "source_path": c.source_path,
+        "sha256": c.sha256,
+        "chunk_index": c.chunk_index,
+        "section": c.section,
+        "step_number": c.step_number,
+        "step_label": c.step_label,
+        "token_start": c.token_start,
+        "token_end": c.token_end,
+        "text": c.text,
+
+        # Catalog metadata
+        "doc_number": c.doc_number,
+        "objetivo": c.objetivo,
+        "referencia_cliente_ticket": c.referencia_cliente_ticket,
+        "fecha_ultimo_cambio": c.fecha_ultimo_cambio,
+        "version": c.version,
+        "cambio_realizado": c.cambio_realizado,
+        "autores": c.autores,
+        "verifico": c.verifico,
+        "asignada_a": c.asignada_a,
+        "fecha_asignacion": c.fecha_asignacion,
+        "fecha_entregado": c.fecha_entregado,
+        "catalog_title": c.catalog_title,
+    }
+
+
+def _chunk_guide(
+    path: str,
+    sha: str,
+    universe: str,
+    encoding_name: str,
+    chunk_tokens: int,
+    overlap_tokens: int,
+    cat_item: Optional[Dict[str, Any]],
+    timings: Optional[Dict[str, float]] = None,
+) -> List[GuideChunk]:
+    """Lee una guía y la divide en chunks (se ejecuta en los workers de parallel_parse)."""
+    title = os.path.basename(path)
+    doc_id = sha[:12]  # estable por contenido
+    chunks: List[GuideChunk] = []
+
+    # Leer documento -> blocks
+    t0 = time.perf_counter()
+    plain_text, blocks, doc_meta = read_guide_document(path, universe=universe)
+    if timings is not None:
+        timings["parse"] = time.perf_counter() - t0
+    if not blocks:
+        return chunks
+
+    # Tokenizar (todos los bloques en un solo encode_batch) y crear chunks
+    block_texts = [(b.get("text") or "").strip() for b in blocks]
+    block_tokens = encode_texts(block_texts, encoding_name)
+    token_cursor = 0
+    chunk_idx = 0
+    
+    for b, b_text, b_toks in zip(blocks, block_texts, block_tokens):
+        if not b_text:
+            continue
+
+        section = b.get("section")
+        step_number = b.get("step_number")
+        block_kind = b.get("block_kind", "content")
+
+        # Dividir bloque largo en chunks de tokens
+        # Para pasos numerados, intentar mantener juntos si son pequeños
+        skip_chunking = False
+        if block_kind == "step" and step_number:
+            if len(b_toks) < 800:  # Pasos pequeños no fragmentar
+                skip_chunking = True
+        
+        if skip_chunking:
+            # Mantener el bloque como un solo chunk
+            sub_chunks = [(b_text, 0, len(b_toks))]
+        else:
+            sub_chunks = chunk_encoded_text(
+                b_toks,
+                encoding_name=encoding_name,
+                chunk_tokens=chunk_tokens,
+                overlap_tokens=overlap_tokens,
+            )
+
+        if not sub_chunks:
+            continue
+
+        for (chunk_txt, t0, t1) in sub_chunks:
+            token_start = token_cursor + t0
+            token_end = token_cursor + t1
+
+            cid = f"{doc_id}_{chunk_idx}"
+            chunk_idx += 1
+
+            # Extraer metadata del catálogo si existe
+            step_label = b.get("step_label")  # Nueva: etiqueta del paso (ej: "3.1")
+            chunks.append(GuideChunk(
+                chunk_id=cid,
+                universe=universe,
+                doc_id=doc_id,
+                title=doc_meta.get("title") or title,
+                source_path=path,
+                sha256=sha,
+                chunk_index=(chunk_idx - 1),
+                section=section,
+                step_number=step_number,
+                step_label=step_label,
+                token_start=token_start,
+                token_end=token_end,
+                text=chunk_txt,
+
+                # Catalog metadata (enriquecido desde Excel)
+                doc_number=cat_item.get("doc_number") if cat_item else doc_meta.get("doc_number"),
+                objetivo=cat_item.get("objetivo") if cat_item else None,
+                referencia_cliente_ticket=cat_item.get("referencia_cliente_ticket") if cat_item else None,
+                fecha_ultimo_cambio=cat_item.get("fecha_ultimo_cambio") if cat_item else None,
+                version=cat_item.get("version") if cat_item else None,
+                cambio_realizado=cat_item.get("cambio_realizado") if cat_item else None,
+                autores=cat_item.get("autores") if cat_item else None,
+                verifico=cat_item.get("verifico") if cat_item else None,
+                asignada_a=cat_item.get("asignada_a") if cat_item else None,
+                fecha_asignacion=cat_item.get("fecha_asignacion") if cat_item else None,
+                fecha_entregado=cat_item.get("fecha_entregado") if cat_item else None,
+                catalog_title=cat_item.get("nombre_completo") if cat_item else None,
+            ))
+
+        # Avanzar cursor por longitud completa de tokens del bloque
+        token_cursor += sub_chunks[-1][2]
+
+    return chunks
+
+
+def _parse_guide_task(task: Tuple[Any, ...]) -> Dict[str, Any]:
+    """
+    Tarea del pool de parseo: nunca lanza, una guía con error se reporta y no se marca procesada.
+    timings: segundos de lectura (parse) y de chunking/tokenización (chunk) en el worker.
+    """
+    path = task[0]
+    timings: Dict[str, float] = {}
+    t0 = time.perf_counter()
+    try:
+        chunks = _chunk_guide(*task, timings=timings)
+    except Exception as e:
+        return {"path": path, "error": f"{type(e).__name__}: {e}"}
+    parse_s = timings.get("parse", 0.0)
+    return {
+        "path": path,
+        "chunks": chunks,
+        "timings": {"parse": parse_s, "chunk": time.perf_counter() - t0 - parse_s},
+    }
 
 
 def build_guides_index(
@@ -38,10 +194,15 @@ def build_guides_index(
     top_level_only: bool = False,
     max_files: Optional[int] = None,
     catalog_path: Optional[str] = "Data/guides_catalog.json",
+    full_rebuild: bool = False,
+    parse_workers: Optional[int] = None,
 ) -> Dict[str, Any]:
     """
-    Construye índice FAISS (IndexFlatIP) + metadatos JSONL para guías de usuario.
+    Construye índice FAISS (IndexIDMap2 sobre IndexFlatIP) + metadatos JSONL para guías de usuario.
     Soporta: .docx
+    Incremental: los chunks de guías modificadas o eliminadas se quitan del índice (remove_ids).
+    full_rebuild=True ignora índice y caché de archivos existentes.
+    parse_workers: procesos para parsear/chunkear (default INDEXER_PARSE_WORKERS / núcleos).
     """
     os.makedirs(out_dir, exist_ok=True)
     catalog = load_guides_catalog(catalog_path)
@@ -53,6 +214,7 @@ def build_guides_index(
     file_cache = load_file_cache(out_dir, universe)
 
     # 1) Descubrir archivos
+    t_discover = time.perf_counter()
     files: List[str] = []
     if top_level_only:
         for fn in os.listdir(input_dir):
@@ -66,17 +228,38 @@ def build_guides_index(
                     files.append(os.path.join(root, fn))
 
     files.sort()
+    discover_s = time.perf_counter() - t_discover
     if max_files is not None:
         files = files[:max_files]
 
     if not files:
         return {"ok": False, "error": f"No encontré archivos {SUPPORTED_EXTS} en {input_dir}"}
     
+    idx_path = os.path.join(out_dir, f"{universe}.index")
+    meta_path = os.path.join(out_dir, f"{universe}_meta.jsonl")
+
+    # Archivos que ya no están (eliminados / fuera de input_dir): se purgan del caché y del índice.
+    # Con max_files solo cuentan los que ya no existen en disco.
+    current_sources = {source_key(p) for p in files}
+    removed_sources = [
+        k for k in file_cache
+        if k not in current_sources and (max_files is None or not os.path.exists(k))
+    ]
+    for k in removed_sources:
+        file_cache.pop(k, None)
+
+    # Hash de cada archivo una sola vez (se reutiliza para el caché y para doc_id)
+    t_hash = time.perf_counter()
+    file_hashes = hash_files(files)
+    hash_s = time.perf_counter() - t_hash
+    files = [p for p in files if p in file_hashes]
+
     # Filtrar archivos ya procesados (solo procesar nuevos/modificados)
-    files_to_process = get_unprocessed_files(files, file_cache, use_relative_path=True)
+    files_to_process = get_unprocessed_files(files, file_cache, use_relative_path=True, hashes=file_hashes)
     skipped_files = len(files) - len(files_to_process)
-    
-    if not files_to_process:
+    index_exists = os.path.exists(idx_path) and os.path.exists(meta_path)
+
+    if not full_rebuild and not files_to_process and not removed_sources and index_exists:
         return {
             "ok": True,
             "universe": universe,
@@ -84,274 +267,119 @@ def build_guides_index(
             "files": len(files),
             "skipped": skipped_files,
             "message": "Todos los archivos ya están procesados. No hay cambios.",
-            "index_path": os.path.join(out_dir, f"{universe}.index"),
-            "meta_path": os.path.join(out_dir, f"{universe}_meta.jsonl"),
+            "stage_seconds": {"discover": round(discover_s, 3), "hash": round(hash_s, 3)},
+            "index_path": idx_path,
+            "meta_path": meta_path,
         }
 
-    # Cargar índice FAISS existente si existe (para actualización incremental)
-    idx_path = os.path.join(out_dir, f"{universe}.index")
-    meta_path = os.path.join(out_dir, f"{universe}_meta.jsonl")
-    existing_index = None
-    existing_meta: List[GuideChunk] = []
-    existing_chunk_ids: Set[str] = set()
-    
-    if os.path.exists(idx_path) and os.path.exists(meta_path):
-        try:
-            existing_index = faiss.read_index(idx_path)
-            # Cargar metadatos existentes para evitar duplicados
-            with open(meta_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        data = json.loads(line)
-                        existing_chunk_ids.add(data.get("chunk_id", ""))
-                    except Exception:
-                        continue
-        except Exception as e:
-            # Si hay error cargando el índice existente, empezamos de cero
-            existing_index = None
-            existing_chunk_ids = set()
-
-    # 2) Crear chunks solo para archivos nuevos/modificados
-    chunks: List[GuideChunk] = []
+    # Cargar índice existente (IndexIDMap2 + meta alineada) para mantenimiento incremental.
+    # Si no se puede usar (ilegible / desalineado) se reconstruye todo desde cero.
+    existing_index, existing_rows, rebuild_reason = (
+        (None, [], None) if full_rebuild else load_index_state(idx_path, meta_path)
+    )
+    if full_rebuild or rebuild_reason or (existing_index is None and file_cache):
+        file_cache = {}
+        files_to_process = list(files)
+        skipped_files = 0
+
+    # 2) Tareas de parseo solo para archivos nuevos/modificados (orden determinista)
+    tasks = []
     matched_catalog_docs = 0
-
     for path in files_to_process:
-        title = os.path.basename(path)
-        sha = file_sha256(path)
-        doc_id = sha[:12]  # estable por contenido
-
         # Coincidencia de catálogo por título/filename
-        cat_item = match_guide_to_catalog(title, catalog)
+        cat_item = match_guide_to_catalog(os.path.basename(path), catalog)
         if cat_item:
             matched_catalog_docs += 1
+        tasks.append((path, file_hashes[path], universe, encoding_name, chunk_tokens, overlap_tokens, cat_item))
 
-        # Leer documento -> blocks
-        plain_text, blocks, doc_meta = read_guide_document(path, universe=universe)
-        if not blocks:
-            continue
-
-        # Tokenizar y crear chunks
-        enc = tiktoken.get_encoding(encoding_name)
-        token_cursor = 0
-        chunk_idx = 0
-        
-        for b in blocks:
-            b_text = (b.get("text") or "").strip()
-            if not b_text:
-                continue
-
-            section = b.get("section")
-            step_number = b.get("step_number")
-            block_kind = b.get("block_kind", "content")
-
-            # Dividir bloque largo en chunks de tokens
-            # Para pasos numerados, intentar mantener juntos si son pequeños
-            skip_chunking = False
-            if block_kind == "step" and step_number:
-                token_count = len(enc.encode(b_text))
-                if token_count < 800:  # Pasos pequeños no fragmentar
-                    skip_chunking = True
-            
-            if skip_chunking:
-                # Mantener el bloque como un solo chunk
-                token_count = len(enc.encode(b_text))
-                sub_chunks = [(b_text, 0, token_count)]
-            else:
-                sub_chunks = chunk_text_tokens(
-                    b_text,
-                    encoding_name=encoding_name,
-                    chunk_tokens=chunk_tokens,
-                    overlap_tokens=overlap_tokens,
-                )
-
-            if not sub_chunks:
-                continue
-
-            for (chunk_txt, t0, t1) in sub_chunks:
-                token_start = token_cursor + t0
-                token_end = token_cursor + t1
-
-                cid = f"{doc_id}_{chunk_idx}"
-                chunk_idx += 1
-
-                # Extraer metadata del catálogo si existe
-                step_label = b.get("step_label")  # Nueva: etiqueta del paso (ej: "3.1")
-                chunks.append(GuideChunk(
-                    chunk_id=cid,
-                    universe=universe,
-                    doc_id=doc_id,
-                    title=doc_meta.get("title") or title,
-                    source_path=path,
-                    sha256=sha,
-                    chunk_index=(chunk_idx - 1),
-                    section=section,
-                    step_number=step_number,
-                    step_label=step_label,
-                    token_start=token_start,
-                    token_end=token_end,
-                    text=chunk_txt,
-
-                    # Catalog metadata (enriquecido desde Excel)
-                    doc_number=cat_item.get("doc_number") if cat_item else doc_meta.get("doc_number"),
-                    objetivo=cat_item.get("objetivo") if cat_item else None,
-                    referencia_cliente_ticket=cat_item.get("referencia_cliente_ticket") if cat_item else None,
-                    fecha_ultimo_cambio=cat_item.get("fecha_ultimo_cambio") if cat_item else None,
-                    version=cat_item.get("version") if cat_item else None,
-                    cambio_realizado=cat_item.get("cambio_realizado") if cat_item else None,
-                    autores=cat_item.get("autores") if cat_item else None,
-                    verifico=cat_item.get("verifico") if cat_item else None,
-                    asignada_a=cat_item.get("asignada_a") if cat_item else None,
-                    fecha_asignacion=cat_item.get("fecha_asignacion") if cat_item else None,
-                    fecha_entregado=cat_item.get("fecha_entregado") if cat_item else None,
-                    catalog_title=cat_item.get("nombre_completo") if cat_item else None,
-                ))
-
-            # Avanzar cursor por longitud completa de tokens del bloque
-            token_cursor += sub_chunks[-1][2]
-
-    if not chunks:
-        # Si no hay chunks nuevos pero hay archivos procesados, retornar info del índice existente
-        if existing_index is not None:
-            return {
-                "ok": True,
-                "universe": universe,
-                "input_dir": input_dir,
-                "files": len(files),
-                "skipped": skipped_files,
-                "new_files": 0,
-                "message": "No se generaron chunks nuevos de los archivos modificados (pueden estar vacíos o fallar extracción). Índice existente se mantiene.",
-                "index_path": idx_path,
-                "meta_path": meta_path,
-            }
-        return {"ok": False, "error": "No se generaron chunks (docs vacíos o extracción falló)"}
-
-    # 3) Embeddings por chunk (con cache)
-    vectors: List[np.ndarray] = []
-    meta_rows: List[GuideChunk] = []
-
-    for c in chunks:
-        v = embed_text_cached(
-            text=c.text,
-            chunk_id=c.chunk_id,
+    # 3) Pipeline en streaming: parse/chunk (procesos) → embeddings (lotes concurrentes, con cache)
+    #    → remove_ids de la versión anterior + add al índice, con checkpoints periódicos
+    def _embed(chunk_batch: List[GuideChunk]) -> List[Optional[np.ndarray]]:
+        return embed_texts_cached(
+            [(c.chunk_id, c.text) for c in chunk_batch],
             universe=universe,
             out_dir=out_dir,
             cache=emb_cache
         )
-        if v is None:
-            continue
-        vectors.append(v.astype(np.float32))
-        meta_rows.append(c)
 
-    if not vectors:
-        return {"ok": False, "error": "No se generaron embeddings (revisa OPENAI key/config)"}
+    try:
+        run = run_index_pipeline(
+            tasks,
+            parse_fn=_parse_guide_task,
+            embed_fn=_embed,
+            row_fn=_meta_row,
+            index=existing_index,
+            rows=existing_rows,
+            file_cache=file_cache,
+            file_hashes=file_hashes,
+            idx_path=idx_path,
+            meta_path=meta_path,
+            save_file_cache_fn=lambda fc: save_file_cache(out_dir, universe, fc),
+            parse_workers=parse_workers,
+        )
+    except DimensionChanged:
+        # Cambió la dimensión de los embeddings: no se pueden mezclar vectores → reconstrucción completa
+        return build_guides_index(
+            universe=universe,
+            input_dir=input_dir,
+            out_dir=out_dir,
+            encoding_name=encoding_name,
+            chunk_tokens=chunk_tokens,
+            overlap_tokens=overlap_tokens,
+            top_level_only=top_level_only,
+            max_files=max_files,
+            catalog_path=catalog_path,
+            full_rebuild=True,
+            parse_workers=parse_workers,
+        )
 
-    mat = np.vstack(vectors).astype(np.float32)
-    dim = mat.shape[1]
+    index = run["index"]
+    all_rows = run["rows"]
+    parse_errors: Dict[str, str] = run["parse_errors"]
+    if index is None:
+        if parse_errors or run["embed_errors"]:
+            return {"ok": False, "error": "No se generaron embeddings (revisa OPENAI key/config)",
+                    "parse_errors": parse_errors, "embed_errors": run["embed_errors"]}
+        return {"ok": False, "error": "No se generaron chunks (docs vacíos o extracción falló)"}
+
+    # Verificar alineación índice/meta en disco
+    alignment = verify_alignment(idx_path, meta_path)
 
-    # 4) Índice FAISS (IP sobre vectores normalizados ~= cosine)
-    if existing_index is not None:
-        if existing_index.d != dim:
-            index = faiss.IndexFlatIP(dim)
-            index.add(mat)
-        else:
-            index = existing_index
-            index.add(mat)
-    else:
-        index = faiss.IndexFlatIP(dim)
-        index.add(mat)
-
-    # 5) Persistir
-    faiss.write_index(index, idx_path)
-
-    # Guardar metadatos: append si hay existentes, write si es nuevo
-    mode = "a" if existing_index is not None and os.path.exists(meta_path) else "w"
-    with open(meta_path, mode, encoding="utf-8") as f:
-        for c in meta_rows:
-            f.write(json.dumps({
-                "chunk_id": c.chunk_id,
-                "universe": c.universe,
-                "doc_id": c.doc_id,
-                "title": c.title,
-                "source_path": c.source_path,
-                "sha256": c.sha256,
-                "chunk_index": c.chunk_index,
-                "section": c.section,
-                "step_number": c.step_number,
-                "step_label": c.step_label,
-                "token_start": c.token_start,
-                "token_end": c.token_end,
-                "text": c.text,
-
-                # Catalog metadata
-                "doc_number": c.doc_number,
-                "objetivo": c.objetivo,
-                "referencia_cliente_ticket": c.referencia_cliente_ticket,
-                "fecha_ultimo_cambio": c.fecha_ultimo_cambio,
-                "version": c.version,
-                "cambio_realizado": c.cambio_realizado,
-                "autores": c.autores,
-                "verifico": c.verifico,
-                "asignada_a": c.asignada_a,
-                "fecha_asignacion": c.fecha_asignacion,
-                "fecha_entregado": c.fecha_entregado,
-                "catalog_title": c.catalog_title,
-            }, ensure_ascii=False) + "\n")
-
-    # Marcar archivos como procesados en el caché
-    for path in files_to_process:
-        try:
-            sha = file_sha256(path)
-            mark_file_processed(path, sha, file_cache, use_relative_path=True)
-        except Exception:
-            pass
-    
-    # Guardar caché de archivos actualizado
-    save_file_cache(out_dir, universe, file_cache)
-    
     # Calcular estadísticas
-    new_doc_ids = set([c.doc_id for c in meta_rows])
-    if existing_index is not None:
-        all_doc_ids = new_doc_ids.copy()
-        try:
-            with open(meta_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        data = json.loads(line)
-                        doc_id = data.get("doc_id")
-                        if doc_id:
-                            all_doc_ids.add(doc_id)
-                    except Exception:
-                        continue
-        except Exception:
-            pass
-        unique_docs = len(all_doc_ids)
-    else:
-        unique_docs = len(new_doc_ids)
+    unique_docs = len({r.get("doc_id") for r in all_rows if r.get("doc_id")})
+
+    # Referencias del universo en el store global de embeddings (para GC / reporte de dedup)
+    emb_refs = emb_cache.update_refs(meta_path)
 
     return {
-        "ok": True,
+        "ok": alignment["ok"],
+        **({} if alignment["ok"] else {"error": f"Índice/meta desalineados: {alignment.get('error')}"}),
         "universe": universe,
         "input_dir": input_dir,
         "files": len(files),
         "files_processed": len(files_to_process),
         "files_skipped": skipped_files,
+        "files_removed": len(removed_sources),
+        **({"parse_errors": parse_errors} if parse_errors else {}),
+        **({"embed_errors": run["embed_errors"]} if run["embed_errors"] else {}),
         "docs": unique_docs,
-        "chunks_new": len(meta_rows),
-        "chunks_total": index.ntotal if index else len(meta_rows),
-        "dim": dim,
+        "chunks_new": run["chunks_new"],
+        "chunks_removed": run["chunks_removed"],
+        "chunks_total": index.ntotal,
+        "dim": index.d,
+        "checkpoints": run["checkpoints"],
+        "stage_seconds": {"discover": round(discover_s, 3), "hash": round(hash_s, 3), **run["stage_seconds"]},
         "index_path": idx_path,
         "meta_path": meta_path,
         "catalog_path": catalog_path,
         "catalog_docs_matched_by_filename": matched_catalog_docs,
         "emb_cache_path": get_emb_cache_path(out_dir, universe),
+        "emb_cache": {**emb_cache.run_stats(), "unique_texts": len(emb_refs)},
         "file_cache_path": get_file_cache_path(out_dir, universe),
         "incremental_update": existing_index is not None,
+        "full_rebuild": existing_index is None,
+        **({"rebuild_reason": rebuild_reason} if rebuild_reason else {}),
+        "alignment": alignment,
         "note": "Para que el catálogo se aplique, el filename debe seguir el formato: (N) Zell - Nombre.docx"
     }
 
@@ -5,6 +5,9 @@ from Tools.docs_indexer.utils import (
     file_sha256,
     fingerprint_text,
     chunk_text_tokens,
+    chunk_encoded_text,
+    encode_texts,
+    get_encoder,
     normalize_vec_1d,
 )
 
@@ -12,6 +15,9 @@ __all__ = [
     "file_sha256",
     "fingerprint_text",
     "chunk_text_tokens",
+    "chunk_encoded_text",
+    "encode_texts",
+    "get_encoder",
     "normalize_vec_1d",
 ]
 
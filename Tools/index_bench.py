@@ -0,0 +1,228 @@
+"""
+Benchmark y reporte de costo de los indexadores offline (docs, guides, quotes, etiquetas).
+
+Corre el indexador en modo dry-run: todo se escribe en un directorio temporal (Data/ no se toca)
+y, por defecto, con el proveedor de embeddings falso (EMBED_PROVIDER=fake en batch_embeddings),
+así que no hace llamadas de red y se puede correr en CI para detectar regresiones de rendimiento.
+
+Reporta archivos, chunks, tokens, tasa de aciertos contra el store real de embeddings
+(Data/emb_store), costo estimado de embeddings y tiempos por etapa:
+discover, hash, parse, chunk, embed, add, persist.
+
+Uso:
+    python -m Tools.index_bench docs --universe meetings_weekly --input_dir knowledgebase/meetings_weekly
+    python -m Tools.index_bench guides --input_dir knowledgebase/user_guides --max_files 20
+    python -m Tools.index_bench quotes
+    python -m Tools.index_bench etiquetas --json_out bench/etiquetas.json
+
+Nota: el conteo de tokens usa tiktoken; sin red, su archivo BPE debe estar en TIKTOKEN_CACHE_DIR.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from Tools.search_tickets import EMBEDDING_MODEL
+from Tools.docs_indexer.utils import encode_texts, fingerprint_text
+from Tools.docs_indexer.emb_store import EmbeddingStore, MANIFEST_NAME
+from Tools.docs_indexer.shared_emb_store import shared_store_dir
+from Tools.docs_indexer.batch_embeddings import ENCODING_NAME, set_embedding_provider
+
+# Precio de text-embedding-ada-002 por 1K tokens (mismo valor que calcular_costo_vectorizacion.py)
+EMBED_COST_PER_1K_TOKENS = float(os.getenv("EMBED_COST_PER_1K_TOKENS", "0.0001"))
+
+INDEXERS = ("docs", "guides", "quotes", "etiquetas")
+STAGES = ("discover", "hash", "parse", "chunk", "embed", "add", "persist")
+
+
+def _run_indexer(kind: str, out_dir: str, opts: Dict[str, Any]) -> Dict[str, Any]:
+    if kind == "docs":
+        from Tools.docs_indexer import build_docs_index
+        return build_docs_index(
+            universe=opts["universe"],
+            input_dir=opts["input_dir"],
+            out_dir=out_dir,
+            max_files=opts.get("max_files"),
+            parse_workers=opts.get("workers"),
+        )
+    if kind == "guides":
+        from Tools.guides_indexer import build_guides_index
+        return build_guides_index(
+            universe=opts.get("universe") or "user_guides",
+            input_dir=opts["input_dir"],
+            out_dir=out_dir,
+            max_files=opts.get("max_files"),
+            parse_workers=opts.get("workers"),
+        )
+    if kind == "quotes":
+        from Tools.quotes_indexer import build_quotes_index
+        from Tools.quotes_indexer.config import DEFAULT_EXCEL_PATH
+        return build_quotes_index(excel_path=opts.get("excel") or DEFAULT_EXCEL_PATH, out_dir=out_dir)
+    if kind == "etiquetas":
+        from Tools.etiquetas_indexer import build_etiquetas_index
+        from Tools.etiquetas_indexer.config import DEFAULT_EXCEL_PATH
+        return build_etiquetas_index(excel_path=opts.get("excel") or DEFAULT_EXCEL_PATH, out_dir=out_dir)
+    raise ValueError(f"Indexador desconocido: {kind} (opciones: {', '.join(INDEXERS)})")
+
+
+def _meta_texts(meta_path: Optional[str]) -> List[str]:
+    texts: List[str] = []
+    if not meta_path or not os.path.exists(meta_path):
+        return texts
+    with open(meta_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                text = json.loads(line).get("text")
+                if text:
+                    texts.append(text)
+    return texts
+
+
+def _stage_breakdown(stage_seconds: Dict[str, float]) -> Dict[str, float]:
+    """Tiempos del indexador → las etapas del reporte (docs/guides llaman 'checkpoint' a persist)."""
+    out = {stage: float(stage_seconds.get(stage, 0.0)) for stage in STAGES}
+    if "persist" not in stage_seconds:
+        out["persist"] = float(stage_seconds.get("checkpoint", 0.0))
+    return {k: round(v, 3) for k, v in out.items()}
+
+
+def cache_and_cost_report(
+    texts: List[str],
+    data_dir: str = "Data",
+    model: str = EMBEDDING_MODEL,
+    cost_per_1k: float = EMBED_COST_PER_1K_TOKENS,
+) -> Dict[str, Any]:
+    """
+    Tokens de los chunks y cuáles ya están en el store real de embeddings (solo lectura).
+    El costo estimado es el de los textos únicos que faltan en el store.
+    """
+    by_fp: Dict[str, str] = {}
+    for t in texts:
+        by_fp.setdefault(fingerprint_text(t), t)
+    fps = list(by_fp)
+    token_counts = dict(zip(fps, (len(toks) for toks in encode_texts([by_fp[fp] for fp in fps], ENCODING_NAME))))
+
+    store_root = shared_store_dir(data_dir)
+    store = EmbeddingStore(store_root) if os.path.exists(os.path.join(store_root, MANIFEST_NAME)) else None
+    misses = [fp for fp in fps if store is None or not store.contains(fp, model)]
+
+    tokens_total = sum(token_counts[fingerprint_text(t)] for t in texts)
+    tokens_unique = sum(token_counts.values())
+    tokens_to_embed = sum(token_counts[fp] for fp in misses)
+    return {
+        "tokens": {
+            "total": tokens_total,
+            "unique_texts": tokens_unique,
+            "to_embed": tokens_to_embed,
+        },
+        "cache": {
+            "store": store_root if store is not None else None,
+            "unique_texts": len(fps),
+            "hits": len(fps) - len(misses),
+            "misses": len(misses),
+            "hit_rate": round((len(fps) - len(misses)) / len(fps), 4) if fps else None,
+        },
+        "cost": {
+            "model": model,
+            "usd_per_1k_tokens": cost_per_1k,
+            "estimated_usd": round(tokens_to_embed / 1000 * cost_per_1k, 6),
+            "full_rebuild_usd": round(tokens_unique / 1000 * cost_per_1k, 6),
+        },
+    }
+
+
+def run_bench(
+    kind: str,
+    data_dir: str = "Data",
+    provider: str = "fake",
+    keep_out_dir: bool = False,
+    cost_per_1k: float = EMBED_COST_PER_1K_TOKENS,
+    **opts: Any,
+) -> Dict[str, Any]:
+    """
+    Corre un indexador en un directorio temporal y arma el reporte.
+    opts: input_dir / universe / max_files / workers (docs, guides) o excel (quotes, etiquetas).
+    """
+    out_dir = tempfile.mkdtemp(prefix=f"index_bench_{kind}_")
+    previous = set_embedding_provider(provider)
+    t0 = time.perf_counter()
+    try:
+        result = _run_indexer(kind, out_dir, opts)
+        wall = time.perf_counter() - t0
+        texts = _meta_texts(result.get("meta_path"))
+        embed_errors = result.get("embed_errors") or 0
+        report: Dict[str, Any] = {
+            "ok": bool(result.get("ok")),
+            **({"error": result["error"]} if result.get("error") else {}),
+            "indexer": kind,
+            "provider": provider,
+            "dry_run": True,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "out_dir": out_dir if keep_out_dir else None,
+            "files": result.get("files", 1 if kind in ("quotes", "etiquetas") else None),
+            "chunks": len(texts),
+            **cache_and_cost_report(texts, data_dir=data_dir, cost_per_1k=cost_per_1k),
+            "stage_seconds": _stage_breakdown(result.get("stage_seconds") or {}),
+            "wall_seconds": round(wall, 3),
+            "parse_errors": len(result.get("parse_errors") or {}),
+            "embed_errors": embed_errors if isinstance(embed_errors, int) else len(embed_errors),
+        }
+        if report["chunks"] and wall:
+            report["chunks_per_second"] = round(report["chunks"] / wall, 2)
+        return report
+    finally:
+        set_embedding_provider(previous)
+        if not keep_out_dir:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark en dry-run y reporte de costo de los indexadores")
+    p.add_argument("indexer", choices=INDEXERS)
+    p.add_argument("--input_dir", default=None, help="docs / guides: carpeta de documentos")
+    p.add_argument("--universe", default=None, help="docs: universo (p. ej. meetings_weekly)")
+    p.add_argument("--excel", default=None, help="quotes / etiquetas: Excel de entrada (default del indexador)")
+    p.add_argument("--max_files", type=int, default=None)
+    p.add_argument("--workers", type=int, default=None, help="Procesos de parseo (docs / guides)")
+    p.add_argument("--data_dir", default="Data", help="Directorio con el store real de embeddings (solo lectura)")
+    p.add_argument("--provider", choices=("fake", "openai"), default="fake",
+                   help="fake: vectores locales sin red (default); openai: embeddings reales (con costo)")
+    p.add_argument("--cost_per_1k", type=float, default=EMBED_COST_PER_1K_TOKENS)
+    p.add_argument("--keep_out_dir", action="store_true", help="No borrar el directorio temporal de salida")
+    p.add_argument("--json_out", default=None, help="Además guarda el reporte en este archivo")
+    args = p.parse_args()
+
+    if args.indexer in ("docs", "guides") and not args.input_dir:
+        p.error("--input_dir es requerido para docs / guides")
+    if args.indexer == "docs" and not args.universe:
+        p.error("--universe es requerido para docs")
+
+    report = run_bench(
+        args.indexer,
+        data_dir=args.data_dir,
+        provider=args.provider,
+        keep_out_dir=args.keep_out_dir,
+        cost_per_1k=args.cost_per_1k,
+        input_dir=args.input_dir,
+        universe=args.universe,
+        excel=args.excel,
+        max_files=args.max_files,
+        workers=args.workers,
+    )
+    out = json.dumps(report, ensure_ascii=False, indent=2)
+    print(out)
+    if args.json_out:
+        os.makedirs(os.path.dirname(args.json_out) or ".", exist_ok=True)
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            f.write(out + "\n")
+    sys.exit(0 if report.get("ok") else 1)
+
+
+if __name__ == "__main__":
+    main()
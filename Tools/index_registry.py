@@ -0,0 +1,412 @@
+"""
+Registro de índices - Mantiene residentes en memoria los índices FAISS y su metadata.
+Usado por las herramientas de búsqueda y obtención:
+- search_docs.py / get_docs.py (docs_org, user_guides, meetings_weekly)
+- search_etiquetas.py / get_etiquetas.py (etiquetas)
+- search_quotes.py / get_quotes.py (quotes)
+- search_tickets.py (tickets)
+
+Cada universo se carga una sola vez por proceso (faiss.read_index + parseo del JSONL)
+y se entrega como un IndexHandle de solo lectura. Un hilo watcher detecta cuando los
+indexers offline reescriben los archivos y publica una nueva generación sin reiniciar.
+"""
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATA_DIR = "Data"
+
+# Universos conocidos -> nombre base de archivos en Data/
+# (<base>.index + <base>_meta.jsonl)
+UNIVERSE_FILES = {
+    "docs_org": "docs_org",
+    "user_guides": "user_guides",
+    "meetings_weekly": "docs_meetings_weekly",
+    "etiquetas": "etiquetas",
+    "quotes": "quotes",
+}
+
+# Tickets usa un formato distinto: índice binario + arreglo de IDs (sin JSONL)
+TICKETS_UNIVERSE = "tickets"
+TICKETS_INDEX_FILE = "faiss_index_ip.bin"
+TICKETS_IDS_FILE = "faiss_ids.npy"
+
+ALL_UNIVERSES = tuple(UNIVERSE_FILES.keys()) + (TICKETS_UNIVERSE,)
+
+# Cada cuántos segundos se revisa si los indexers reescribieron los archivos (0 = sin hot reload)
+RELOAD_INTERVAL_SECONDS = float(os.getenv("INDEX_RELOAD_INTERVAL_SECONDS", "10"))
+
+
+def _index_base_name(universe: str) -> str:
+    """
+    Resuelve el nombre base de archivos para un universo.
+    Para universos no registrados aplica la misma regla que search_docs:
+    si ya tiene prefijo conocido ("docs_", "user_") se usa tal cual, si no se agrega "docs_".
+    """
+    if universe in UNIVERSE_FILES:
+        return UNIVERSE_FILES[universe]
+    if universe.startswith("docs_") or universe.startswith("user_"):
+        return universe
+    return f"docs_{universe}"
+
+
+def _file_signature(*paths: str) -> Tuple[Tuple[int, int], ...]:
+    """(mtime_ns, size) de cada archivo: cambia cuando un indexer reescribe índice o metadata."""
+    signature = []
+    for p in paths:
+        st = os.stat(p)
+        signature.append((st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+
+def _positional_index(index: Any) -> Any:
+    """
+    Los indexers de docs/guías/quotes/etiquetas guardan IndexIDMap2 (ids estables para remove_ids) con la
+    metadata reescrita en el orden de almacenamiento. Para las búsquedas se usa el índice
+    interno, que regresa posiciones: ids[i] sigue siendo la fila i de la metadata.
+    """
+    if not isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return index
+    inner = faiss.downcast_index(index.index)
+    # El IndexIDMap2 es dueño del índice interno: mantenerlo vivo mientras se use inner
+    inner.referenced_objects = [index]
+    return inner
+
+
+def _id_map_mismatches(index: Any, meta: Tuple[Dict[str, Any], ...]) -> int:
+    """Filas cuyo vector_id no coincide con el id del índice en la misma posición (0 si no aplica)."""
+    if not isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)) or index.ntotal != len(meta):
+        return 0
+    ids = faiss.vector_to_array(index.id_map)
+    meta_ids = np.array([int(m.get("vector_id", -1)) for m in meta], dtype=np.int64)
+    return int(np.count_nonzero(ids != meta_ids))
+
+
+def _load_meta(meta_path: str) -> List[Dict[str, Any]]:
+    """Carga metadata desde archivo JSONL."""
+    rows = []
+    with open(meta_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            rows.append(json.loads(line))
+    return rows
+
+
+@dataclass(frozen=True)
+class IndexHandle:
+    """
+    Handle de solo lectura sobre un universo cargado.
+    Las filas de metadata son compartidas entre requests: NO modificarlas.
+    """
+    universe: str
+    index: Any
+    meta: Tuple[Dict[str, Any], ...]
+    index_path: str
+    meta_path: Optional[str]
+    loaded_at: float
+    load_seconds: float
+    ids: Optional[np.ndarray] = None
+    generation: int = 1
+    signature: Tuple[Tuple[int, int], ...] = ()
+    _lookups: Dict[Tuple[str, str], Any] = field(default_factory=dict, repr=False, compare=False)
+
+    @property
+    def ntotal(self) -> int:
+        return int(self.index.ntotal)
+
+    @property
+    def dim(self) -> int:
+        return int(self.index.d)
+
+    def index_by(self, key: str) -> Dict[Any, Dict[str, Any]]:
+        """
+        Mapa key -> fila de metadata (si hay repetidos gana la última, igual que
+        el dict comprehension que usaban get_docs/get_quotes/get_etiquetas).
+        Se calcula una sola vez por handle.
+        """
+        cache_key = ("index_by", key)
+        lookup = self._lookups.get(cache_key)
+        if lookup is None:
+            lookup = {}
+            for m in self.meta:
+                value = m.get(key)
+                if value is not None:
+                    lookup[value] = m
+            self._lookups[cache_key] = lookup
+        return lookup
+
+    def group_by(self, key: str) -> Dict[Any, List[Dict[str, Any]]]:
+        """Mapa key -> lista de filas de metadata (en orden del índice). Se calcula una sola vez por handle."""
+        cache_key = ("group_by", key)
+        lookup = self._lookups.get(cache_key)
+        if lookup is None:
+            lookup = {}
+            for m in self.meta:
+                value = m.get(key)
+                if value is not None:
+                    lookup.setdefault(value, []).append(m)
+            self._lookups[cache_key] = lookup
+        return lookup
+
+    def memo(self, name: str, builder: Callable[[Tuple[Dict[str, Any], ...]], Any]) -> Any:
+        """
+        Estructura derivada de la metadata construida una sola vez por handle
+        (ej: {doc_id: {chunk_index: chunk}} en get_docs).
+        """
+        cache_key = ("memo", name)
+        value = self._lookups.get(cache_key)
+        if value is None:
+            value = builder(self.meta)
+            self._lookups[cache_key] = value
+        return value
+
+
+class IndexRegistry:
+    """
+    Registro de índices residentes para un directorio de datos.
+    Carga perezosa por universo (o precarga con preload()) y acceso thread-safe.
+
+    Hot reload: cuando un indexer reescribe Data/*.index / *_meta.jsonl, el nuevo
+    handle se construye aparte (doble buffer) y se publica con un solo swap del dict;
+    las búsquedas en curso terminan sobre el handle anterior que ya tenían en mano.
+    """
+
+    def __init__(self, data_dir: str = DEFAULT_DATA_DIR):
+        self.data_dir = data_dir
+        self._handles: Dict[str, IndexHandle] = {}
+        self._base_names: Dict[str, Optional[str]] = {}
+        self._lock = threading.RLock()
+        self._reload_lock = threading.Lock()
+        # Firma vista en la revisión anterior (para esperar a que el indexer termine de escribir)
+        self._pending: Dict[str, Tuple[Tuple[int, int], ...]] = {}
+        self._last_errors: Dict[str, str] = {}
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def paths_for(self, universe: str, base_name: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Retorna (index_path, meta_path) del universo. Para tickets, meta_path es el .npy de IDs.
+        base_name permite forzar el nombre de archivo para universos no registrados
+        (ej: search_etiquetas/search_quotes usan "<universe>.index" sin prefijo).
+        """
+        if universe == TICKETS_UNIVERSE:
+            return (
+                os.path.join(self.data_dir, TICKETS_INDEX_FILE),
+                os.path.join(self.data_dir, TICKETS_IDS_FILE),
+            )
+        base = UNIVERSE_FILES.get(universe) or base_name or _index_base_name(universe)
+        return (
+            os.path.join(self.data_dir, f"{base}.index"),
+            os.path.join(self.data_dir, f"{base}_meta.jsonl"),
+        )
+
+    def _load(self, universe: str, base_name: Optional[str] = None, generation: int = 1, strict: bool = False) -> IndexHandle:
+        """
+        Lee índice + metadata del disco y construye un handle nuevo.
+        Con strict=True (recargas) una inconsistencia index/meta lanza ValueError
+        para conservar el handle anterior en vez de publicar uno a medio escribir.
+        """
+        idx_path, meta_path = self.paths_for(universe, base_name)
+
+        if not os.path.exists(idx_path):
+            raise FileNotFoundError(f"No existe index: {idx_path}")
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"No existe meta: {meta_path}")
+
+        # Firma antes de leer: si el indexer escribe durante la lectura, la siguiente revisión lo detecta
+        signature = _file_signature(idx_path, meta_path)
+
+        t0 = time.time()
+        index = faiss.read_index(idx_path)
+        if universe == TICKETS_UNIVERSE:
+            ids = np.load(meta_path).astype("int64")
+            ids.setflags(write=False)
+            meta: Tuple[Dict[str, Any], ...] = ()
+            if index.ntotal != len(ids):
+                if strict:
+                    raise ValueError(f"Inconsistencia FAISS tickets: index size={index.ntotal}, ids={len(ids)}")
+                logger.warning(f"[IndexRegistry] ⚠️ Inconsistencia FAISS tickets: index size={index.ntotal}, ids={len(ids)}")
+        else:
+            ids = None
+            meta = tuple(_load_meta(meta_path))
+            if index.ntotal != len(meta):
+                if strict:
+                    raise ValueError(f"Inconsistencia {universe}: index size={index.ntotal}, meta={len(meta)}")
+                logger.warning(f"[IndexRegistry] ⚠️ Inconsistencia {universe}: index size={index.ntotal}, meta={len(meta)}")
+            mismatches = _id_map_mismatches(index, meta)
+            if mismatches:
+                if strict:
+                    raise ValueError(f"Inconsistencia {universe}: {mismatches} filas con vector_id distinto al índice")
+                logger.warning(f"[IndexRegistry] ⚠️ Inconsistencia {universe}: {mismatches} filas con vector_id distinto al índice")
+            index = _positional_index(index)
+
+        handle = IndexHandle(
+            universe=universe,
+            index=index,
+            meta=meta,
+            index_path=idx_path,
+            meta_path=meta_path,
+            loaded_at=time.time(),
+            load_seconds=time.time() - t0,
+            ids=ids,
+            generation=generation,
+            signature=signature,
+        )
+        logger.info(
+            f"[IndexRegistry] ✅ {universe} cargado (gen {generation}): "
+            f"{handle.ntotal} vectores, dim={handle.dim} ({handle.load_seconds:.2f}s)"
+        )
+        return handle
+
+    def get(self, universe: str, base_name: Optional[str] = None) -> IndexHandle:
+        """
+        Retorna el handle residente del universo, cargándolo si es la primera vez.
+        Lanza FileNotFoundError si no existen los archivos del universo.
+        """
+        handle = self._handles.get(universe)
+        if handle is not None:
+            return handle
+        with self._lock:
+            handle = self._handles.get(universe)
+            if handle is None:
+                handle = self._load(universe, base_name)
+                self._base_names[universe] = base_name
+                self._handles[universe] = handle
+            return handle
+
+    def reload(self, universe: str) -> bool:
+        """
+        Recarga un universo ya cargado y publica el nuevo handle (generation + 1).
+        Si la carga falla, se conserva el handle anterior. Retorna True si hubo swap.
+        """
+        with self._reload_lock:
+            old = self._handles.get(universe)
+            if old is None:
+                return False
+            try:
+                new = self._load(universe, self._base_names.get(universe), generation=old.generation + 1, strict=True)
+            except Exception as e:
+                self._last_errors[universe] = str(e)
+                logger.error(f"[IndexRegistry] ❌ Recarga de {universe} falló, se mantiene gen {old.generation}: {e}")
+                return False
+            # Swap atómico: las búsquedas en curso conservan la referencia al handle anterior
+            self._handles[universe] = new
+            self._pending.pop(universe, None)
+            self._last_errors.pop(universe, None)
+            return True
+
+    def check_for_updates(self, universe: str) -> bool:
+        """
+        Revisa si los archivos de un universo cambiaron en disco y, si ya se estabilizaron,
+        lo recarga. Los indexers escriben primero el .index y luego el _meta.jsonl, así que
+        se espera a ver la misma firma en dos revisiones seguidas antes de recargar.
+        """
+        old = self._handles.get(universe)
+        if old is None:
+            return False
+        try:
+            signature = _file_signature(old.index_path, old.meta_path)
+        except FileNotFoundError:
+            # El indexer puede estar reemplazando los archivos; se revisa en la siguiente vuelta
+            return False
+        if signature == old.signature:
+            self._pending.pop(universe, None)
+            return False
+        if self._pending.get(universe) != signature:
+            self._pending[universe] = signature
+            return False
+        return self.reload(universe)
+
+    def refresh(self) -> List[str]:
+        """Revisa todos los universos cargados y retorna los que se recargaron."""
+        return [u for u in list(self._handles.keys()) if self.check_for_updates(u)]
+
+    def start_watcher(self, interval: Optional[float] = None) -> None:
+        """Inicia (una sola vez) el hilo daemon que revisa cambios en disco cada `interval` segundos."""
+        interval = RELOAD_INTERVAL_SECONDS if interval is None else interval
+        if interval <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return
+        self._stop_event.clear()
+
+        def _run():
+            while not self._stop_event.wait(interval):
+                try:
+                    reloaded = self.refresh()
+                    if reloaded:
+                        logger.info(f"[IndexRegistry] 🔄 Universos recargados: {reloaded}")
+                except Exception as e:
+                    logger.error(f"[IndexRegistry] ❌ Error revisando índices: {e}")
+
+        self._watcher = threading.Thread(target=_run, name="index-registry-watcher", daemon=True)
+        self._watcher.start()
+        logger.info(f"[IndexRegistry] 👀 Hot reload activo (cada {interval:.0f}s) sobre {self.data_dir}")
+
+    def stop_watcher(self) -> None:
+        self._stop_event.set()
+
+    def preload(self, universes: Optional[List[str]] = None) -> Dict[str, bool]:
+        """Carga de una vez los universos indicados (default: todos). No lanza excepción: retorna {universe: ok}."""
+        result: Dict[str, bool] = {}
+        for universe in universes or ALL_UNIVERSES:
+            try:
+                self.get(universe)
+                result[universe] = True
+            except Exception as e:
+                logger.error(f"[IndexRegistry] ❌ Falló carga de {universe}: {e}")
+                result[universe] = False
+        return result
+
+    def loaded_universes(self) -> List[str]:
+        return list(self._handles.keys())
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Estado por universo (para /admin/indexes)."""
+        rows = []
+        for universe, h in list(self._handles.items()):
+            rows.append({
+                "universe": universe,
+                "generation": h.generation,
+                "vectors": h.ntotal,
+                "dim": h.dim,
+                "meta_rows": len(h.ids) if h.ids is not None else len(h.meta),
+                "load_seconds": round(h.load_seconds, 3),
+                "loaded_at": datetime.fromtimestamp(h.loaded_at).isoformat(timespec="seconds"),
+                "index_path": h.index_path,
+                "meta_path": h.meta_path,
+                "pending_change": universe in self._pending,
+                "last_reload_error": self._last_errors.get(universe),
+            })
+        return rows
+
+
+_registries: Dict[str, IndexRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_index_registry(data_dir: str = DEFAULT_DATA_DIR) -> IndexRegistry:
+    """Obtiene el registro (singleton por data_dir) del proceso."""
+    registry = _registries.get(data_dir)
+    if registry is None:
+        with _registries_lock:
+            registry = _registries.get(data_dir)
+            if registry is None:
+                registry = IndexRegistry(data_dir)
+                _registries[data_dir] = registry
+    return registry
+
+
+def get_index_handle(universe: str, data_dir: str = DEFAULT_DATA_DIR, base_name: Optional[str] = None) -> IndexHandle:
+    """Atajo: handle residente de un universo."""
+    return get_index_registry(data_dir).get(universe, base_name)
@@ -0,0 +1,130 @@
+"""
+Búsqueda multi-universo - Embebe la consulta una sola vez y busca en varios universos en paralelo.
+Backend de tool_search_knowledge (v2_internal/tool_description/implementations.py):
+- tickets: search_tickets_semantic_by_vector (similitud 0-1)
+- etiquetas / quotes: search_*_by_vector (umbral 0.80)
+- docs_org / user_guides / meetings_weekly: search_docs_by_vector (meetings con umbral 0.6)
+"""
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from Tools.search_tickets import generate_openai_embedding, search_tickets_semantic_by_vector
+from Tools.search_docs import search_docs_by_vector
+from Tools.search_etiquetas import search_etiquetas_by_vector
+from Tools.search_quotes import search_quotes_by_vector
+
+logger = logging.getLogger(__name__)
+
+DOC_UNIVERSES = ("docs_org", "user_guides", "meetings_weekly")
+ALL_SEARCH_UNIVERSES = ("tickets", "etiquetas", "quotes") + DOC_UNIVERSES
+
+# FAISS libera el GIL durante search(), así que un pool de hilos sí paraleliza
+MULTI_SEARCH_WORKERS = int(os.getenv("MULTI_SEARCH_WORKERS", str(len(ALL_SEARCH_UNIVERSES))))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MULTI_SEARCH_WORKERS, thread_name_prefix="multi-search")
+    return _executor
+
+
+def _search_tickets(vec: np.ndarray, universe: str, top_k: int, query: str) -> Dict[str, Any]:
+    hits = search_tickets_semantic_by_vector(vec, top_k=top_k)
+    return {"ok": True, "universe": universe, "query": query, "hits": hits}
+
+
+def _search_etiquetas(vec: np.ndarray, universe: str, top_k: int, query: str) -> Dict[str, Any]:
+    return search_etiquetas_by_vector(vec, top_k=top_k, universe=universe, query=query)
+
+
+def _search_quotes(vec: np.ndarray, universe: str, top_k: int, query: str) -> Dict[str, Any]:
+    return search_quotes_by_vector(vec, top_k=top_k, universe=universe, query=query)
+
+
+def _search_docs(vec: np.ndarray, universe: str, top_k: int, query: str) -> Dict[str, Any]:
+    return search_docs_by_vector(vec, universe=universe, top_k=top_k, query=query)
+
+
+def _searcher_for(universe: str) -> Callable[[np.ndarray, str, int, str], Dict[str, Any]]:
+    if universe == "tickets":
+        return _search_tickets
+    if universe == "etiquetas":
+        return _search_etiquetas
+    if universe in ("quotes", "cotizaciones"):
+        return _search_quotes
+    # Cualquier otro universo se trata como universo de documentos (misma regla que search_docs)
+    return _search_docs
+
+
+def _run_one(vec: np.ndarray, universe: str, top_k: int, query: str) -> Dict[str, Any]:
+    searcher = _searcher_for(universe)
+    target = "quotes" if universe == "cotizaciones" else universe
+    try:
+        return searcher(vec, target, top_k, query)
+    except Exception as e:
+        logger.error(f"[MultiSearch] ❌ Error buscando en {universe}: {e}")
+        return {"ok": False, "universe": universe, "error": str(e)}
+
+
+def multi_search(
+    query: str,
+    universes: Optional[List[str]] = None,
+    top_k: int = 5,
+    conversation_id: str = "multi_search",
+) -> Dict[str, Any]:
+    """
+    Busca la misma consulta en varios universos con un solo embedding.
+
+    Cada universo conserva su lógica actual (umbrales 0.6 meetings_weekly, 0.80 etiquetas/quotes,
+    similitud 0-1 en tickets); las búsquedas FAISS corren en paralelo sobre un pool de hilos.
+
+    Args:
+        query: Texto de búsqueda
+        universes: Universos a consultar (default: todos). Acepta "tickets", "etiquetas",
+                   "quotes"/"cotizaciones" y cualquier universo de documentos.
+        top_k: Resultados por universo
+        conversation_id: ID de conversación (para logging del embedding)
+
+    Returns:
+        Dict con formato:
+        {
+            "ok": True/False,
+            "query": str,
+            "results": {
+                "<universe>": {"ok": True, "hits": [...]} | {"ok": False, "error": str},
+                ...
+            }
+        }
+    """
+    universes = list(dict.fromkeys(universes or ALL_SEARCH_UNIVERSES))
+    if not universes:
+        return {"ok": True, "query": query, "results": {}}
+
+    vec = generate_openai_embedding(query, conversation_id=conversation_id, interaction_id=None)
+    if vec is None:
+        return {
+            "ok": False,
+            "query": query,
+            "error": "embedding_failed",
+            "results": {u: {"ok": False, "universe": u, "error": "embedding_failed"} for u in universes},
+        }
+
+    if len(universes) == 1:
+        results = {universes[0]: _run_one(vec, universes[0], top_k, query)}
+    else:
+        executor = _get_executor()
+        futures = {u: executor.submit(_run_one, vec, u, top_k, query) for u in universes}
+        results = {u: f.result() for u, f in futures.items()}
+
+    return {"ok": True, "query": query, "results": results}
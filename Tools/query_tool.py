@@ -4,9 +4,9 @@ from utils.llm_provider import chat_completion
 import os
 import json
 import logging
-import requests
 from dotenv import load_dotenv
 
+from Tools.zell_client import zell_get
 from utils.logs import log_ai_call
 # TODO: Comentado temporalmente - trabajar en Postgres después
 # from utils.logs import log_ai_call_postgres
@@ -132,18 +132,16 @@ async def generate_sql_query(user_question, conversation_id, interaction_id):
         return None
 
 # ─────────────────────────────────────────────
+# Las consultas SQL (acción 7777) pueden tardar más que un ticket individual
+ZELL_QUERY_TIMEOUT = float(os.getenv("ZELL_QUERY_TIMEOUT", "60"))
+
+
 def fetch_query_results(sql_query):
-    api_url = f"https://tickets.zell.mx/apilink/info?query={sql_query}"
-    headers = {
-        "x-api-key": os.getenv("ZELL_API_KEY"),
-        "user":      os.getenv("ZELL_USER"),
-        "password":  os.getenv("ZELL_PASSWORD"),
-        "action":    "7777"
-    }
+    action = "7777"
     try:
-        r = requests.get(api_url, headers=headers)
+        r = zell_get(action, f"query={sql_query}", timeout=ZELL_QUERY_TIMEOUT)
         r.raise_for_status()
-        return r.json(), r.status_code, {}, headers["action"]
+        return r.json(), r.status_code, {}, action
     except Exception as e:
         logging.error(f"❌ Zell API error: {e}")
-        return None, 500, {}, headers["action"]
+        return None, 500, {}, action
@@ -2,12 +2,9 @@
 # Indexador de cotizaciones: construye FAISS index + metadata JSONL desde Excel
 
 import os
-import json
+import time
 import pandas as pd
-from typing import List, Dict, Any, Optional
-
-import numpy as np
-import faiss
+from typing import List, Dict, Any
 
 from .config import (
     UNIVERSE_NAME,
@@ -21,52 +18,96 @@ from .config import (
     EXCEL_HEADER_ROW,
 )
 from .models import QuoteChunk
+from Tools.docs_indexer.excel_columns import str_values, int_values, float_values, date_values
+from Tools.docs_indexer.table_sync import keyed_meta_rows, sync_table_index
+from Tools.docs_indexer.utils import fingerprint_text
 from .embeddings import (
     load_emb_cache,
-    embed_text_cached,
+    embed_texts_cached,
     get_emb_cache_path
 )
 
 
-def _build_text_for_embedding(row: pd.Series) -> Optional[str]:
+def _build_chunks(df: pd.DataFrame, universe: str) -> List[QuoteChunk]:
     """
-    Construye el texto combinado para embedding.
-    Formato: "vTitle + Descriptions" (solo concatena Descriptions si no es NULL)
+    Convierte las filas del Excel en QuoteChunk con operaciones por columna (sin iterrows).
+    Texto para embedding: "vTitle + Descriptions" (solo concatena Descriptions si no es NULL);
+    las filas sin título ni descripciones se omiten.
     """
-    v_title = str(row[COL_TITLE]).strip() if pd.notna(row[COL_TITLE]) else ""
-    descriptions = str(row[COL_DESCRIPTIONS]).strip() if pd.notna(row[COL_DESCRIPTIONS]) else ""
-    
-    # Validar que al menos tengamos título o descripciones
-    if not v_title and not descriptions:
-        return None
-    
-    # Construir texto: solo concatena Descriptions si existe (no es NULL)
-    parts = []
-    if v_title:
-        parts.append(v_title)
-    if descriptions:  # Solo se agrega si Descriptions no es NULL/vacío
-        parts.append(descriptions)
-    
-    text = " ".join(parts)
-    
-    return text if text.strip() else None
+    v_title = str_values(df, COL_TITLE)
+    descriptions = str_values(df, COL_DESCRIPTIONS)
+
+    # Construir texto: las partes vacías no dejan separador
+    text = (v_title.fillna("") + " " + descriptions.fillna("")).str.strip()
+    keep = (text != "").to_numpy(dtype=bool)
+
+    i_issue_id = int_values(df, COL_ISSUE_ID)
+    i_quote_id = int_values(df, COL_QUOTE_ID)
+    i_units = float_values(df, COL_UNITS)
+    f_payment_date = date_values(df, COL_PAYMENT_DATE)
+
+    # Solo la construcción de los QuoteChunk recorre filas (sobre listas nativas, no Series)
+    chunks: List[QuoteChunk] = []
+    for keep_row, idx, issue_id, quote_id, units, payment_date, title, desc, txt in zip(
+        keep.tolist(), df.index.tolist(), i_issue_id, i_quote_id, i_units, f_payment_date,
+        v_title.tolist(), descriptions.tolist(), text.tolist(),
+    ):
+        if not keep_row:
+            continue  # Saltar filas sin texto válido
+        chunks.append(QuoteChunk(
+            chunk_id=f"quote_{issue_id}" if issue_id else f"quote_row_{idx}",
+            universe=universe,
+            i_issue_id=issue_id,
+            i_quote_id=quote_id,
+            v_title=title,
+            i_units=units,
+            f_payment_date=payment_date,
+            descriptions=desc,
+            text=txt,
+        ))
+    return chunks
+
+
+def _row_key(c: QuoteChunk) -> str:
+    """Llave estable de la fila: iIssueId + iQuoteId (un ticket puede tener varias cotizaciones)."""
+    if c.i_issue_id is None and c.i_quote_id is None:
+        return f"text:{fingerprint_text(c.text)}"
+    return f"{c.i_issue_id}:{c.i_quote_id}"
+
+
+def _meta_row(c: QuoteChunk) -> Dict[str, Any]:
+    return {
+        "chunk_id": c.chunk_id,
+        "universe": c.universe,
+        "i_issue_id": c.i_issue_id,
+        "i_quote_id": c.i_quote_id,
+        "v_title": c.v_title,
+        "i_units": c.i_units,
+        "f_payment_date": c.f_payment_date,
+        "descriptions": c.descriptions,
+        "text": c.text,  # Texto usado para embedding (para referencia)
+    }
 
 
 def build_quotes_index(
     excel_path: str = DEFAULT_EXCEL_PATH,
     out_dir: str = "Data",
     universe: str = UNIVERSE_NAME,
+    full_rebuild: bool = False,
 ) -> Dict[str, Any]:
     """
-    Construye índice FAISS (IndexFlatIP) + metadatos JSONL para cotizaciones desde Excel.
+    Construye o actualiza el índice FAISS (IndexIDMap2 sobre IndexFlatIP) + metadatos JSONL
+    para cotizaciones desde Excel. Solo se embeben y re-escriben las filas agregadas o cambiadas
+    respecto a la corrida anterior; las que ya no están en el Excel se eliminan del índice.
     
     Args:
         excel_path: Ruta al archivo Excel con las cotizaciones
         out_dir: Directorio donde guardar el índice y metadata
         universe: Nombre del universo (default: "quotes")
+        full_rebuild: Ignora el índice anterior y lo reconstruye con todas las filas
     
     Returns:
-        Dict con estadísticas del proceso
+        Dict con estadísticas del proceso (rows_added / rows_changed / rows_removed / rows_unchanged)
     """
     os.makedirs(out_dir, exist_ok=True)
     
@@ -77,6 +118,7 @@ def build_quotes_index(
     emb_cache = load_emb_cache(out_dir, universe)
     
     # 1) Leer Excel
+    t0 = time.perf_counter()
     try:
         df = pd.read_excel(excel_path, header=EXCEL_HEADER_ROW)
     except Exception as e:
@@ -88,155 +130,50 @@ def build_quotes_index(
     if missing_cols:
         return {"ok": False, "error": f"Faltan columnas en Excel: {missing_cols}"}
     
-    # 2) Crear chunks (una cotización = un chunk)
-    chunks: List[QuoteChunk] = []
+    parse_s = time.perf_counter() - t0
     
-    for idx, row in df.iterrows():
-        # Construir texto para embedding
-        text = _build_text_for_embedding(row)
-        if not text:
-            continue  # Saltar filas sin texto válido
-        
-        # Extraer valores
-        i_issue_id = None
-        if pd.notna(row[COL_ISSUE_ID]):
-            try:
-                i_issue_id = int(float(row[COL_ISSUE_ID]))
-            except (ValueError, TypeError):
-                pass
-        
-        chunk_id = f"quote_{i_issue_id}" if i_issue_id else f"quote_row_{idx}"
-        
-        # Extraer iQuoteId
-        i_quote_id = None
-        if pd.notna(row[COL_QUOTE_ID]):
-            try:
-                i_quote_id = int(float(row[COL_QUOTE_ID]))
-            except (ValueError, TypeError):
-                pass
-        
-        # Extraer iUnits
-        i_units = None
-        if pd.notna(row[COL_UNITS]):
-            try:
-                i_units = float(row[COL_UNITS])
-            except (ValueError, TypeError):
-                pass
-        
-        # Extraer fPaymentDate (manejar NULL)
-        f_payment_date = None
-        if pd.notna(row[COL_PAYMENT_DATE]):
-            # Convertir fecha a string en formato ISO
-            try:
-                if isinstance(row[COL_PAYMENT_DATE], pd.Timestamp):
-                    f_payment_date = row[COL_PAYMENT_DATE].strftime("%Y-%m-%d")
-                elif isinstance(row[COL_PAYMENT_DATE], str):
-                    f_payment_date = row[COL_PAYMENT_DATE]
-                else:
-                    # Intentar parsear como datetime
-                    f_payment_date = str(row[COL_PAYMENT_DATE])
-            except Exception:
-                f_payment_date = str(row[COL_PAYMENT_DATE]) if pd.notna(row[COL_PAYMENT_DATE]) else None
-        
-        # Extraer vTitle y Descriptions para metadata
-        v_title = str(row[COL_TITLE]).strip() if pd.notna(row[COL_TITLE]) else None
-        descriptions = str(row[COL_DESCRIPTIONS]).strip() if pd.notna(row[COL_DESCRIPTIONS]) else None
-        
-        chunks.append(QuoteChunk(
-            chunk_id=chunk_id,
-            universe=universe,
-            i_issue_id=i_issue_id,
-            i_quote_id=i_quote_id,
-            v_title=v_title,
-            i_units=i_units,
-            f_payment_date=f_payment_date,
-            descriptions=descriptions,
-            text=text,
-        ))
+    # 2) Crear chunks (una cotización = un chunk)
+    chunks = _build_chunks(df, universe)
     
     if not chunks:
         return {"ok": False, "error": "No se generaron chunks válidos del Excel"}
     
-    # 3) Embeddings por chunk (con cache)
-    vectors: List[np.ndarray] = []
-    meta_rows: List[QuoteChunk] = []
-    
-    for c in chunks:
-        v = embed_text_cached(
-            text=c.text,
-            chunk_id=c.chunk_id,
-            universe=universe,
-            out_dir=out_dir,
-            cache=emb_cache
-        )
-        if v is None:
-            continue
-        vectors.append(v.astype(np.float32))
-        meta_rows.append(c)
-    
-    if not vectors:
-        return {"ok": False, "error": "No se generaron embeddings (revisa OPENAI key/config)"}
-    
-    mat = np.vstack(vectors).astype(np.float32)
-    dim = mat.shape[1]
-    
-    # 4) Índice FAISS (IP sobre vectores normalizados ~= cosine)
-    idx_path = os.path.join(out_dir, f"{universe}.index")
-    meta_path = os.path.join(out_dir, f"{universe}_meta.jsonl")
-    
-    # Cargar índice existente si existe (para actualización incremental)
-    existing_index = None
-    if os.path.exists(idx_path):
-        try:
-            existing_index = faiss.read_index(idx_path)
-            if existing_index.d != dim:
-                # Dimensiones no coinciden, crear nuevo índice
-                existing_index = None
-        except Exception:
-            existing_index = None
-    
-    if existing_index is not None:
-        # Agregar nuevos vectores al índice existente
-        index = existing_index
-        index.add(mat)
-    else:
-        # Crear nuevo índice
-        index = faiss.IndexFlatIP(dim)
-        index.add(mat)
-    
-    # 5) Persistir
-    faiss.write_index(index, idx_path)
-    
-    # Guardar metadatos: append si hay existentes, write si es nuevo
-    mode = "a" if existing_index is not None and os.path.exists(meta_path) else "w"
-    with open(meta_path, mode, encoding="utf-8") as f:
-        for c in meta_rows:
-            f.write(json.dumps({
-                "chunk_id": c.chunk_id,
-                "universe": c.universe,
-                "i_issue_id": c.i_issue_id,
-                "i_quote_id": c.i_quote_id,
-                "v_title": c.v_title,
-                "i_units": c.i_units,
-                "f_payment_date": c.f_payment_date,
-                "descriptions": c.descriptions,
-                "text": c.text,  # Texto usado para embedding (para referencia)
-            }, ensure_ascii=False) + "\n")
-    
+    # 3) Diff por fila contra la metadata anterior (llave iIssueId/iQuoteId + fingerprint del texto)
+    #    Solo las agregadas/cambiadas se embeben (con cache; faltantes en lotes multi-input)
+    meta_rows = keyed_meta_rows(
+        universe,
+        [_meta_row(c) for c in chunks],
+        [_row_key(c) for c in chunks],
+    )
+    chunk_s = time.perf_counter() - t0 - parse_s
+    sync = sync_table_index(
+        universe,
+        out_dir,
+        meta_rows,
+        embed_fn=lambda items: embed_texts_cached(items, universe=universe, out_dir=out_dir, cache=emb_cache),
+        full_rebuild=full_rebuild,
+    )
+    if sync.get("index") is None:
+        return {**sync, "ok": False, "excel_path": excel_path}
+
+    index = sync.pop("index")
+    rows = sync.pop("rows")
+
     # Estadísticas
-    unique_quotes = len(set([c.i_issue_id for c in meta_rows if c.i_issue_id is not None]))
+    unique_quotes = len(set([r["i_issue_id"] for r in rows if r.get("i_issue_id") is not None]))
     
+    # Referencias del universo en el store global de embeddings (para GC / reporte de dedup)
+    emb_refs = emb_cache.update_refs(sync["meta_path"])
+
     return {
-        "ok": True,
+        **sync,
         "universe": universe,
         "excel_path": excel_path,
-        "chunks_total": len(meta_rows),
-        "chunks_indexed": index.ntotal if index else len(meta_rows),
-        "dim": dim,
-        "index_path": idx_path,
-        "meta_path": meta_path,
+        "chunks_total": len(rows),
+        "chunks_indexed": index.ntotal,
+        "dim": index.d,
+        "stage_seconds": {"parse": round(parse_s, 3), "chunk": round(chunk_s, 3), **sync["stage_seconds"]},
         "emb_cache_path": get_emb_cache_path(out_dir, universe),
+        "emb_cache": {**emb_cache.run_stats(), "unique_texts": len(emb_refs)},
         "unique_quotes": unique_quotes,
-        "incremental_update": existing_index is not None,
     }
-
@@ -4,13 +4,11 @@ Complementa a get_docs.py:
 - search_docs.py: Buscar documentos (búsqueda semántica con FAISS)
 - get_docs.py: Obtener contexto completo de documentos (chunks con texto completo)
 """
-import os
-import json
 from typing import List, Dict, Any, Tuple
 
 import numpy as np
-import faiss
 
+from Tools.index_registry import get_index_handle
 from Tools.search_tickets import generate_openai_embedding
 
 
@@ -22,47 +20,20 @@ def _normalize(v: np.ndarray) -> np.ndarray:
     return v / n
 
 
-def _load_meta(meta_path: str) -> List[Dict[str, Any]]:
-    """Carga metadata de documentos desde archivo JSONL."""
-    rows = []
-    with open(meta_path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            rows.append(json.loads(line))
-    return rows
-
-
 def _load_index_and_meta(universe: str, data_dir: str = "Data") -> Tuple[Any, List[Dict[str, Any]]]:
     """
-    Carga el índice FAISS y la metadata para un universo de documentos.
-    
+    Obtiene el índice FAISS y la metadata (residentes) para un universo de documentos.
+    La carga real ocurre una sola vez por proceso en Tools/index_registry.py.
+
     Args:
         universe: Nombre del universo (ej: "docs_org", "docs_iso", "user_guides")
         data_dir: Directorio donde están los archivos de índice y metadata
-    
+
     Returns:
-        Tupla (index, meta) donde index es el índice FAISS y meta es la lista de metadata
+        Tupla (index, meta) donde index es el índice FAISS y meta es la secuencia de metadata (solo lectura)
     """
-    # Si el universo ya tiene prefijo conocido, no agregar el prefijo "docs_"
-    # Esto permite usar "docs_org", "user_guides", etc. directamente
-    if universe.startswith("docs_") or universe.startswith("user_"):
-        index_name = universe
-    else:
-        index_name = f"docs_{universe}"
-    
-    idx_path = os.path.join(data_dir, f"{index_name}.index")
-    meta_path = os.path.join(data_dir, f"{index_name}_meta.jsonl")
-
-    if not os.path.exists(idx_path):
-        raise FileNotFoundError(f"No existe index: {idx_path}")
-    if not os.path.exists(meta_path):
-        raise FileNotFoundError(f"No existe meta: {meta_path}")
-
-    index = faiss.read_index(idx_path)
-    meta = _load_meta(meta_path)
-    return index, meta
+    handle = get_index_handle(universe, data_dir)
+    return handle.index, handle.meta
 
 
 def search_docs(query: str, universe: str, top_k: int = 5) -> Dict[str, Any]:
@@ -112,13 +83,30 @@ def search_docs(query: str, universe: str, top_k: int = 5) -> Dict[str, Any]:
             ]
         }
     """
-    index, meta = _load_index_and_meta(universe)
+    # Falla rápido si el universo no existe (antes de pagar el embedding)
+    _load_index_and_meta(universe)
 
     emb = generate_openai_embedding(query, conversation_id=f"docs_search:{universe}", interaction_id=None)
     if emb is None:
         return {"ok": False, "error": "embedding_failed"}
 
-    q = _normalize(np.array(emb, dtype=np.float32)).reshape(1, -1)
+    return search_docs_by_vector(emb, universe=universe, top_k=top_k, query=query)
+
+
+def search_docs_by_vector(query_vec: np.ndarray, universe: str, top_k: int = 5, query: str = "") -> Dict[str, Any]:
+    """
+    Igual que search_docs pero con el embedding de la consulta ya calculado
+    (lo usa Tools/multi_search.py para embeber una sola vez y buscar en varios universos).
+
+    Args:
+        query_vec: Embedding de la consulta (1, d) o (d,)
+        universe: Nombre del universo
+        top_k: Número de resultados a retornar (máximo antes del filtro de similitud)
+        query: Texto original (solo se regresa en la respuesta)
+    """
+    index, meta = _load_index_and_meta(universe)
+
+    q = _normalize(np.array(query_vec, dtype=np.float32)).reshape(1, -1)
     scores, ids = index.search(q, top_k)
 
     # Umbral de similitud para meetings_weekly: solo retornar resultados relevantes (score >= 0.6)
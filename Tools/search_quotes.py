@@ -2,13 +2,11 @@
 Buscar cotizaciones - Búsqueda semántica de cotizaciones del sistema ZELL.
 Similar a search_etiquetas.py pero específico para cotizaciones (quotes).
 """
-import os
-import json
 from typing import List, Dict, Any, Tuple
 
 import numpy as np
-import faiss
 
+from Tools.index_registry import get_index_handle
 from Tools.search_tickets import generate_openai_embedding
 
 
@@ -20,21 +18,10 @@ def _normalize(v: np.ndarray) -> np.ndarray:
     return v / n
 
 
-def _load_meta(meta_path: str) -> List[Dict[str, Any]]:
-    """Carga metadata de cotizaciones desde archivo JSONL."""
-    rows = []
-    with open(meta_path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            rows.append(json.loads(line))
-    return rows
-
-
 def _load_index_and_meta(universe: str = "quotes", data_dir: str = "Data") -> Tuple[Any, List[Dict[str, Any]]]:
     """
-    Carga el índice FAISS y la metadata para cotizaciones.
+    Obtiene el índice FAISS y la metadata (residentes) para cotizaciones.
+    La carga real ocurre una sola vez por proceso en Tools/index_registry.py.
     
     Args:
         universe: Nombre del universo (default: "quotes")
@@ -43,17 +30,8 @@ def _load_index_and_meta(universe: str = "quotes", data_dir: str = "Data") -> Tu
     Returns:
         Tupla (index, meta) donde index es el índice FAISS y meta es la lista de metadata
     """
-    idx_path = os.path.join(data_dir, f"{universe}.index")
-    meta_path = os.path.join(data_dir, f"{universe}_meta.jsonl")
-
-    if not os.path.exists(idx_path):
-        raise FileNotFoundError(f"No existe index: {idx_path}")
-    if not os.path.exists(meta_path):
-        raise FileNotFoundError(f"No existe meta: {meta_path}")
-
-    index = faiss.read_index(idx_path)
-    meta = _load_meta(meta_path)
-    return index, meta
+    handle = get_index_handle(universe, data_dir, base_name=universe)
+    return handle.index, handle.meta
 
 
 def search_quotes(query: str, top_k: int = 5, universe: str = "quotes", similarity_threshold: float = 0.80) -> Dict[str, Any]:
@@ -90,8 +68,9 @@ def search_quotes(query: str, top_k: int = 5, universe: str = "quotes", similari
             ]
         }
     """
+    # Falla rápido si el universo no existe (antes de pagar el embedding)
     try:
-        index, meta = _load_index_and_meta(universe)
+        _load_index_and_meta(universe)
     except FileNotFoundError as e:
         return {"ok": False, "error": str(e)}
 
@@ -99,7 +78,26 @@ def search_quotes(query: str, top_k: int = 5, universe: str = "quotes", similari
     if emb is None:
         return {"ok": False, "error": "embedding_failed"}
 
-    q = _normalize(np.array(emb, dtype=np.float32)).reshape(1, -1)
+    return search_quotes_by_vector(emb, top_k=top_k, universe=universe, similarity_threshold=similarity_threshold, query=query)
+
+
+def search_quotes_by_vector(
+    query_vec: np.ndarray,
+    top_k: int = 5,
+    universe: str = "quotes",
+    similarity_threshold: float = 0.80,
+    query: str = ""
+) -> Dict[str, Any]:
+    """
+    Igual que search_quotes pero con el embedding de la consulta ya calculado
+    (lo usa Tools/multi_search.py para embeber una sola vez y buscar en varios universos).
+    """
+    try:
+        index, meta = _load_index_and_meta(universe)
+    except FileNotFoundError as e:
+        return {"ok": False, "error": str(e)}
+
+    q = _normalize(np.array(query_vec, dtype=np.float32)).reshape(1, -1)
     # Buscar más resultados inicialmente para luego filtrar por umbral
     search_k = min(top_k * 2, 20)  # Buscar hasta 20 para tener opciones después del filtro
     scores, ids = index.search(q, search_k)
@@ -4,13 +4,15 @@ Incluye funciones de bajo nivel para FAISS y embeddings.
 """
 import os
 import logging
-import requests
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
 import faiss
 import numpy as np
 import openai
 
+from Tools.embedding_cache import get_embedding_cache
+from Tools.index_registry import get_index_handle, TICKETS_UNIVERSE
+from Tools.zell_client import zell_submit
 from utils.debug_logger import log_debug_event
 from utils.logs import log_ai_call
 from dotenv import load_dotenv
@@ -28,6 +30,7 @@ OPENAI_API_KEY_SEMANTIC = (
 )
 FAISS_INDEX_PATH = "Data/faiss_index_ip.bin"
 FAISS_IDS_PATH = "Data/faiss_ids.npy"
+EMBEDDING_MODEL = "text-embedding-ada-002"
 
 # === Globals para FAISS de tickets ===
 faiss_index = None
@@ -41,13 +44,13 @@ def load_faiss_data():
     if faiss_loaded:
         return True
     try:
-        faiss_index = faiss.read_index(FAISS_INDEX_PATH)
-        issue_ids = np.load(FAISS_IDS_PATH).astype("int64")
+        # El índice vive en el registro compartido (Tools/index_registry.py); los globals
+        # se conservan por compatibilidad y apuntan a la primera generación cargada.
+        # perform_faiss_search siempre usa la generación vigente (hot reload).
+        handle = get_index_handle(TICKETS_UNIVERSE)
+        faiss_index = handle.index
+        issue_ids = handle.ids
         faiss_loaded = True
-        if faiss_index.ntotal != len(issue_ids):
-            logger.warning(f"[SearchTickets] ⚠️ Inconsistencia FAISS: index size={faiss_index.ntotal}, ids={len(issue_ids)}")
-        else:
-            logger.info(f"[SearchTickets] ✅ FAISS cargado: {faiss_index.ntotal} vectores, {len(issue_ids)} IDs")
         return True
     except Exception as e:
         logger.error(f"[SearchTickets] ❌ Falló carga FAISS/IDs: {e}")
@@ -71,10 +74,19 @@ def generate_openai_embedding(query: str, conversation_id: str, interaction_id:
     
     Returns:
         Vector normalizado L2 de forma (1, d) o None si hay error
+
+    Usa el cache de embeddings (Tools/embedding_cache.py): la misma consulta normalizada
+    solo llega a OpenAI una vez mientras siga en el cache.
     """
+    cache = get_embedding_cache()
+    cached = cache.get(EMBEDDING_MODEL, query)
+    if cached is not None:
+        log_debug_event("Búsqueda Semántica", conversation_id, interaction_id, "Embedding Cache Hit", {"query": query})
+        return cached
+
     try:
         log_debug_event("Búsqueda Semántica", conversation_id, interaction_id, "Generate Embedding", {"query": query})
-        resp = openai.embeddings.create(model="text-embedding-ada-002", input=query)
+        resp = openai.embeddings.create(model=EMBEDDING_MODEL, input=query)
         
         # Extraer token usage para logging de costos
         # OpenAI embeddings retorna usage con total_tokens y prompt_tokens
@@ -99,7 +111,7 @@ def generate_openai_embedding(query: str, conversation_id: str, interaction_id:
             safe_messages = [{"role": "user", "content": query[:200]}]  # Truncar para logging
             log_ai_call(
                 call_type="Embedding Generation",
-                model="text-embedding-ada-002",
+                model=EMBEDDING_MODEL,
                 provider="openai",
                 messages=safe_messages,
                 response={"status": "success", "dimension": len(resp.data[0].embedding)},
@@ -114,6 +126,7 @@ def generate_openai_embedding(query: str, conversation_id: str, interaction_id:
         
         vec = np.array(resp.data[0].embedding, dtype="float32").reshape(1, -1)
         faiss.normalize_L2(vec)
+        cache.put(EMBEDDING_MODEL, query, vec)
         return vec
     except Exception as e:
         logger.error(f"[SearchTickets] ❌ Error embedding: {e}")
@@ -134,11 +147,12 @@ def perform_faiss_search(vector: np.ndarray, k: int = 10) -> tuple[List[Dict[str
         - results: Lista de dicts con {"ticket_id": int, "score": float} (score es distancia)
         - debug_info: Dict con información de debug
     """
-    if faiss_index is None:
+    if not faiss_loaded:
         logger.error("[SearchTickets] ❌ FAISS index no inicializado. Llama init_semantic_tool() primero.")
         return [], {"error": "FAISS not initialized"}
     
-    distances, indices = faiss_index.search(vector, k)
+    index = get_index_handle(TICKETS_UNIVERSE).index
+    distances, indices = index.search(vector, k)
     results = []
     for i, idx in enumerate(indices[0]):
         if idx == -1:
@@ -152,6 +166,8 @@ logger = logging.getLogger(__name__)
 def search_tickets_by_keywords(keywords: List[str], max_results: int = 3) -> List[Dict[str, Any]]:
     """
     Busca tickets por palabras clave usando SQL LIKE en Título y Descripción.
+    Las consultas de todas las keywords se lanzan a la vez (una request por keyword en vuelo
+    simultáneamente sobre el cliente compartido) en lugar de una tras otra.
     
     Args:
         keywords: Lista de palabras clave a buscar
@@ -160,25 +176,22 @@ def search_tickets_by_keywords(keywords: List[str], max_results: int = 3) -> Lis
     Returns:
         Lista de tickets encontrados (cada uno con IdTicket, Cliente, Titulo, Descripcion)
     """
-    if not keywords:
-        return []
+    return _collect_keyword_results(_submit_keyword_queries(keywords, max_results))
 
-    all_results = []
-    seen_ids = set()
 
-    for kw in keywords:
-        words = kw.split()
-        if not words:
-            continue  # si está vacío, lo saltamos
+def _keyword_sql(kw: str, max_results: int) -> Optional[str]:
+    words = kw.split()
+    if not words:
+        return None  # si está vacío, lo saltamos
 
-        sanitized_words = [w.replace("'", "''") for w in words]
-        like_titulo = " AND ".join([f"Titulo COLLATE Latin1_General_CI_AI LIKE '%{w}%'" for w in sanitized_words])
-        like_desc = " AND ".join([f"Descripcion COLLATE Latin1_General_CI_AI LIKE '%{w}%'" for w in sanitized_words])
-        like_clause = f"(({like_titulo}) OR ({like_desc}))"
+    sanitized_words = [w.replace("'", "''") for w in words]
+    like_titulo = " AND ".join([f"Titulo COLLATE Latin1_General_CI_AI LIKE '%{w}%'" for w in sanitized_words])
+    like_desc = " AND ".join([f"Descripcion COLLATE Latin1_General_CI_AI LIKE '%{w}%'" for w in sanitized_words])
+    like_clause = f"(({like_titulo}) OR ({like_desc}))"
 
-        logger.debug(f"🔍 Ejecutando búsqueda LIKE para keyword '{kw}':\n{like_clause}")
+    logger.debug(f"🔍 Ejecutando búsqueda LIKE para keyword '{kw}':\n{like_clause}")
 
-        sql_query = f"""
+    return f"""
             SELECT TOP {max_results}
                 iError = 0,
                 vError = '',
@@ -192,16 +205,29 @@ def search_tickets_by_keywords(keywords: List[str], max_results: int = 3) -> Lis
             ORDER BY CONVERT(datetime, FechaCreado, 101) DESC
         """
 
-        api_url = f"https://tickets.zell.mx/apilink/info?query={sql_query}"
-        headers = {
-            "x-api-key": os.getenv("ZELL_API_KEY"),
-            "user": os.getenv("ZELL_USER"),
-            "password": os.getenv("ZELL_PASSWORD"),
-            "action": "7777"
-        }
 
+def _submit_keyword_queries(keywords: List[str], max_results: int) -> List[Tuple[str, Any]]:
+    """Lanza (sin esperar) una consulta LIKE por keyword; retorna [(keyword, future)]."""
+    pending = []
+    for kw in keywords or []:
+        sql_query = _keyword_sql(kw, max_results)
+        if sql_query is None:
+            continue
+        try:
+            pending.append((kw, zell_submit("7777", f"query={sql_query}", timeout=10)))
+        except Exception as e:
+            logger.error(f"❌ Error en búsqueda LIKE con keyword '{kw}': {e}")
+    return pending
+
+
+def _collect_keyword_results(pending: List[Tuple[str, Any]]) -> List[Dict[str, Any]]:
+    """Espera las consultas de _submit_keyword_queries y deduplica en el orden de las keywords."""
+    all_results = []
+    seen_ids = set()
+
+    for kw, future in pending:
         try:
-            response = requests.get(api_url, headers=headers, timeout=10)
+            response = future.result()
             response.raise_for_status()
             results = response.json()
 
@@ -257,6 +283,22 @@ def search_tickets_semantic(
             logger.error("No se pudo generar embedding para búsqueda semántica")
             return []
 
+        return search_tickets_semantic_by_vector(vec, top_k=top_k)
+
+    except Exception as e:
+        logger.error(f"❌ Error en búsqueda semántica: {e}")
+        return []
+
+
+def search_tickets_semantic_by_vector(vec: np.ndarray, top_k: int = 10) -> List[Dict[str, Any]]:
+    """
+    Igual que search_tickets_semantic pero con el embedding de la consulta ya calculado
+    (lo usa Tools/multi_search.py para embeber una sola vez y buscar en varios universos).
+    """
+    if not faiss_loaded:
+        load_faiss_data()
+
+    try:
         # Buscar en FAISS
         faiss_results, _dbg = perform_faiss_search(vec, k=top_k)
         if not faiss_results:
@@ -318,7 +360,13 @@ def search_tickets_hybrid(
     words = [w.strip(".,:;!?()[]{}\"'").lower() for w in query.split()]
     words = [w for w in words if len(w) >= 4][:6] or [query]
     
-    keyword_results = search_tickets_by_keywords(words, max_results=keyword_max_per_term)
+    # Las consultas LIKE quedan en vuelo mientras se calcula la búsqueda semántica
+    pending_keywords = _submit_keyword_queries(words, max_results=keyword_max_per_term)
+
+    # 2. Búsqueda semántica (embedding + FAISS) en paralelo con las keywords
+    semantic_results = search_tickets_semantic(query, conversation_id, top_k=top_k)
+
+    keyword_results = _collect_keyword_results(pending_keywords)
     for r in keyword_results:
         tid = r.get("IdTicket") or r.get("ticket_id") or r.get("id")
         if tid is not None:
@@ -329,8 +377,6 @@ def search_tickets_hybrid(
                 "title": r.get("Titulo") or r.get("title") or "",
             })
 
-    # 2. Búsqueda semántica
-    semantic_results = search_tickets_semantic(query, conversation_id, top_k=top_k)
     for r in semantic_results:
         all_hits.append({
             "ticket_id": r.get("ticket_id"),
@@ -23,7 +23,11 @@ def test_exact_search():
     print(f"\nQuery exacto: {exact_text[:80]}...\n")
     
     # 1. Cargar índice y metadata
-    index = faiss.read_index("Data/docs_meetings_weekly.index")
+    stored_index = faiss.read_index("Data/docs_meetings_weekly.index")
+    index = stored_index
+    if isinstance(stored_index, faiss.IndexIDMap2):
+        # Índice con ids estables: buscar en el interno para obtener posiciones (fila del meta)
+        index = faiss.downcast_index(stored_index.index)
     print(f"Índice: {index.ntotal} vectores, dimensión: {index.d}")
     print(f"Tipo métrica: {index.metric_type} (0=Inner Product, 1=L2)")
     
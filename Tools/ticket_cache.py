@@ -0,0 +1,256 @@
+"""
+Cache de detalle de tickets - Evita volver a pedir a la API de Zell el mismo ticket
+en cada get_item / propose_next_steps. Usado por get_tickets.py.
+
+- Clave (acción, ticket): 5001 = datos del ticket, 5002 = comentarios.
+- TTL por acción: corto para comentarios (cambian seguido), más largo para los datos.
+- Stale-while-revalidate: pasado el TTL, durante TICKET_CACHE_STALE_SECONDS se sigue
+  entregando el valor anterior y se refresca en segundo plano (un solo refresh por clave).
+- Tier compartido (opcional): SQLite en TICKET_CACHE_DISK_PATH, visible para todos los workers
+  del mismo host y que sobrevive reinicios.
+- Purga explícita por ticket (POST /admin/ticket-cache/purge).
+"""
+import os
+import copy
+import json
+import time
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# === Config ===
+TICKET_CACHE_MAX_ITEMS = int(os.getenv("TICKET_CACHE_MAX_ITEMS", "1024"))
+TICKET_CACHE_DATA_TTL_SECONDS = float(os.getenv("TICKET_CACHE_DATA_TTL_SECONDS", "600"))
+TICKET_CACHE_COMMENTS_TTL_SECONDS = float(os.getenv("TICKET_CACHE_COMMENTS_TTL_SECONDS", "60"))
+TICKET_CACHE_STALE_SECONDS = float(os.getenv("TICKET_CACHE_STALE_SECONDS", "600"))
+# Vacío = sin tier compartido
+TICKET_CACHE_DISK_PATH = os.getenv("TICKET_CACHE_DISK_PATH", "")
+
+ACTION_TICKET_DATA = "5001"
+ACTION_TICKET_COMMENTS = "5002"
+
+FRESH = "fresh"
+STALE = "stale"
+
+
+class TicketCache:
+    """
+    Cache LRU + TTL por acción de respuestas ya normalizadas de la API de Zell.
+    Thread-safe; los valores se guardan y entregan como copia profunda.
+    """
+
+    def __init__(
+        self,
+        max_items: int = TICKET_CACHE_MAX_ITEMS,
+        ttls: Optional[Dict[str, float]] = None,
+        stale_seconds: float = TICKET_CACHE_STALE_SECONDS,
+        disk_path: str = TICKET_CACHE_DISK_PATH,
+    ):
+        self.max_items = max_items
+        self.ttls = ttls or {
+            ACTION_TICKET_DATA: TICKET_CACHE_DATA_TTL_SECONDS,
+            ACTION_TICKET_COMMENTS: TICKET_CACHE_COMMENTS_TTL_SECONDS,
+        }
+        self.stale_seconds = stale_seconds
+        self.disk_path = disk_path
+        self._items: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing: Set[Tuple[str, str]] = set()
+        self._refresh_pool: Optional[ThreadPoolExecutor] = None
+        self._disk: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+        self.purges = 0
+        if disk_path:
+            self._open_disk(disk_path)
+
+    def _open_disk(self, path: str) -> None:
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ticket_cache ("
+                "action TEXT, ticket TEXT, stored_at REAL, value TEXT, PRIMARY KEY (action, ticket))"
+            )
+            conn.commit()
+            self._disk = conn
+            logger.info(f"[TicketCache] 💾 Tier compartido activo: {path}")
+        except Exception as e:
+            logger.error(f"[TicketCache] ❌ No se pudo abrir cache en disco {path}: {e}")
+            self._disk = None
+
+    def _disk_get(self, key: Tuple[str, str]) -> Optional[Tuple[float, Any]]:
+        if self._disk is None:
+            return None
+        try:
+            row = self._disk.execute(
+                "SELECT stored_at, value FROM ticket_cache WHERE action = ? AND ticket = ?", key
+            ).fetchone()
+        except Exception as e:
+            logger.debug(f"[TicketCache] Error leyendo cache en disco: {e}")
+            return None
+        if row is None:
+            return None
+        return float(row[0]), json.loads(row[1])
+
+    def _disk_put(self, key: Tuple[str, str], stored_at: float, value: Any) -> None:
+        if self._disk is None:
+            return
+        try:
+            self._disk.execute(
+                "INSERT OR REPLACE INTO ticket_cache (action, ticket, stored_at, value) VALUES (?, ?, ?, ?)",
+                (key[0], key[1], stored_at, json.dumps(value, ensure_ascii=False, default=str)),
+            )
+            self._disk.commit()
+        except Exception as e:
+            logger.debug(f"[TicketCache] Error escribiendo cache en disco: {e}")
+
+    def _state(self, action: str, stored_at: float, now: float) -> Optional[str]:
+        age = now - stored_at
+        ttl = self.ttls.get(action, TICKET_CACHE_DATA_TTL_SECONDS)
+        if age <= ttl:
+            return FRESH
+        if age <= ttl + self.stale_seconds:
+            return STALE
+        return None
+
+    def get(self, action: str, ticket: str) -> Tuple[Optional[Any], Optional[str]]:
+        """
+        Returns:
+            (valor, FRESH) | (valor, STALE) si pasó el TTL pero sigue dentro de la ventana stale |
+            (None, None) si no hay entrada utilizable.
+        """
+        key = (str(action), str(ticket))
+        now = time.time()
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                entry = self._disk_get(key)
+                if entry is not None:
+                    self._put_memory(key, entry[0], entry[1])
+                    self.disk_hits += 1
+
+            if entry is not None:
+                stored_at, value = entry
+                state = self._state(key[0], stored_at, now)
+                if state is not None:
+                    self._items.move_to_end(key)
+                    if state == FRESH:
+                        self.hits += 1
+                    else:
+                        self.stale_hits += 1
+                    return copy.deepcopy(value), state
+                self._items.pop(key, None)
+
+            self.misses += 1
+            return None, None
+
+    def put(self, action: str, ticket: str, value: Any) -> None:
+        key = (str(action), str(ticket))
+        now = time.time()
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._put_memory(key, now, value)
+            self._disk_put(key, now, value)
+
+    def _put_memory(self, key: Tuple[str, str], stored_at: float, value: Any) -> None:
+        self._items[key] = (stored_at, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def refresh_in_background(self, action: str, ticket: str, loader: Callable[[], Any]) -> bool:
+        """
+        Lanza loader() en segundo plano para revalidar una entrada stale.
+        Solo un refresh en vuelo por clave; loader es responsable de llamar a put() si sale bien.
+        """
+        key = (str(action), str(ticket))
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            if self._refresh_pool is None:
+                self._refresh_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ticket-cache")
+            pool = self._refresh_pool
+            self.refreshes += 1
+
+        def _run():
+            try:
+                loader()
+            except Exception as e:
+                logger.warning(f"[TicketCache] ⚠️ Error revalidando ticket {ticket} (acción {action}): {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        pool.submit(_run)
+        return True
+
+    def purge(self, ticket: Optional[str] = None) -> int:
+        """Elimina todas las acciones cacheadas de un ticket (o todo el cache si ticket es None)."""
+        with self._lock:
+            if ticket is None:
+                removed = len(self._items)
+                self._items.clear()
+            else:
+                keys = [k for k in self._items if k[1] == str(ticket)]
+                for k in keys:
+                    del self._items[k]
+                removed = len(keys)
+            if self._disk is not None:
+                try:
+                    if ticket is None:
+                        cur = self._disk.execute("DELETE FROM ticket_cache")
+                    else:
+                        cur = self._disk.execute("DELETE FROM ticket_cache WHERE ticket = ?", (str(ticket),))
+                    self._disk.commit()
+                    removed = max(removed, cur.rowcount or 0)
+                except Exception as e:
+                    logger.error(f"[TicketCache] ❌ Error purgando cache en disco: {e}")
+            self.purges += 1
+        logger.info(f"[TicketCache] 🧹 Purga {'total' if ticket is None else f'ticket {ticket}'}: {removed} entradas")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "items": len(self._items),
+                "max_items": self.max_items,
+                "ttl_seconds": dict(self.ttls),
+                "stale_seconds": self.stale_seconds,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "refreshes": self.refreshes,
+                "purges": self.purges,
+                "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+                "disk_path": self.disk_path if self._disk is not None else None,
+            }
+
+
+_ticket_cache: Optional[TicketCache] = None
+_ticket_cache_lock = threading.Lock()
+
+
+def get_ticket_cache() -> TicketCache:
+    """Cache de tickets del proceso (singleton)."""
+    global _ticket_cache
+    if _ticket_cache is None:
+        with _ticket_cache_lock:
+            if _ticket_cache is None:
+                _ticket_cache = TicketCache()
+    return _ticket_cache
@@ -0,0 +1,346 @@
+"""
+Cliente HTTP compartido para la API de Zell (tickets.zell.mx/apilink/info).
+Usado por get_tickets.py (acciones 5001/5002), search_tickets.search_tickets_by_keywords
+y query_tool.fetch_query_results (acción 7777).
+
+- Un solo httpx.AsyncClient por proceso: keep-alive, pool de conexiones acotado, HTTP/2 si
+  está instalado `h2`. Vive en un event loop propio (hilo daemon), así que sirve igual a las
+  tools síncronas que corren en el pool de v2_internal/executor.py y a código async.
+- Reintentos con backoff exponencial + jitter ante errores de red, 429 y 5xx.
+- Circuit breaker: tras ZELL_BREAKER_FAILURES fallos seguidos deja de llamar a la API durante
+  ZELL_BREAKER_COOLDOWN_SECONDS y falla rápido con ZellCircuitOpenError.
+
+ZELL_API_URL permite apuntar a un servidor local de prueba.
+"""
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# === Config ===
+ZELL_API_URL = os.getenv("ZELL_API_URL", "https://tickets.zell.mx/apilink/info")
+ZELL_HTTP_TIMEOUT = float(os.getenv("ZELL_HTTP_TIMEOUT", "30"))
+ZELL_HTTP_CONNECT_TIMEOUT = float(os.getenv("ZELL_HTTP_CONNECT_TIMEOUT", "5"))
+ZELL_HTTP_MAX_CONNECTIONS = int(os.getenv("ZELL_HTTP_MAX_CONNECTIONS", "20"))
+ZELL_HTTP_MAX_KEEPALIVE = int(os.getenv("ZELL_HTTP_MAX_KEEPALIVE", "10"))
+ZELL_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("ZELL_HTTP_KEEPALIVE_EXPIRY", "30"))
+ZELL_HTTP2 = os.getenv("ZELL_HTTP2", "1") == "1"
+ZELL_HTTP_RETRIES = int(os.getenv("ZELL_HTTP_RETRIES", "2"))
+ZELL_HTTP_BACKOFF_BASE = float(os.getenv("ZELL_HTTP_BACKOFF_BASE", "0.3"))
+ZELL_HTTP_BACKOFF_MAX = float(os.getenv("ZELL_HTTP_BACKOFF_MAX", "3"))
+ZELL_BREAKER_FAILURES = int(os.getenv("ZELL_BREAKER_FAILURES", "5"))
+ZELL_BREAKER_COOLDOWN_SECONDS = float(os.getenv("ZELL_BREAKER_COOLDOWN_SECONDS", "30"))
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class ZellCircuitOpenError(Exception):
+    """La API de Zell falló repetidamente; no se intenta la llamada hasta que pase el cooldown."""
+
+
+def zell_headers(action: str) -> Dict[str, str]:
+    """Headers de autenticación de la API de Zell para una acción (5001, 5002, 7777...)."""
+    return {
+        "x-api-key": os.getenv("ZELL_API_KEY", ""),
+        "user": os.getenv("ZELL_USER", ""),
+        "password": os.getenv("ZELL_PASSWORD", ""),
+        "action": str(action),
+    }
+
+
+def zell_url(query_string: str) -> str:
+    """URL completa de apilink/info con el query string dado (p. ej. 'source=1&sourceid=123')."""
+    return f"{ZELL_API_URL}?{query_string}"
+
+
+def _http2_available() -> bool:
+    if not ZELL_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class CircuitBreaker:
+    """
+    Breaker simple de tres estados:
+    - closed: llamadas normales; cuenta fallos consecutivos.
+    - open: falla rápido hasta que pasa el cooldown.
+    - half_open: deja pasar una sola llamada de prueba; si sale bien vuelve a closed.
+    """
+
+    def __init__(self, failure_threshold: int = ZELL_BREAKER_FAILURES, cooldown_seconds: float = ZELL_BREAKER_COOLDOWN_SECONDS):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_seconds = cooldown_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state_locked()
+
+    def _state_locked(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.cooldown_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state_locked()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("[ZellClient] ✅ Circuit breaker cerrado, la API de Zell responde de nuevo")
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            half_open_probe = self._probe_in_flight
+            self._probe_in_flight = False
+            if half_open_probe or self._failures >= self.failure_threshold:
+                if self._opened_at is None or half_open_probe:
+                    self.times_opened += 1
+                    logger.error(
+                        f"[ZellClient] 🛑 Circuit breaker abierto tras {self._failures} fallos; "
+                        f"reintento en {self.cooldown_seconds:.0f}s"
+                    )
+                self._opened_at = time.monotonic()
+
+    def release_probe(self) -> None:
+        """Libera la llamada de prueba sin contarla (se canceló antes de saber si la API responde)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._state_locked(),
+                "consecutive_failures": self._failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+
+class ZellClient:
+    """
+    Dueño del httpx.AsyncClient compartido y del event loop en el que vive.
+    Usar get_zell_client(); las funciones zell_get / zell_get_async son el punto de entrada normal.
+    """
+
+    def __init__(self):
+        self.breaker = CircuitBreaker()
+        self.http2 = _http2_available()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    # --- ciclo de vida ---
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None:
+            return self._loop
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def _run():
+                    asyncio.set_event_loop(loop)
+                    self._client = httpx.AsyncClient(
+                        timeout=httpx.Timeout(ZELL_HTTP_TIMEOUT, connect=ZELL_HTTP_CONNECT_TIMEOUT),
+                        limits=httpx.Limits(
+                            max_connections=ZELL_HTTP_MAX_CONNECTIONS,
+                            max_keepalive_connections=ZELL_HTTP_MAX_KEEPALIVE,
+                            keepalive_expiry=ZELL_HTTP_KEEPALIVE_EXPIRY,
+                        ),
+                        http2=self.http2,
+                    )
+                    ready.set()
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=_run, name="zell-http", daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+                logger.info(
+                    f"[ZellClient] 🔌 Cliente HTTP compartido listo "
+                    f"(http2={self.http2}, max_connections={ZELL_HTTP_MAX_CONNECTIONS})"
+                )
+        return self._loop
+
+    def close(self) -> None:
+        """Cierra el AsyncClient y detiene su loop (shutdown de la app)."""
+        with self._lock:
+            loop, client = self._loop, self._client
+            self._loop, self._client, thread = None, None, self._thread
+            self._thread = None
+        if loop is None:
+            return
+        try:
+            if client is not None:
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(timeout=5)
+        except Exception as e:
+            logger.warning(f"[ZellClient] ⚠️ Error cerrando cliente HTTP: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout=5)
+        logger.info("[ZellClient] 🔌 Cliente HTTP cerrado")
+
+    # --- requests ---
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniforme entre 0 y base * 2^attempt (acotado)
+        return random.uniform(0, min(ZELL_HTTP_BACKOFF_MAX, ZELL_HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+    async def _get(self, url: str, headers: Dict[str, str], timeout: Optional[float]) -> httpx.Response:
+        if not self.breaker.allow():
+            raise ZellCircuitOpenError("La API de Zell no está disponible por ahora (circuit breaker abierto).")
+
+        self.requests += 1
+        kwargs: Dict[str, Any] = {"headers": headers}
+        if timeout is not None:
+            kwargs["timeout"] = httpx.Timeout(timeout, connect=min(timeout, ZELL_HTTP_CONNECT_TIMEOUT))
+
+        # Toda salida registra el resultado en el breaker: si no, una llamada de prueba (half_open)
+        # cancelada o con un error inesperado lo dejaría abierto para siempre
+        recorded = False
+        try:
+            attempt = 0
+            while True:
+                try:
+                    response = await self._client.get(url, **kwargs)
+                    if response.status_code in RETRY_STATUS_CODES and attempt < ZELL_HTTP_RETRIES:
+                        raise httpx.HTTPStatusError(
+                            f"Zell API {response.status_code}", request=response.request, response=response
+                        )
+                except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                    if attempt >= ZELL_HTTP_RETRIES:
+                        raise
+                    delay = self._backoff(attempt)
+                    attempt += 1
+                    self.retries += 1
+                    logger.warning(f"[ZellClient] 🔁 Reintento {attempt}/{ZELL_HTTP_RETRIES} en {delay:.2f}s: {e}")
+                    await asyncio.sleep(delay)
+                    continue
+
+                recorded = True
+                if response.status_code >= 500:
+                    self.failures += 1
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                return response
+        except asyncio.CancelledError:
+            # Timeout de la tool u otra cancelación: no dice nada de la API, solo se libera la prueba
+            if not recorded:
+                self.breaker.release_probe()
+            raise
+        except BaseException:
+            if not recorded:
+                self.failures += 1
+                self.breaker.record_failure()
+            raise
+
+    def submit(self, url: str, headers: Dict[str, str], timeout: Optional[float] = None) -> "concurrent.futures.Future[httpx.Response]":
+        """Programa el GET en el loop del cliente y devuelve un Future (no bloquea)."""
+        loop = self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(self._get(url, headers, timeout), loop)
+
+    def get(self, url: str, headers: Dict[str, str], timeout: Optional[float] = None) -> httpx.Response:
+        """GET bloqueante (para tools síncronas). No llamar desde el propio loop del cliente."""
+        if self._thread is not None and threading.current_thread() is self._thread:
+            raise RuntimeError("ZellClient.get() no puede llamarse desde el loop del cliente; usa get_async()")
+        return self.submit(url, headers, timeout).result()
+
+    async def get_async(self, url: str, headers: Dict[str, str], timeout: Optional[float] = None) -> httpx.Response:
+        """GET desde código async en cualquier event loop."""
+        return await asyncio.wrap_future(self.submit(url, headers, timeout))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "base_url": ZELL_API_URL,
+            "started": self._loop is not None,
+            "http2": self.http2,
+            "max_connections": ZELL_HTTP_MAX_CONNECTIONS,
+            "max_keepalive": ZELL_HTTP_MAX_KEEPALIVE,
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "breaker": self.breaker.stats(),
+        }
+
+
+_client: Optional[ZellClient] = None
+_client_lock = threading.Lock()
+
+
+def get_zell_client() -> ZellClient:
+    """Cliente compartido del proceso (se inicia perezosamente en la primera llamada)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ZellClient()
+    return _client
+
+
+def zell_get(action: str, query_string: str, timeout: Optional[float] = None) -> httpx.Response:
+    """
+    GET síncrono a apilink/info con la acción dada.
+
+    Raises:
+        httpx.TimeoutException / httpx.TransportError: tras agotar los reintentos
+        ZellCircuitOpenError: si el breaker está abierto
+    """
+    return get_zell_client().get(zell_url(query_string), zell_headers(action), timeout=timeout)
+
+
+def zell_submit(action: str, query_string: str, timeout: Optional[float] = None) -> "concurrent.futures.Future[httpx.Response]":
+    """
+    Lanza el GET sin esperar la respuesta (concurrent.futures.Future).
+    Sirve para tener varias llamadas en vuelo a la vez desde código síncrono
+    (p. ej. datos + comentarios de un ticket en get_tickets.get_ticket_full).
+    """
+    return get_zell_client().submit(zell_url(query_string), zell_headers(action), timeout=timeout)
+
+
+async def zell_get_async(action: str, query_string: str, timeout: Optional[float] = None) -> httpx.Response:
+    """Versión async de zell_get."""
+    return await get_zell_client().get_async(zell_url(query_string), zell_headers(action), timeout=timeout)
+
+
+def close_zell_client() -> None:
+    if _client is not None:
+        _client.close()
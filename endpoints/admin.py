@@ -0,0 +1,160 @@
+import os
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Request, HTTPException
+
+from Tools.embedding_cache import get_embedding_cache
+from Tools.index_registry import get_index_registry
+from Tools.ticket_cache import get_ticket_cache
+from Tools.zell_client import get_zell_client
+from utils.db_log_sink import get_db_log_sink
+from utils.log_rotation import get_log_rotator
+from utils.log_writer import get_log_writer
+from utils.session_store import get_session_store
+from utils.usage_store import get_usage_store
+
+router = APIRouter()
+
+
+def _check_admin_token(request: Request):
+    # Check token in header
+    token = request.headers.get("X-Admin-Token")
+    expected_token = os.getenv("ADMIN_ACCESS_TOKEN")
+
+    if not expected_token or token != expected_token:
+        raise HTTPException(status_code=403, detail="🛑 Invalid or missing admin token.")
+
+
+@router.get("/admin/indexes")
+def list_indexes(request: Request):
+    """Estado de los índices FAISS residentes: generación, vectores, dim y tiempo de carga por universo."""
+    _check_admin_token(request)
+    return {"indexes": get_index_registry().stats()}
+
+
+@router.post("/admin/indexes/reload")
+def reload_indexes(request: Request, universe: Optional[str] = None):
+    """
+    Fuerza la recarga de un universo (o de todos los cargados) sin esperar al watcher.
+    Si la recarga falla, el universo sigue sirviendo la generación anterior.
+    """
+    _check_admin_token(request)
+    registry = get_index_registry()
+
+    universes = [universe] if universe else registry.loaded_universes()
+    if universe and universe not in registry.loaded_universes():
+        raise HTTPException(status_code=404, detail=f"❓ Index '{universe}' not loaded.")
+
+    results = {u: registry.reload(u) for u in universes}
+    return {"reloaded": results, "indexes": registry.stats()}
+
+
+@router.get("/admin/embedding-cache")
+def embedding_cache_stats(request: Request):
+    """Contadores del cache de embeddings de consultas (hits, misses, evictions, tamaño)."""
+    _check_admin_token(request)
+    return get_embedding_cache().stats()
+
+
+@router.get("/admin/zell-client")
+def zell_client_stats(request: Request):
+    """Estado del cliente HTTP compartido de la API de Zell: pool, reintentos y circuit breaker."""
+    _check_admin_token(request)
+    return get_zell_client().stats()
+
+
+@router.get("/admin/ticket-cache")
+def ticket_cache_stats(request: Request):
+    """Contadores del cache de tickets (hits frescos/stale, misses, revalidaciones, purgas)."""
+    _check_admin_token(request)
+    return get_ticket_cache().stats()
+
+
+@router.post("/admin/ticket-cache/purge")
+def purge_ticket_cache(request: Request, ticket_id: Optional[str] = None):
+    """
+    Purga del cache los datos y comentarios de un ticket (o todo el cache si no se indica ticket_id),
+    p. ej. después de actualizarlo en Zell para que el bot no responda con información vieja.
+    """
+    _check_admin_token(request)
+    removed = get_ticket_cache().purge(ticket_id.strip() if ticket_id else None)
+    return {"purged": removed, "ticket_id": ticket_id}
+
+
+@router.get("/admin/session-tokens")
+def session_token_stats(request: Request):
+    """Tokens de sesión por estado y contadores del cache positivo / sweeper."""
+    _check_admin_token(request)
+    return get_session_store().stats()
+
+
+@router.get("/admin/log-writer")
+def log_writer_stats(request: Request):
+    """Cola del escritor de logs CSV: filas encoladas, escritas, descartadas (cola llena) y errores."""
+    _check_admin_token(request)
+    return get_log_writer().stats()
+
+
+@router.get("/admin/db-log-sink")
+def db_log_sink_stats(request: Request):
+    """Sink de logs a Supabase/Postgres: insertadas, reintentos, spill a disco, replay y estado del circuito."""
+    _check_admin_token(request)
+    return get_db_log_sink().stats()
+
+
+@router.get("/admin/log-rotation")
+def log_rotation_stats(request: Request):
+    """Segmentos archivados, bytes comprimidos vs. originales y contadores de rotación/retención."""
+    _check_admin_token(request)
+    return get_log_rotator().stats()
+
+
+@router.post("/admin/log-rotation/run")
+def run_log_rotation(request: Request, force: bool = False):
+    """Corre una pasada de rotación ahora (force=true rota todos los logs no vacíos)."""
+    _check_admin_token(request)
+    return get_log_rotator().rotate_pass(force=force)
+
+
+def _parse_day(value: Optional[str], name: str) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"❓ '{name}' must be a date (YYYY-MM-DD).")
+
+
+def _csv_param(value: Optional[str]) -> Optional[list]:
+    items = [v.strip() for v in (value or "").split(",") if v.strip()]
+    return items or None
+
+
+@router.get("/admin/usage")
+def usage_report(
+    request: Request,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    model: Optional[str] = None,
+    user: Optional[str] = None,
+):
+    """
+    Costo y tokens de chat_v2 por día, usuario, tool y modelo desde el store Parquet
+    (utils/usage_store.py). Default: últimos 30 días; model/user aceptan varios separados por coma.
+    """
+    _check_admin_token(request)
+    start_day, end_day = _parse_day(start, "start"), _parse_day(end, "end")
+    if start_day and end_day and start_day > end_day:
+        raise HTTPException(status_code=400, detail="❓ 'start' must be on or before 'end'.")
+    store = get_usage_store()
+    report = store.usage_report(
+        start=start_day,
+        end=end_day,
+        models=_csv_param(model),
+        users=_csv_param(user),
+    )
+    if not report.get("ok"):
+        raise HTTPException(status_code=503 if not store.enabled else 400, detail=report.get("error"))
+    report["store"] = store.stats()
+    return report
@@ -7,7 +7,6 @@
 import os
 import json
 import time
-import inspect
 import asyncio
 from typing import Any, Dict, List, Optional
 
@@ -50,6 +49,7 @@ from v2_internal import (
     TOOL_IMPL,
     process_chat_v2_core,
 )
+from v2_internal.core.tool_runner import run_tool_calls
 
 router = APIRouter()
 
@@ -261,6 +261,9 @@ async def chat_v2(req: ChatV2Request):
             tool_outputs: List[Dict[str, Any]] = []
             web_search_used_this_round = False
             tools_called_this_round: List[str] = []
+            # (item, índice en pending o None, resultado ya resuelto)
+            resolved: List[Any] = []
+            pending: List[tuple] = []
 
             for i, item in enumerate(calls, start=1):
                 name = getattr(item, "name", "")
@@ -284,13 +287,7 @@ async def chat_v2(req: ChatV2Request):
                             "current_count": current_count,
                             "max_allowed": MAX_WEB_SEARCHES_PER_CONV
                         }
-                        tool_outputs.append(
-                            {
-                                "type": "function_call_output",
-                                "call_id": getattr(item, "call_id", ""),
-                                "output": json.dumps(result, ensure_ascii=False),
-                            }
-                        )
+                        resolved.append((item, None, result))
                         # No marcar como usado si fue bloqueado
                         continue
                     else:
@@ -327,17 +324,25 @@ async def chat_v2(req: ChatV2Request):
                 tools_called_this_round.append(tool_name_display)
 
                 fn = TOOL_IMPL.get(name)
-                t1 = time.time()
                 if fn:
-                    # Manejar funciones async y síncronas
-                    if inspect.iscoroutinefunction(fn):
-                        result = await fn(args, req.conversation_id)
-                    else:
-                        result = fn(args, req.conversation_id)
+                    # Se ejecuta abajo, en paralelo con las demás tools del round
+                    pending.append((fn, args, tool_name_display))
+                    resolved.append((item, len(pending) - 1, None))
                 else:
                     tr(f"Tool {name} no implementada")
-                    result = {"error": f"Tool no implementada: {name}"}
-                dt = time.time() - t1
+                    resolved.append((item, None, {"error": f"Tool no implementada: {name}"}))
+
+            # Ejecutar en paralelo las tools del round (sync → pool acotado; async → en el loop),
+            # con límite por round, por tool y timeout por call. Outputs en el orden de las calls.
+            if pending:
+                t1 = time.time()
+                pending_results = await run_tool_calls(pending, req.conversation_id)
+                if len(pending) > 1:
+                    tr(f"{len(pending)} tools ejecutadas en paralelo en {time.time() - t1:.2f}s")
+
+            for item, pending_idx, result in resolved:
+                if pending_idx is not None:
+                    result = pending_results[pending_idx]
 
                 # Summary mejorado en español
                 summary_parts = []
@@ -364,7 +369,7 @@ async def chat_v2(req: ChatV2Request):
                         summary_parts.append(f"Error: {error_msg}")
                 
                 summary = " | ".join(summary_parts) if summary_parts else "Completado"
-                tr(f"Tool completado en {dt:.2f}s: {summary}")
+                tr(f"Resultado {getattr(item, 'name', '')}: {summary}")
 
                 tool_outputs.append(
                     {
@@ -1,11 +1,15 @@
 import os
+from datetime import datetime
+from typing import Optional
 from fastapi import APIRouter, Request, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
+
+from utils.log_rotation import get_log_rotator, iter_log_bytes, to_naive_utc
 
 router = APIRouter()
 
-@router.get("/download-log/{logname}")
-def download_log(logname: str, request: Request):
+
+def _check_admin_token(request: Request):
     # Check token in header
     token = request.headers.get("X-Admin-Token")
     expected_token = os.getenv("ADMIN_ACCESS_TOKEN")
@@ -13,12 +17,62 @@ def download_log(logname: str, request: Request):
     if not expected_token or token != expected_token:
         raise HTTPException(status_code=403, detail="🛑 Invalid or missing admin token.")
 
+
+def _parse_ts(value: Optional[str], name: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        # Con zona ("Z", "+00:00", "-06:00") se convierte a UTC; sin zona se toma como UTC
+        return to_naive_utc(datetime.fromisoformat(value))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"❓ '{name}' must be an ISO datetime (UTC), e.g. 2026-01-31T00:00:00")
+
+
+@router.get("/download-log/{logname}")
+def download_log(logname: str, request: Request, start: Optional[str] = None, end: Optional[str] = None):
+    """
+    Sin start/end: el archivo activo (desde la última rotación).
+    Con start y/o end (ISO, UTC): los segmentos archivados que cubren el rango + el activo,
+    descomprimidos y concatenados en un solo stream (ver utils/log_rotation.py).
+    """
+    _check_admin_token(request)
+    if logname != os.path.basename(logname) or logname.startswith("."):
+        raise HTTPException(status_code=400, detail="❓ Invalid log name.")
+
     file_path = os.path.join("logs", logname)
-    if not os.path.isfile(file_path):
-        raise HTTPException(status_code=404, detail=f"❓ Log file '{logname}' not found.")
+    if not start and not end:
+        if not os.path.isfile(file_path):
+            raise HTTPException(status_code=404, detail=f"❓ Log file '{logname}' not found.")
+        return FileResponse(
+            path=file_path,
+            media_type="text/plain",
+            filename=logname
+        )
+
+    start_dt, end_dt = _parse_ts(start, "start"), _parse_ts(end, "end")
+    paths = get_log_rotator().segments_for_range(logname, start_dt, end_dt)
+    if not paths:
+        raise HTTPException(status_code=404, detail=f"❓ No segments of '{logname}' cover that range.")
 
-    return FileResponse(
-        path=file_path,
-        media_type="text/plain",
-        filename=logname
+    stem, ext = os.path.splitext(logname)
+    tag = f"{start_dt.strftime('%Y%m%dT%H%M%S') if start_dt else 'inicio'}_{end_dt.strftime('%Y%m%dT%H%M%S') if end_dt else 'actual'}"
+    return StreamingResponse(
+        iter_log_bytes(paths),
+        media_type="text/csv" if ext == ".csv" else "text/plain",
+        headers={
+            "Content-Disposition": f'attachment; filename="{stem}_{tag}{ext}"',
+            "X-Log-Segments": str(len(paths)),
+        },
     )
+
+
+@router.get("/log-segments/{logname}")
+def list_log_segments(logname: str, request: Request):
+    """Segmentos archivados de un log (del manifest) y desde cuándo está activo el archivo actual."""
+    _check_admin_token(request)
+    manifest = get_log_rotator().load_manifest()
+    return {
+        "log": logname,
+        "active_since": manifest["logs"].get(logname, {}).get("active_since"),
+        "segments": [s for s in manifest["segments"] if s["log"] == logname],
+    }
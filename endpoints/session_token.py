@@ -2,22 +2,25 @@ import os
 import hmac
 import uuid
 import csv
-from datetime import datetime, timedelta
+from datetime import datetime
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
+from utils.log_writer import enqueue_csv_row
+from utils.session_store import get_session_store
+
 router = APIRouter()
 
 SECRET_KEY = os.getenv("WIDGET_SECRET_KEY", "clave_secreta_segura")
 LOG_PATH = "logs/session_tokens.csv"
-TOKEN_EXPIRATION_HOURS = 12
+LOG_HEADERS = ["token", "user_email", "timestamp_inicio", "estado", "motivo"]
 
 # Asegúrate de que el archivo de log exista
 os.makedirs("logs", exist_ok=True)
 if not os.path.isfile(LOG_PATH):
     with open(LOG_PATH, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
-        writer.writerow(["token", "user_email", "timestamp_inicio", "estado", "motivo"])
+        writer.writerow(LOG_HEADERS)
 
 
 class SessionRequest(BaseModel):
@@ -52,9 +55,9 @@ def start_session(data: SessionRequest):
 
 
 def registrar_token(token: str, email: str, estado: str, motivo: str):
-    with open(LOG_PATH, "a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow([token, email, datetime.utcnow().isoformat(), estado, motivo])
+    # Bitácora append-only de inicios de sesión (en cola); la validación usa el store indexado
+    enqueue_csv_row(LOG_PATH, [token, email, datetime.utcnow().isoformat(), estado, motivo], LOG_HEADERS)
+    get_session_store().register(token, email, estado, motivo)
 
 
 def validar_token(token: str) -> tuple[bool, str]:
@@ -62,50 +65,7 @@ def validar_token(token: str) -> tuple[bool, str]:
     Retorna (True, email) si el token es válido y activo.
     Retorna (False, motivo) si es inválido o expirado.
     """
-    updated_rows = []
-    token_encontrado = False
-    valido = False
-    email_encontrado = "-"
-    motivo = ""
-
-    with open(LOG_PATH, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            row_token = row["token"]
-            estado = row["estado"]
-            email = row["user_email"]
-            ts = datetime.fromisoformat(row["timestamp_inicio"])
-
-            if row_token == token:
-                token_encontrado = True
-                email_encontrado = email
-
-                if estado == "valido":
-                    if datetime.utcnow() - ts <= timedelta(hours=TOKEN_EXPIRATION_HOURS):
-                        valido = True
-                        motivo = "Token válido"
-                        updated_rows.append(row)
-                    else:
-                        # Lazy update → marcar como expirado
-                        row["estado"] = "expirado"
-                        row["motivo"] = "expirado por uso"
-                        motivo = "Token expirado"
-                        updated_rows.append(row)
-                else:
-                    motivo = f"Token en estado: {estado}"
-                    updated_rows.append(row)
-            else:
-                updated_rows.append(row)
-
-    # Reescribe el CSV con los cambios (lazy update si hubo expiración)
-    if token_encontrado:
-        with open(LOG_PATH, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=["token", "user_email", "timestamp_inicio", "estado", "motivo"])
-            writer.writeheader()
-            writer.writerows(updated_rows)
-
-    if not token_encontrado:
-        return False, "Token no encontrado"
-    if valido:
-        return True, email_encontrado
-    return False, motivo
+    res = get_session_store().validate(token, expired_motivo="expirado por uso")
+    if res["valido"]:
+        return True, res["usuario"]
+    return False, res["motivo"]
@@ -13,6 +13,7 @@ from utils.logging_config import setup_logging
 from endpoints.session_token import router as session_router
 from endpoints.logsdownload import router as logs_router
 from endpoints.chat_v2 import router as chat_v2_router
+from endpoints.admin import router as admin_router
 
 
 
@@ -70,6 +71,7 @@ async def global_exception_handler(request: Request, exc: Exception):
 app.include_router(session_router)
 app.include_router(logs_router)
 app.include_router(chat_v2_router)
+app.include_router(admin_router)
 
 @app.get("/")
 async def root():
@@ -79,6 +81,52 @@ async def root():
 from Tools.search_tickets import init_semantic_tool
 init_semantic_tool()
 
+# Preload all FAISS universes (docs, guides, meetings, etiquetas, quotes) so the
+# first request of each universe doesn't pay the index/meta load, and watch Data/
+# so re-running the offline indexers swaps in the new index without a restart
+from Tools.index_registry import get_index_registry
+get_index_registry().preload()
+get_index_registry().start_watcher()
+
+# Session tokens (utils/session_store.py): background sweeper that expires and prunes old tokens
+from utils.session_store import get_session_store
+get_session_store().start_sweeper()
+
+# Shared pooled HTTP client for the Zell API (Tools/zell_client.py): close its
+# keep-alive connections cleanly when the server stops
+from Tools.zell_client import close_zell_client
+
+@app.on_event("shutdown")
+def shutdown_zell_client():
+    close_zell_client()
+
+# Size/age-based rotation of logs/*.csv and logs/*.log into gzip segments (utils/log_rotation.py)
+from utils.log_rotation import get_log_rotator
+get_log_rotator().start()
+
+# Background CSV log writer (utils/log_writer.py): flush queued rows before exiting
+from utils.log_writer import close_log_writer
+
+@app.on_event("shutdown")
+def shutdown_log_writer():
+    close_log_writer()
+
+# Batched Supabase/Postgres log sink (utils/db_log_sink.py): start it now so rows spilled
+# to disk by a previous run are replayed, and send (or spill) pending rows on shutdown
+from utils.db_log_sink import get_db_log_sink, close_db_log_sink
+get_db_log_sink().start()
+
+@app.on_event("shutdown")
+def shutdown_db_log_sink():
+    close_db_log_sink()
+
+# Parquet usage store (utils/usage_store.py): write pending token/interaction rows on shutdown
+from utils.usage_store import close_usage_store
+
+@app.on_event("shutdown")
+def shutdown_usage_store():
+    close_usage_store()
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5050))
     uvicorn.run("main:app", host="0.0.0.0", port=port, reload=False, log_level="info")
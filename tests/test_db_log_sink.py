@@ -0,0 +1,217 @@
+"""
+Tests de utils/db_log_sink.py: replay del spill a disco, COPY contra un Postgres de prueba,
+dead-letter de filas inválidas y sink apagado sin credenciales.
+"""
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+from decimal import Decimal
+
+from utils.db_log_sink import TABLE_COLUMNS, DbLogSink, PostgresBackend
+
+
+class RecordingBackend:
+    """Backend en memoria: guarda lo insertado por tabla."""
+
+    name = "memory"
+
+    def __init__(self):
+        self.rows = {}
+
+    def insert_many(self, table, rows):
+        self.rows.setdefault(table, []).extend(rows)
+
+    def close(self):
+        pass
+
+
+def _write_spill(path, ids):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in ids:
+            f.write(json.dumps({"table": "token_usage_v2", "row": {"response_id": i}}) + "\n")
+
+
+def _sink(tmp_path, backend, **kwargs):
+    kwargs.setdefault("retry_base_seconds", 0.0)
+    return DbLogSink(backend=backend, spill_dir=str(tmp_path), **kwargs)
+
+
+def test_replay_no_pisa_un_replay_pendiente(tmp_path):
+    backend = RecordingBackend()
+    sink = _sink(tmp_path, backend)
+    base = f"spill-{os.getpid()}.jsonl"
+    # Replay a medias de esta misma corrida + spill nuevo del mismo proceso
+    _write_spill(tmp_path / f"{base}.replay-{os.getpid()}", ["A0", "A1", "A2"])
+    _write_spill(tmp_path / base, ["B0", "B1"])
+
+    sink._replay()
+
+    sent = sorted(r["response_id"] for r in backend.rows["token_usage_v2"])
+    assert sent == ["A0", "A1", "A2", "B0", "B1"]
+    assert os.listdir(tmp_path) == []
+
+
+def test_replay_toma_spill_de_proceso_muerto(tmp_path):
+    backend = RecordingBackend()
+    sink = _sink(tmp_path, backend)
+    dead_pid = 2 ** 22 + 12345  # fuera de pid_max: nunca está vivo
+    _write_spill(tmp_path / f"spill-{dead_pid}.jsonl.replay-{dead_pid}", ["C0"])
+    _write_spill(tmp_path / f"spill-{dead_pid}.jsonl", ["D0"])
+
+    sink._replay()
+
+    sent = sorted(r["response_id"] for r in backend.rows["token_usage_v2"])
+    assert sent == ["C0", "D0"]
+    assert os.listdir(tmp_path) == []
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Postgres de prueba: conexión falsa con la interfaz de asyncpg que usa PostgresBackend
+# ─────────────────────────────────────────────────────────────────────────────
+
+class FakePostgres:
+    """Stand-in de un servidor Postgres: tablas en memoria, caídas y rechazos programables."""
+
+    def __init__(self):
+        self.tables = {}
+        self.down = False
+        self.connects = 0
+
+    async def connect(self, timeout=None, **kwargs):
+        if self.down:
+            raise ConnectionRefusedError("stand-in caído")
+        self.connects += 1
+        return FakeConnection(self)
+
+
+class FakeConnection:
+    def __init__(self, server):
+        self.server = server
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+    async def copy_records_to_table(self, table, records, columns):
+        import asyncpg
+
+        if self.server.down:
+            self.closed = True
+            raise asyncpg.exceptions.ConnectionDoesNotExistError("conexión perdida")
+        if table not in TABLE_COLUMNS:
+            raise asyncpg.exceptions.UndefinedTableError(f'relation "{table}" does not exist')
+        rows = [dict(zip(columns, r)) for r in records]
+        for row in rows:
+            if row.get("round") is not None and not isinstance(row["round"], int):
+                raise asyncpg.exceptions.DataError("invalid input for query argument (round)")
+        self.server.tables.setdefault(table, []).extend(rows)
+
+    async def close(self, timeout=None):
+        self.closed = True
+
+    def terminate(self):
+        self.closed = True
+
+
+def _token_row(i, **extra):
+    return {"timestamp": "2026-01-31 10:00:00", "conversation_id": "c1", "response_id": f"r{i}",
+            "round": i, "model": "gpt-5-mini", "cost_total_usd": 0.001, **extra}
+
+
+def _pg_sink(tmp_path, server, **kwargs):
+    backend = PostgresBackend(dsn="postgresql://stand-in", connect=server.connect)
+    return _sink(tmp_path, backend, flush_seconds=0.05, **kwargs)
+
+
+def test_postgres_copy_por_lotes(tmp_path):
+    server = FakePostgres()
+    sink = _pg_sink(tmp_path, server, batch_rows=10)
+    for i in range(25):
+        assert sink.enqueue("token_usage_v2", _token_row(i))
+    assert sink.close()
+
+    rows = server.tables["token_usage_v2"]
+    assert [r["response_id"] for r in rows] == [f"r{i}" for i in range(25)]
+    assert isinstance(rows[0]["timestamp"], datetime)
+    assert rows[0]["cost_total_usd"] == Decimal("0.001")
+    assert sink.stats()["batches"] == 3
+    assert server.connects == 1
+
+
+def test_postgres_caido_spill_y_replay(tmp_path):
+    server = FakePostgres()
+    server.down = True
+    sink = _pg_sink(tmp_path, server, max_retries=2, max_backoff_seconds=0.0)
+    for i in range(5):
+        sink.enqueue("token_usage_v2", _token_row(i))
+    assert sink.flush()
+    assert sink.stats()["spilled"] == 5
+    assert "token_usage_v2" not in server.tables
+
+    server.down = False
+    sink.enqueue("token_usage_v2", _token_row(5))
+    assert sink.close()
+
+    sent = sorted(r["response_id"] for r in server.tables["token_usage_v2"])
+    assert sent == sorted(f"r{i}" for i in range(6))
+    assert sink.stats()["replayed"] == 5
+    assert not [f for f in os.listdir(tmp_path) if f.startswith("spill-")]
+
+
+def test_fila_invalida_va_a_dead_letter_sin_abrir_circuito(tmp_path):
+    server = FakePostgres()
+    sink = _pg_sink(tmp_path, server, max_retries=3)
+    sink.enqueue("token_usage_v2", _token_row(0))
+    sink.enqueue("token_usage_v2", _token_row(1, round="uno"))
+    sink.enqueue("token_usage_v2", _token_row(2))
+    assert sink.close()
+
+    stats = sink.stats()
+    assert sorted(r["response_id"] for r in server.tables["token_usage_v2"]) == ["r0", "r2"]
+    assert stats["dead_lettered"] == 1
+    assert stats["retries"] == 0 and stats["spilled"] == 0 and not stats["circuit_open"]
+    with open(tmp_path / f"deadletter-{os.getpid()}.jsonl", encoding="utf-8") as f:
+        dead = [json.loads(line) for line in f]
+    assert dead[0]["row"]["response_id"] == "r1" and "DataError" in dead[0]["error"]
+
+
+def test_sin_credenciales_el_sink_queda_apagado(monkeypatch):
+    import utils.db_log_sink as db_log_sink
+    import utils.logs_v2 as logs_v2
+
+    monkeypatch.setattr(db_log_sink, "LOG_SINK_BACKEND", "supabase")
+    monkeypatch.setattr(logs_v2, "_supabase_client", None)
+    monkeypatch.delenv("SUPABASE_URL", raising=False)
+    monkeypatch.delenv("SUPABASE_KEY", raising=False)
+    sink = DbLogSink(backend=db_log_sink._default_backend())
+
+    assert sink.backend is None
+    assert sink.enqueue("token_usage_v2", _token_row(0)) is False
+    assert sink._thread is None
+
+
+def test_no_toma_el_spill_activo_de_otro_proceso_vivo(tmp_path):
+    # Otro worker vivo (un proceso real) es dueño de spill-<pid>.jsonl y sigue escribiendo en él
+    other = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        owner = _sink(tmp_path, RecordingBackend())
+        owner.spill_path = str(tmp_path / f"spill-{other.pid}.jsonl")
+        owner._spill("token_usage_v2", [{"response_id": "E0"}])
+
+        backend = RecordingBackend()
+        replayer = _sink(tmp_path, backend)
+        replayer._replay()
+
+        assert backend.rows == {}
+        assert os.listdir(tmp_path) == [f"spill-{other.pid}.jsonl"]
+
+        # El dueño sigue agregando al mismo archivo; cuando muere, su spill sí se reenvía
+        owner._spill("token_usage_v2", [{"response_id": "E1"}])
+    finally:
+        other.kill()
+        other.wait()
+    replayer._replay()
+    assert sorted(r["response_id"] for r in backend.rows["token_usage_v2"]) == ["E0", "E1"]
+    assert os.listdir(tmp_path) == []
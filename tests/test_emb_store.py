@@ -0,0 +1,77 @@
+"""
+Tests de Tools/docs_indexer/emb_store.py: recuperación de un append interrumpido y varias
+instancias (procesos) escribiendo en el mismo store.
+"""
+import numpy as np
+
+from Tools.docs_indexer.emb_store import EmbeddingStore
+
+MODEL = "test-model"
+
+
+def _vec(i, dim=4):
+    return np.full(dim, float(i), dtype=np.float32)
+
+
+def _seg_files(store):
+    return store._seg_paths(store._segments[0]["name"])
+
+
+def test_vectores_huerfanos_se_recortan_al_cargar(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.put_many([("k0", _vec(0)), ("k1", _vec(1))], MODEL)
+    vec_path, _ = _seg_files(store)
+    # El proceso murió después de escribir el vector y antes de la clave
+    with open(vec_path, "ab") as f:
+        f.write(_vec(99).tobytes())
+
+    store = EmbeddingStore(str(tmp_path))
+    store.put("k2", _vec(2), MODEL)
+
+    store = EmbeddingStore(str(tmp_path))
+    for i in range(3):
+        assert np.array_equal(store.get(f"k{i}", MODEL), _vec(i))
+    assert store.stats()["rows"] == 3
+
+
+def test_linea_de_clave_incompleta_se_recorta(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.put("k0", _vec(0), MODEL)
+    vec_path, keys_path = _seg_files(store)
+    with open(vec_path, "ab") as f:
+        f.write(_vec(1).tobytes())
+    with open(keys_path, "ab") as f:
+        f.write(b"k1-parci")
+
+    store = EmbeddingStore(str(tmp_path))
+    assert store.keys(MODEL) == {"k0"}
+    store.put("k3", _vec(3), MODEL)
+
+    store = EmbeddingStore(str(tmp_path))
+    assert store.keys(MODEL) == {"k0", "k3"}
+    assert np.array_equal(store.get("k3", MODEL), _vec(3))
+
+
+def test_dos_instancias_sobre_el_mismo_store(tmp_path):
+    # Dos indexadores (dos procesos) con su propio estado en memoria sobre el mismo directorio
+    a = EmbeddingStore(str(tmp_path))
+    b = EmbeddingStore(str(tmp_path))
+    a.put_many([("a0", _vec(0)), ("a1", _vec(1))], MODEL)
+    b.put_many([("b0", _vec(10)), ("b1", _vec(11))], MODEL)
+    a.put("a2", _vec(2), "otro-modelo")
+    b.put("b2", _vec(12), MODEL)
+    fresh = EmbeddingStore(str(tmp_path))
+    expected = {"a0": 0, "a1": 1, "b0": 10, "b1": 11, "b2": 12}
+    for key, val in expected.items():
+        assert np.array_equal(fresh.get(key, MODEL), _vec(val)), key
+    assert np.array_equal(fresh.get("a2", "otro-modelo"), _vec(2))
+    assert fresh.stats()["rows"] == 6
+
+    # La otra instancia compacta: la primera sigue leyendo y escribiendo bien
+    b.compact()
+    assert np.array_equal(a.get("b1", MODEL), _vec(11))
+    a.put("a3", _vec(3), MODEL)
+    fresh = EmbeddingStore(str(tmp_path))
+    assert np.array_equal(fresh.get("a3", MODEL), _vec(3))
+    assert np.array_equal(fresh.get("b2", MODEL), _vec(12))
+    assert fresh.stats()["rows"] == 7
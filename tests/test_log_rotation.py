@@ -0,0 +1,28 @@
+"""
+Tests de utils/log_rotation.py: rangos con y sin zona horaria sobre el manifest (UTC naive).
+"""
+from datetime import datetime, timedelta, timezone
+
+from utils.log_rotation import LogRotator
+
+
+def _rotator(tmp_path):
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    (logs / "ai_calls.csv").write_text("timestamp,a\n2026-01-31 10:00:00,1\n", encoding="utf-8")
+    rotator = LogRotator(logs_dir=str(logs), archive_dir=str(logs / "archive"))
+    rotator.rotate_pass(force=True)
+    (logs / "ai_calls.csv").write_text("timestamp,a\n2026-01-31 11:00:00,2\n", encoding="utf-8")
+    return rotator
+
+
+def test_rango_con_zona_equivale_a_utc_naive(tmp_path):
+    rotator = _rotator(tmp_path)
+    naive = datetime.utcnow() - timedelta(hours=1)
+    aware_utc = naive.replace(tzinfo=timezone.utc)
+    aware_mx = aware_utc.astimezone(timezone(timedelta(hours=-6)))
+
+    expected = rotator.segments_for_range("ai_calls.csv", naive, None)
+    assert len(expected) == 2  # segmento archivado + archivo activo
+    assert rotator.segments_for_range("ai_calls.csv", aware_utc, None) == expected
+    assert rotator.segments_for_range("ai_calls.csv", aware_mx, aware_mx + timedelta(days=1)) == expected
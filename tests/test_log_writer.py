@@ -0,0 +1,54 @@
+"""
+Tests de utils/log_writer.py: la fila guarda el payload tal como estaba al encolar y el
+json.dumps corre en el hilo escritor.
+"""
+import csv
+import json
+import threading
+
+from utils.log_writer import CsvLogWriter, JsonCell
+
+
+def test_payload_mutado_despues_de_encolar(tmp_path):
+    path = str(tmp_path / "context_log.csv")
+    writer = CsvLogWriter(flush_seconds=60)
+    context = {"ticket": 1, "tags": ["a"]}
+    messages = [{"role": "user", "content": "hola"}]
+
+    writer.enqueue(path, ["c1", JsonCell(context), JsonCell(messages), {"raw": True}], ["id", "ctx", "msgs", "raw"])
+    context["ticket"] = 2
+    context["tags"].append("b")
+    messages.append({"role": "assistant", "content": "después"})
+    assert writer.close()
+
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["id", "ctx", "msgs", "raw"]
+    assert json.loads(rows[1][1]) == {"ticket": 1, "tags": ["a"]}
+    assert json.loads(rows[1][2]) == [{"role": "user", "content": "hola"}]
+    assert json.loads(rows[1][3]) == {"raw": True}
+
+
+def test_json_cell_de_str_igual_que_json_dumps(tmp_path):
+    path = str(tmp_path / "ai_calls.csv")
+    writer = CsvLogWriter()
+    writer.enqueue(path, [JsonCell("texto \"plano\""), "texto"])
+    assert writer.close()
+
+    with open(path, newline="", encoding="utf-8") as f:
+        assert list(csv.reader(f)) == [[json.dumps("texto \"plano\""), "texto"]]
+
+
+def test_serializacion_en_el_hilo_escritor(tmp_path):
+    threads = []
+
+    class Payload:
+        def __str__(self):
+            threads.append(threading.current_thread().name)
+            return "payload"
+
+    writer = CsvLogWriter()
+    writer.enqueue(str(tmp_path / "ai_calls.csv"), [JsonCell({"obj": Payload()})])
+    assert threads == []  # enqueue() no serializa
+    assert writer.close()
+    assert threads == ["csv-log-writer"]
@@ -0,0 +1,39 @@
+"""
+Tests de Tools/docs_indexer/shared_emb_store.py: migración del cache JSONL original.
+"""
+import json
+
+import numpy as np
+
+from Tools.docs_indexer import shared_emb_store
+from Tools.docs_indexer.shared_emb_store import SharedEmbeddingCache
+from Tools.search_tickets import EMBEDDING_MODEL
+
+
+def _legacy_jsonl(path, fp, vec):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"cache_key": f"chunk-1|{fp}", "embedding": vec, "dim": len(vec)}) + "\n")
+
+
+def test_jsonl_original_se_importa_bajo_el_modelo_real(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_emb_store, "_stores", {})
+    legacy = tmp_path / "docs_org_emb_cache.jsonl"
+    _legacy_jsonl(legacy, "fp1", [0.5, 0.25, 0.125])
+
+    cache = SharedEmbeddingCache(str(tmp_path), "docs_org", legacy_jsonl=str(legacy), model=EMBEDDING_MODEL)
+
+    assert np.allclose(cache.get("fp1"), [0.5, 0.25, 0.125])
+    assert cache.hits == 1
+
+
+def test_jsonl_original_no_se_importa_con_proveedor_falso(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_emb_store, "_stores", {})
+    legacy = tmp_path / "docs_org_emb_cache.jsonl"
+    _legacy_jsonl(legacy, "fp1", [0.5, 0.25, 0.125])
+
+    fake = SharedEmbeddingCache(str(tmp_path), "docs_org", legacy_jsonl=str(legacy), model="fake-3")
+    assert len(fake.store) == 0
+
+    # La siguiente corrida real sí lo migra
+    real = SharedEmbeddingCache(str(tmp_path), "docs_org", legacy_jsonl=str(legacy), model=EMBEDDING_MODEL)
+    assert real.get("fp1") is not None
@@ -0,0 +1,157 @@
+"""
+Tests de Tools/zell_client.py contra un servidor HTTP local que hace de API de Zell:
+keep-alive, reintentos y circuit breaker (incluida la llamada de prueba cancelada o con error).
+"""
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from Tools import zell_client
+from Tools.zell_client import CircuitBreaker, ZellCircuitOpenError, ZellClient
+
+
+class StandInZell:
+    """API de Zell de prueba: responde según `mode` y cuenta requests y conexiones."""
+
+    def __init__(self):
+        self.mode = "ok"
+        self.fail_next = 0
+        self.requests = 0
+        self.connections = set()
+        self.headers = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stand_in.requests += 1
+                stand_in.connections.add(self.client_address)
+                stand_in.headers.append(dict(self.headers))
+                if stand_in.fail_next > 0:
+                    stand_in.fail_next -= 1
+                    return self._send(503, b'{"error": "busy"}')
+                if stand_in.mode == "down":
+                    return self._send(503, b'{"error": "down"}')
+                if stand_in.mode == "slow":
+                    time.sleep(0.5)
+                if stand_in.mode == "bad_gzip":
+                    return self._send(200, b"esto no es gzip", {"Content-Encoding": "gzip"})
+                return self._send(200, b'{"Data": [{"IdTicket": 1}]}')
+
+            def _send(self, status, body, extra=None):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in (extra or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/apilink/info"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def zell(monkeypatch):
+    server = StandInZell()
+    monkeypatch.setattr(zell_client, "ZELL_API_URL", server.url)
+    monkeypatch.setattr(zell_client, "ZELL_HTTP_RETRIES", 2)
+    monkeypatch.setattr(zell_client, "ZELL_HTTP_BACKOFF_BASE", 0.01)
+    client = ZellClient()
+    client.breaker = CircuitBreaker(failure_threshold=2, cooldown_seconds=0.2)
+    monkeypatch.setattr(zell_client, "_client", client)
+    yield server, client
+    client.close()
+    server.close()
+
+
+def test_conexion_reutilizada_y_headers(zell):
+    server, client = zell
+    for i in range(5):
+        r = zell_client.zell_get("5001", f"source=1&sourceid={i}")
+        assert r.json()["Data"][0]["IdTicket"] == 1
+    assert server.requests == 5
+    assert len(server.connections) == 1  # keep-alive: una sola conexión TCP
+    assert server.headers[0]["action"] == "5001"
+
+
+def test_reintenta_5xx(zell):
+    server, client = zell
+    server.fail_next = 2
+    r = zell_client.zell_get("5001", "source=1&sourceid=1")
+    assert r.status_code == 200
+    assert server.requests == 3
+    assert client.stats()["retries"] == 2
+    assert client.breaker.state == "closed"
+
+
+def test_breaker_abre_y_se_recupera(zell):
+    server, client = zell
+    server.mode = "down"
+    for _ in range(2):
+        assert zell_client.zell_get("5001", "x=1").status_code == 503
+    assert client.breaker.state == "open"
+    with pytest.raises(ZellCircuitOpenError):
+        zell_client.zell_get("5001", "x=1")
+
+    server.mode = "ok"
+    time.sleep(0.25)
+    assert zell_client.zell_get("5001", "x=1").status_code == 200
+    assert client.breaker.state == "closed"
+
+
+def _open_breaker(server):
+    server.mode = "down"
+    for _ in range(2):
+        zell_client.zell_get("5001", "x=1")
+    time.sleep(0.25)
+
+
+def test_prueba_cancelada_no_deja_el_breaker_abierto(zell):
+    server, client = zell
+    _open_breaker(server)
+    assert client.breaker.state == "half_open"
+
+    server.mode = "slow"
+
+    async def _probe_with_tool_timeout():
+        await asyncio.wait_for(zell_client.zell_get_async("5001", "x=1"), timeout=0.1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(_probe_with_tool_timeout())
+    time.sleep(0.1)  # la cancelación llega al loop del cliente
+
+    server.mode = "ok"
+    assert zell_client.zell_get("5001", "x=1").status_code == 200
+    assert client.breaker.state == "closed"
+
+
+def test_error_inesperado_en_la_prueba_cuenta_como_fallo(zell):
+    server, client = zell
+    _open_breaker(server)
+    opened = client.breaker.stats()["times_opened"]
+
+    server.mode = "bad_gzip"
+    with pytest.raises(httpx.DecodingError):
+        zell_client.zell_get("5001", "x=1")
+    assert client.breaker.state == "open"
+    assert client.breaker.stats()["times_opened"] == opened + 1
+
+    server.mode = "ok"
+    time.sleep(0.25)
+    assert zell_client.zell_get("5001", "x=1").status_code == 200
+    assert client.breaker.state == "closed"
@@ -0,0 +1,641 @@
+"""
+Sink en segundo plano de logs a Supabase/PostgreSQL (conversation_logs_v2, token_usage_v2,
+ai_calls_v2) - Reemplaza el insert síncrono por evento de utils/logs_v2.py.
+
+- enqueue() solo agrega la fila a una cola acotada (LOG_SINK_QUEUE_MAX); con la cola llena la fila
+  se descarta y se cuenta (el request nunca espera por la base).
+- Un hilo agrupa filas por tabla y hace un insert multi-fila cada LOG_SINK_BATCH_ROWS filas o
+  LOG_SINK_FLUSH_SECONDS segundos. Backends (LOG_SINK_BACKEND):
+    supabase  → table(...).insert([filas]).execute() (default, mismas credenciales que antes)
+    postgres  → asyncpg copy_records_to_table (LOG_SINK_PG_DSN o PG_HOST/PG_PORT/...)
+    off       → no se envía nada
+  Sin credenciales (SUPABASE_URL/SUPABASE_KEY, o LOG_SINK_PG_DSN/PG_HOST) el sink queda apagado
+  como "off": no se reintenta ni se escribe spill.
+- Reintentos con backoff exponencial por lote; si siguen fallando el lote se escribe en disco
+  (LOG_SINK_SPILL_DIR, un JSONL por proceso) y el circuito queda abierto: mientras tanto los
+  lotes nuevos van directo a disco sin esperar a la base.
+- Errores que no se arreglan reintentando (fila inválida, columna o tabla inexistente) no
+  abren el circuito ni van a spill: el lote se reintenta fila por fila y las filas rechazadas
+  van a deadletter-<pid>.jsonl (con el error) para revisarlas a mano.
+- Replay: cuando un insert vuelve a funcionar (o en la prueba periódica con el circuito
+  cerrado) se reenvían los archivos de spill propios y los de procesos muertos (el spill activo de
+  otro worker vivo no se toca); cada archivo se toma con un rename atómico para que dos workers
+  no lo reenvíen dos veces.
+"""
+import os
+import glob
+import json
+import time
+import queue
+import atexit
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# === Config ===
+LOG_SINK_BACKEND = os.getenv("LOG_SINK_BACKEND", "supabase").strip().lower()
+LOG_SINK_PG_DSN = os.getenv("LOG_SINK_PG_DSN", "")
+LOG_SINK_QUEUE_MAX = int(os.getenv("LOG_SINK_QUEUE_MAX", "5000"))
+LOG_SINK_BATCH_ROWS = int(os.getenv("LOG_SINK_BATCH_ROWS", "100"))
+LOG_SINK_FLUSH_SECONDS = float(os.getenv("LOG_SINK_FLUSH_SECONDS", "2.0"))
+LOG_SINK_MAX_RETRIES = int(os.getenv("LOG_SINK_MAX_RETRIES", "3"))
+LOG_SINK_RETRY_BASE_SECONDS = float(os.getenv("LOG_SINK_RETRY_BASE_SECONDS", "0.5"))
+LOG_SINK_MAX_BACKOFF_SECONDS = float(os.getenv("LOG_SINK_MAX_BACKOFF_SECONDS", "120"))
+LOG_SINK_SPILL_DIR = os.getenv("LOG_SINK_SPILL_DIR", os.path.join("logs", "db_sink_spill"))
+LOG_SINK_SPILL_MAX_MB = float(os.getenv("LOG_SINK_SPILL_MAX_MB", "200"))
+LOG_SINK_CLOSE_TIMEOUT_SECONDS = float(os.getenv("LOG_SINK_CLOSE_TIMEOUT_SECONDS", "15"))
+
+# Columnas por tabla (create_tables_v2_supabase.sql); el orden es el del COPY
+TABLE_COLUMNS: Dict[str, List[str]] = {
+    "conversation_logs_v2": [
+        "timestamp", "userName", "conversation_id", "user_message", "response",
+        "response_id", "rounds_used", "had_previous_context", "extra_info",
+    ],
+    "token_usage_v2": [
+        "timestamp", "conversation_id", "response_id", "round", "model",
+        "input_tokens_total", "cached_tokens", "input_tokens_real", "output_tokens", "total_tokens",
+        "cost_input_usd", "cost_cached_usd", "cost_output_usd", "cost_total_usd",
+        "web_search_used", "tools_called",
+    ],
+    "ai_calls_v2": [
+        "conversation_id", "interaction_id", "call_type", "model", "provider",
+        "temperature", "confidence_score", "messages", "response", "token_usage", "timestamp",
+    ],
+}
+JSON_COLUMNS = {"messages", "response", "token_usage"}
+NUMERIC_COLUMNS = {"cost_input_usd", "cost_cached_usd", "cost_output_usd", "cost_total_usd", "temperature", "confidence_score"}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# BACKENDS
+# ─────────────────────────────────────────────────────────────────────────────
+
+class SupabaseBackend:
+    """Insert multi-fila con supabase-py (un request HTTP por lote y tabla)."""
+
+    name = "supabase"
+
+    def __init__(self, client_factory: Callable[[], Any]):
+        self._client_factory = client_factory
+
+    def insert_many(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        client = self._client_factory()
+        if client is None:
+            raise ConnectionError("Cliente Supabase no disponible (SUPABASE_URL / SUPABASE_KEY)")
+        client.table(table).insert(rows).execute()
+
+    def close(self) -> None:
+        pass
+
+
+class PostgresBackend:
+    """COPY binario con asyncpg (copy_records_to_table) en un event loop propio del hilo del sink."""
+
+    name = "postgres"
+
+    def __init__(self, dsn: str = LOG_SINK_PG_DSN, connect: Optional[Callable[..., Any]] = None):
+        self.dsn = dsn
+        # connect(timeout=..., **kwargs) -> conexión asyncpg (inyectable para tests)
+        self._connect = connect
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._conn = None
+
+    def _connect_kwargs(self) -> Dict[str, Any]:
+        if self.dsn:
+            return {"dsn": self.dsn}
+        return {
+            "host": os.getenv("PG_HOST"),
+            "port": int(os.getenv("PG_PORT") or 5432),
+            "user": os.getenv("PG_USER"),
+            "password": os.getenv("PG_PASSWORD"),
+            "database": os.getenv("PG_DBNAME"),
+        }
+
+    @staticmethod
+    def _record(table: str, row: Dict[str, Any]) -> Tuple[Any, ...]:
+        out = []
+        for col in TABLE_COLUMNS[table]:
+            v = row.get(col)
+            if v is None:
+                out.append(None)
+            elif col in JSON_COLUMNS:
+                out.append(json.dumps(v, ensure_ascii=False, default=str))
+            elif col == "timestamp":
+                out.append(v if isinstance(v, datetime) else datetime.fromisoformat(str(v)))
+            elif col in NUMERIC_COLUMNS:
+                out.append(Decimal(str(v)))
+            else:
+                out.append(v)
+        return tuple(out)
+
+    async def _insert(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        import asyncpg
+
+        if self._conn is None or self._conn.is_closed():
+            self._conn = await (self._connect or asyncpg.connect)(timeout=10, **self._connect_kwargs())
+        try:
+            await self._conn.copy_records_to_table(
+                table,
+                records=[self._record(table, r) for r in rows],
+                columns=TABLE_COLUMNS[table],
+            )
+        except (OSError, asyncpg.exceptions.ConnectionDoesNotExistError, asyncpg.exceptions.InterfaceError):
+            # Conexión caída: la próxima llamada reconecta
+            await self._drop_conn()
+            raise
+
+    async def _drop_conn(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                await conn.close(timeout=2)
+            except Exception:
+                conn.terminate()
+
+    def insert_many(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self._insert(table, rows))
+
+    def close(self) -> None:
+        if self._loop is not None:
+            self._loop.run_until_complete(self._drop_conn())
+            self._loop.close()
+            self._loop = None
+
+
+def _default_backend():
+    """Backend según LOG_SINK_BACKEND; None (sink apagado) si no hay credenciales configuradas."""
+    if LOG_SINK_BACKEND == "off":
+        return None
+    if LOG_SINK_BACKEND == "postgres":
+        if not LOG_SINK_PG_DSN and not os.getenv("PG_HOST"):
+            logger.warning("[DbLogSink] ⚠️ LOG_SINK_PG_DSN / PG_HOST no configurados: logs a base desactivados")
+            return None
+        return PostgresBackend()
+
+    # Import diferido: utils.logs_v2 importa este módulo
+    from utils.logs_v2 import _get_supabase_client
+
+    if _get_supabase_client() is None:
+        logger.warning("[DbLogSink] ⚠️ Cliente Supabase no disponible: logs a base desactivados")
+        return None
+    return SupabaseBackend(_get_supabase_client)
+
+
+def _is_permanent(e: BaseException) -> bool:
+    """True si reintentar no sirve: la fila o el esquema están mal, no la conexión."""
+    if isinstance(e, (ValueError, TypeError, KeyError, InvalidOperation)):
+        # Conversión de la fila (PostgresBackend._record) o payload inválido
+        return True
+    try:
+        import asyncpg
+
+        if isinstance(e, (
+            asyncpg.exceptions.DataError,
+            asyncpg.exceptions.IntegrityConstraintViolationError,
+            asyncpg.exceptions.UndefinedColumnError,
+            asyncpg.exceptions.UndefinedTableError,
+            asyncpg.exceptions.DatatypeMismatchError,
+        )):
+            return True
+    except ImportError:
+        pass
+    # PostgREST (supabase-py APIError): SQLSTATE de datos/constraints/esquema o PGRST1xx/2xx
+    code = str(getattr(e, "code", "") or "")
+    if code.startswith(("22", "23", "PGRST1", "PGRST2")):
+        return True
+    return code.startswith("42") and code != "42501"
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SINK
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _Flush:
+    def __init__(self, stop: bool = False):
+        self.done = threading.Event()
+        self.stop = stop
+
+
+class DbLogSink:
+    """Cola acotada + hilo que inserta por lotes, con reintentos, spill a disco y replay."""
+
+    def __init__(
+        self,
+        backend: Any = None,
+        queue_max: int = LOG_SINK_QUEUE_MAX,
+        batch_rows: int = LOG_SINK_BATCH_ROWS,
+        flush_seconds: float = LOG_SINK_FLUSH_SECONDS,
+        max_retries: int = LOG_SINK_MAX_RETRIES,
+        retry_base_seconds: float = LOG_SINK_RETRY_BASE_SECONDS,
+        max_backoff_seconds: float = LOG_SINK_MAX_BACKOFF_SECONDS,
+        spill_dir: str = LOG_SINK_SPILL_DIR,
+        spill_max_mb: float = LOG_SINK_SPILL_MAX_MB,
+    ):
+        self.backend = backend
+        self.batch_rows = max(1, batch_rows)
+        self.flush_seconds = flush_seconds
+        self.max_retries = max(1, max_retries)
+        self.retry_base_seconds = retry_base_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = int(spill_max_mb * 1024 * 1024)
+        self.spill_path = os.path.join(spill_dir, f"spill-{os.getpid()}.jsonl")
+        self._claim_seq = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, queue_max))
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        # Circuito: mientras monotonic() < _open_until los lotes van directo a disco
+        self._open_until = 0.0
+        self._backoff = 0.0
+        self.last_error: Optional[str] = None
+        self.enqueued = 0
+        self.inserted = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed_batches = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.dropped = 0
+        self.dead_lettered = 0
+        self._last_drop_warning = 0.0
+
+    # --- productor ---
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="db-log-sink", daemon=True)
+                self._thread.start()
+
+    def start(self) -> None:
+        """Inicia el hilo (también reenvía el spill que haya quedado de corridas anteriores)."""
+        if self.backend is not None and not self._closed:
+            self._ensure_started()
+
+    def enqueue(self, table: str, row: Dict[str, Any]) -> bool:
+        """Encola una fila para `table`. Retorna False si se descartó (sin backend, cola llena o cerrado)."""
+        if self.backend is None:
+            return False
+        if not self._closed:
+            self._ensure_started()
+            try:
+                self._queue.put_nowait((table, row))
+                with self._lock:
+                    self.enqueued += 1
+                return True
+            except queue.Full:
+                pass
+        with self._lock:
+            self.dropped += 1
+            now = time.time()
+            warn = now - self._last_drop_warning >= 60
+            if warn:
+                self._last_drop_warning = now
+        if warn:
+            logger.warning(f"[DbLogSink] ⚠️ Cola llena o cerrada: descartando filas ({self.dropped} en total)")
+        return False
+
+    # --- envío ---
+
+    def _circuit_open(self) -> bool:
+        return time.monotonic() < self._open_until
+
+    def _insert_with_retry(self, table: str, rows: List[Dict[str, Any]]) -> bool:
+        for attempt in range(self.max_retries):
+            try:
+                self.backend.insert_many(table, rows)
+                with self._lock:
+                    self.inserted += len(rows)
+                    self.batches += 1
+                self._backoff = 0.0
+                self._open_until = 0.0
+                self.last_error = None
+                return True
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                if _is_permanent(e):
+                    self._isolate_bad_rows(table, rows, e)
+                    return True
+                if attempt + 1 < self.max_retries:
+                    with self._lock:
+                        self.retries += 1
+                    time.sleep(self.retry_base_seconds * (2 ** attempt))
+
+        self._backoff = min(self.max_backoff_seconds, max(self.retry_base_seconds, self._backoff * 2 or 1.0))
+        self._open_until = time.monotonic() + self._backoff
+        with self._lock:
+            self.failed_batches += 1
+        logger.error(
+            f"[DbLogSink] ❌ Falló insert de {len(rows)} filas en {table} tras {self.max_retries} intentos "
+            f"({self.last_error}); circuito abierto {self._backoff:.1f}s"
+        )
+        return False
+
+    def _isolate_bad_rows(self, table: str, rows: List[Dict[str, Any]], error: BaseException) -> None:
+        """
+        Error permanente en un lote: reintenta fila por fila (una vez) para no perder las buenas.
+        Las rechazadas van a dead-letter; las que fallan por conexión van a spill como siempre.
+        """
+        bad: List[Tuple[Dict[str, Any], BaseException]] = []
+        transient: List[Dict[str, Any]] = []
+        if len(rows) == 1:
+            bad.append((rows[0], error))
+        else:
+            for row in rows:
+                try:
+                    self.backend.insert_many(table, [row])
+                    with self._lock:
+                        self.inserted += 1
+                except Exception as e:
+                    if _is_permanent(e):
+                        bad.append((row, e))
+                    else:
+                        transient.append(row)
+        if bad:
+            self._dead_letter(table, bad)
+        if transient:
+            self._spill(table, transient)
+
+    def _dead_letter(self, table: str, bad: List[Tuple[Dict[str, Any], BaseException]]) -> None:
+        path = os.path.join(self.spill_dir, f"deadletter-{os.getpid()}.jsonl")
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                for row, e in bad:
+                    f.write(json.dumps(
+                        {"table": table, "error": f"{type(e).__name__}: {e}", "row": row},
+                        ensure_ascii=False, default=str,
+                    ) + "\n")
+        except Exception as e:
+            logger.error(f"[DbLogSink] ❌ No se pudo escribir dead-letter {path}: {e}")
+        with self._lock:
+            self.dead_lettered += len(bad)
+        logger.error(
+            f"[DbLogSink] ❌ {len(bad)} filas rechazadas por {table} ({type(bad[0][1]).__name__}: {bad[0][1]}); "
+            f"guardadas en {os.path.basename(path)}"
+        )
+
+    def _spill(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            if self._spill_bytes() >= self.spill_max_bytes:
+                with self._lock:
+                    self.dropped += len(rows)
+                logger.error(f"[DbLogSink] ❌ Spill lleno ({self.spill_dir}): {len(rows)} filas descartadas")
+                return
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps({"table": table, "row": row}, ensure_ascii=False, default=str) + "\n")
+            with self._lock:
+                self.spilled += len(rows)
+        except Exception as e:
+            with self._lock:
+                self.dropped += len(rows)
+            logger.error(f"[DbLogSink] ❌ No se pudo escribir spill {self.spill_path}: {e}")
+
+    def _spill_files(self) -> List[str]:
+        paths = glob.glob(os.path.join(self.spill_dir, "spill-*.jsonl*"))
+        return sorted(p for p in paths if not p.endswith(".tmp"))
+
+    def _spill_bytes(self) -> int:
+        total = 0
+        for path in self._spill_files():
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        return total
+
+    def _send(self, pending: Dict[str, List[Dict[str, Any]]]) -> None:
+        for table, rows in pending.items():
+            for i in range(0, len(rows), self.batch_rows):
+                chunk = rows[i:i + self.batch_rows]
+                if self._circuit_open() or not self._insert_with_retry(table, chunk):
+                    self._spill(table, chunk)
+        if pending and not self._circuit_open():
+            self._replay()
+
+    def _claim(self, path: str) -> Optional[str]:
+        """
+        Toma un archivo de spill para reenviarlo con un rename atómico a un nombre único
+        <archivo>.replay-<pid>-<n> (nunca pisa otro archivo ya tomado). None si lo tiene otro
+        proceso vivo, si otro proceso lo tomó primero o si ya no existe.
+        """
+        base, _, claim = os.path.basename(path).partition(".replay-")
+        mine = str(os.getpid())
+        if claim:
+            owner = claim.split("-", 1)[0]
+            if owner == mine:
+                return path
+        else:
+            # Spill activo spill-<pid>.jsonl: su dueño puede estar escribiendo en él. Solo se toma
+            # el propio (el spill y el replay corren en el mismo hilo) o el de un proceso muerto
+            owner = base[len("spill-"):].split(".", 1)[0]
+        if owner != mine and _pid_alive(owner):
+            return None
+        while True:
+            self._claim_seq += 1
+            claimed = os.path.join(os.path.dirname(path), f"{base}.replay-{mine}-{self._claim_seq}")
+            if not os.path.exists(claimed):
+                break
+        try:
+            os.replace(path, claimed)
+        except OSError:
+            return None
+        return claimed
+
+    def _replay(self) -> None:
+        for path in self._spill_files():
+            if self._circuit_open():
+                return
+            if not os.path.exists(path):
+                # El listado ya no es actual (otro proceso lo tomó o ya se reenvió)
+                continue
+            claimed = self._claim(path)
+            if claimed is None:
+                continue
+            try:
+                entries = _read_spill(claimed)
+            except FileNotFoundError:
+                continue
+            sent = 0
+            while sent < len(entries):
+                table = entries[sent]["table"]
+                chunk = []
+                while sent + len(chunk) < len(entries) and len(chunk) < self.batch_rows \
+                        and entries[sent + len(chunk)]["table"] == table:
+                    chunk.append(entries[sent + len(chunk)]["row"])
+                if not self._insert_with_retry(table, chunk):
+                    break
+                sent += len(chunk)
+                with self._lock:
+                    self.replayed += len(chunk)
+            if sent >= len(entries):
+                os.remove(claimed)
+                logger.info(f"[DbLogSink] 🔁 Spill reenviado: {len(entries)} filas ({os.path.basename(path)})")
+            else:
+                # Lo que falta queda en el mismo archivo para el próximo replay
+                tmp = claimed + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    for e in entries[sent:]:
+                        f.write(json.dumps(e, ensure_ascii=False, default=str) + "\n")
+                os.replace(tmp, claimed)
+                return
+
+    def _run(self) -> None:
+        pending: Dict[str, List[Dict[str, Any]]] = {}
+        pending_rows = 0
+        first_at = 0.0
+        try:
+            if self._spill_files():
+                self._replay()
+        except Exception as e:
+            logger.error(f"[DbLogSink] ❌ Error reenviando spill: {e}")
+        while True:
+            timeout = self.flush_seconds
+            if pending_rows:
+                timeout = max(0.0, first_at + self.flush_seconds - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, tuple):
+                table, row = item
+                pending.setdefault(table, []).append(row)
+                if not pending_rows:
+                    first_at = time.monotonic()
+                pending_rows += 1
+                if pending_rows < self.batch_rows and time.monotonic() - first_at < self.flush_seconds:
+                    continue
+
+            try:
+                if pending:
+                    self._send(pending)
+                elif item is None and not self._circuit_open() and self._spill_files():
+                    # Sin tráfico: prueba periódica de recuperación
+                    self._replay()
+            except Exception as e:
+                logger.error(f"[DbLogSink] ❌ Error en el sink de logs: {e}")
+            pending, pending_rows = {}, 0
+            if isinstance(item, _Flush):
+                item.done.set()
+                if item.stop:
+                    return
+
+    # --- ciclo de vida ---
+
+    def flush(self, timeout: float = LOG_SINK_CLOSE_TIMEOUT_SECONDS) -> bool:
+        """Espera a que lo encolado hasta ahora quede insertado (o en spill)."""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        marker = _Flush()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.done.wait(timeout)
+
+    def close(self, timeout: float = LOG_SINK_CLOSE_TIMEOUT_SECONDS) -> bool:
+        """Deja de aceptar filas, envía (o manda a spill) lo pendiente y detiene el hilo."""
+        self._closed = True
+        ok = True
+        if self._thread is not None and self._thread.is_alive():
+            marker = _Flush(stop=True)
+            try:
+                self._queue.put(marker, timeout=timeout)
+                ok = marker.done.wait(timeout)
+            except queue.Full:
+                ok = False
+            if not ok:
+                logger.error("[DbLogSink] ❌ No se pudo vaciar la cola del sink al cerrar (timeout)")
+        if ok and self.backend is not None:
+            try:
+                self.backend.close()
+            except Exception:
+                pass
+        return ok
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": getattr(self.backend, "name", None),
+                "queued": self._queue.qsize(),
+                "queue_max": self._queue.maxsize,
+                "batch_rows": self.batch_rows,
+                "flush_seconds": self.flush_seconds,
+                "enqueued": self.enqueued,
+                "inserted": self.inserted,
+                "batches": self.batches,
+                "retries": self.retries,
+                "failed_batches": self.failed_batches,
+                "spilled": self.spilled,
+                "replayed": self.replayed,
+                "dropped": self.dropped,
+                "dead_lettered": self.dead_lettered,
+                "spill_files": len(self._spill_files()),
+                "spill_bytes": self._spill_bytes(),
+                "circuit_open": self._circuit_open(),
+                "backoff_seconds": self._backoff,
+                "last_error": self.last_error,
+                "running": self._thread is not None and self._thread.is_alive(),
+            }
+
+
+def _read_spill(path: str) -> List[Dict[str, Any]]:
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Línea truncada (p. ej. el proceso murió escribiendo): se descarta
+                logger.warning(f"[DbLogSink] ⚠️ Línea inválida en {path}, se omite")
+                continue
+            if entry.get("table") in TABLE_COLUMNS and isinstance(entry.get("row"), dict):
+                entries.append(entry)
+    return entries
+
+
+def _pid_alive(pid: str) -> bool:
+    try:
+        os.kill(int(pid), 0)
+        return True
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True
+
+
+_db_log_sink: Optional[DbLogSink] = None
+_db_log_sink_lock = threading.Lock()
+
+
+def get_db_log_sink() -> DbLogSink:
+    """Sink de logs a base de datos del proceso (singleton; backend según LOG_SINK_BACKEND)."""
+    global _db_log_sink
+    if _db_log_sink is None:
+        with _db_log_sink_lock:
+            if _db_log_sink is None:
+                _db_log_sink = DbLogSink(backend=_default_backend())
+                atexit.register(_db_log_sink.close)
+    return _db_log_sink
+
+
+def close_db_log_sink() -> None:
+    """Envía lo pendiente y detiene el sink (shutdown del servidor)."""
+    if _db_log_sink is not None:
+        _db_log_sink.close()
@@ -0,0 +1,378 @@
+"""
+Rotación y archivo comprimido de logs/*.csv y logs/*.log.
+
+- Un archivo se rota al pasar LOG_ROTATE_MAX_MB o cuando su segmento activo tiene más de
+  LOG_ROTATE_MAX_AGE_HOURS. El segmento pasa a logs/archive/<nombre>/ y se comprime con gzip.
+- CSV: se renombra (el escritor de utils/log_writer.py abre por lote, así que la siguiente
+  escritura crea el archivo nuevo con sus headers). *.log: copia + truncate, porque los
+  logging.FileHandler (debugging.log, app_errors.log) mantienen el archivo abierto.
+- La compresión espera LOG_ROTATE_COMPRESS_GRACE_SECONDS tras el rename para que terminen los
+  lotes que otro worker ya tenía abiertos sobre el archivo.
+- Retención: se borran los segmentos cuyo fin es anterior a LOG_ARCHIVE_RETENTION_DAYS.
+- manifest.json registra cada segmento (log, archivo, inicio/fin UTC, tamaños) y desde cuándo
+  está activo cada log; /download-log/{logname}?start=...&end=... lo usa para elegir segmentos.
+- Entre workers solo uno rota a la vez (flock sobre logs/archive/.lock, si existe fcntl).
+
+Uso manual (p. ej. desde cron): python -m utils.log_rotation [--force]
+"""
+import os
+import json
+import glob
+import gzip
+import time
+import shutil
+import logging
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows (desarrollo local): sin lock entre procesos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# === Config ===
+LOGS_DIR = "logs"
+LOG_ARCHIVE_DIR = os.getenv("LOG_ARCHIVE_DIR", os.path.join(LOGS_DIR, "archive"))
+LOG_ROTATE_MAX_MB = float(os.getenv("LOG_ROTATE_MAX_MB", "50"))
+LOG_ROTATE_MAX_AGE_HOURS = float(os.getenv("LOG_ROTATE_MAX_AGE_HOURS", "24"))
+LOG_ARCHIVE_RETENTION_DAYS = float(os.getenv("LOG_ARCHIVE_RETENTION_DAYS", "90"))
+LOG_ROTATE_CHECK_SECONDS = float(os.getenv("LOG_ROTATE_CHECK_SECONDS", "300"))
+LOG_ROTATE_COMPRESS_GRACE_SECONDS = float(os.getenv("LOG_ROTATE_COMPRESS_GRACE_SECONDS", "5"))
+
+ROTATE_PATTERNS = ("*.csv", "*.log")
+COPY_TRUNCATE_SUFFIXES = (".log",)
+MANIFEST_NAME = "manifest.json"
+_TS_TAG = "%Y%m%dT%H%M%S"
+
+
+def _now() -> datetime:
+    return datetime.utcnow().replace(microsecond=0)
+
+
+def _iso(dt: Optional[datetime]) -> Optional[str]:
+    return dt.isoformat() if dt else None
+
+
+def _parse(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def to_naive_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    """El manifest guarda UTC sin zona: un datetime con zona (p. ej. "...Z" o "+00:00") se pasa a UTC naive."""
+    if dt is None or dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _header_only(path: str, size: int) -> bool:
+    """CSV sin filas (solo headers): no vale la pena rotarlo."""
+    if not path.endswith(".csv") or size > 64 * 1024:
+        return False
+    with open(path, "rb") as f:
+        return f.read().count(b"\n") <= 1
+
+
+class LogRotator:
+    """Rotación por tamaño/edad, compresión gzip, retención y manifest de segmentos."""
+
+    def __init__(
+        self,
+        logs_dir: str = LOGS_DIR,
+        archive_dir: str = LOG_ARCHIVE_DIR,
+        max_mb: float = LOG_ROTATE_MAX_MB,
+        max_age_hours: float = LOG_ROTATE_MAX_AGE_HOURS,
+        retention_days: float = LOG_ARCHIVE_RETENTION_DAYS,
+        compress_grace_seconds: float = LOG_ROTATE_COMPRESS_GRACE_SECONDS,
+    ):
+        self.logs_dir = logs_dir
+        self.archive_dir = archive_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_age = timedelta(hours=max_age_hours)
+        self.retention = timedelta(days=retention_days)
+        self.compress_grace_seconds = compress_grace_seconds
+        self.manifest_path = os.path.join(archive_dir, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self.passes = 0
+        self.rotated = 0
+        self.compressed = 0
+        self.deleted = 0
+        self.last_pass: Optional[str] = None
+
+    # --- manifest ---
+
+    def load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        manifest.setdefault("logs", {})
+        manifest.setdefault("segments", [])
+        return manifest
+
+    def _save_manifest(self, manifest: Dict[str, Any]) -> None:
+        os.makedirs(self.archive_dir, exist_ok=True)
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    # --- rotación ---
+
+    def _candidates(self) -> List[str]:
+        names = set()
+        for pattern in ROTATE_PATTERNS:
+            names.update(os.path.basename(p) for p in glob.glob(os.path.join(self.logs_dir, pattern)))
+        return sorted(names)
+
+    def _rotate_file(self, name: str, state: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+        src = os.path.join(self.logs_dir, name)
+        stem, ext = os.path.splitext(name)
+        start = _parse(state.get("active_since"))
+        seg_dir = os.path.join(self.archive_dir, stem)
+        os.makedirs(seg_dir, exist_ok=True)
+        seg_name = f"{stem}.{start.strftime(_TS_TAG) if start else 'inicio'}-{now.strftime(_TS_TAG)}{ext}"
+        seg_path = os.path.join(seg_dir, seg_name)
+        n = 1
+        while os.path.exists(seg_path) or os.path.exists(seg_path + ".gz"):
+            n += 1
+            seg_path = os.path.join(seg_dir, f"{os.path.splitext(seg_name)[0]}.{n}{ext}")
+
+        if ext in COPY_TRUNCATE_SUFFIXES:
+            shutil.copyfile(src, seg_path)
+            with open(src, "r+b") as f:
+                f.truncate(0)
+        else:
+            os.replace(src, seg_path)
+
+        state["active_since"] = _iso(now)
+        return {
+            "log": name,
+            "file": os.path.relpath(seg_path, self.archive_dir),
+            "start": _iso(start),
+            "end": _iso(now),
+            "raw_bytes": os.path.getsize(seg_path),
+            "bytes": os.path.getsize(seg_path),
+            "compression": None,
+        }
+
+    def _compress(self, seg: Dict[str, Any]) -> bool:
+        path = os.path.join(self.archive_dir, seg["file"])
+        if not os.path.exists(path):
+            return False
+        if time.time() - os.path.getmtime(path) < self.compress_grace_seconds:
+            return False
+        tmp = path + ".gz.tmp"
+        with open(path, "rb") as src, gzip.open(tmp, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(tmp, path + ".gz")
+        os.remove(path)
+        seg["file"] += ".gz"
+        seg["bytes"] = os.path.getsize(path + ".gz")
+        seg["compression"] = "gzip"
+        return True
+
+    def _acquire_process_lock(self):
+        if fcntl is None:
+            return True
+        os.makedirs(self.archive_dir, exist_ok=True)
+        f = open(os.path.join(self.archive_dir, ".lock"), "w")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return f
+        except OSError:
+            f.close()
+            return None
+
+    def rotate_pass(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Una pasada: rota lo que toque (todo lo no vacío si force), comprime segmentos pendientes
+        y aplica la retención. Returns: {"ok", "rotated", "compressed", "deleted"} o skipped.
+        """
+        with self._lock:
+            lock = self._acquire_process_lock()
+            if lock is None:
+                return {"ok": True, "skipped": "otro proceso está rotando"}
+            try:
+                return self._pass(force)
+            finally:
+                if lock is not True:
+                    lock.close()
+
+    def _pass(self, force: bool) -> Dict[str, Any]:
+        now = _now()
+        manifest = self.load_manifest()
+        rotated: List[str] = []
+        for name in self._candidates():
+            path = os.path.join(self.logs_dir, name)
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            state = manifest["logs"].setdefault(name, {"active_since": None, "first_seen": _iso(now)})
+            since = _parse(state.get("active_since") or state.get("first_seen")) or now
+            due = force or size >= self.max_bytes or now - since >= self.max_age
+            if not due or size == 0 or _header_only(path, size):
+                continue
+            try:
+                manifest["segments"].append(self._rotate_file(name, state, now))
+                rotated.append(name)
+            except OSError as e:
+                logger.error(f"[LogRotation] ❌ No se pudo rotar {name}: {e}")
+
+        compressed = 0
+        for seg in manifest["segments"]:
+            if not seg.get("compression"):
+                try:
+                    compressed += int(self._compress(seg))
+                except OSError as e:
+                    logger.error(f"[LogRotation] ❌ No se pudo comprimir {seg['file']}: {e}")
+
+        cutoff = now - self.retention
+        keep, deleted = [], 0
+        for seg in manifest["segments"]:
+            if _parse(seg["end"]) < cutoff:
+                try:
+                    os.remove(os.path.join(self.archive_dir, seg["file"]))
+                except FileNotFoundError:
+                    pass
+                deleted += 1
+            else:
+                keep.append(seg)
+        manifest["segments"] = keep
+
+        self._save_manifest(manifest)
+        self.passes += 1
+        self.rotated += len(rotated)
+        self.compressed += compressed
+        self.deleted += deleted
+        self.last_pass = _iso(now)
+        if rotated or deleted:
+            logger.info(f"[LogRotation] 🗜️ Rotados: {rotated or '-'} | comprimidos: {compressed} | eliminados: {deleted}")
+        return {"ok": True, "rotated": rotated, "compressed": compressed, "deleted": deleted}
+
+    # --- lectura por rango ---
+
+    def segments_for_range(
+        self, logname: str, start: Optional[datetime] = None, end: Optional[datetime] = None
+    ) -> List[str]:
+        """
+        Rutas (segmentos archivados en orden + archivo activo) que cubren [start, end] en UTC.
+        Un segmento con inicio desconocido (el primero) se considera desde siempre.
+        """
+        start, end = to_naive_utc(start), to_naive_utc(end)
+        manifest = self.load_manifest()
+        segs = [s for s in manifest["segments"] if s["log"] == logname]
+        segs.sort(key=lambda s: s["end"])
+        paths = []
+        for seg in segs:
+            seg_start, seg_end = _parse(seg.get("start")), _parse(seg["end"])
+            if start and seg_end < start:
+                continue
+            if end and seg_start and seg_start > end:
+                continue
+            paths.append(os.path.join(self.archive_dir, seg["file"]))
+
+        active = os.path.join(self.logs_dir, logname)
+        active_since = _parse(manifest["logs"].get(logname, {}).get("active_since"))
+        if os.path.isfile(active) and not (end and active_since and active_since > end):
+            paths.append(active)
+        return paths
+
+    # --- hilo ---
+
+    def start(self, interval: float = LOG_ROTATE_CHECK_SECONDS) -> None:
+        """Inicia (una sola vez) el hilo daemon que corre rotate_pass() cada `interval` segundos."""
+        if interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop_event.clear()
+
+        def _run():
+            while not self._stop_event.wait(interval):
+                try:
+                    self.rotate_pass()
+                except Exception as e:
+                    logger.error(f"[LogRotation] ❌ Error rotando logs: {e}")
+
+        self._thread = threading.Thread(target=_run, name="log-rotation", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def stats(self) -> Dict[str, Any]:
+        manifest = self.load_manifest()
+        return {
+            "archive_dir": self.archive_dir,
+            "max_mb": round(self.max_bytes / 1024 / 1024, 2),
+            "max_age_hours": self.max_age.total_seconds() / 3600,
+            "retention_days": self.retention.total_seconds() / 86400,
+            "segments": len(manifest["segments"]),
+            "archive_bytes": sum(s.get("bytes", 0) for s in manifest["segments"]),
+            "raw_bytes": sum(s.get("raw_bytes", 0) for s in manifest["segments"]),
+            "passes": self.passes,
+            "rotated": self.rotated,
+            "compressed": self.compressed,
+            "deleted": self.deleted,
+            "last_pass": self.last_pass,
+        }
+
+
+def iter_log_bytes(paths: List[str], chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    """
+    Contenido descomprimido de los segmentos en orden. En CSV los headers de los segmentos
+    siguientes se omiten si son iguales al primero.
+    """
+    header: Optional[bytes] = None
+    for path in paths:
+        if not os.path.exists(path) and os.path.exists(path + ".gz"):
+            path += ".gz"  # se comprimió entre la selección y la lectura
+        opener = gzip.open if path.endswith(".gz") else open
+        try:
+            f = opener(path, "rb")
+        except FileNotFoundError:
+            continue
+        with f:
+            if ".csv" in os.path.basename(path):
+                first = f.readline()
+                if header is None:
+                    header = first
+                    yield first
+                elif first != header:
+                    yield first
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+
+_log_rotator: Optional[LogRotator] = None
+_log_rotator_lock = threading.Lock()
+
+
+def get_log_rotator() -> LogRotator:
+    """Rotador de logs del proceso (singleton)."""
+    global _log_rotator
+    if _log_rotator is None:
+        with _log_rotator_lock:
+            if _log_rotator is None:
+                _log_rotator = LogRotator()
+    return _log_rotator
+
+
+def main():
+    p = argparse.ArgumentParser(description="Rota, comprime y purga logs/*.csv y logs/*.log")
+    p.add_argument("--force", action="store_true", help="Rota todos los logs no vacíos sin importar tamaño/edad")
+    args = p.parse_args()
+    print(json.dumps(get_log_rotator().rotate_pass(force=args.force), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
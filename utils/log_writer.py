@@ -0,0 +1,254 @@
+"""
+Escritor de logs CSV en segundo plano - Los log_* de utils/logs.py, utils/logs_v2.py y los
+registros de tokens de sesión solo encolan la fila; nunca abren archivos en el request.
+
+- Cola acotada (LOG_WRITER_QUEUE_MAX filas). Política con la cola llena: la fila nueva se
+  descarta y se cuenta en "dropped" (el request nunca espera por un log).
+- Un solo hilo escritor agrupa las filas por archivo y escribe cada lote con un open/writerows,
+  al juntar LOG_WRITER_BATCH_ROWS filas o cada LOG_WRITER_FLUSH_SECONDS segundos.
+- Los valores dict/list (y los envueltos en JsonCell) se serializan a JSON en el hilo escritor.
+  enqueue() solo copia sus contenedores (dicts/listas, sin tocar los strings): la fila refleja
+  el payload al momento de la llamada aunque el caller lo modifique después, sin pagar el
+  json.dumps de prompts y respuestas completos en el request.
+- Si el archivo no existe o está vacío se escriben primero sus headers.
+- close_log_writer() (shutdown de main.py y atexit) vacía la cola antes de terminar.
+"""
+import os
+import csv
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# === Config ===
+LOG_WRITER_QUEUE_MAX = int(os.getenv("LOG_WRITER_QUEUE_MAX", "10000"))
+LOG_WRITER_BATCH_ROWS = int(os.getenv("LOG_WRITER_BATCH_ROWS", "200"))
+LOG_WRITER_FLUSH_SECONDS = float(os.getenv("LOG_WRITER_FLUSH_SECONDS", "1.0"))
+LOG_WRITER_CLOSE_TIMEOUT_SECONDS = float(os.getenv("LOG_WRITER_CLOSE_TIMEOUT_SECONDS", "10"))
+
+
+class _Flush:
+    """Marca en la cola: el escritor vacía lo pendiente y avisa con el evento."""
+
+    def __init__(self, stop: bool = False):
+        self.done = threading.Event()
+        self.stop = stop
+
+
+class JsonCell:
+    """Valor que el hilo escritor serializa con json.dumps aunque sea str (mismo texto que json.dumps directo)."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+
+def _copy_containers(value: Any) -> Any:
+    """Copia dicts/listas/tuplas anidados; strings, números y otros objetos van por referencia."""
+    if isinstance(value, dict):
+        return {k: _copy_containers(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_copy_containers(v) for v in value]
+    return value
+
+
+def _snapshot(value: Any) -> Any:
+    """Foto barata de una celda al encolar (sin serializar): la mutación posterior no llega al CSV."""
+    if isinstance(value, JsonCell):
+        return JsonCell(_copy_containers(value.value))
+    if isinstance(value, (dict, list, tuple)):
+        return _copy_containers(value)
+    return value
+
+
+def _cell(value: Any) -> Any:
+    if isinstance(value, JsonCell):
+        return json.dumps(value.value, ensure_ascii=False, default=str)
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return value
+
+
+class CsvLogWriter:
+    """Cola acotada + hilo escritor de filas CSV. Thread-safe; enqueue() nunca bloquea."""
+
+    def __init__(
+        self,
+        queue_max: int = LOG_WRITER_QUEUE_MAX,
+        batch_rows: int = LOG_WRITER_BATCH_ROWS,
+        flush_seconds: float = LOG_WRITER_FLUSH_SECONDS,
+    ):
+        self.batch_rows = max(1, batch_rows)
+        self.flush_seconds = flush_seconds
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, queue_max))
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.write_errors = 0
+        self.batches = 0
+        self._per_file: Dict[str, Dict[str, int]] = {}
+        self._last_drop_warning = 0.0
+
+    def _file_stats(self, path: str) -> Dict[str, int]:
+        return self._per_file.setdefault(path, {"written": 0, "dropped": 0, "errors": 0})
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="csv-log-writer", daemon=True)
+                self._thread.start()
+
+    def enqueue(self, path: str, row: Sequence[Any], headers: Optional[Sequence[str]] = None) -> bool:
+        """Encola una fila para `path`. Retorna False si se descartó (cola llena o writer cerrado)."""
+        if not self._closed:
+            self._ensure_started()
+            try:
+                # Solo se copian los contenedores; json.dumps corre en el hilo escritor
+                cells = [_snapshot(v) for v in row]
+                self._queue.put_nowait((path, cells, list(headers) if headers else None))
+                with self._lock:
+                    self.enqueued += 1
+                return True
+            except queue.Full:
+                pass
+        with self._lock:
+            self.dropped += 1
+            self._file_stats(path)["dropped"] += 1
+            now = time.time()
+            warn = now - self._last_drop_warning >= 60
+            if warn:
+                self._last_drop_warning = now
+        if warn:
+            logger.warning(f"[LogWriter] ⚠️ Cola de logs llena o cerrada: descartando filas ({self.dropped} en total)")
+        return False
+
+    def _write_batch(self, pending: Dict[str, Tuple[Optional[List[str]], List[List[Any]]]]) -> None:
+        for path, (headers, rows) in pending.items():
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                with open(path, "a", newline="", encoding="utf-8") as f:
+                    writer = csv.writer(f)
+                    if headers and f.tell() == 0:
+                        writer.writerow(headers)
+                    writer.writerows([_cell(v) for v in row] for row in rows)
+                with self._lock:
+                    self.written += len(rows)
+                    self._file_stats(path)["written"] += len(rows)
+            except Exception as e:
+                with self._lock:
+                    self.write_errors += len(rows)
+                    self._file_stats(path)["errors"] += len(rows)
+                logger.error(f"[LogWriter] ❌ Error escribiendo {len(rows)} filas en {path}: {e}")
+        if pending:
+            with self._lock:
+                self.batches += 1
+
+    def _run(self) -> None:
+        pending: Dict[str, Tuple[Optional[List[str]], List[List[Any]]]] = {}
+        pending_rows = 0
+        first_at = 0.0
+        while True:
+            timeout = None
+            if pending_rows:
+                timeout = max(0.0, first_at + self.flush_seconds - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, tuple):
+                path, row, headers = item
+                entry = pending.setdefault(path, (headers, []))
+                entry[1].append(row)
+                if not pending_rows:
+                    first_at = time.monotonic()
+                pending_rows += 1
+                if pending_rows < self.batch_rows and time.monotonic() - first_at < self.flush_seconds:
+                    continue
+
+            self._write_batch(pending)
+            pending, pending_rows = {}, 0
+            if isinstance(item, _Flush):
+                item.done.set()
+                if item.stop:
+                    return
+
+    def flush(self, timeout: float = LOG_WRITER_CLOSE_TIMEOUT_SECONDS) -> bool:
+        """Espera a que todo lo encolado hasta ahora quede escrito. Retorna False si venció el timeout."""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        marker = _Flush()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.done.wait(timeout)
+
+    def close(self, timeout: float = LOG_WRITER_CLOSE_TIMEOUT_SECONDS) -> bool:
+        """Deja de aceptar filas, escribe lo pendiente y detiene el hilo."""
+        self._closed = True
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        marker = _Flush(stop=True)
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            logger.error("[LogWriter] ❌ No se pudo vaciar la cola de logs al cerrar (timeout)")
+            return False
+        ok = marker.done.wait(timeout)
+        if ok:
+            logger.info(f"[LogWriter] ✅ Cerrado: {self.written} filas escritas, {self.dropped} descartadas")
+        return ok
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "queue_max": self._queue.maxsize,
+                "batch_rows": self.batch_rows,
+                "flush_seconds": self.flush_seconds,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "write_errors": self.write_errors,
+                "batches": self.batches,
+                "running": self._thread is not None and self._thread.is_alive(),
+                "files": {path: dict(v) for path, v in self._per_file.items()},
+            }
+
+
+_log_writer: Optional[CsvLogWriter] = None
+_log_writer_lock = threading.Lock()
+
+
+def get_log_writer() -> CsvLogWriter:
+    """Escritor de logs CSV del proceso (singleton)."""
+    global _log_writer
+    if _log_writer is None:
+        with _log_writer_lock:
+            if _log_writer is None:
+                _log_writer = CsvLogWriter()
+                atexit.register(_log_writer.close)
+    return _log_writer
+
+
+def enqueue_csv_row(path: str, row: Sequence[Any], headers: Optional[Sequence[str]] = None) -> bool:
+    """Atajo para get_log_writer().enqueue(...)."""
+    return get_log_writer().enqueue(path, row, headers)
+
+
+def close_log_writer() -> None:
+    """Vacía y detiene el escritor (shutdown del servidor)."""
+    if _log_writer is not None:
+        _log_writer.close()
@@ -7,6 +7,8 @@ from datetime import datetime
 from zoneinfo import ZoneInfo
 import logging
 
+from utils.log_writer import JsonCell, enqueue_csv_row
+
 LOGS_DIR = "logs"
 os.makedirs(LOGS_DIR, exist_ok=True)
 
@@ -30,21 +32,30 @@ CONTEXT_LOG_FILE = os.path.join(LOGS_DIR, "context_log.csv")
 ZELL_API_LOG_FILE = os.path.join(LOGS_DIR, "zell_api_calls.csv")
 CONVERSATION_LOG_FILE = os.path.join(LOGS_DIR, "conversation_log.csv")
 
-ensure_csv_headers(AI_LOG_FILE, [
+AI_LOG_HEADERS = [
     "conversation_id", "interaction_id", "call_type", "model", "provider", "temperature",
     "messages", "confidence_score", "response", "token_usage", "timestamp"
-])
-ensure_csv_headers(CONTEXT_LOG_FILE, [
+]
+CONTEXT_LOG_HEADERS = [
     "conversation_id", "interaction_id", "action", "context_data", "timestamp"
-])
-ensure_csv_headers(ZELL_API_LOG_FILE, [
+]
+ZELL_API_LOG_HEADERS = [
     "conversation_id", "interaction_id", "action", "api_action", "endpoint",
     "request_data", "response_data", "status_code", "headers", "timestamp"
-])
-ensure_csv_headers(CONVERSATION_LOG_FILE, [
+]
+CONVERSATION_LOG_HEADERS = [
     "userName", "conversation_id", "interaction_id", "step_id",
     "user_input", "system_output", "classification", "extra_info", "timestamp"
-])
+]
+
+ensure_csv_headers(AI_LOG_FILE, AI_LOG_HEADERS)
+ensure_csv_headers(CONTEXT_LOG_FILE, CONTEXT_LOG_HEADERS)
+ensure_csv_headers(ZELL_API_LOG_FILE, ZELL_API_LOG_HEADERS)
+ensure_csv_headers(CONVERSATION_LOG_FILE, CONVERSATION_LOG_HEADERS)
+
+# Las filas se encolan al escritor en segundo plano (utils/log_writer.py): ningún log_* abre
+# archivos en el request. Los payloads (JsonCell) se copian al encolar (solo dicts/listas) y se
+# serializan a JSON en el hilo escritor: el CSV guarda lo que había al momento de la llamada.
 
 # ─────────────────────────────────────────────────────────────────────────────
 # INTERACTION LOG
@@ -68,23 +79,7 @@ def log_interaction(userName, conversation_id, interaction_id, step_id, user_inp
         "timestamp": timestamp
     }
 
-    try:
-        fieldnames = [
-            "userName", "conversation_id", "interaction_id", "step_id",
-            "user_input", "system_output", "classification", "extra_info", "timestamp"
-        ]
-
-        with open(CONVERSATION_LOG_FILE, "a", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
-
-            # Asegura que tenga encabezados si el archivo está vacío
-            if f.tell() == 0:
-                writer.writeheader()
-            print("LOGGING ROW:", row)
-            print("TYPE:", type(row))
-            writer.writerow(row)
-    except Exception as e:
-        logging.error(f"❌ Error writing to conversation_log.csv: {str(e)}")
+    enqueue_csv_row(CONVERSATION_LOG_FILE, [row[h] for h in CONVERSATION_LOG_HEADERS], CONVERSATION_LOG_HEADERS)
 
 # ─────────────────────────────────────────────────────────────────────────────
 # SQLite LOG
@@ -239,22 +234,17 @@ async def log_ai_call_postgres(
 
 def log_ai_call(call_type, model, provider, messages, response, token_usage="N/A", conversation_id=None, interaction_id=None, module=None, tool=None, prompt_file=None, temperature=None, confidence_score=None):
     timestamp = datetime.now(ZoneInfo("America/Mexico_City")).strftime("%Y-%m-%d %H:%M:%S")
-    print(f"[AI Call] [{timestamp}] Module: {module} | Tool: {tool} | Model: {model} | Type: {call_type}")
     logging.info(f"[AI Call] {timestamp} | Type: {call_type} | Model: {model} | Module: {module} | Tool: {tool}")
 
     row = [
-        conversation_id or "", interaction_id or "", call_type, model, provider,                    temperature if temperature is not None else "",
+        conversation_id or "", interaction_id or "", call_type, model, provider,
+        temperature if temperature is not None else "",
         confidence_score if confidence_score is not None else "",
-        json.dumps(messages, ensure_ascii=False),
-        json.dumps(response, ensure_ascii=False),
+        JsonCell(messages),
+        JsonCell(response),
         token_usage or "Not Provided", timestamp
     ]
-
-    try:
-        with open(AI_LOG_FILE, "a", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow(row)
-    except Exception as e:
-        logging.error(f"❌ Error writing to OpenAI log: {e}")
+    enqueue_csv_row(AI_LOG_FILE, row, AI_LOG_HEADERS)
 
 # ─────────────────────────────────────────────────────────────────────────────
 # CONTEXT & ZELL LOGS
@@ -264,13 +254,9 @@ def log_context_update(conversation_id, action, context_data, interaction_id=Non
     timestamp = datetime.now(ZoneInfo("America/Mexico_City")).strftime("%Y-%m-%d %H:%M:%S")
     row = [
         conversation_id, interaction_id or "", action,
-        json.dumps(context_data, ensure_ascii=False), timestamp
+        JsonCell(context_data), timestamp
     ]
-    try:
-        with open(CONTEXT_LOG_FILE, "a", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow(row)
-    except Exception as e:
-        print(f"❌ Error writing to context log: {e}")
+    enqueue_csv_row(CONTEXT_LOG_FILE, row, CONTEXT_LOG_HEADERS)
 
 def log_zell_api_call(action, api_action, endpoint, request_data,
                       response_data, status_code, headers, conversation_id=None, interaction_id=None):
@@ -279,16 +265,11 @@ def log_zell_api_call(action, api_action, endpoint, request_data,
 
     row = [
         conversation_id or "", interaction_id or "", action, api_action, endpoint,
-        json.dumps(request_data, ensure_ascii=False),
-        json.dumps(response_data, ensure_ascii=False),
-        status_code, json.dumps(sanitized_headers, ensure_ascii=False), timestamp
+        JsonCell(request_data),
+        JsonCell(response_data),
+        status_code, JsonCell(sanitized_headers), timestamp
     ]
-
-    try:
-        with open(ZELL_API_LOG_FILE, "a", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow(row)
-    except Exception as e:
-        print(f"❌ Error writing to Zell API log: {e}")
+    enqueue_csv_row(ZELL_API_LOG_FILE, row, ZELL_API_LOG_HEADERS)
 
 # ─────────────────────────────────────────────────────────────────────────────
 # FULL PAYLOAD DEBUGGING
@@ -9,6 +9,10 @@ from typing import Any, Dict, List, Optional
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
+from utils.db_log_sink import get_db_log_sink
+from utils.log_writer import enqueue_csv_row
+from utils.usage_store import INTERACTIONS, TOKEN_USAGE, get_usage_store, interaction_row, token_usage_row
+
 # Cliente de Supabase (lazy loading)
 _supabase_client = None
 
@@ -19,6 +23,36 @@ _supabase_client = None
 CHAT_V2_LOG_FILE = os.path.join("logs", "chat_v2_interactions.csv")
 TOKEN_USAGE_LOG_FILE = os.path.join("logs", "chat_v2_token_usage.csv")
 
+CHAT_V2_LOG_HEADERS = [
+    "timestamp",
+    "userName",
+    "conversation_id",
+    "user_message",
+    "response",
+    "response_id",
+    "rounds_used",
+    "had_previous_context",
+    "extra_info"
+]
+TOKEN_USAGE_LOG_HEADERS = [
+    "timestamp",
+    "conversation_id",
+    "response_id",
+    "round",
+    "model",
+    "input_tokens_total",  # Total de input (incluye cached)
+    "cached_tokens",       # Tokens cached
+    "input_tokens_real",   # Input real sin cache (total - cached)
+    "output_tokens",
+    "total_tokens",
+    "cost_input_usd",      # Costo sobre input_tokens_real
+    "cost_cached_usd",     # Costo sobre cached_tokens
+    "cost_output_usd",
+    "cost_total_usd",
+    "web_search_used",
+    "tools_called"
+]
+
 # --- Precios de modelos (por millón de tokens) ---
 # Fuente: https://openai.com/api/pricing/
 # Precios actualizados: gpt-5-mini
@@ -53,17 +87,7 @@ def ensure_log_file_exists():
     if not os.path.exists(CHAT_V2_LOG_FILE) or os.path.getsize(CHAT_V2_LOG_FILE) == 0:
         with open(CHAT_V2_LOG_FILE, "w", newline="", encoding="utf-8") as f:
             writer = csv.writer(f)
-            writer.writerow([
-                "timestamp",
-                "userName",
-                "conversation_id",
-                "user_message",
-                "response",
-                "response_id",
-                "rounds_used",
-                "had_previous_context",
-                "extra_info"
-            ])
+            writer.writerow(CHAT_V2_LOG_HEADERS)
 
 
 def ensure_token_log_file_exists():
@@ -75,24 +99,7 @@ def ensure_token_log_file_exists():
         try:
             with open(TOKEN_USAGE_LOG_FILE, "w", newline="", encoding="utf-8") as f:
                 writer = csv.writer(f)
-                writer.writerow([
-                    "timestamp",
-                    "conversation_id",
-                    "response_id",
-                    "round",
-                    "model",
-                    "input_tokens_total",  # Total de input (incluye cached)
-                    "cached_tokens",       # Tokens cached
-                    "input_tokens_real",   # Input real sin cache (total - cached)
-                    "output_tokens",
-                    "total_tokens",
-                    "cost_input_usd",      # Costo sobre input_tokens_real
-                    "cost_cached_usd",     # Costo sobre cached_tokens
-                    "cost_output_usd",
-                    "cost_total_usd",
-                    "web_search_used",
-                    "tools_called"
-                ])
+                writer.writerow(TOKEN_USAGE_LOG_HEADERS)
         except (PermissionError, IOError) as e:
             _tr(f"⚠️ No se pudo crear {TOKEN_USAGE_LOG_FILE}: {e}")
             _tr(f"⚠️ Verifica que el archivo no esté abierto en Excel u otro programa.")
@@ -326,7 +333,6 @@ def log_token_usage(
         tools_called: Lista de tools llamados
     """
     try:
-        ensure_token_log_file_exists()
         timestamp = datetime.now(ZoneInfo("America/Mexico_City")).strftime("%Y-%m-%d %H:%M:%S")
         
         # Debug: verificar que cached_tokens se está recibiendo correctamente
@@ -344,36 +350,35 @@ def log_token_usage(
             actual_savings = normal_cost - cached_cost
             _tr(f"✅ CACHE DETECTADO: {cached_tokens:,} cached tokens (ahorro: ${actual_savings:.6f}) | Round {round_num} | Conv: {conversation_id[:20] if conversation_id else 'N/A'}...")
         
-        # Log a CSV (síncrono)
-        try:
-            with open(TOKEN_USAGE_LOG_FILE, "a", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow([
-                    timestamp,
-                    conversation_id or "",
-                    response_id or "",
-                    round_num,
-                    model,
-                    input_tokens_total,    # Total de input (incluye cached)
-                    cached_tokens,         # Tokens cached
-                    input_tokens_real,     # Input real sin cache
-                    output_tokens,
-                    total_tokens,
-                    costs["cost_input_usd"],    # Costo sobre input_tokens_real
-                    costs["cost_cached_usd"],   # Costo sobre cached_tokens
-                    costs["cost_output_usd"],
-                    costs["cost_total_usd"],
-                    "Yes" if web_search_used else "No",
-                    tools_str
-                ])
-                f.flush()
-            _tr(f"Logged token usage: {total_tokens} tokens (${costs['cost_total_usd']:.6f}) to {TOKEN_USAGE_LOG_FILE}")
-        except PermissionError as pe:
-            _tr(f"Permission denied writing token log: {pe}")
-        except IOError as ioe:
-            _tr(f"IO error writing token log: {ioe}")
-        
-        # Log a Supabase (usando librería oficial - síncrono)
+        # Log a CSV (en cola: lo escribe el hilo de utils/log_writer.py)
+        enqueue_csv_row(TOKEN_USAGE_LOG_FILE, [
+            timestamp,
+            conversation_id or "",
+            response_id or "",
+            round_num,
+            model,
+            input_tokens_total,    # Total de input (incluye cached)
+            cached_tokens,         # Tokens cached
+            input_tokens_real,     # Input real sin cache
+            output_tokens,
+            total_tokens,
+            costs["cost_input_usd"],    # Costo sobre input_tokens_real
+            costs["cost_cached_usd"],   # Costo sobre cached_tokens
+            costs["cost_output_usd"],
+            costs["cost_total_usd"],
+            "Yes" if web_search_used else "No",
+            tools_str
+        ], TOKEN_USAGE_LOG_HEADERS)
+        _tr(f"Logged token usage: {total_tokens} tokens (${costs['cost_total_usd']:.6f}) to {TOKEN_USAGE_LOG_FILE}")
+
+        # Store Parquet para /admin/usage (en cola, ver utils/usage_store.py)
+        get_usage_store().append(TOKEN_USAGE, token_usage_row(
+            timestamp, conversation_id, response_id, round_num, model,
+            input_tokens_total, input_tokens_real, cached_tokens, output_tokens, total_tokens,
+            costs, web_search_used, tools_called
+        ))
+
+        # Log a Supabase (en cola, inserción por lotes en utils/db_log_sink.py)
         try:
             log_token_usage_postgres(
                 conversation_id, response_id, round_num, model,
@@ -414,38 +419,34 @@ def log_chat_v2_interaction(
         had_previous_context: Si había contexto previo
         extra_info: Información adicional
     """
-    # Log a CSV (síncrono)
+    # Log a CSV (en cola: lo escribe el hilo de utils/log_writer.py)
     try:
-        ensure_log_file_exists()
         timestamp = datetime.now(ZoneInfo("America/Mexico_City")).strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Usar modo append con manejo de errores más robusto
-        try:
-            with open(CHAT_V2_LOG_FILE, "a", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow([
-                    timestamp,
-                    userName or "N/A",
-                    conversation_id or "",  # Asegurar que no sea None
-                    user_message[:500] if len(user_message) > 500 else user_message,  # Limitar tamaño
-                    response[:1000] if len(response) > 1000 else response,  # Limitar tamaño
-                    response_id or "",
-                    rounds_used,
-                    "Yes" if had_previous_context else "No",
-                    extra_info
-                ])
-                f.flush()  # Forzar escritura inmediata
-            _tr(f"Logged interaction to {CHAT_V2_LOG_FILE}")
-        except PermissionError as pe:
-            _tr(f"Permission denied writing to CSV (file may be open): {pe}")
-        except IOError as ioe:
-            _tr(f"IO error writing to CSV: {ioe}")
+        enqueue_csv_row(CHAT_V2_LOG_FILE, [
+            timestamp,
+            userName or "N/A",
+            conversation_id or "",  # Asegurar que no sea None
+            user_message[:500] if len(user_message) > 500 else user_message,  # Limitar tamaño
+            response[:1000] if len(response) > 1000 else response,  # Limitar tamaño
+            response_id or "",
+            rounds_used,
+            "Yes" if had_previous_context else "No",
+            extra_info
+        ], CHAT_V2_LOG_HEADERS)
+        _tr(f"Logged interaction to {CHAT_V2_LOG_FILE}")
     except Exception as e:
         _tr(f"Error logging to CSV: {e}")
-        import traceback
-        _tr(f"Traceback: {traceback.format_exc()}")
+
+    # Store Parquet para /admin/usage (solo metadatos, sin el texto)
+    try:
+        get_usage_store().append(INTERACTIONS, interaction_row(
+            timestamp, userName, conversation_id, user_message, response,
+            response_id, rounds_used, had_previous_context, extra_info
+        ))
+    except Exception as e:
+        _tr(f"Error en logging a usage store (continuando): {e}")
     
-    # Log a Supabase (usando librería oficial - síncrono)
+    # Log a Supabase (en cola, inserción por lotes en utils/db_log_sink.py)
     try:
         log_chat_v2_interaction_postgres(
             userName, conversation_id, user_message, response,
@@ -516,29 +517,6 @@ def _get_supabase_client():
             return None
     return _supabase_client
 
-def _schedule_async_log(coro):
-    """Helper para ejecutar una corrutina de logging de forma segura."""
-    try:
-        import asyncio
-        loop = None
-        try:
-            loop = asyncio.get_running_loop()
-            # Si hay un loop corriendo, crear task en background
-            asyncio.create_task(coro)
-        except RuntimeError:
-            # No hay loop corriendo, crear uno nuevo
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_closed():
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                loop.run_until_complete(coro)
-            except RuntimeError:
-                # Crear loop completamente nuevo
-                asyncio.run(coro)
-    except Exception as e:
-        _tr(f"Error scheduling async log (continuando): {e}")
-
 def log_chat_v2_interaction_postgres(
     userName: str,
     conversation_id: str,
@@ -550,8 +528,9 @@ def log_chat_v2_interaction_postgres(
     extra_info: str = ""
 ):
     """
-    Log de interacciones V2 en Supabase usando la librería oficial supabase-py.
-    Inserta en la tabla conversation_logs_v2 que coincide exactamente con chat_v2_interactions.csv
+    Log de interacciones V2 en Supabase: encola la fila para el sink en segundo plano
+    (utils/db_log_sink.py), que la inserta por lotes en conversation_logs_v2
+    (coincide exactamente con chat_v2_interactions.csv).
     
     Referencia: https://supabase.com/docs/reference/python/introduction
     
@@ -566,18 +545,11 @@ def log_chat_v2_interaction_postgres(
         extra_info: Información adicional
     """
     try:
-        supabase = _get_supabase_client()
-        if not supabase:
-            _tr("⚠️ Cliente Supabase no disponible - saltando logging")
-            return
-        
         # Convertir had_previous_context a texto "Yes"/"No" (igual que en CSV)
         had_context_str = "Yes" if had_previous_context else "No"
         
         timestamp = datetime.now(ZoneInfo("America/Mexico_City")).strftime("%Y-%m-%d %H:%M:%S")
         
-        # Insertar usando la librería oficial de Supabase
-        # Referencia: https://supabase.com/docs/reference/python/insert-data
         data = {
             "timestamp": timestamp,
             "userName": userName or "N/A",
@@ -590,19 +562,12 @@ def log_chat_v2_interaction_postgres(
             "extra_info": extra_info
         }
         
-        result = supabase.table("conversation_logs_v2").insert(data).execute()
-        _tr("✅ Log V2 guardado en Supabase (conversation_logs_v2).")
+        # En cola: utils/db_log_sink.py lo inserta por lotes en segundo plano
+        if get_db_log_sink().enqueue("conversation_logs_v2", data):
+            _tr("✅ Log V2 encolado para Supabase (conversation_logs_v2).")
         
     except Exception as e:
-        error_msg = str(e)
-        if "relation" in error_msg.lower() and "does not exist" in error_msg.lower():
-            _tr(f"🔥 Error: La tabla 'conversation_logs_v2' no existe. Ejecuta el SQL de creación de tablas primero.")
-        elif "JWT" in error_msg or "auth" in error_msg.lower() or "invalid api key" in error_msg.lower():
-            _tr(f"🔥 Error de autenticación Supabase: Verifica SUPABASE_KEY en tu .env")
-        elif "could not connect" in error_msg.lower() or "network" in error_msg.lower():
-            _tr(f"🔥 Error de conexión a Supabase: Verifica SUPABASE_URL en tu .env")
-        else:
-            _tr(f"🔥 Error al guardar log V2 en Supabase: {e}")
+        _tr(f"🔥 Error al encolar log V2 para Supabase: {e}")
 
 
 def log_token_usage_postgres(
@@ -624,9 +589,9 @@ def log_token_usage_postgres(
     provider: str = "openai"
 ):
     """
-    Log de uso de tokens V2 en Supabase usando la librería oficial supabase-py.
-    Inserta en token_usage_v2 (coincide con chat_v2_token_usage.csv) 
-    y también en ai_calls_v2 (estructura más completa con JSONB).
+    Log de uso de tokens V2 en Supabase: encola para el sink en segundo plano
+    (utils/db_log_sink.py) una fila de token_usage_v2 (coincide con chat_v2_token_usage.csv)
+    y otra de ai_calls_v2 (estructura más completa con JSONB).
     
     Referencia: https://supabase.com/docs/reference/python/introduction
     
@@ -649,11 +614,6 @@ def log_token_usage_postgres(
         provider: Proveedor del modelo (default: "openai")
     """
     try:
-        supabase = _get_supabase_client()
-        if not supabase:
-            _tr("⚠️ Cliente Supabase no disponible - saltando logging de tokens")
-            return
-        
         timestamp = datetime.now(ZoneInfo("America/Mexico_City")).strftime("%Y-%m-%d %H:%M:%S")
         
         # Convertir web_search_used a texto "Yes"/"No" (igual que en CSV)
@@ -682,7 +642,8 @@ def log_token_usage_postgres(
             "tools_called": tools_str
         }
         
-        supabase.table("token_usage_v2").insert(token_data).execute()
+        sink = get_db_log_sink()
+        sink.enqueue("token_usage_v2", token_data)
 
         # 2. También insertar en ai_calls_v2 (estructura más completa con JSONB)
         token_usage_json = {
@@ -728,18 +689,8 @@ def log_token_usage_postgres(
             "timestamp": timestamp_dt.isoformat()
         }
         
-        supabase.table("ai_calls_v2").insert(ai_call_data).execute()
-        
-        _tr(f"✅ Token usage V2 log registrado en Supabase (token_usage_v2 + ai_calls_v2, Round {round_num}).")
+        if sink.enqueue("ai_calls_v2", ai_call_data):
+            _tr(f"✅ Token usage V2 encolado para Supabase (token_usage_v2 + ai_calls_v2, Round {round_num}).")
         
     except Exception as e:
-        error_msg = str(e)
-        if "relation" in error_msg.lower() and "does not exist" in error_msg.lower():
-            _tr(f"🔥 Error: Las tablas no existen. Ejecuta el SQL de creación de tablas primero.")
-        elif "JWT" in error_msg or "auth" in error_msg.lower() or "invalid api key" in error_msg.lower():
-            _tr(f"🔥 Error de autenticación Supabase: Verifica SUPABASE_KEY en tu .env")
-        elif "could not connect" in error_msg.lower() or "network" in error_msg.lower():
-            _tr(f"🔥 Error de conexión a Supabase: Verifica SUPABASE_URL en tu .env")
-        else:
-            _tr(f"🔥 Error al registrar token usage V2 en Supabase: {e}")
-
+        _tr(f"🔥 Error al encolar token usage V2 para Supabase: {e}")
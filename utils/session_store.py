@@ -0,0 +1,239 @@
+"""
+Store de tokens de sesión del widget - Reemplaza el escaneo completo de logs/session_tokens.csv
+que hacían verificar_token (utils/token_verifier.py) y validar_token (endpoints/session_token.py).
+
+- SQLite en modo WAL (SESSION_STORE_PATH): lookup por llave primaria, compartido por todos los
+  workers del mismo host y sin reescribir archivos en cada mensaje.
+- Expiración perezosa: al validar un token vencido se marca "expirado"; además un hilo daemon
+  (sweeper) marca los vencidos y borra los que pasaron SESSION_TOKEN_RETENTION_DAYS.
+- Cache positivo en proceso: un token validado se acepta sin ir a SQLite durante
+  SESSION_TOKEN_CACHE_TTL_SECONDS (nunca más allá de su expiración).
+- La primera vez que se crea la base se importan los tokens de logs/session_tokens.csv, que
+  sigue existiendo como bitácora append-only de inicios de sesión.
+"""
+import os
+import csv
+import time
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# === Config ===
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", "logs/session_tokens.db")
+SESSION_LOG_PATH = "logs/session_tokens.csv"
+TOKEN_EXPIRY_HOURS = float(os.getenv("SESSION_TOKEN_EXPIRY_HOURS", "12"))
+SESSION_TOKEN_CACHE_TTL_SECONDS = float(os.getenv("SESSION_TOKEN_CACHE_TTL_SECONDS", "60"))
+SESSION_TOKEN_SWEEP_SECONDS = float(os.getenv("SESSION_TOKEN_SWEEP_SECONDS", "600"))
+SESSION_TOKEN_RETENTION_DAYS = float(os.getenv("SESSION_TOKEN_RETENTION_DAYS", "30"))
+
+ESTADO_VALIDO = "valido"
+ESTADO_EXPIRADO = "expirado"
+
+
+def _to_epoch(iso_utc: str) -> float:
+    """timestamp_inicio del CSV (datetime.utcnow().isoformat(), sin zona) → epoch."""
+    return datetime.fromisoformat(iso_utc).replace(tzinfo=timezone.utc).timestamp()
+
+
+class SessionTokenStore:
+    """
+    Tokens de sesión indexados por token. Thread-safe (una conexión por store con lock);
+    entre procesos la consistencia la da SQLite (WAL + busy_timeout).
+    """
+
+    def __init__(
+        self,
+        path: str = SESSION_STORE_PATH,
+        expiry_hours: float = TOKEN_EXPIRY_HOURS,
+        cache_ttl_seconds: float = SESSION_TOKEN_CACHE_TTL_SECONDS,
+        retention_days: float = SESSION_TOKEN_RETENTION_DAYS,
+        import_csv_path: Optional[str] = SESSION_LOG_PATH,
+    ):
+        self.path = path
+        self.expiry_seconds = expiry_hours * 3600
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.retention_seconds = retention_days * 86400
+        # token → (válido en cache hasta, user_email)
+        self._cache: Dict[str, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self.cache_hits = 0
+        self.lookups = 0
+        self.expired_lazy = 0
+        self.swept_expired = 0
+        self.swept_deleted = 0
+        self._db = self._open(path)
+        if import_csv_path:
+            self._import_csv_once(import_csv_path)
+
+    def _open(self, path: str) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_tokens ("
+            "token TEXT PRIMARY KEY, user_email TEXT, timestamp_inicio TEXT, "
+            "expires_at REAL, estado TEXT, motivo TEXT)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_session_tokens_expires ON session_tokens (expires_at)")
+        conn.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.commit()
+        return conn
+
+    def _import_csv_once(self, csv_path: str) -> None:
+        """Importa los tokens del CSV anterior (una sola vez por base; los workers compiten sin duplicar)."""
+        with self._lock:
+            try:
+                self._db.execute("BEGIN IMMEDIATE")
+                done = self._db.execute("SELECT 1 FROM store_meta WHERE key = 'csv_imported'").fetchone()
+                imported = 0
+                if not done and os.path.isfile(csv_path):
+                    with open(csv_path, newline="", encoding="utf-8") as f:
+                        for row in csv.DictReader(f):
+                            token = (row.get("token") or "").strip()
+                            if not token or token == "-":
+                                continue
+                            try:
+                                issued = _to_epoch(row["timestamp_inicio"])
+                            except (KeyError, TypeError, ValueError):
+                                continue
+                            self._db.execute(
+                                "INSERT OR REPLACE INTO session_tokens VALUES (?, ?, ?, ?, ?, ?)",
+                                (token, row.get("user_email") or "-", row["timestamp_inicio"],
+                                 issued + self.expiry_seconds, row.get("estado") or "", row.get("motivo") or ""),
+                            )
+                            imported += 1
+                self._db.execute("INSERT OR REPLACE INTO store_meta VALUES ('csv_imported', ?)", (datetime.utcnow().isoformat(),))
+                self._db.commit()
+                if imported:
+                    logger.info(f"[SessionStore] 📥 {imported} tokens importados de {csv_path}")
+            except Exception as e:
+                self._db.rollback()
+                logger.error(f"[SessionStore] ❌ No se pudieron importar tokens de {csv_path}: {e}")
+
+    def register(self, token: str, email: str, estado: str, motivo: str) -> None:
+        """Alta de un token (timestamp_inicio = ahora, UTC). Los intentos sin token ("-") no se guardan."""
+        if not token or token == "-":
+            return
+        now = time.time()
+        issued_iso = datetime.utcfromtimestamp(now).isoformat()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO session_tokens VALUES (?, ?, ?, ?, ?, ?)",
+                (token, email, issued_iso, now + self.expiry_seconds, estado, motivo),
+            )
+            self._db.commit()
+            self._cache.pop(token, None)
+
+    def validate(self, token: str, expired_motivo: str = "Expirado por lazy update") -> Dict[str, Any]:
+        """
+        Returns:
+            {"encontrado": bool, "valido": bool, "usuario": email | "-", "motivo": str, "cache": bool}
+        """
+        now = time.time()
+        with self._lock:
+            cached = self._cache.get(token)
+            if cached is not None:
+                if cached[0] >= now:
+                    self.cache_hits += 1
+                    return {"encontrado": True, "valido": True, "usuario": cached[1], "motivo": "Token válido", "cache": True}
+                del self._cache[token]
+
+            self.lookups += 1
+            row = self._db.execute(
+                "SELECT user_email, expires_at, estado FROM session_tokens WHERE token = ?", (token,)
+            ).fetchone()
+            if row is None:
+                return {"encontrado": False, "valido": False, "usuario": "-", "motivo": "Token no encontrado", "cache": False}
+
+            email, expires_at, estado = row
+            if estado != ESTADO_VALIDO:
+                return {"encontrado": True, "valido": False, "usuario": email, "motivo": f"Token en estado: {estado}", "cache": False}
+            if expires_at < now:
+                # Lazy update → marcar como expirado
+                self._db.execute(
+                    "UPDATE session_tokens SET estado = ?, motivo = ? WHERE token = ? AND estado = ?",
+                    (ESTADO_EXPIRADO, expired_motivo, token, ESTADO_VALIDO),
+                )
+                self._db.commit()
+                self.expired_lazy += 1
+                return {"encontrado": True, "valido": False, "usuario": email, "motivo": "Token expirado", "cache": False}
+
+            if self.cache_ttl_seconds > 0:
+                self._cache[token] = (min(now + self.cache_ttl_seconds, expires_at), email)
+            return {"encontrado": True, "valido": True, "usuario": email, "motivo": "Token válido", "cache": False}
+
+    def sweep(self) -> Dict[str, int]:
+        """Marca como expirados los tokens vencidos y borra los que pasaron el periodo de retención."""
+        now = time.time()
+        with self._lock:
+            expired = self._db.execute(
+                "UPDATE session_tokens SET estado = ?, motivo = ? WHERE estado = ? AND expires_at < ?",
+                (ESTADO_EXPIRADO, "Expirado por sweeper", ESTADO_VALIDO, now),
+            ).rowcount or 0
+            deleted = self._db.execute(
+                "DELETE FROM session_tokens WHERE expires_at < ?", (now - self.retention_seconds,)
+            ).rowcount or 0
+            self._db.commit()
+            self._cache = {t: v for t, v in self._cache.items() if v[0] >= now}
+            self.swept_expired += expired
+            self.swept_deleted += deleted
+        if expired or deleted:
+            logger.info(f"[SessionStore] 🧹 Sweep: {expired} expirados, {deleted} eliminados")
+        return {"expired": expired, "deleted": deleted}
+
+    def start_sweeper(self, interval: float = SESSION_TOKEN_SWEEP_SECONDS) -> None:
+        """Inicia (una sola vez) el hilo daemon que corre sweep() cada `interval` segundos."""
+        if interval <= 0 or (self._sweeper is not None and self._sweeper.is_alive()):
+            return
+        self._stop_event.clear()
+
+        def _run():
+            while not self._stop_event.wait(interval):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.error(f"[SessionStore] ❌ Error en sweep de tokens: {e}")
+
+        self._sweeper = threading.Thread(target=_run, name="session-token-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        self._stop_event.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._db.execute("SELECT estado, COUNT(*) FROM session_tokens GROUP BY estado").fetchall())
+            validations = self.cache_hits + self.lookups
+            return {
+                "path": self.path,
+                "tokens": counts,
+                "cached": len(self._cache),
+                "cache_ttl_seconds": self.cache_ttl_seconds,
+                "cache_hits": self.cache_hits,
+                "lookups": self.lookups,
+                "cache_hit_rate": round(self.cache_hits / validations, 4) if validations else 0.0,
+                "expired_lazy": self.expired_lazy,
+                "swept_expired": self.swept_expired,
+                "swept_deleted": self.swept_deleted,
+            }
+
+
+_session_store: Optional[SessionTokenStore] = None
+_session_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionTokenStore:
+    """Store de tokens del proceso (singleton)."""
+    global _session_store
+    if _session_store is None:
+        with _session_store_lock:
+            if _session_store is None:
+                _session_store = SessionTokenStore()
+    return _session_store
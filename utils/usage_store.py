@@ -0,0 +1,609 @@
+"""
+Store columnar de analítica de chat_v2 (uso de tokens e interacciones) - Parquet particionado
+por día para reportes de costo sin recorrer los CSV completos (ver /admin/usage).
+
+- logs/analytics/<dataset>/date=YYYY-MM-DD/part-*.parquet, datasets "token_usage" e
+  "interactions". Fechas y timestamps en hora de Ciudad de México, igual que los CSV.
+- log_token_usage / log_chat_v2_interaction (utils/logs_v2.py) solo encolan la fila; un hilo
+  escribe un archivo Parquet por día cada USAGE_STORE_BATCH_ROWS filas o
+  USAGE_STORE_FLUSH_SECONDS segundos (rename atómico: un lector nunca ve un archivo a medias).
+- Compactación: los días cerrados con varios archivos se juntan en uno
+  (cada USAGE_STORE_COMPACT_SECONDS; un solo worker a la vez con flock).
+- Consultas con pyarrow.dataset: el rango de fechas poda particiones y los filtros de modelo
+  se evalúan al leer; solo se leen las columnas necesarias.
+- De interactions solo se guardan metadatos (usuario, conversación, rounds, longitudes), no el
+  texto de los mensajes.
+- pyarrow es opcional: sin él el store queda deshabilitado y /admin/usage responde con error.
+
+Backfill desde los CSV (activos y segmentos archivados, solo filas anteriores al store):
+    python -m utils.usage_store --backfill
+"""
+import os
+import glob
+import json
+import time
+import queue
+import atexit
+import logging
+import argparse
+import threading
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows (desarrollo local): sin lock entre procesos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# === Config ===
+USAGE_STORE_DIR = os.getenv("USAGE_STORE_DIR", os.path.join("logs", "analytics"))
+USAGE_STORE_ENABLED = os.getenv("USAGE_STORE_ENABLED", "1") == "1"
+USAGE_STORE_QUEUE_MAX = int(os.getenv("USAGE_STORE_QUEUE_MAX", "10000"))
+USAGE_STORE_BATCH_ROWS = int(os.getenv("USAGE_STORE_BATCH_ROWS", "500"))
+USAGE_STORE_FLUSH_SECONDS = float(os.getenv("USAGE_STORE_FLUSH_SECONDS", "60"))
+USAGE_STORE_COMPACT_SECONDS = float(os.getenv("USAGE_STORE_COMPACT_SECONDS", "3600"))
+USAGE_STORE_CLOSE_TIMEOUT_SECONDS = float(os.getenv("USAGE_STORE_CLOSE_TIMEOUT_SECONDS", "15"))
+
+TOKEN_USAGE = "token_usage"
+INTERACTIONS = "interactions"
+NO_TOOL = "(sin tool)"
+UNKNOWN_USER = "(desconocido)"
+
+_arrow_error: Optional[str] = None
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError as e:  # dependencia opcional
+    pa = ds = pq = None
+    _arrow_error = f"pyarrow no está instalado ({e}); pip install pyarrow"
+
+
+def _schemas() -> Dict[str, Any]:
+    return {
+        TOKEN_USAGE: pa.schema([
+            ("timestamp", pa.timestamp("s")),
+            ("conversation_id", pa.string()),
+            ("response_id", pa.string()),
+            ("round", pa.int32()),
+            ("model", pa.string()),
+            ("input_tokens_total", pa.int64()),
+            ("cached_tokens", pa.int64()),
+            ("input_tokens_real", pa.int64()),
+            ("output_tokens", pa.int64()),
+            ("total_tokens", pa.int64()),
+            ("cost_input_usd", pa.float64()),
+            ("cost_cached_usd", pa.float64()),
+            ("cost_output_usd", pa.float64()),
+            ("cost_total_usd", pa.float64()),
+            ("web_search_used", pa.bool_()),
+            ("tools_called", pa.list_(pa.string())),
+        ]),
+        INTERACTIONS: pa.schema([
+            ("timestamp", pa.timestamp("s")),
+            ("user_name", pa.string()),
+            ("conversation_id", pa.string()),
+            ("response_id", pa.string()),
+            ("rounds_used", pa.int32()),
+            ("had_previous_context", pa.bool_()),
+            ("user_message_chars", pa.int32()),
+            ("response_chars", pa.int32()),
+            ("extra_info", pa.string()),
+        ]),
+    }
+
+
+def _partitioning():
+    return ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+
+
+class _Flush:
+    def __init__(self, stop: bool = False):
+        self.done = threading.Event()
+        self.stop = stop
+
+
+class UsageStore:
+    """Cola acotada + hilo que escribe Parquet por día; consultas agregadas con pushdown."""
+
+    def __init__(
+        self,
+        root: str = USAGE_STORE_DIR,
+        enabled: bool = USAGE_STORE_ENABLED,
+        queue_max: int = USAGE_STORE_QUEUE_MAX,
+        batch_rows: int = USAGE_STORE_BATCH_ROWS,
+        flush_seconds: float = USAGE_STORE_FLUSH_SECONDS,
+        compact_seconds: float = USAGE_STORE_COMPACT_SECONDS,
+    ):
+        self.root = root
+        self.enabled = enabled and pa is not None
+        self.batch_rows = max(1, batch_rows)
+        self.flush_seconds = flush_seconds
+        self.compact_seconds = compact_seconds
+        self.schemas = _schemas() if pa is not None else {}
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, queue_max))
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._seq = 0
+        self._last_compact = time.monotonic()
+        self.enqueued = 0
+        self.written = 0
+        self.files_written = 0
+        self.dropped = 0
+        self.write_errors = 0
+        self.compacted_days = 0
+        if enabled and pa is None:
+            logger.warning(f"[UsageStore] ⚠️ Deshabilitado: {_arrow_error}")
+
+    # --- escritura ---
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="usage-store", daemon=True)
+                self._thread.start()
+
+    def append(self, dataset: str, row: Dict[str, Any]) -> bool:
+        """Encola una fila (timestamp como datetime o "YYYY-MM-DD HH:MM:SS"). False si se descartó."""
+        if not self.enabled or self._closed:
+            return False
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((dataset, row))
+            with self._lock:
+                self.enqueued += 1
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def _part_path(self, dataset: str, day: str) -> Tuple[str, str]:
+        self._seq += 1
+        part_dir = os.path.join(self.root, dataset, f"date={day}")
+        name = f"part-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{self._seq}.parquet"
+        # Los nombres que empiezan con "." no los ve pyarrow.dataset: sirven de temporal
+        return os.path.join(part_dir, name), os.path.join(part_dir, f".{name}.tmp")
+
+    def write_rows(self, dataset: str, rows: List[Dict[str, Any]]) -> int:
+        """Escribe filas directo (sin cola) agrupadas por día. Retorna filas escritas."""
+        schema = self.schemas[dataset]
+        by_day: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            ts = row.get("timestamp")
+            if not isinstance(ts, datetime):
+                ts = datetime.fromisoformat(str(ts))
+            by_day.setdefault(ts.date().isoformat(), []).append({**row, "timestamp": ts.replace(microsecond=0)})
+        written = 0
+        for day, day_rows in by_day.items():
+            table = pa.Table.from_pylist(day_rows, schema=schema)
+            final, tmp = self._part_path(dataset, day)
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            pq.write_table(table, tmp, compression="zstd")
+            os.replace(tmp, final)
+            written += len(day_rows)
+            with self._lock:
+                self.files_written += 1
+        return written
+
+    def _write_pending(self, pending: Dict[str, List[Dict[str, Any]]]) -> None:
+        for dataset, rows in pending.items():
+            try:
+                n = self.write_rows(dataset, rows)
+                with self._lock:
+                    self.written += n
+            except Exception as e:
+                with self._lock:
+                    self.write_errors += len(rows)
+                logger.error(f"[UsageStore] ❌ Error escribiendo {len(rows)} filas de {dataset}: {e}")
+
+    def _run(self) -> None:
+        pending: Dict[str, List[Dict[str, Any]]] = {}
+        pending_rows = 0
+        first_at = 0.0
+        while True:
+            timeout = self.flush_seconds
+            if pending_rows:
+                timeout = max(0.0, first_at + self.flush_seconds - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, tuple):
+                dataset, row = item
+                pending.setdefault(dataset, []).append(row)
+                if not pending_rows:
+                    first_at = time.monotonic()
+                pending_rows += 1
+                if pending_rows < self.batch_rows and time.monotonic() - first_at < self.flush_seconds:
+                    continue
+
+            if pending:
+                self._write_pending(pending)
+                pending, pending_rows = {}, 0
+            if isinstance(item, _Flush):
+                item.done.set()
+                if item.stop:
+                    return
+            if self.compact_seconds > 0 and time.monotonic() - self._last_compact >= self.compact_seconds:
+                self._last_compact = time.monotonic()
+                try:
+                    self.compact()
+                except Exception as e:
+                    logger.error(f"[UsageStore] ❌ Error compactando: {e}")
+
+    def flush(self, timeout: float = USAGE_STORE_CLOSE_TIMEOUT_SECONDS) -> bool:
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        marker = _Flush()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.done.wait(timeout)
+
+    def close(self, timeout: float = USAGE_STORE_CLOSE_TIMEOUT_SECONDS) -> bool:
+        """Deja de aceptar filas, escribe lo pendiente y detiene el hilo."""
+        self._closed = True
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        marker = _Flush(stop=True)
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.done.wait(timeout)
+
+    # --- compactación ---
+
+    def compact(self, before: Optional[date] = None) -> int:
+        """Junta en un solo archivo cada día anterior a `before` (default: hoy) que tenga varios."""
+        if not self.enabled:
+            return 0
+        before_s = (before or date.today()).isoformat()
+        lock = None
+        if fcntl is not None:
+            os.makedirs(self.root, exist_ok=True)
+            lock = open(os.path.join(self.root, ".compact.lock"), "w")
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock.close()
+                return 0
+        try:
+            days = 0
+            for dataset, schema in self.schemas.items():
+                for part_dir in sorted(glob.glob(os.path.join(self.root, dataset, "date=*"))):
+                    day = os.path.basename(part_dir)[len("date="):]
+                    files = sorted(glob.glob(os.path.join(part_dir, "part-*.parquet")))
+                    if day >= before_s or len(files) < 2:
+                        continue
+                    table = pa.concat_tables([pq.read_table(f, schema=schema) for f in files])
+                    final, tmp = self._part_path(dataset, day)
+                    pq.write_table(table.sort_by("timestamp"), tmp, compression="zstd")
+                    os.replace(tmp, final)
+                    for f in files:
+                        os.remove(f)
+                    days += 1
+            with self._lock:
+                self.compacted_days += days
+            if days:
+                logger.info(f"[UsageStore] 🗜️ {days} días compactados")
+            return days
+        finally:
+            if lock is not None:
+                lock.close()
+
+    # --- lectura ---
+
+    def read(
+        self,
+        dataset: str,
+        start: date,
+        end: date,
+        columns: List[str],
+        models: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """Filas de [start, end] (días, inclusive) con poda de particiones y filtro de modelo al leer."""
+        path = os.path.join(self.root, dataset)
+        if not os.path.isdir(path):
+            return pd.DataFrame(columns=columns)
+        dataset_ = ds.dataset(
+            path, format="parquet", partitioning=_partitioning(), schema=self.schemas[dataset].append(pa.field("date", pa.string()))
+        )
+        flt = (ds.field("date") >= start.isoformat()) & (ds.field("date") <= end.isoformat())
+        if models:
+            flt = flt & ds.field("model").isin(models)
+        return dataset_.to_table(columns=columns, filter=flt).to_pandas()
+
+    def usage_report(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        models: Optional[List[str]] = None,
+        users: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """Agregados de costo y tokens por día, usuario, tool y modelo (default: últimos 30 días)."""
+        if pa is None:
+            return {"ok": False, "error": _arrow_error}
+        end = end or date.today()
+        start = start or end - timedelta(days=29)
+        if start > end:
+            return {"ok": False, "error": "start debe ser menor o igual a end"}
+
+        tokens = self.read(TOKEN_USAGE, start, end, [
+            "date", "conversation_id", "model", "total_tokens", "cached_tokens",
+            "input_tokens_total", "output_tokens", "cost_total_usd", "tools_called",
+        ], models=models)
+        interactions = self.read(INTERACTIONS, start, end, ["date", "conversation_id", "user_name"])
+        return {
+            "ok": True,
+            "range": {"start": start.isoformat(), "end": end.isoformat()},
+            "filters": {"models": models, "users": users},
+            **aggregate_usage(tokens, interactions, users=users),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "error": None if pa is not None else _arrow_error,
+                "root": self.root,
+                "queued": self._queue.qsize(),
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "files_written": self.files_written,
+                "dropped": self.dropped,
+                "write_errors": self.write_errors,
+                "compacted_days": self.compacted_days,
+            }
+
+
+def _round_costs(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    if "cost_usd" in df:
+        df = df.assign(cost_usd=df["cost_usd"].round(6))
+    return df.to_dict(orient="records")
+
+
+def aggregate_usage(
+    tokens: pd.DataFrame, interactions: pd.DataFrame, users: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Agregados a partir de las filas de token_usage e interactions ya filtradas por fecha/modelo.
+    El usuario de cada round sale de su conversación (interactions); el costo de un round con
+    varios tools se reparte en partes iguales, así la suma por tool coincide con el total.
+    """
+    users_by_conv = (
+        interactions.dropna(subset=["conversation_id"])
+        .drop_duplicates("conversation_id", keep="last")
+        .set_index("conversation_id")["user_name"]
+        if len(interactions) else pd.Series(dtype=object)
+    )
+    t = tokens.copy()
+    t["user_name"] = t["conversation_id"].map(users_by_conv).fillna(UNKNOWN_USER) if len(t) else []
+    if users:
+        t = t[t["user_name"].isin(users)]
+        interactions = interactions[interactions["user_name"].isin(users)]
+
+    sums = {
+        "rounds": ("conversation_id", "size"),
+        "conversations": ("conversation_id", "nunique"),
+        "total_tokens": ("total_tokens", "sum"),
+        "cached_tokens": ("cached_tokens", "sum"),
+        "output_tokens": ("output_tokens", "sum"),
+        "cost_usd": ("cost_total_usd", "sum"),
+    }
+
+    def _by(col: str) -> List[Dict[str, Any]]:
+        if not len(t):
+            return []
+        out = t.groupby(col, sort=True).agg(**sums).reset_index()
+        return _round_costs(out.astype({k: "int64" for k in sums if k != "cost_usd"}))
+
+    tools: List[Dict[str, Any]] = []
+    if len(t):
+        exploded = t[["tools_called", "cost_total_usd", "total_tokens"]].copy()
+        exploded["tools_called"] = exploded["tools_called"].map(
+            lambda v: list(v) if v is not None and len(v) else [NO_TOOL]
+        )
+        exploded["share"] = 1.0 / exploded["tools_called"].map(len)
+        exploded = exploded.explode("tools_called")
+        exploded["cost_usd"] = exploded["cost_total_usd"] * exploded["share"]
+        exploded["tokens"] = exploded["total_tokens"] * exploded["share"]
+        by_tool = exploded.groupby("tools_called").agg(
+            calls=("share", "size"), tokens=("tokens", "sum"), cost_usd=("cost_usd", "sum")
+        ).reset_index().rename(columns={"tools_called": "tool"})
+        by_tool["tokens"] = by_tool["tokens"].round().astype("int64")
+        tools = _round_costs(by_tool.sort_values("cost_usd", ascending=False))
+
+    interactions_by_day = (
+        interactions.groupby("date").size().to_dict() if len(interactions) else {}
+    )
+    by_day = _by("date")
+    for row in by_day:
+        row["interactions"] = int(interactions_by_day.get(row["date"], 0))
+
+    return {
+        "totals": {
+            "rounds": int(len(t)),
+            "conversations": int(t["conversation_id"].nunique()) if len(t) else 0,
+            "interactions": int(len(interactions)),
+            "total_tokens": int(t["total_tokens"].sum()) if len(t) else 0,
+            "cost_usd": round(float(t["cost_total_usd"].sum()), 6) if len(t) else 0.0,
+        },
+        "by_day": by_day,
+        "by_user": _by("user_name"),
+        "by_tool": tools,
+        "by_model": _by("model"),
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# BACKFILL DESDE CSV
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _csv_sources(logname: str, logs_dir: str = "logs") -> List[str]:
+    stem = os.path.splitext(logname)[0]
+    archived = sorted(glob.glob(os.path.join(logs_dir, "archive", stem, f"{stem}.*.csv*")))
+    active = os.path.join(logs_dir, logname)
+    return archived + ([active] if os.path.isfile(active) else [])
+
+
+def _earliest(store: UsageStore, dataset: str) -> Optional[datetime]:
+    path = os.path.join(store.root, dataset)
+    if not os.path.isdir(path):
+        return None
+    col = ds.dataset(path, format="parquet", partitioning=_partitioning()).to_table(columns=["timestamp"])["timestamp"]
+    return col.to_pandas().min() if len(col) else None
+
+
+def backfill_from_csv(store: UsageStore, logs_dir: str = "logs") -> Dict[str, Any]:
+    """Importa los CSV de chat_v2 anteriores a la primera fila del store (no duplica lo ya escrito)."""
+    if pa is None:
+        return {"ok": False, "error": _arrow_error}
+    out: Dict[str, Any] = {"ok": True}
+
+    cutoff = _earliest(store, TOKEN_USAGE)
+    rows = []
+    for src in _csv_sources("chat_v2_token_usage.csv", logs_dir):
+        df = pd.read_csv(src, dtype=str, keep_default_na=False)
+        for r in df.to_dict(orient="records"):
+            ts = pd.to_datetime(r.get("timestamp"), errors="coerce")
+            if pd.isna(ts) or (cutoff is not None and ts >= cutoff):
+                continue
+            rows.append(token_usage_row(
+                ts.to_pydatetime(), r.get("conversation_id"), r.get("response_id"), _int(r.get("round")),
+                r.get("model"), _int(r.get("input_tokens_total")), _int(r.get("input_tokens_real")),
+                _int(r.get("cached_tokens")), _int(r.get("output_tokens")), _int(r.get("total_tokens")),
+                {k: _float(r.get(k)) for k in ("cost_input_usd", "cost_cached_usd", "cost_output_usd", "cost_total_usd")},
+                r.get("web_search_used") == "Yes",
+                [x.strip() for x in (r.get("tools_called") or "").split(",") if x.strip()],
+            ))
+    out[TOKEN_USAGE] = store.write_rows(TOKEN_USAGE, rows) if rows else 0
+
+    cutoff = _earliest(store, INTERACTIONS)
+    rows = []
+    for src in _csv_sources("chat_v2_interactions.csv", logs_dir):
+        df = pd.read_csv(src, dtype=str, keep_default_na=False)
+        for r in df.to_dict(orient="records"):
+            ts = pd.to_datetime(r.get("timestamp"), errors="coerce")
+            if pd.isna(ts) or (cutoff is not None and ts >= cutoff):
+                continue
+            rows.append(interaction_row(
+                ts.to_pydatetime(), r.get("userName"), r.get("conversation_id"), r.get("user_message") or "",
+                r.get("response") or "", r.get("response_id"), _int(r.get("rounds_used")),
+                r.get("had_previous_context") == "Yes", r.get("extra_info") or "",
+            ))
+    out[INTERACTIONS] = store.write_rows(INTERACTIONS, rows) if rows else 0
+    return out
+
+
+def _int(v: Any) -> int:
+    try:
+        return int(float(v))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _float(v: Any) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# FILAS
+# ─────────────────────────────────────────────────────────────────────────────
+
+def token_usage_row(
+    timestamp: Any, conversation_id: Optional[str], response_id: Optional[str], round_num: int, model: str,
+    input_tokens_total: int, input_tokens_real: int, cached_tokens: int, output_tokens: int, total_tokens: int,
+    costs: Dict[str, float], web_search_used: bool, tools_called: Optional[List[str]],
+) -> Dict[str, Any]:
+    return {
+        "timestamp": timestamp,
+        "conversation_id": conversation_id or "",
+        "response_id": response_id or "",
+        "round": int(round_num or 0),
+        "model": model,
+        "input_tokens_total": int(input_tokens_total or 0),
+        "cached_tokens": int(cached_tokens or 0),
+        "input_tokens_real": int(input_tokens_real or 0),
+        "output_tokens": int(output_tokens or 0),
+        "total_tokens": int(total_tokens or 0),
+        "cost_input_usd": float(costs.get("cost_input_usd", 0.0)),
+        "cost_cached_usd": float(costs.get("cost_cached_usd", 0.0)),
+        "cost_output_usd": float(costs.get("cost_output_usd", 0.0)),
+        "cost_total_usd": float(costs.get("cost_total_usd", 0.0)),
+        "web_search_used": bool(web_search_used),
+        "tools_called": list(tools_called or []),
+    }
+
+
+def interaction_row(
+    timestamp: Any, user_name: Optional[str], conversation_id: Optional[str], user_message: str, response: str,
+    response_id: Optional[str], rounds_used: int, had_previous_context: bool, extra_info: str,
+) -> Dict[str, Any]:
+    return {
+        "timestamp": timestamp,
+        "user_name": user_name or "N/A",
+        "conversation_id": conversation_id or "",
+        "response_id": response_id or "",
+        "rounds_used": int(rounds_used or 0),
+        "had_previous_context": bool(had_previous_context),
+        "user_message_chars": len(user_message or ""),
+        "response_chars": len(response or ""),
+        "extra_info": extra_info or "",
+    }
+
+
+_usage_store: Optional[UsageStore] = None
+_usage_store_lock = threading.Lock()
+
+
+def get_usage_store() -> UsageStore:
+    """Store de analítica del proceso (singleton)."""
+    global _usage_store
+    if _usage_store is None:
+        with _usage_store_lock:
+            if _usage_store is None:
+                _usage_store = UsageStore()
+                atexit.register(_usage_store.close)
+    return _usage_store
+
+
+def close_usage_store() -> None:
+    """Escribe lo pendiente y detiene el hilo (shutdown del servidor)."""
+    if _usage_store is not None:
+        _usage_store.close()
+
+
+def main():
+    p = argparse.ArgumentParser(description="Store Parquet de uso de chat_v2")
+    p.add_argument("--backfill", action="store_true", help="Importa los CSV de chat_v2 anteriores al store")
+    p.add_argument("--compact", action="store_true", help="Compacta los días cerrados")
+    p.add_argument("--report", action="store_true", help="Imprime el reporte de los últimos 30 días")
+    args = p.parse_args()
+
+    store = get_usage_store()
+    out: Dict[str, Any] = {}
+    if args.backfill:
+        out["backfill"] = backfill_from_csv(store)
+    if args.compact:
+        out["compacted_days"] = store.compact()
+    if args.report or not out:
+        out["report"] = store.usage_report()
+    print(json.dumps(out, ensure_ascii=False, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
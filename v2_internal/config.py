@@ -10,3 +10,29 @@ SKIP_AUTH = os.getenv("SKIP_AUTH", "0") == "1"
 # Constantes
 MAX_WEB_SEARCHES_PER_CONV = 3  # Límite de búsquedas web por conversación
 
+
+# Ejecución de tools (ver v2_internal/executor.py y core/tool_runner.py)
+# Las tools síncronas (FAISS, requests/httpx, OpenAI embeddings) corren en un pool acotado
+# para no congelar el event loop ni los streams SSE de otras conversaciones.
+TOOL_EXECUTOR_WORKERS = int(os.getenv("TOOL_EXECUTOR_WORKERS", "16"))
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "60"))
+
+# Máximo de function_calls de un mismo round ejecutándose en paralelo
+TOOL_CALLS_MAX_PARALLEL = int(os.getenv("TOOL_CALLS_MAX_PARALLEL", "4"))
+
+# Timeouts específicos por tool (segundos); el resto usa TOOL_TIMEOUT_SECONDS
+TOOL_TIMEOUTS = {
+    "search_knowledge": 30,
+    "get_item": 45,
+    "query_tickets": 90,
+    "propose_next_steps": 120,
+}
+
+# Máximo de ejecuciones simultáneas por tool en todo el proceso; el resto usa TOOL_DEFAULT_CONCURRENCY
+TOOL_DEFAULT_CONCURRENCY = int(os.getenv("TOOL_DEFAULT_CONCURRENCY", "8"))
+TOOL_CONCURRENCY_LIMITS = {
+    "search_knowledge": 8,
+    "get_item": 8,
+    "query_tickets": 4,
+    "propose_next_steps": 4,
+}
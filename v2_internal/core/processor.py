@@ -4,7 +4,6 @@ Procesador central de chat_v2
 import os
 import json
 import time
-import inspect
 from typing import Any, Dict, List, Optional
 
 from utils.token_verifier import verificar_token
@@ -26,6 +25,7 @@ from ..context_manager import (
 from ..live_steps import tr, get_step_emitter
 from ..tool_description import TOOLS, SYSTEM_INSTRUCTIONS, TOOL_IMPL
 from .tool_executor import execute_tool_call, build_tool_output
+from .tool_runner import run_tool_calls
 
 
 async def process_chat_v2_core(req: ChatV2Request) -> Dict[str, Any]:
@@ -189,6 +189,10 @@ async def process_chat_v2_core(req: ChatV2Request) -> Dict[str, Any]:
             web_search_used_this_round = False
             tools_called_this_round: List[str] = []
 
+            # 1) Resolver cada call (web_search, tool no implementada o (fn, args) a ejecutar)
+            # 2) Ejecutar en paralelo las tools del round; outputs en el mismo orden de las calls
+            resolved: List[Any] = []
+            pending: List[tuple] = []
             for i, item in enumerate(calls, start=1):
                 name = getattr(item, "name", "")
                 try:
@@ -209,23 +213,29 @@ async def process_chat_v2_core(req: ChatV2Request) -> Dict[str, Any]:
                     # web_search es manejado por OpenAI, no agregamos output
                     continue
                 
-                # Si result es una tupla (fn, args), ejecutar la función
-                if isinstance(result, tuple) and len(result) == 2:
-                    fn, fn_args = result
-                    t1 = time.time()
-                    # Detectar si la función es async o sync
-                    if inspect.iscoroutinefunction(fn):
-                        result = await fn(fn_args, req.conversation_id)
-                    else:
-                        result = fn(fn_args, req.conversation_id)
-                    dt = time.time() - t1
-                    tr(f"Tool {tool_name} completado en {dt:.2f}s")
-                elif result is None:
+                if result is None:
                     # web_search o tool que no necesita output
                     continue
                 
                 tools_called_this_round.append(tool_name)
-                
+                # Si result es una tupla (fn, args), se ejecuta en el paso 2
+                if isinstance(result, tuple) and len(result) == 2:
+                    fn, fn_args = result
+                    pending.append((fn, fn_args, tool_name))
+                    resolved.append((item, len(pending) - 1, None))
+                else:
+                    resolved.append((item, None, result))
+
+            if pending:
+                t1 = time.time()
+                # Sync → pool acotado; async → en el loop. Límite por round, por tool y timeout por call
+                pending_results = await run_tool_calls(pending, req.conversation_id)
+                if len(pending) > 1:
+                    tr(f"{len(pending)} tools ejecutadas en paralelo en {time.time() - t1:.2f}s")
+
+            for item, pending_idx, result in resolved:
+                if pending_idx is not None:
+                    result = pending_results[pending_idx]
                 tool_outputs.append(build_tool_output(result, getattr(item, "call_id", "")))
 
             # Log token usage con manejo robusto de errores
@@ -0,0 +1,100 @@
+"""
+Ejecución no bloqueante de tools para chat_v2
+- Tools síncronas: corren en el pool acotado (v2_internal/executor.py)
+- Tools async: se esperan directamente en el loop
+Ambas con límite de concurrencia por tool y timeout (resultado de error estructurado).
+Las function_call de un mismo round se ejecutan en paralelo (run_tool_calls).
+"""
+import asyncio
+import inspect
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from ..config import (
+    TOOL_TIMEOUT_SECONDS,
+    TOOL_TIMEOUTS,
+    TOOL_DEFAULT_CONCURRENCY,
+    TOOL_CONCURRENCY_LIMITS,
+    TOOL_CALLS_MAX_PARALLEL,
+)
+from ..executor import run_blocking
+from ..live_steps import tr
+
+# Semáforos por tool (compartidos entre todas las conversaciones del proceso)
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def _get_semaphore(tool_name: str) -> asyncio.Semaphore:
+    sem = _semaphores.get(tool_name)
+    if sem is None:
+        sem = asyncio.Semaphore(TOOL_CONCURRENCY_LIMITS.get(tool_name, TOOL_DEFAULT_CONCURRENCY))
+        _semaphores[tool_name] = sem
+    return sem
+
+
+def get_tool_timeout(tool_name: str) -> float:
+    return float(TOOL_TIMEOUTS.get(tool_name, TOOL_TIMEOUT_SECONDS))
+
+
+async def run_tool(
+    fn: Callable[..., Any],
+    args: Dict[str, Any],
+    conversation_id: str,
+    tool_name: str,
+) -> Any:
+    """
+    Ejecuta una tool sin bloquear el event loop.
+
+    Returns:
+        El resultado de la tool, o {"error": ..., "timeout": True} si excede su timeout.
+        Nota: una tool síncrona que excede el timeout sigue corriendo en su hilo hasta terminar
+        (los hilos no se pueden cancelar); solo se deja de esperar su resultado.
+    """
+    timeout = get_tool_timeout(tool_name)
+    t0 = time.time()
+    async with _get_semaphore(tool_name):
+        waited = time.time() - t0
+        if waited > 0.5:
+            tr(f"Tool {tool_name} esperó {waited:.2f}s por límite de concurrencia")
+        try:
+            if inspect.iscoroutinefunction(fn):
+                return await asyncio.wait_for(fn(args, conversation_id), timeout=timeout)
+            return await asyncio.wait_for(run_blocking(fn, args, conversation_id), timeout=timeout)
+        except asyncio.TimeoutError:
+            tr(f"⚠️ Tool {tool_name} excedió el tiempo límite ({timeout:.0f}s)")
+            return {
+                "error": f"La herramienta {tool_name} excedió el tiempo límite de {timeout:.0f}s.",
+                "timeout": True,
+                "tool": tool_name,
+            }
+
+
+async def run_tool_calls(
+    calls: List[Tuple[Callable[..., Any], Dict[str, Any], str]],
+    conversation_id: str,
+) -> List[Any]:
+    """
+    Ejecuta en paralelo las tools solicitadas en un mismo round (asyncio.gather),
+    con máximo TOOL_CALLS_MAX_PARALLEL simultáneas.
+
+    Args:
+        calls: Lista de (fn, args, tool_name) en el orden en que el modelo las pidió
+
+    Returns:
+        Resultados en el MISMO orden que calls (para respetar el call_id de cada output).
+        Una excepción en una tool se convierte en {"error": ...} sin afectar a las demás.
+    """
+    round_sem = asyncio.Semaphore(max(1, TOOL_CALLS_MAX_PARALLEL))
+
+    async def _one(fn: Callable[..., Any], args: Dict[str, Any], tool_name: str) -> Any:
+        async with round_sem:
+            t0 = time.time()
+            try:
+                result = await run_tool(fn, args, conversation_id, tool_name)
+            except Exception as e:
+                tr(f"Error ejecutando tool {tool_name}: {e}")
+                return {"error": f"Error ejecutando {tool_name}: {e}", "tool": tool_name}
+            tr(f"Tool {tool_name} completado en {time.time() - t0:.2f}s")
+            return result
+
+    return list(await asyncio.gather(*(_one(fn, args, name) for fn, args, name in calls)))
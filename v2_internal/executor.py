@@ -0,0 +1,36 @@
+"""
+Pool acotado para trabajo bloqueante de chat_v2 (tools síncronas, llamadas HTTP/FAISS dentro de tools async).
+Vive fuera de core/ para que tool_description pueda usarlo sin import circular.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from .config import TOOL_EXECUTOR_WORKERS
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_tool_executor() -> ThreadPoolExecutor:
+    """ThreadPoolExecutor compartido (TOOL_EXECUTOR_WORKERS hilos)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=TOOL_EXECUTOR_WORKERS, thread_name_prefix="v2-tool")
+    return _executor
+
+
+async def run_blocking(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Ejecuta una función bloqueante en el pool sin detener el event loop.
+    Copia el contexto (ContextVars) para que tr() siga encontrando el StepEmitter del request.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, fn, *args, **kwargs)
+    return await loop.run_in_executor(get_tool_executor(), call)
@@ -17,6 +17,11 @@ class StepEmitter:
     
     def __init__(self):
         self.queue = asyncio.Queue()
+        # Loop dueño de la queue: tr() lo usa para emitir desde hilos del pool de tools
+        try:
+            self.loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            self.loop = None
         self.last_sent_time = 0.0
         self.last_message = ""
         self.throttle_ms = 0  # Sin throttle - mostrar TODOS los mensajes (para debug)
@@ -125,6 +125,15 @@ def tr(msg: str) -> None:
                     # Estamos en contexto async, usar create_task
                     asyncio.create_task(emitter.emit_status(friendly_msg))
                 except RuntimeError:
+                    # Sin loop en este hilo: tool síncrona corriendo en el pool (v2_internal/executor.py).
+                    # Programar la emisión en el loop dueño del emitter (thread-safe).
+                    emitter_loop = getattr(emitter, "loop", None)
+                    if emitter_loop is not None and emitter_loop.is_running():
+                        try:
+                            asyncio.run_coroutine_threadsafe(emitter.emit_status(friendly_msg), emitter_loop)
+                        except Exception:
+                            pass
+                        return
                     # No hay event loop corriendo, crear uno nuevo (raro pero posible)
                     try:
                         loop = asyncio.get_event_loop()
@@ -3,29 +3,27 @@ Implementaciones de herramientas para chat_v2
 """
 import os
 import re
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 from Tools.get_tickets import (
-    get_ticket_data,
-    get_ticket_comments,
+    get_ticket_full,
+    get_tickets_full,
 )
 from Tools.search_tickets import (
     search_tickets_by_keywords,
-    search_tickets_semantic,
     search_tickets_hybrid,
 )
-from Tools.search_docs import search_docs
 from Tools.get_docs import get_doc_context
 from Tools.get_etiquetas import get_etiqueta_context
-from Tools.search_etiquetas import search_etiquetas
 from Tools.get_quotes import get_quotes_context
-from Tools.search_quotes import search_quotes
+from Tools.multi_search import multi_search, DOC_UNIVERSES
 from Tools.query_tool import (
     generate_sql_query,
     fetch_query_results,
 )
 from utils.contextManager.context_handler import get_interaction_id
 
+from ..executor import run_blocking
 from ..live_steps import tr
 from .helpers import _dedupe_hits
 
@@ -69,6 +67,23 @@ def tool_search_knowledge(args: Dict[str, Any], conversation_id: str) -> Dict[st
         tr(f"universe='all' detectado: buscando en todos los scopes (tickets, quotes, etiquetas, docs)")
         tr(f"Obtendrá hasta {top_k} resultados por cada categoría (tickets, quotes, etiquetas, cada universo de docs)")
 
+    # ---- FAN-OUT SEMÁNTICO ----
+    # Un solo embedding de la query y búsquedas FAISS en paralelo para todos los universos
+    # semánticos que pide el scope; cada bloque de abajo solo interpreta su resultado.
+    semantic_universes: list[str] = []
+    if scope in ("tickets", "all") and policy == "semantic":
+        semantic_universes.append("tickets")
+    if scope in ("etiquetas", "all"):
+        semantic_universes.append("etiquetas")
+    if scope in ("quotes", "cotizaciones", "all"):
+        semantic_universes.append("quotes")
+    if scope in ("docs", "all"):
+        semantic_universes.extend(DOC_UNIVERSES if universe == "all" else [universe])
+
+    fanout: Dict[str, Dict[str, Any]] = {}
+    if semantic_universes:
+        fanout = multi_search(query, semantic_universes, top_k=top_k, conversation_id=conversation_id).get("results", {})
+
     # ---- TICKETS ----
     if scope in ("tickets", "all"):
         if policy == "hybrid":
@@ -135,7 +150,10 @@ def tool_search_knowledge(args: Dict[str, Any], conversation_id: str) -> Dict[st
             # Solo búsqueda semántica
             tr(f"Buscando en tickets con búsqueda semántica...")
             try:
-                semantic_results = search_tickets_semantic(query, conversation_id, top_k=top_k)
+                tickets_res = fanout.get("tickets") or {"ok": False, "error": "not_searched"}
+                if not tickets_res.get("ok"):
+                    notes.append(f"semantic error: {tickets_res.get('error')}")
+                semantic_results = tickets_res.get("hits", []) or []
                 count = len(semantic_results) if semantic_results else 0
                 if count > 0:
                     tr(f"Encontrados {count} tickets con búsqueda semántica")
@@ -163,7 +181,7 @@ def tool_search_knowledge(args: Dict[str, Any], conversation_id: str) -> Dict[st
     if scope in ("etiquetas", "all"):
         tr(f"Buscando etiquetas del sistema ZELL...")
         try:
-            etiquetas_res = search_etiquetas(query=query, top_k=top_k)
+            etiquetas_res = fanout.get("etiquetas") or {"ok": False, "error": "not_searched"}
             if etiquetas_res.get("ok"):
                 etiquetas_hits = etiquetas_res.get("hits", []) or []
                 count = len(etiquetas_hits)
@@ -201,7 +219,7 @@ def tool_search_knowledge(args: Dict[str, Any], conversation_id: str) -> Dict[st
     if scope in ("quotes", "cotizaciones", "all"):
         tr(f"Buscando cotizaciones del sistema ZELL...")
         try:
-            quotes_res = search_quotes(query=query, top_k=top_k)
+            quotes_res = fanout.get("quotes") or {"ok": False, "error": "not_searched"}
             if quotes_res.get("ok"):
                 quotes_hits = quotes_res.get("hits", []) or []
                 count = len(quotes_hits)
@@ -250,7 +268,7 @@ def tool_search_knowledge(args: Dict[str, Any], conversation_id: str) -> Dict[st
             
             for uni in available_universes:
                 try:
-                    doc_res = search_docs(query=query, universe=uni, top_k=top_k)
+                    doc_res = fanout.get(uni) or {"ok": False, "error": "not_searched"}
                     if doc_res.get("ok"):
                         uni_hits = doc_res.get("hits", []) or []
                         if uni_hits:
@@ -261,6 +279,9 @@ def tool_search_knowledge(args: Dict[str, Any], conversation_id: str) -> Dict[st
                             all_dhits.extend(uni_hits)
                         else:
                             tr(f"No se encontraron documentos en {uni}")
+                    else:
+                        tr(f"Error buscando en {uni}: {doc_res.get('error')}")
+                        notes.append(f"{uni}: error={doc_res.get('error')}")
                 except Exception as e:
                     tr(f"Error buscando en {uni}: {e}")
                     notes.append(f"{uni}: error={e}")
@@ -273,7 +294,7 @@ def tool_search_knowledge(args: Dict[str, Any], conversation_id: str) -> Dict[st
         else:
             tr(f"Buscando en: {universe}")
             try:
-                doc_res = search_docs(query=query, universe=universe, top_k=top_k)
+                doc_res = fanout.get(universe) or {"ok": False, "error": "not_searched"}
                 if doc_res.get("ok"):
                     dhits = doc_res.get("hits", []) or []
                     count = len(dhits)
@@ -533,39 +554,75 @@ def tool_get_item(args: Dict[str, Any], conversation_id: str) -> Dict[str, Any]:
     if item_type == "ticket":
         tr(f"Obteniendo datos del ticket #{item_id}")
         try:
-            ticket_data = get_ticket_data(item_id, conversation_id)
-            # Verificar si hubo error
-            if "error" in ticket_data:
-                tr(f"Error al obtener ticket: {ticket_data['error']}")
-                return {"error": ticket_data["error"]}
-            
-            title = ticket_data.get("Titulo") or ticket_data.get("title") or "N/A"
-            tr(f"Ticket obtenido: {title}")
+            # Datos (5001) y comentarios (5002) en vuelo a la vez
+            ticket_data, comments_result = get_ticket_full(item_id, conversation_id, include_comments=include_comments)
         except Exception as e:
             tr(f"Error al obtener ticket: {e}")
             return {"error": f"get_ticket_data falló: {e}"}
 
-        out: Dict[str, Any] = {"ticket_data": ticket_data}
+        return _ticket_item_result(ticket_data, comments_result)
 
-        if include_comments:
-            tr(f"Obteniendo comentarios del ticket...")
-            try:
-                comments_result = get_ticket_comments(item_id, conversation_id)
-                # Verificar si hubo error
-                if "error" in comments_result:
-                    tr(f"Error al obtener comentarios: {comments_result['error']}")
-                    out["ticket_comments_error"] = comments_result["error"]
-                else:
-                    out["ticket_comments"] = comments_result
-                    comments_count = len(comments_result) if isinstance(comments_result, list) else 1
-                    tr(f"Comentarios obtenidos: {comments_count}")
-            except Exception as e:
-                tr(f"Error al obtener comentarios: {e}")
-                out["ticket_comments_error"] = str(e)
+    return {"error": f"Tipo no soportado: {item_type}"}
 
-        return out
 
-    return {"error": f"Tipo no soportado: {item_type}"}
+def _ticket_item_result(ticket_data: Dict[str, Any], comments_result: Any) -> Dict[str, Any]:
+    """Arma la salida de get_item para un ticket a partir de datos + comentarios ya obtenidos."""
+    # Verificar si hubo error
+    if "error" in ticket_data:
+        tr(f"Error al obtener ticket: {ticket_data['error']}")
+        return {"error": ticket_data["error"]}
+
+    title = ticket_data.get("Titulo") or ticket_data.get("title") or "N/A"
+    tr(f"Ticket obtenido: {title}")
+
+    out: Dict[str, Any] = {"ticket_data": ticket_data}
+
+    if comments_result is not None:
+        if isinstance(comments_result, dict) and "error" in comments_result:
+            tr(f"Error al obtener comentarios: {comments_result['error']}")
+            out["ticket_comments_error"] = comments_result["error"]
+        else:
+            out["ticket_comments"] = comments_result
+            comments_count = len(comments_result) if isinstance(comments_result, list) else 1
+            tr(f"Comentarios obtenidos: {comments_count}")
+
+    return out
+
+
+def get_items(items: List[Dict[str, Any]], conversation_id: str) -> List[Dict[str, Any]]:
+    """
+    Variante batch de tool_get_item: recibe una lista de args de get_item
+    ({"type", "id", "include_comments", ...}) y devuelve los resultados en el mismo orden.
+
+    Los tickets se piden todos en paralelo a la API de Zell (get_tickets_full, con tope
+    TICKET_BATCH_MAX_CONCURRENCY); docs/etiquetas/quotes son lecturas locales y van directo.
+    """
+    results: List[Any] = [None] * len(items)
+
+    ticket_positions: Dict[bool, List[int]] = {True: [], False: []}
+    for pos, item in enumerate(items):
+        if item.get("type") == "ticket":
+            ticket_positions[bool(item.get("include_comments", True))].append(pos)
+        else:
+            results[pos] = tool_get_item(item, conversation_id)
+
+    for include_comments, positions in ticket_positions.items():
+        if not positions:
+            continue
+        ids = [str(items[pos].get("id")) for pos in positions]
+        tr(f"Obteniendo {len(set(ids))} tickets en paralelo: {', '.join(f'#{i}' for i in dict.fromkeys(ids))}")
+        try:
+            fetched = get_tickets_full(ids, conversation_id, include_comments=include_comments)
+        except Exception as e:
+            tr(f"Error al obtener tickets: {e}")
+            for pos in positions:
+                results[pos] = {"error": f"get_ticket_data falló: {e}"}
+            continue
+        for pos, ticket_id in zip(positions, ids):
+            ticket_data, comments_result = fetched[ticket_id]
+            results[pos] = _ticket_item_result(ticket_data, comments_result)
+
+    return results
 
 
 async def tool_query_tickets(args: Dict[str, Any], conversation_id: str) -> Dict[str, Any]:
@@ -618,7 +675,7 @@ async def tool_query_tickets(args: Dict[str, Any], conversation_id: str) -> Dict
         
         # 2️⃣ Ejecutar consulta en Zell
         tr(f"Ejecutando consulta en base de datos...")
-        api_data, status_code, _, _ = fetch_query_results(sql_query)
+        api_data, status_code, _, _ = await run_blocking(fetch_query_results, sql_query)
         if api_data is None:
             tr(f"Error llamando API de Zell")
             return {"error": "Error llamando API de Zell."}
@@ -732,7 +789,8 @@ async def tool_propose_next_steps(args: Dict[str, Any], conversation_id: str) ->
     
     # 1. Obtener el ticket completo
     try:
-        ticket_result = tool_get_item(
+        ticket_result = await run_blocking(
+            tool_get_item,
             {"type": "ticket", "id": ticket_id, "include_comments": True},
             conversation_id
         )
@@ -765,94 +823,84 @@ async def tool_propose_next_steps(args: Dict[str, Any], conversation_id: str) ->
     
     tr(f"Query construida (título + descripción) para búsqueda semántica: {search_query[:100]}...")
     
-    # 4. Búsqueda semántica en tickets (top_k=3)
-    similar_tickets_ids = []
+    # 4-5. Búsquedas semánticas en tickets y cotizaciones (top_k=3): un solo embedding de la
+    # query y ambas búsquedas FAISS en paralelo (multi_search)
+    tr(f"Buscando tickets y cotizaciones similares (top_k=3)...")
     try:
-        tr(f"Buscando tickets similares (top_k=3)...")
-        tickets_search_result = tool_search_knowledge(
-            {
-                "query": search_query,
-                "scope": "tickets",
-                "policy": "semantic",
-                "top_k": 3,
-            },
-            conversation_id
-        )
-        if tickets_search_result.get("hits"):
-            for hit in tickets_search_result.get("hits", []):
-                hit_ticket_id = hit.get("id")
-                if hit_ticket_id and hit_ticket_id != ticket_id:  # Excluir el ticket actual
-                    similar_tickets_ids.append(hit_ticket_id)
-            tr(f"Encontrados {len(similar_tickets_ids)} tickets similares")
+        fanout = (await run_blocking(
+            multi_search, search_query, ["tickets", "quotes"], top_k=3, conversation_id=conversation_id
+        )).get("results", {})
     except Exception as e:
-        tr(f"Error al buscar tickets similares: {e}")
-    
-    # 5. Búsqueda semántica en cotizaciones (top_k=3)
+        tr(f"Error al buscar tickets y cotizaciones similares: {e}")
+        fanout = {}
+    tickets_search_result = fanout.get("tickets") or {"ok": False, "error": "not_searched"}
+    quotes_search_result = fanout.get("quotes") or {"ok": False, "error": "not_searched"}
+
+    similar_tickets_ids = []
+    if not tickets_search_result.get("ok"):
+        tr(f"Error al buscar tickets similares: {tickets_search_result.get('error')}")
+    elif tickets_search_result.get("hits"):
+        for hit in tickets_search_result.get("hits", []):
+            hit_ticket_id = hit.get("ticket_id")
+            if hit_ticket_id is not None and str(hit_ticket_id) != ticket_id:  # Excluir el ticket actual
+                similar_tickets_ids.append(str(hit_ticket_id))
+        tr(f"Encontrados {len(similar_tickets_ids)} tickets similares")
+
     similar_quotes_metadata = []
-    try:
-        tr(f"Buscando cotizaciones similares (top_k=3)...")
-        quotes_search_result = tool_search_knowledge(
-            {
-                "query": search_query,
-                "scope": "quotes",
-                "policy": "semantic",
-                "top_k": 3,
-            },
-            conversation_id
-        )
-        if quotes_search_result.get("hits"):
-            for hit in quotes_search_result.get("hits", []):
-                # El id en el hit es i_issue_id, y también está en metadata
-                issue_id = hit.get("id") or hit.get("metadata", {}).get("i_issue_id")
-                if issue_id:
-                    similar_quotes_metadata.append({
-                        "i_issue_id": str(issue_id),
-                        "i_quote_id": hit.get("metadata", {}).get("i_quote_id"),
-                        "metadata": hit.get("metadata", {}),
-                    })
-            tr(f"Encontradas {len(similar_quotes_metadata)} cotizaciones similares")
-    except Exception as e:
-        tr(f"Error al buscar cotizaciones similares: {e}")
-    
-    # 6. Obtener tickets similares completos
-    similar_tickets_data = []
-    for similar_ticket_id in similar_tickets_ids:
-        try:
-            tr(f"Obteniendo ticket completo #{similar_ticket_id}...")
-            similar_ticket_result = tool_get_item(
-                {"type": "ticket", "id": similar_ticket_id, "include_comments": True},
-                conversation_id
-            )
-            if "error" not in similar_ticket_result:
-                similar_tickets_data.append({
-                    "ticket_id": similar_ticket_id,
-                    "ticket_data": similar_ticket_result.get("ticket_data"),
-                    "ticket_comments": similar_ticket_result.get("ticket_comments", []),
+    if not quotes_search_result.get("ok"):
+        tr(f"Error al buscar cotizaciones similares: {quotes_search_result.get('error')}")
+    elif quotes_search_result.get("hits"):
+        for hit in quotes_search_result.get("hits", []):
+            issue_id = hit.get("i_issue_id")
+            if issue_id:
+                similar_quotes_metadata.append({
+                    "i_issue_id": str(issue_id),
+                    "i_quote_id": hit.get("i_quote_id"),
+                    "metadata": {
+                        "i_issue_id": hit.get("i_issue_id"),
+                        "i_quote_id": hit.get("i_quote_id"),
+                        "v_title": hit.get("v_title"),
+                        "i_units": hit.get("i_units"),
+                        "f_payment_date": hit.get("f_payment_date"),
+                        "descriptions": hit.get("descriptions"),
+                    },
                 })
+        tr(f"Encontradas {len(similar_quotes_metadata)} cotizaciones similares")
+
+    # 6-7. Obtener tickets y cotizaciones similares completos en una sola ola (get_items)
+    batch = (
+        [{"type": "ticket", "id": tid, "include_comments": True} for tid in similar_tickets_ids]
+        + [{"type": "quote", "id": q.get("i_issue_id")} for q in similar_quotes_metadata]
+    )
+    batch_results: List[Dict[str, Any]] = []
+    if batch:
+        try:
+            batch_results = await run_blocking(get_items, batch, conversation_id)
         except Exception as e:
-            tr(f"Error al obtener ticket #{similar_ticket_id}: {e}")
-    
-    # 7. Obtener cotizaciones similares completas
+            tr(f"Error al obtener tickets y cotizaciones similares: {e}")
+            batch_results = [{"error": str(e)}] * len(batch)
+
+    similar_tickets_data = []
+    for similar_ticket_id, similar_ticket_result in zip(similar_tickets_ids, batch_results):
+        if "error" not in similar_ticket_result:
+            similar_tickets_data.append({
+                "ticket_id": similar_ticket_id,
+                "ticket_data": similar_ticket_result.get("ticket_data"),
+                "ticket_comments": similar_ticket_result.get("ticket_comments", []),
+            })
+
     similar_quotes_data = []
-    for quote_meta in similar_quotes_metadata:
+    for quote_meta, quote_result in zip(similar_quotes_metadata, batch_results[len(similar_tickets_ids):]):
         issue_id = quote_meta.get("i_issue_id")
-        try:
-            tr(f"Obteniendo cotización completa (i_issue_id: {issue_id})...")
-            quote_result = tool_get_item(
-                {"type": "quote", "id": issue_id},
-                conversation_id
-            )
-            if "error" not in quote_result and quote_result.get("ok"):
-                quotes_list = quote_result.get("quotes", [])
-                if quotes_list:
-                    similar_quotes_data.append({
-                        "i_issue_id": issue_id,
-                        "i_quote_id": quote_meta.get("i_quote_id"),
-                        "quote_data": quotes_list[0],  # Primera cotización encontrada
-                    })
-        except Exception as e:
-            tr(f"Error al obtener cotización (i_issue_id: {issue_id}): {e}")
-    
+        if "error" not in quote_result and quote_result.get("ok"):
+            quotes_list = quote_result.get("quotes", [])
+            if quotes_list:
+                similar_quotes_data.append({
+                    "i_issue_id": issue_id,
+                    "i_quote_id": quote_meta.get("i_quote_id"),
+                    "quote_data": quotes_list[0],  # Primera cotización encontrada
+                })
+
     # 8. Obtener el documento completo del Procedimiento P-OPR-01
     tr(f"Obteniendo documento completo P-OPR-01 (doc_id: {P_OPR_01_DOC_ID})...")
     procedure_document = None
@@ -54,6 +54,32 @@ def verificar_cache_embeddings(universe: str, out_dir: str = "Data"):
     print(f"VERIFICACION: Cache de Embeddings ({universe})")
     print(f"{'='*70}")
     
+    # Store binario (Tools/docs_indexer/emb_store.py); el JSONL solo existe si aun no se migro
+    store_dir = os.path.join(out_dir, f"docs_{universe}_emb_store")
+    manifest_path = os.path.join(store_dir, "manifest.json")
+    if os.path.exists(manifest_path):
+        print(f"  [OK] Store de embeddings existe: {store_dir}")
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            count = 0
+            size_bytes = 0
+            for seg in manifest.get("segments", []):
+                keys_path = os.path.join(store_dir, f"{seg['name']}.keys")
+                vec_path = os.path.join(store_dir, f"{seg['name']}.f32")
+                if os.path.exists(keys_path):
+                    with open(keys_path, "r", encoding="utf-8") as f:
+                        count += sum(1 for line in f if line.strip())
+                for p in (keys_path, vec_path):
+                    if os.path.exists(p):
+                        size_bytes += os.path.getsize(p)
+            print(f"  [OK] Store contiene {count:,} embeddings guardados")
+            print(f"  [INFO] Tamano del store: {size_bytes / (1024 * 1024):.2f} MB")
+            return True
+        except Exception as e:
+            print(f"  [ERROR] No se pudo leer el store: {e}")
+            return False
+
     cache_path = os.path.join(out_dir, f"docs_{universe}_emb_cache.jsonl")
     
     if not os.path.exists(cache_path):